@@ -0,0 +1,189 @@
+"""
+asyncio event-loop runtime for the MTR to MQTT bridge.
+
+The asyncio runtime reuses the MtrBridge measurement handling, so MQTT
+topics, payloads and console output are identical to the threaded runtime.
+Only the scheduling differs: each receiver has its own reader task, and the
+offline deadlines, summary debounce and metadata refresh run as timers
+instead of being checked on every pass of a polling loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from mtr2mqtt import runtime
+
+
+HOUSEKEEPING_INTERVAL = 1
+
+
+class AsyncMtrBridge(runtime.MtrBridge):
+    """
+    MtrBridge driven by an asyncio event loop.
+
+    pyserial has no non-blocking API, so every poll of a receiver runs in the
+    default executor through asyncio.to_thread. Measurements are handed to the
+    event loop through a queue and tracked and published there only.
+    """
+
+    def __init__(self, args, transmitters_metadata=None, discovery_publisher=None):
+        super().__init__(
+            args,
+            transmitters_metadata=transmitters_metadata,
+            discovery_publisher=discovery_publisher,
+        )
+        self._measurement_queue = None
+        self._reader_tasks = {}
+        self._receiver_states = {}
+
+    def _is_connected(self, receiver):
+        return any(connected is receiver for connected in self.receivers)
+
+    async def _read_receiver(self, receiver):
+        """
+        Poll one receiver until it is replaced by recovery or dropped.
+        """
+        poll_scheduler = self._create_poll_scheduler()
+        try:
+            while self._is_connected(receiver):
+                await self._read_receiver_once(receiver, poll_scheduler)
+        finally:
+            self._receiver_states.pop(id(receiver), None)
+
+    async def _read_receiver_once(self, receiver, poll_scheduler):
+        """
+        Poll one receiver, update the bridge state from every receiver's
+        latest state and pace the next poll.
+        """
+        polled_at = time.monotonic()
+        state, _receiver, measurements = await asyncio.to_thread(
+            self._poll_receiver,
+            receiver,
+        )
+        self._receiver_states[id(receiver)] = state
+        self._settle_state(self._aggregate_state(set(self._receiver_states.values())))
+        if measurements:
+            poll_scheduler.record_traffic(polled_at)
+            await self._measurement_queue.put((receiver, measurements))
+        if state is runtime.BridgeState.IDLE:
+            poll_scheduler.record_idle()
+            await asyncio.sleep(poll_scheduler.next_delay())
+        elif state is not runtime.BridgeState.READY:
+            await asyncio.sleep(runtime.RECEIVER_RETRY_INTERVAL)
+        else:
+            await asyncio.sleep(0)
+
+    async def _supervise_receivers(self):
+        """
+        Start a reader task for every connected receiver and reap finished ones.
+        """
+        while True:
+            receivers = await asyncio.to_thread(self._ensure_receivers)
+            for key, task in list(self._reader_tasks.items()):
+                if task.done():
+                    del self._reader_tasks[key]
+                    task.result()
+            for receiver in list(receivers):
+                if id(receiver) not in self._reader_tasks:
+                    self._reader_tasks[id(receiver)] = asyncio.create_task(
+                        self._read_receiver(receiver),
+                    )
+            await asyncio.sleep(runtime.RECEIVER_RETRY_INTERVAL)
+
+    async def _consume_measurements(self):
+        """
+        Track and publish measurement batches in arrival order.
+        """
+        while True:
+            receiver, measurements = await self._measurement_queue.get()
+            for measurement in measurements:
+                self.handle_measurement(measurement, receiver)
+            self.publish_status_changes()
+            self.publish_due_summaries()
+
+    async def _status_timer(self):
+        """
+        Sleep until the next offline deadline and publish the transition.
+
+        New traffic only ever moves deadlines later, so the timer never
+        oversleeps; with nothing tracked, the earliest possible deadline is
+        one offline_timeout away.
+        """
+        while True:
+            self.sweep_status()
+            delay = self._status_delay()
+            if delay is None:
+                delay = self.status_tracker.offline_timeout
+            await asyncio.sleep(delay)
+
+    async def _summary_timer(self):
+        """
+        Sleep until the next debounced summary is due and publish it.
+
+        While MQTT is disconnected an overdue summary is retried once per
+        HOUSEKEEPING_INTERVAL instead of immediately.
+        """
+        while True:
+            self.publish_due_summaries()
+            delay = self._summary_delay()
+            if not self._mqtt_connected():
+                delay = max(delay or 0.0, HOUSEKEEPING_INTERVAL)
+            elif delay is None:
+                delay = self.summary_tracker.debounce_seconds
+            await asyncio.sleep(delay)
+
+    async def _output_timer(self):
+        """
+        Draw coalesced table frames once their frame interval has elapsed.
+        """
+        while True:
+            self.flush_output()
+            delay = self._output_frame_delay()
+            if delay is None:
+                delay = self.output_view.frame_interval or HOUSEKEEPING_INTERVAL
+            await asyncio.sleep(delay)
+
+    async def _housekeeping_timer(self):
+        """
+        Run the bridge housekeeping once per HOUSEKEEPING_INTERVAL.
+        """
+        while True:
+            await asyncio.sleep(HOUSEKEEPING_INTERVAL)
+            self.housekeeping()
+
+    async def run(self):
+        """
+        Start the bridge and run reader, consumer and timer tasks until one fails.
+        """
+        await asyncio.to_thread(self.start)
+        self._measurement_queue = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self._supervise_receivers()),
+            asyncio.create_task(self._consume_measurements()),
+            asyncio.create_task(self._status_timer()),
+            asyncio.create_task(self._summary_timer()),
+            asyncio.create_task(self._housekeeping_timer()),
+        ]
+        if self.output_view is not None:
+            tasks.append(asyncio.create_task(self._output_timer()))
+        try:
+            done, _pending = await asyncio.wait(
+                tasks,
+                return_when=asyncio.FIRST_EXCEPTION,
+            )
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks + list(self._reader_tasks.values()):
+                task.cancel()
+            await asyncio.gather(
+                *tasks,
+                *self._reader_tasks.values(),
+                return_exceptions=True,
+            )
+            self._reader_tasks = {}
+
+    def _run(self):
+        asyncio.run(self.run())
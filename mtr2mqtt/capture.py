@@ -0,0 +1,247 @@
+"""
+Raw serial traffic capture to a compact binary log.
+
+A capture file starts with a header holding a magic value and the wall-clock
+time the file was started. Every request written to and every response read
+from a receiver follows as a record: the monotonic seconds since the file was
+started, the direction, the data length and the raw bytes. Records go through
+a buffered writer under a lock, so capturing costs a memory copy on the poll
+path. The bridge flushes the log from its housekeeping loop; a flush that
+finds the file at or past the size limit moves it to ``<path>.1`` and starts
+a new file, so the poll path never renames or reopens files. A file can
+therefore exceed the limit by the traffic of one flush interval.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+import os
+import struct
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+MAGIC = b"MTRCAP\x00\x01"
+HEADER = struct.Struct("<8sd")
+RECORD = struct.Struct("<dBI")
+DIRECTION_WRITE = 0
+DIRECTION_READ = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+BUFFER_SIZE = 64 * 1024
+FLUSH_INTERVAL_SECONDS = 5.0
+
+_active_log = None  # pylint: disable=invalid-name
+
+
+class CaptureError(ValueError):
+    """
+    Raised when a capture file cannot be parsed.
+    """
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    """
+    One captured request or response.
+    """
+
+    timestamp: float
+    direction: int
+    data: bytes
+
+
+class CaptureLog:
+    """
+    Append capture records to a size-rotated binary file.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, monotonic=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._monotonic = monotonic or time.monotonic
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._started_at = None
+        self._open()
+
+    def _open(self):
+        # The file stays open across records; close() and _rotate() close it.
+        self._file = open(  # pylint: disable=consider-using-with
+            self.path,
+            "wb",
+            buffering=BUFFER_SIZE,
+        )
+        self._file.write(HEADER.pack(MAGIC, time.time()))
+        self._size = HEADER.size
+        self._started_at = self._monotonic()
+
+    def _rotate(self):
+        self._file.close()
+        os.replace(self.path, f"{self.path}.1")
+        self._open()
+        LOGGER.info(
+            "Capture file rotated",
+            extra={"event": "capture_rotated", "capture_file": self.path},
+        )
+
+    def record(self, direction, data):
+        """
+        Append one request or response.
+        """
+        if not data:
+            return
+        data = bytes(data)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(
+                RECORD.pack(self._monotonic() - self._started_at, direction, len(data))
+            )
+            self._file.write(data)
+            self._size += RECORD.size + len(data)
+
+    def flush(self):
+        """
+        Write buffered records to the file, rotating it at the size limit.
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            if self.max_bytes and self._size >= self.max_bytes:
+                self._rotate()
+            else:
+                self._file.flush()
+
+    def close(self):
+        """
+        Flush and close the capture file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CapturingSerial:
+    """
+    Serial handle proxy that records every write and read to a capture log.
+    """
+
+    def __init__(self, serial_handle, capture_log):
+        self.serial_handle = serial_handle
+        self.capture_log = capture_log
+
+    def __getattr__(self, name):
+        return getattr(self.serial_handle, name)
+
+    def write(self, data):
+        """
+        Write a request and record it.
+        """
+        written = self.serial_handle.write(data)
+        self.capture_log.record(DIRECTION_WRITE, data)
+        return written
+
+    def read_until(self, *args, **kwargs):
+        """
+        Read a response up to the terminator and record it.
+        """
+        data = self.serial_handle.read_until(*args, **kwargs)
+        self.capture_log.record(DIRECTION_READ, data)
+        return data
+
+    def read(self, *args, **kwargs):
+        """
+        Read response bytes and record them.
+        """
+        data = self.serial_handle.read(*args, **kwargs)
+        self.capture_log.record(DIRECTION_READ, data)
+        return data
+
+
+def start(path, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Start capturing the traffic of every serial handle wrapped from now on.
+    """
+    global _active_log  # pylint: disable=global-statement
+    stop()
+    _active_log = CaptureLog(path, max_bytes=max_bytes)
+    LOGGER.info(
+        "Capturing serial traffic",
+        extra={"event": "capture_started", "capture_file": path},
+    )
+    return _active_log
+
+
+def stop():
+    """
+    Stop capturing and close the capture file.
+    """
+    global _active_log  # pylint: disable=global-statement
+    if _active_log is not None:
+        _active_log.close()
+        _active_log = None
+
+
+def flush():
+    """
+    Flush the active capture log, rotating it at the size limit.
+    """
+    if _active_log is not None:
+        _active_log.flush()
+
+
+def wrap(serial_handle):
+    """
+    Return a capturing proxy for the handle while a capture is active.
+    """
+    if _active_log is None:
+        return serial_handle
+    return CapturingSerial(serial_handle, _active_log)
+
+
+def is_capture_file(path):
+    """
+    Return whether the file starts with the capture header magic.
+    """
+    try:
+        with open(path, "rb") as capture_file:
+            return capture_file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _warn_truncated(path):
+    LOGGER.warning(
+        "Ignoring truncated record at the end of capture %s",
+        path,
+        extra={"event": "capture_truncated", "capture_file": path},
+    )
+
+
+def read_records(path):
+    """
+    Yield every record of a capture file.
+
+    A record cut short by an unclean shutdown ends the file with a warning.
+    """
+    with open(path, "rb") as capture_file:
+        header = capture_file.read(HEADER.size)
+        if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+            raise CaptureError(f"{path} is not a capture file")
+        while True:
+            record = capture_file.read(RECORD.size)
+            if not record:
+                return
+            if len(record) < RECORD.size:
+                _warn_truncated(path)
+                return
+            timestamp, direction, length = RECORD.unpack(record)
+            data = capture_file.read(length)
+            if len(data) < length:
+                _warn_truncated(path)
+                return
+            yield CaptureRecord(timestamp, direction, data)
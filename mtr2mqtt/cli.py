@@ -2,7 +2,7 @@
 Command line entrypoint for the MTR to MQTT bridge.
 """
 
-from argparse import ArgumentParser, BooleanOptionalAction
+from argparse import Action, ArgumentParser, ArgumentTypeError, BooleanOptionalAction
 from importlib.metadata import version
 import logging
 import os
@@ -11,11 +11,22 @@ import sys
 from serial.serialutil import EIGHTBITS, FIVEBITS, SEVENBITS, SIXBITS
 import serial
 
+from mtr2mqtt.async_runtime import AsyncMtrBridge
+from mtr2mqtt import capture
+from mtr2mqtt import diagnostics
 from mtr2mqtt import homeassistant
 from mtr2mqtt.logging_utils import configure_root_logger
 from mtr2mqtt import metadata
+from mtr2mqtt import metadata_watcher
+from mtr2mqtt import pipeline
+from mtr2mqtt import replay
+from mtr2mqtt import scheduler
+from mtr2mqtt import snapshot
+from mtr2mqtt import spool
 from mtr2mqtt import summary
+from mtr2mqtt import table_view
 from mtr2mqtt.runtime import BridgeError
+from mtr2mqtt.runtime import DEFAULT_DRAIN_MAX_PACKETS
 from mtr2mqtt.runtime import MtrBridge
 
 
@@ -35,6 +46,28 @@ def _env_flag(name, default=False):
     return value.lower() in ["true", "1", "yes", "on"]
 
 
+def _env_list(name, default=None):
+    """
+    Parse a comma-separated environment variable into a list.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class _AppendReplacingDefault(Action):  # pylint: disable=too-few-public-methods
+    """
+    Collect a repeatable option, replacing its environment default on first use.
+    """
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        current = getattr(namespace, self.dest, None)
+        if current is None or current is self.default:
+            current = []
+        setattr(namespace, self.dest, current + [values])
+
+
 def _env_int(name, default):
     """
     Parse an integer environment variable with a clear configuration error.
@@ -50,6 +83,161 @@ def _env_int(name, default):
         ) from error
 
 
+def _env_float(name, default):
+    """
+    Parse a float environment variable with a clear configuration error.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError as error:
+        raise CliConfigurationError(
+            f"Environment variable {name} must be a number, got {value!r}"
+        ) from error
+
+
+def _env_positive_float(name, default):
+    """
+    Parse a float environment variable that must be greater than zero.
+    """
+    value = _env_float(name, default)
+    if value <= 0:
+        raise CliConfigurationError(
+            f"Environment variable {name} must be greater than 0, got {value!r}"
+        )
+    return value
+
+
+def _positive_float(value):
+    """
+    Parse a command line number that must be greater than zero.
+    """
+    try:
+        number = float(value)
+    except ValueError as error:
+        raise ArgumentTypeError(f"must be a number, got {value!r}") from error
+    if number <= 0:
+        raise ArgumentTypeError(f"must be greater than 0, got {value!r}")
+    return number
+
+
+def _topic_template(value):
+    """
+    Parse a topic template that may only reference {receiver}.
+    """
+    try:
+        value.format(receiver="receiver")
+    except (IndexError, KeyError, ValueError) as error:
+        raise ArgumentTypeError(
+            f"may only use the {{receiver}} placeholder, got {value!r}"
+        ) from error
+    return value
+
+
+def _env_topic_template(name):
+    """
+    Parse a topic template environment variable with a clear configuration error.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    try:
+        return _topic_template(value)
+    except ArgumentTypeError as error:
+        raise CliConfigurationError(f"Environment variable {name} {error}") from error
+
+
+def _add_diagnostics_arguments(parser):
+    """
+    Add the metrics, serial capture, replay and bridge status options.
+    """
+    parser.add_argument(
+        "--metrics-port",
+        help="Serve Prometheus metrics over HTTP on this port "
+        "(ENV: MTR2MQTT_METRICS_PORT)",
+        default=_env_int("MTR2MQTT_METRICS_PORT", None),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--metrics-host",
+        help="Address the metrics endpoint listens on, all interfaces by default "
+        "(ENV: MTR2MQTT_METRICS_HOST)",
+        default=os.environ.get("MTR2MQTT_METRICS_HOST", ""),
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--capture",
+        help="Write every serial request and response to this binary capture "
+        "file (ENV: MTR2MQTT_CAPTURE)",
+        default=os.environ.get("MTR2MQTT_CAPTURE"),
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--capture-max-bytes",
+        help="Size at which the capture file is rotated to <file>.1 "
+        "(ENV: MTR2MQTT_CAPTURE_MAX_BYTES)",
+        default=_env_int("MTR2MQTT_CAPTURE_MAX_BYTES", capture.DEFAULT_MAX_BYTES),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--replay",
+        help="Replay a capture of SCL response frames instead of reading a "
+        "receiver (ENV: MTR2MQTT_REPLAY)",
+        default=os.environ.get("MTR2MQTT_REPLAY"),
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--replay-speed",
+        help="Replay pace relative to the recorded timings, 0 replays as fast as "
+        "possible (ENV: MTR2MQTT_REPLAY_SPEED)",
+        default=_env_float("MTR2MQTT_REPLAY_SPEED", replay.DEFAULT_SPEED),
+        required=False,
+        type=float,
+    )
+    parser.add_argument(
+        "--replay-stub-mqtt",
+        help="Publish to an in-process stub MQTT client instead of a broker "
+        "(ENV: MTR2MQTT_REPLAY_STUB_MQTT)",
+        default=_env_flag("MTR2MQTT_REPLAY_STUB_MQTT", False),
+        action=BooleanOptionalAction,
+        required=False,
+    )
+    parser.add_argument(
+        "--bridge-status",
+        help="Publish retained bridge diagnostics for each receiver "
+        "(ENV: MTR2MQTT_BRIDGE_STATUS)",
+        default=_env_flag("MTR2MQTT_BRIDGE_STATUS", False),
+        action=BooleanOptionalAction,
+        required=False,
+    )
+    parser.add_argument(
+        "--bridge-status-interval",
+        help="Seconds between bridge diagnostics publishes "
+        "(ENV: MTR2MQTT_BRIDGE_STATUS_INTERVAL)",
+        default=_env_int(
+            "MTR2MQTT_BRIDGE_STATUS_INTERVAL",
+            diagnostics.DEFAULT_INTERVAL_SECONDS,
+        ),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--bridge-status-topic",
+        help="Bridge diagnostics topic template, {receiver} is replaced with the "
+        "receiver serial number (ENV: MTR2MQTT_BRIDGE_STATUS_TOPIC)",
+        default=_env_topic_template("MTR2MQTT_BRIDGE_STATUS_TOPIC"),
+        required=False,
+        type=_topic_template,
+    )
+
+
 def create_parser():
     """
     Build the CLI argument parser.
@@ -62,9 +250,12 @@ def create_parser():
     parser.add_argument(
         "--serial-port",
         "-s",
-        help="Serial port for MTR series receiver (ENV: MTR2MQTT_SERIAL_PORT)",
-        default=os.environ.get("MTR2MQTT_SERIAL_PORT"),
+        help="Serial port for an MTR series receiver, repeat for several "
+        "receivers; all detected receivers are used when omitted "
+        "(ENV: MTR2MQTT_SERIAL_PORT, comma-separated)",
+        default=_env_list("MTR2MQTT_SERIAL_PORT"),
         required=False,
+        action=_AppendReplacingDefault,
     )
     parser.add_argument(
         "--baudrate",
@@ -127,6 +318,64 @@ def create_parser():
         required=False,
         type=int,
     )
+    parser.add_argument(
+        "--summary-delta",
+        help="Publish non-retained summary/<receiver>/delta documents with only "
+        "the changed transmitters and publish the full retained summary at "
+        "--summary-full-interval (ENV: MTR2MQTT_SUMMARY_DELTA)",
+        default=_env_flag("MTR2MQTT_SUMMARY_DELTA", False),
+        required=False,
+        action=BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--summary-full-interval",
+        help="Minimum seconds between full retained summary publishes when "
+        "summary deltas are enabled (ENV: MTR2MQTT_SUMMARY_FULL_INTERVAL)",
+        default=_env_int(
+            "MTR2MQTT_SUMMARY_FULL_INTERVAL",
+            summary.DEFAULT_FULL_INTERVAL_SECONDS,
+        ),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--drain-mode",
+        help="Read the receiver ring buffer back-to-back until it is empty "
+        "(ENV: MTR2MQTT_DRAIN_MODE)",
+        default=_env_flag("MTR2MQTT_DRAIN_MODE", False),
+        action=BooleanOptionalAction,
+        required=False,
+    )
+    parser.add_argument(
+        "--drain-max-packets",
+        help="Maximum packets read in one drain batch "
+        "(ENV: MTR2MQTT_DRAIN_MAX_PACKETS)",
+        default=_env_int("MTR2MQTT_DRAIN_MAX_PACKETS", DEFAULT_DRAIN_MAX_PACKETS),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--poll-interval-min",
+        help="Seconds to wait after the first empty poll following traffic "
+        "(ENV: MTR2MQTT_POLL_INTERVAL_MIN)",
+        default=_env_float(
+            "MTR2MQTT_POLL_INTERVAL_MIN",
+            scheduler.DEFAULT_MIN_INTERVAL,
+        ),
+        required=False,
+        type=float,
+    )
+    parser.add_argument(
+        "--poll-interval-max",
+        help="Maximum seconds between polls of an idle receiver "
+        "(ENV: MTR2MQTT_POLL_INTERVAL_MAX)",
+        default=_env_float(
+            "MTR2MQTT_POLL_INTERVAL_MAX",
+            scheduler.DEFAULT_MAX_INTERVAL,
+        ),
+        required=False,
+        type=float,
+    )
     parser.add_argument(
         "--scl-address",
         help="SCL address 0...123 or 126 for broadcast (ENV: MTR2MQTT_SCL_ADDRESS)",
@@ -167,6 +416,25 @@ def create_parser():
         action=BooleanOptionalAction,
         required=False,
     )
+    parser.add_argument(
+        "--metadata-watch",
+        help="Reload the metadata file when it changes without restarting "
+        "(ENV: MTR2MQTT_METADATA_WATCH)",
+        default=_env_flag("MTR2MQTT_METADATA_WATCH", False),
+        action=BooleanOptionalAction,
+        required=False,
+    )
+    parser.add_argument(
+        "--metadata-watch-interval",
+        help="Seconds between metadata file checks when inotify is not available "
+        "(ENV: MTR2MQTT_METADATA_WATCH_INTERVAL)",
+        default=_env_int(
+            "MTR2MQTT_METADATA_WATCH_INTERVAL",
+            metadata_watcher.DEFAULT_POLL_INTERVAL,
+        ),
+        required=False,
+        type=int,
+    )
     parser.add_argument(
         "--output",
         help="Console output mode (ENV: MTR2MQTT_OUTPUT)",
@@ -174,6 +442,106 @@ def create_parser():
         required=False,
         choices=["json", "table"],
     )
+    parser.add_argument(
+        "--table-max-fps",
+        help="Maximum table output redraws per second, 0 to redraw on every "
+        "update (ENV: MTR2MQTT_TABLE_MAX_FPS)",
+        default=_env_float("MTR2MQTT_TABLE_MAX_FPS", table_view.DEFAULT_MAX_FPS),
+        required=False,
+        type=float,
+    )
+    parser.add_argument(
+        "--pipeline",
+        help="Read serial packets in a separate thread and publish them from a "
+        "bounded queue (ENV: MTR2MQTT_PIPELINE)",
+        default=_env_flag("MTR2MQTT_PIPELINE", False),
+        action=BooleanOptionalAction,
+        required=False,
+    )
+    parser.add_argument(
+        "--pipeline-queue-size",
+        help="Maximum measurements waiting to be published in pipeline mode "
+        "(ENV: MTR2MQTT_PIPELINE_QUEUE_SIZE)",
+        default=_env_int(
+            "MTR2MQTT_PIPELINE_QUEUE_SIZE",
+            pipeline.DEFAULT_QUEUE_SIZE,
+        ),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--pipeline-overflow",
+        help="What to do when the pipeline queue is full "
+        "(ENV: MTR2MQTT_PIPELINE_OVERFLOW)",
+        default=os.environ.get(
+            "MTR2MQTT_PIPELINE_OVERFLOW",
+            pipeline.OVERFLOW_BLOCK,
+        ),
+        required=False,
+        choices=pipeline.OVERFLOW_POLICIES,
+    )
+    parser.add_argument(
+        "--spool-file",
+        help="SQLite file buffering measurements while MQTT is disconnected "
+        "(ENV: MTR2MQTT_SPOOL_FILE)",
+        default=os.environ.get("MTR2MQTT_SPOOL_FILE"),
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--spool-max-bytes",
+        help="Maximum size of spooled measurement payloads in bytes "
+        "(ENV: MTR2MQTT_SPOOL_MAX_BYTES)",
+        default=_env_int("MTR2MQTT_SPOOL_MAX_BYTES", spool.DEFAULT_MAX_BYTES),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--spool-max-age",
+        help="Seconds a spooled measurement is kept before it is discarded "
+        "(ENV: MTR2MQTT_SPOOL_MAX_AGE)",
+        default=_env_int("MTR2MQTT_SPOOL_MAX_AGE", spool.DEFAULT_MAX_AGE_SECONDS),
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--spool-replay-rate",
+        help="Spooled measurements replayed per second after reconnecting, "
+        "greater than 0 (ENV: MTR2MQTT_SPOOL_REPLAY_RATE)",
+        default=_env_positive_float(
+            "MTR2MQTT_SPOOL_REPLAY_RATE",
+            spool.DEFAULT_REPLAY_RATE,
+        ),
+        required=False,
+        type=_positive_float,
+    )
+    parser.add_argument(
+        "--state-file",
+        help="Save discovery, status and summary publish state to this file and "
+        "restore it at startup (ENV: MTR2MQTT_STATE_FILE)",
+        default=os.environ.get("MTR2MQTT_STATE_FILE"),
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--state-save-interval",
+        help="Seconds between state file saves (ENV: MTR2MQTT_STATE_SAVE_INTERVAL)",
+        default=_env_int(
+            "MTR2MQTT_STATE_SAVE_INTERVAL",
+            snapshot.DEFAULT_SAVE_INTERVAL,
+        ),
+        required=False,
+        type=int,
+    )
+    _add_diagnostics_arguments(parser)
+    parser.add_argument(
+        "--runtime",
+        help="Runtime core: threaded polling loop or asyncio event loop "
+        "(ENV: MTR2MQTT_RUNTIME)",
+        default=os.environ.get("MTR2MQTT_RUNTIME", "threaded"),
+        required=False,
+        choices=["threaded", "asyncio"],
+    )
     parser.add_argument(
         "--ha-discovery",
         help="Enable Home Assistant MQTT discovery (ENV: MTR2MQTT_HA_DISCOVERY)",
@@ -204,6 +572,26 @@ def create_parser():
         required=False,
         type=str,
     )
+    parser.add_argument(
+        "--ha-discovery-warm-up",
+        help="Publish Home Assistant discovery for every metadata transmitter at "
+        "startup instead of waiting for its first measurement "
+        "(ENV: MTR2MQTT_HA_DISCOVERY_WARM_UP)",
+        default=_env_flag("MTR2MQTT_HA_DISCOVERY_WARM_UP", False),
+        action=BooleanOptionalAction,
+        required=False,
+    )
+    parser.add_argument(
+        "--ha-discovery-warm-up-rate",
+        help="Discovery payloads published per second during the warm-up "
+        "(ENV: MTR2MQTT_HA_DISCOVERY_WARM_UP_RATE)",
+        default=_env_float(
+            "MTR2MQTT_HA_DISCOVERY_WARM_UP_RATE",
+            homeassistant.DEFAULT_WARM_UP_RATE,
+        ),
+        required=False,
+        type=float,
+    )
 
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -250,10 +638,10 @@ def configure_logging(args):
 
 def load_metadata(args):
     """
-    Load metadata from the specified file if provided.
+    Load and index metadata from the specified file if provided.
     """
     if args.metadata_file:
-        return metadata.loadfile(args.metadata_file)
+        return metadata.load_index(args.metadata_file)
     return None
 
 
@@ -267,6 +655,7 @@ def create_discovery_publisher(args):
         discovery_prefix=args.ha_discovery_prefix,
         retain=args.ha_discovery_retain,
         node_id=args.ha_discovery_node_id,
+        warm_up_rate=args.ha_discovery_warm_up_rate,
     )
 
 
@@ -286,7 +675,10 @@ def main():
 
     try:
         configure_logging(args)
-        bridge = MtrBridge(
+        bridge_class = MtrBridge
+        if getattr(args, "runtime", "threaded") == "asyncio":
+            bridge_class = AsyncMtrBridge
+        bridge = bridge_class(
             args,
             transmitters_metadata=load_metadata(args),
             discovery_publisher=create_discovery_publisher(args),
@@ -0,0 +1,239 @@
+"""
+Bridge self-diagnostics published as a retained MQTT status document.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import os
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from mtr2mqtt import publishing
+from mtr2mqtt.topics import topic_fragment
+
+
+BRIDGE_STATUS_SUFFIX = "bridge"
+DEFAULT_INTERVAL_SECONDS = 60
+DEFAULT_RTT_SAMPLES = 1024
+RTT_PERCENTILES = (50, 95, 99)
+
+
+def bridge_status_topic(receiver, topic_template=None):
+    """
+    Build the retained bridge diagnostics topic for one receiver.
+
+    A custom template may reference the receiver as {receiver}.
+    """
+    receiver = topic_fragment(receiver)
+    if topic_template:
+        return topic_template.format(receiver=receiver)
+    return f"status/{receiver}/{BRIDGE_STATUS_SUFFIX}"
+
+
+def percentile(sorted_values, percent):
+    """
+    Return the nearest-rank percentile of already sorted values, or None.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def rss_bytes():
+    """
+    Return the resident set size of this process, or None when unavailable.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class BridgeDiagnostics:
+    """
+    Collect the runtime statistics of one receiver between publishes.
+
+    The bridge keeps one instance per receiver. Packets, checksum errors,
+    poll round-trip times and poll states are recorded by the thread polling
+    that receiver; CPU time, memory and inflight publishes are process-wide.
+    """
+
+    def __init__(self, rtt_samples=DEFAULT_RTT_SAMPLES, monotonic=None):
+        self._monotonic = monotonic or time.monotonic
+        self._lock = threading.Lock()
+        self._rtt_samples = deque(maxlen=rtt_samples)
+        self._counts = {"packets": 0, "checksum_errors": 0}
+        # (started_at, counts) of the current rate interval.
+        self._interval = (self._monotonic(), dict(self._counts))
+        # (state, since) of the most recent poll state.
+        self._current_state = (None, self._interval[0])
+        self._state_seconds = {}
+
+    def record_rtt(self, seconds):
+        """
+        Record the serial round-trip time of one poll.
+        """
+        with self._lock:
+            self._rtt_samples.append(seconds)
+
+    def record_packet(self):
+        """
+        Count one packet read from the receiver ring buffer.
+        """
+        with self._lock:
+            self._counts["packets"] += 1
+
+    def record_checksum_error(self):
+        """
+        Count one response rejected for a checksum error.
+        """
+        with self._lock:
+            self._counts["checksum_errors"] += 1
+
+    def record_state(self, state):
+        """
+        Account the time spent in the previous poll state.
+        """
+        with self._lock:
+            previous, since = self._current_state
+            if state is previous:
+                return
+            now = self._monotonic()
+            if previous is not None:
+                self._state_seconds[previous] = (
+                    self._state_seconds.get(previous, 0.0) + now - since
+                )
+            self._current_state = (state, now)
+
+    @property
+    def state(self):
+        """
+        Return the most recent poll state.
+        """
+        return self._current_state[0]
+
+    def state_seconds(self, now=None):
+        """
+        Return seconds spent in each state, including the current one.
+        """
+        now = self._monotonic() if now is None else now
+        with self._lock:
+            seconds = dict(self._state_seconds)
+            state, since = self._current_state
+        if state is not None:
+            seconds[state] = seconds.get(state, 0.0) + now - since
+        return seconds
+
+    def payload(self, mqtt_inflight=None):
+        """
+        Build the diagnostics payload and start a new rate interval.
+        """
+        now = self._monotonic()
+        state_seconds = self.state_seconds(now)
+        with self._lock:
+            started_at, last_counts = self._interval
+            counts = dict(self._counts)
+            rtt_ms = sorted(sample * 1000 for sample in self._rtt_samples)
+            self._interval = (now, counts)
+        elapsed = max(now - started_at, 1e-9)
+        state = self.state
+        payload = {
+            "state": getattr(state, "value", state),
+            "packets_total": counts["packets"],
+            "packets_per_second": round(
+                (counts["packets"] - last_counts["packets"]) / elapsed,
+                3,
+            ),
+            "checksum_errors_total": counts["checksum_errors"],
+            "checksum_errors_per_second": round(
+                (counts["checksum_errors"] - last_counts["checksum_errors"]) / elapsed,
+                6,
+            ),
+            "cpu_seconds": round(time.process_time(), 3),
+            "rss_bytes": rss_bytes(),
+            "mqtt_inflight": mqtt_inflight,
+            "state_seconds": {
+                getattr(state, "value", state): round(seconds, 3)
+                for state, seconds in state_seconds.items()
+            },
+        }
+        for percent in RTT_PERCENTILES:
+            value = percentile(rtt_ms, percent)
+            payload[f"poll_rtt_p{percent}_ms"] = None if value is None else round(value, 3)
+        return payload
+
+
+class BridgeStatusPublisher:
+    """
+    Keep the diagnostics of every receiver and publish them once per interval.
+
+    Every receiver topic carries the packet counts, poll round-trip times
+    and poll states of that receiver.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL_SECONDS, topic_template=None):
+        self.interval = interval
+        self.topic_template = topic_template
+        self._receivers = {}
+        self._published_at = None
+
+    def diagnostics_for(self, receiver_serial_number):
+        """
+        Return the diagnostics collected for one receiver.
+        """
+        receiver_diagnostics = self._receivers.get(receiver_serial_number)
+        if receiver_diagnostics is None:
+            receiver_diagnostics = self._receivers.setdefault(
+                receiver_serial_number,
+                BridgeDiagnostics(),
+            )
+        return receiver_diagnostics
+
+    def due(self, force=False):
+        """
+        Return whether the interval has passed, and start a new one if so.
+        """
+        now = time.monotonic()
+        if (
+            not force
+            and self._published_at is not None
+            and now - self._published_at < self.interval
+        ):
+            return False
+        self._published_at = now
+        return True
+
+    def publish(
+        self,
+        mqtt_client,
+        receiver_serial_numbers,
+        updated_at,
+        discovery_publisher=None,
+    ):
+        """
+        Publish the retained diagnostics of every receiver and return the
+        published (payload, mid) pairs.
+        """
+        inflight = publishing.mqtt_inflight(mqtt_client)
+        published = []
+        for receiver_serial_number in receiver_serial_numbers:
+            topic = bridge_status_topic(receiver_serial_number, self.topic_template)
+            if discovery_publisher is not None:
+                discovery_publisher.publish_bridge_if_needed(
+                    mqtt_client,
+                    receiver_serial_number,
+                    topic,
+                )
+            payload = self.diagnostics_for(receiver_serial_number).payload(inflight)
+            payload["updated_at"] = updated_at
+            payload["receiver"] = str(receiver_serial_number)
+            result, mid = publishing.publish_status(mqtt_client, topic, payload)
+            if result == mqtt.MQTT_ERR_SUCCESS:
+                published.append((payload, mid))
+        return published
@@ -0,0 +1,27 @@
+"""
+Exceptions raised by the bridge runtime and its connection helpers.
+"""
+
+
+class BridgeError(Exception):
+    """
+    Base exception for runtime-level startup and transport failures.
+    """
+
+
+class ReceiverConnectionError(BridgeError):
+    """
+    Raised when the runtime cannot open or validate the receiver connection.
+    """
+
+
+class MqttConnectionError(BridgeError):
+    """
+    Raised when the runtime cannot connect to the MQTT broker.
+    """
+
+
+class OutputModeError(BridgeError):
+    """
+    Raised when the selected output mode cannot run in the current terminal.
+    """
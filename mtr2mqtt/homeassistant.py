@@ -4,22 +4,57 @@ Home Assistant MQTT Discovery helpers.
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from functools import cache
 import json
 import logging
 import re
+import threading
+import time
 from importlib.metadata import PackageNotFoundError, version
 
+from mtr2mqtt import metadata
+from mtr2mqtt.snapshot import payload_digest
+from mtr2mqtt.topics import memoize
 from mtr2mqtt.topics import topic_fragment
 
 
+DEFAULT_WARM_UP_RATE = 10.0
+_UNSAFE_ID_CHARACTERS = re.compile(r"[^a-z0-9]+")
+_BATTERY_COMPONENT = {
+    "p": "sensor",
+    "unique_id": None,
+    "object_id": None,
+    "name": "Battery",
+    "value_template": "{{ value_json.battery }}",
+    "device_class": "voltage",
+    "state_class": "measurement",
+    "unit_of_measurement": "V",
+    "entity_category": "diagnostic",
+}
+_RSL_COMPONENT = {
+    "p": "sensor",
+    "unique_id": None,
+    "object_id": None,
+    "name": "Signal",
+    "value_template": "{{ value_json.rsl }}",
+    "state_class": "measurement",
+    "unit_of_measurement": "dBm",
+    "entity_category": "diagnostic",
+    "icon": "mdi:signal",
+}
+
+
+@memoize
 def sanitize_id(value):
     """
     Convert an arbitrary identifier into a Home Assistant safe object id fragment.
     """
-    sanitized = re.sub(r"[^a-z0-9]+", "_", str(value).strip().lower())
+    sanitized = _UNSAFE_ID_CHARACTERS.sub("_", str(value).strip().lower())
     return sanitized.strip("_") or "unknown"
 
 
+@memoize
 def state_topic(receiver_serial_number, sensor_id):
     """
     Build the measurement state topic.
@@ -43,6 +78,7 @@ def discovery_object_id(sensor_id):
     return device_identifier(sensor_id)
 
 
+@memoize
 def discovery_topic(
     discovery_prefix,
     _receiver_serial_number,
@@ -125,7 +161,12 @@ def _device_name(measurement, sensor_id):
     return f"Sensor {sensor_id}"
 
 
+@cache
 def _origin():
+    """
+    Resolve the origin block once per process; looking up the installed
+    version scans the distributions on disk.
+    """
     try:
         app_version = version("mtr2mqtt")
     except PackageNotFoundError:
@@ -196,27 +237,14 @@ def build_discovery_payload(receiver_serial_number, measurement):
     _apply_reading_overrides(reading, measurement)
 
     battery = {
-        "p": "sensor",
+        **_BATTERY_COMPONENT,
         "unique_id": f"{identifier}_battery",
         "object_id": f"{base_object_id}_battery",
-        "name": "Battery",
-        "value_template": "{{ value_json.battery }}",
-        "device_class": "voltage",
-        "state_class": "measurement",
-        "unit_of_measurement": "V",
-        "entity_category": "diagnostic",
     }
-
     rsl = {
-        "p": "sensor",
+        **_RSL_COMPONENT,
         "unique_id": f"{identifier}_rsl",
         "object_id": f"{base_object_id}_rsl",
-        "name": "Signal",
-        "value_template": "{{ value_json.rsl }}",
-        "state_class": "measurement",
-        "unit_of_measurement": "dBm",
-        "entity_category": "diagnostic",
-        "icon": "mdi:signal",
     }
 
     payload = {
@@ -240,22 +268,125 @@ def build_discovery_payload(receiver_serial_number, measurement):
     return json.dumps(payload)
 
 
+def _metadata_view(measurement):
+    """
+    Keep the metadata fields of a measurement and whether it carries a reading.
+
+    Warm-up payloads can only be built from this view, so provisional
+    discovery is confirmed by comparing views instead of full payloads.
+    """
+    view = {
+        key: value
+        for key, value in measurement.items()
+        if key not in metadata.RESERVED_METADATA_FIELDS
+    }
+    view["id"] = measurement["id"]
+    if measurement.get("reading") is not None:
+        view["reading"] = measurement["reading"]
+    return view
+
+
+_BRIDGE_COMPONENTS = (
+    ("packets_per_second", "Packet rate", "packets/s", None, "mdi:swap-vertical"),
+    ("poll_rtt_p95_ms", "Poll RTT p95", "ms", "duration", None),
+    ("checksum_errors_per_second", "Checksum errors", "errors/s", None, "mdi:alert"),
+    ("cpu_seconds", "CPU time", "s", "duration", None),
+    ("rss_bytes", "Memory", "B", "data_size", None),
+    ("mqtt_inflight", "MQTT inflight", None, None, "mdi:tray-full"),
+)
+
+
+def bridge_discovery_topic(discovery_prefix, receiver_serial_number, node_id=None):
+    """
+    Build the Home Assistant discovery topic for the bridge diagnostics device.
+    """
+    object_id = f"mtr2mqtt_bridge_{sanitize_id(receiver_serial_number)}"
+    if node_id:
+        return f"{discovery_prefix}/device/{sanitize_id(node_id)}/{object_id}/config"
+    return f"{discovery_prefix}/device/{object_id}/config"
+
+
+def build_bridge_discovery_payload(receiver_serial_number, bridge_state_topic):
+    """
+    Build a Home Assistant device discovery payload for the bridge diagnostics.
+    """
+    identifier = f"mtr2mqtt_bridge_{sanitize_id(receiver_serial_number)}"
+    components = {}
+    for key, name, unit, device_class, icon in _BRIDGE_COMPONENTS:
+        components[key] = _drop_none_values(
+            {
+                "p": "sensor",
+                "unique_id": f"{identifier}_{key}",
+                "object_id": f"{identifier}_{key}",
+                "name": name,
+                "value_template": f"{{{{ value_json.{key} }}}}",
+                "state_class": "measurement",
+                "unit_of_measurement": unit,
+                "device_class": device_class,
+                "entity_category": "diagnostic",
+                "icon": icon,
+            }
+        )
+    payload = {
+        "dev": {
+            "ids": [identifier],
+            "name": f"mtr2mqtt bridge {receiver_serial_number}",
+            "mf": "mtr2mqtt",
+            "mdl": "MTR receiver bridge",
+            "sn": str(receiver_serial_number),
+        },
+        "o": _origin(),
+        "state_topic": bridge_state_topic,
+        "qos": 1,
+        "cmps": components,
+    }
+    return json.dumps(payload)
+
+
+@dataclass
+class _Announcement:
+    """
+    Discovery state of one announced receiver/sensor pair.
+
+    Restored entries have no measurement. Provisional entries are kept until
+    the first real measurement confirms or re-publishes them.
+    """
+
+    digest: str
+    measurement: dict | None = None
+    provisional: bool = False
+
+
 class DiscoveryPublisher:
     """
     Publish Home Assistant discovery payloads once per receiver and sensor pair.
+
+    Discovery can also be warmed up from metadata before transmitters report,
+    or restored from a state snapshot. Such entries are provisional: the first
+    real measurement rebuilds the payload and publishes it again only if its
+    digest differs.
     """
 
-    def __init__(self, discovery_prefix, retain=True, node_id=None):
+    def __init__(
+        self,
+        discovery_prefix,
+        retain=True,
+        node_id=None,
+        warm_up_rate=DEFAULT_WARM_UP_RATE,
+    ):
         self.discovery_prefix = discovery_prefix
         self.retain = retain
         self.node_id = node_id
-        self._published = set()
+        self.warm_up_rate = warm_up_rate
+        self._announced = {}
+        self._bridges = set()
+        self._lock = threading.RLock()
 
     def has_published(self, receiver_serial_number, sensor_id):
         """
         Return whether discovery is already published for this receiver/sensor.
         """
-        return (str(receiver_serial_number), str(sensor_id)) in self._published
+        return (str(receiver_serial_number), str(sensor_id)) in self._announced
 
     def publish_if_needed(self, mqtt_client, receiver_serial_number, measurement):
         """
@@ -264,38 +395,262 @@ class DiscoveryPublisher:
         try:
             sensor_id = str(measurement["id"])
             cache_key = (str(receiver_serial_number), sensor_id)
-            if cache_key in self._published:
-                return True
-
-            topic = discovery_topic(
-                self.discovery_prefix,
-                receiver_serial_number,
-                sensor_id,
-                node_id=self.node_id,
-            )
-            payload = build_discovery_payload(receiver_serial_number, measurement)
-            result, mid = mqtt_client.publish(
-                topic,
-                payload=payload,
-                qos=1,
-                retain=self.retain,
-            )
-            logging.debug("HA discovery publish result: %s, mid: %s", result, mid)
-            if result == 0:
-                self._published.add(cache_key)
-                return True
-
-            logging.warning(
-                "Sending Home Assistant discovery for receiver %s sensor %s failed "
-                "with result code: %s",
+            with self._lock:
+                announcement = self._announced.get(cache_key)
+                if announcement is not None and not announcement.provisional:
+                    return True
+                if self._confirm_provisional(cache_key, measurement):
+                    return True
+                return self._publish(mqtt_client, cache_key, measurement)
+        except (OSError, RuntimeError, TypeError, ValueError, KeyError):
+            logging.exception(
+                "Home Assistant discovery publish raised an exception for receiver %s",
                 receiver_serial_number,
-                sensor_id,
-                result,
             )
             return False
+
+    def publish_bridge_if_needed(self, mqtt_client, receiver_serial_number, topic):
+        """
+        Publish the bridge diagnostics device once per receiver.
+        """
+        receiver_serial_number = str(receiver_serial_number)
+        try:
+            with self._lock:
+                if receiver_serial_number in self._bridges:
+                    return True
+                result, mid = mqtt_client.publish(
+                    bridge_discovery_topic(
+                        self.discovery_prefix,
+                        receiver_serial_number,
+                        node_id=self.node_id,
+                    ),
+                    payload=build_bridge_discovery_payload(receiver_serial_number, topic),
+                    qos=1,
+                    retain=self.retain,
+                )
+                logging.debug("HA bridge discovery publish result: %s, mid: %s", result, mid)
+                if result == 0:
+                    self._bridges.add(receiver_serial_number)
+                    return True
         except (OSError, RuntimeError, TypeError, ValueError, KeyError):
             logging.exception(
-                "Home Assistant discovery publish raised an exception for receiver %s",
+                "Home Assistant bridge discovery publish raised an exception for receiver %s",
                 receiver_serial_number,
             )
             return False
+        logging.warning(
+            "Sending Home Assistant bridge discovery for receiver %s failed "
+            "with result code: %s",
+            receiver_serial_number,
+            result,
+        )
+        return False
+
+    def warm_up(
+        self,
+        mqtt_client,
+        receiver_serial_number,
+        metadata_index,
+        *,
+        stop_event=None,
+    ):
+        """
+        Publish provisional discovery for every transmitter in the metadata,
+        at most warm_up_rate payloads per second, and return the number published.
+        """
+        stop_event = stop_event or threading.Event()
+        rate = self.warm_up_rate
+        interval = 1 / rate if rate and rate > 0 else 0
+        started_at = time.monotonic()
+        published = 0
+        for transmitter_id in metadata_index.ids():
+            if stop_event.is_set():
+                break
+            cache_key = (str(receiver_serial_number), str(transmitter_id))
+            # Assume a reading, as every decoded transmitter type but the
+            # utility packets reports one.
+            measurement = {
+                **metadata_index.get(transmitter_id),
+                "id": transmitter_id,
+                "reading": 0.0,
+            }
+            try:
+                with self._lock:
+                    if cache_key in self._announced:
+                        continue
+                    if not self._publish(
+                        mqtt_client,
+                        cache_key,
+                        measurement,
+                        provisional=True,
+                    ):
+                        continue
+            except (OSError, RuntimeError, TypeError, ValueError, KeyError):
+                logging.exception(
+                    "Home Assistant discovery warm-up raised an exception for "
+                    "sensor %s",
+                    transmitter_id,
+                )
+                continue
+            published += 1
+            if interval:
+                stop_event.wait(interval)
+        logging.info(
+            "Home Assistant discovery warm-up published %s of %s transmitters in %.1f s",
+            published,
+            len(metadata_index),
+            time.monotonic() - started_at,
+        )
+        return published
+
+    def snapshot(self):
+        """
+        Return the announced receiver/sensor pairs with their payload digests.
+        """
+        with self._lock:
+            return [
+                [*cache_key, self._announced[cache_key].digest]
+                for cache_key in sorted(self._announced)
+            ]
+
+    def restore(self, entries):
+        """
+        Mark snapshot entries as provisionally published.
+        """
+        with self._lock:
+            for receiver_serial_number, sensor_id, digest in entries:
+                cache_key = (str(receiver_serial_number), str(sensor_id))
+                if cache_key in self._announced:
+                    continue
+                self._announced[cache_key] = _Announcement(digest, provisional=True)
+
+    def _confirm_provisional(self, cache_key, measurement):
+        """
+        Keep a provisional entry if the real measurement renders the same payload.
+
+        Warm-up entries only know the metadata, so they are kept when the
+        metadata view of the measurement renders the same payload. The
+        transmitter model stays unset until discovery is next re-published,
+        for example after a metadata change.
+        """
+        announcement = self._announced.get(cache_key)
+        if announcement is None or not announcement.provisional:
+            return False
+        digests = {
+            self._digest(*self._render(cache_key, candidate))
+            for candidate in (measurement, _metadata_view(measurement))
+        }
+        if announcement.digest not in digests:
+            return False
+        announcement.provisional = False
+        announcement.measurement = measurement
+        return True
+
+    def _render(self, cache_key, measurement):
+        receiver_serial_number, sensor_id = cache_key
+        topic = discovery_topic(
+            self.discovery_prefix,
+            receiver_serial_number,
+            sensor_id,
+            node_id=self.node_id,
+        )
+        return topic, build_discovery_payload(receiver_serial_number, measurement)
+
+    def _digest(self, topic, payload):
+        return payload_digest(topic, payload, self.retain)
+
+    def republish_changed(self, mqtt_client, sensor_ids, metadata_index):
+        """
+        Re-publish discovery for already announced sensors whose metadata changed.
+        """
+        sensor_ids = {str(sensor_id) for sensor_id in sensor_ids}
+        republished = []
+        with self._lock:
+            announced = [
+                (cache_key, announcement.measurement)
+                for cache_key, announcement in self._announced.items()
+                if announcement.measurement is not None
+            ]
+        for cache_key, measurement in announced:
+            receiver_serial_number, sensor_id = cache_key
+            if sensor_id not in sensor_ids:
+                continue
+            updated = {
+                key: value
+                for key, value in measurement.items()
+                if key in metadata.RESERVED_METADATA_FIELDS
+            }
+            if metadata_index is not None:
+                updated.update(metadata_index.get(sensor_id) or {})
+            try:
+                with self._lock:
+                    if self._publish(mqtt_client, cache_key, updated):
+                        republished.append(cache_key)
+            except (OSError, RuntimeError, TypeError, ValueError, KeyError):
+                logging.exception(
+                    "Home Assistant discovery republish raised an exception for "
+                    "receiver %s",
+                    receiver_serial_number,
+                )
+        return republished
+
+    def _publish(self, mqtt_client, cache_key, measurement, provisional=False):
+        receiver_serial_number, sensor_id = cache_key
+        topic, payload = self._render(cache_key, measurement)
+        result, mid = mqtt_client.publish(
+            topic,
+            payload=payload,
+            qos=1,
+            retain=self.retain,
+        )
+        logging.debug("HA discovery publish result: %s, mid: %s", result, mid)
+        if result == 0:
+            self._announced[cache_key] = _Announcement(
+                self._digest(topic, payload),
+                measurement,
+                provisional,
+            )
+            return True
+
+        logging.warning(
+            "Sending Home Assistant discovery for receiver %s sensor %s failed "
+            "with result code: %s",
+            receiver_serial_number,
+            sensor_id,
+            result,
+        )
+        return False
+
+
+class DiscoveryWarmUp:
+    """
+    Run a discovery warm-up on a background thread that can be stopped.
+    """
+
+    def __init__(self, discovery_publisher):
+        self.discovery_publisher = discovery_publisher
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, mqtt_client, receiver_serial_number, metadata_index):
+        """
+        Start warming up discovery for the metadata transmitters.
+        """
+        self._stop_event.clear()
+        self.thread = threading.Thread(
+            target=self.discovery_publisher.warm_up,
+            args=(mqtt_client, receiver_serial_number, metadata_index),
+            kwargs={"stop_event": self._stop_event},
+            name="mtr2mqtt-discovery-warm-up",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop a running warm-up and wait for its thread to finish.
+        """
+        if self.thread is not None:
+            self._stop_event.set()
+            self.thread.join()
+            self.thread = None
@@ -1,8 +1,13 @@
 """
 Module for getting metadata for transmitters
 
+Classes
+    TransmitterMetadataIndex
+
 Functions
     loadfile(file)
+    load_index(file)
+    as_index(transmitters_metadata)
     get_data(transmitter_id, all_transmitters)
 
 """
@@ -12,20 +17,110 @@ import json
 import yaml
 
 
+RESERVED_METADATA_FIELDS = frozenset({
+    "battery",
+    "type",
+    "rsl",
+    "id",
+    "reading",
+    "timestamp",
+    "message",
+    "calibrated",
+    "utility",
+})
+
+
 class MetadataError(Exception):
     """
     Raised when transmitter metadata cannot be loaded safely.
     """
 
 
-def loadfile(file):
+class TransmitterMetadataIndex:
     """
-    Loads metadata file and returns it as json string
+    Transmitter metadata keyed by integer id for constant-time lookups.
+
+    Reserved measurement fields are dropped once when the index is built, so
+    the returned metadata can be merged into a measurement as is. Returned
+    dictionaries are shared and must be treated as read-only.
     """
+
+    def __init__(self, transmitters=None):
+        self._entries = {}
+        if transmitters is None:
+            return
+        if not isinstance(transmitters, list):
+            logging.warning(
+                "Metadata must be a list of transmitters, got %s",
+                type(transmitters).__name__,
+            )
+            return
+        for transmitter in transmitters:
+            if not isinstance(transmitter, dict):
+                logging.debug(
+                    "Skipping metadata entry with unexpected type: %s",
+                    type(transmitter).__name__,
+                )
+                continue
+            transmitter_id = transmitter.get('id')
+            if not isinstance(transmitter_id, int) or isinstance(transmitter_id, bool):
+                logging.debug("Skipping metadata entry without integer id: %s", transmitter)
+                continue
+            self._entries.setdefault(transmitter_id, {
+                key: value
+                for key, value in transmitter.items()
+                if key not in RESERVED_METADATA_FIELDS
+            })
+
+    @classmethod
+    def from_json(cls, all_transmitters):
+        """
+        Build an index from the JSON string produced by loadfile.
+        """
+        try:
+            transmitters = json.loads(all_transmitters)
+        except (TypeError, json.JSONDecodeError):
+            logging.warning("Metadata content is not valid JSON, skipping lookup")
+            return cls()
+        return cls(transmitters)
+
+    def get(self, transmitter_id):
+        """
+        Return metadata for a transmitter id, or None when it is not configured.
+        """
+        transmitter_id = _normalized_transmitter_id(transmitter_id)
+        if transmitter_id is None:
+            return None
+        return self._entries.get(transmitter_id)
+
+    def ids(self):
+        """
+        Return the configured transmitter ids in file order.
+        """
+        return list(self._entries)
+
+    def changed_ids(self, previous):
+        """
+        Return ids whose metadata was added, removed or changed since previous.
+        """
+        previous = previous if previous is not None else TransmitterMetadataIndex()
+        return {
+            transmitter_id
+            for transmitter_id in set(self._entries) | set(previous.ids())
+            if self._entries.get(transmitter_id) != previous.get(transmitter_id)
+        }
+
+    def __contains__(self, transmitter_id):
+        return self.get(transmitter_id) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _read_yaml(file):
     try:
         with open(file, 'r', encoding="utf-8") as metafile:
-            transmitter_info = yaml.safe_load(metafile)
-            return json.dumps(transmitter_info)
+            return yaml.safe_load(metafile)
     except FileNotFoundError as error:
         raise MetadataError(f"Metadata file not found: {file}") from error
     except PermissionError as error:
@@ -34,12 +129,40 @@ def loadfile(file):
         raise MetadataError(f"Unable to read metadata file {file}: {error}") from error
     except yaml.YAMLError as error:
         raise MetadataError(f"Metadata file {file} is not valid YAML: {error}") from error
+
+
+def loadfile(file):
+    """
+    Loads metadata file and returns it as json string
+    """
+    transmitter_info = _read_yaml(file)
+    try:
+        return json.dumps(transmitter_info)
     except TypeError as error:
         raise MetadataError(
             f"Metadata file {file} contains values that cannot be serialized to JSON"
         ) from error
 
 
+def load_index(file):
+    """
+    Loads metadata file into a TransmitterMetadataIndex
+    """
+    return TransmitterMetadataIndex(_read_yaml(file))
+
+
+def as_index(transmitters_metadata):
+    """
+    Return transmitter metadata as an index, building one from JSON if needed.
+    """
+    if transmitters_metadata is None or isinstance(
+        transmitters_metadata,
+        TransmitterMetadataIndex,
+    ):
+        return transmitters_metadata
+    return TransmitterMetadataIndex.from_json(transmitters_metadata)
+
+
 def _load_transmitter_list(all_transmitters):
     try:
         transmitter_list = json.loads(all_transmitters)
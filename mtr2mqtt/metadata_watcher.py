@@ -0,0 +1,191 @@
+"""
+Background reloading of the transmitter metadata file.
+
+The watcher waits for changes with inotify when the platform provides it and
+falls back to polling the file modification time otherwise. Either way a
+change is confirmed by comparing the file stat signature before the metadata
+index is rebuilt, so spurious wake-ups never trigger a reload.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import threading
+
+from mtr2mqtt import metadata
+
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_POLL_INTERVAL = 5
+
+# inotify(7) constants, watched on the parent directory so atomic replaces
+# and symlink swaps (as done by editors and Kubernetes ConfigMaps) are seen.
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_IN_WATCH_MASK = (
+    0x00000002  # IN_MODIFY
+    | 0x00000004  # IN_ATTRIB
+    | 0x00000008  # IN_CLOSE_WRITE
+    | 0x00000080  # IN_MOVED_TO
+    | 0x00000100  # IN_CREATE
+    | 0x00000200  # IN_DELETE
+)
+
+
+def _file_signature(path):
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def _open_inotify(directory):
+    """
+    Return an inotify file descriptor watching directory, or None if unavailable.
+    """
+    library = ctypes.util.find_library("c")
+    if not library:
+        return None
+    try:
+        libc = ctypes.CDLL(library, use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    inotify_fd = inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if inotify_fd < 0:
+        return None
+    if inotify_add_watch(inotify_fd, os.fsencode(directory), _IN_WATCH_MASK) < 0:
+        os.close(inotify_fd)
+        return None
+    return inotify_fd
+
+
+class PendingChanges:
+    """
+    Transmitter ids changed by metadata reloads and not applied yet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed_ids = set()
+
+    def add(self, changed_ids):
+        """
+        Queue changed transmitter ids, usually from the watcher thread.
+        """
+        with self._lock:
+            self._changed_ids.update(changed_ids)
+
+    def take(self):
+        """
+        Return and clear the queued transmitter ids.
+        """
+        with self._lock:
+            changed_ids, self._changed_ids = self._changed_ids, set()
+        return changed_ids
+
+
+class MetadataWatcher:
+    """
+    Rebuild the metadata index when the metadata file changes on disk.
+    """
+
+    def __init__(self, path, on_reload, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.path = path
+        self.on_reload = on_reload
+        self.poll_interval = poll_interval
+        self._signature = _file_signature(path)
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify_fd = None
+
+    @property
+    def uses_inotify(self):
+        """
+        Return whether change notifications come from inotify.
+        """
+        return self._inotify_fd is not None
+
+    def start(self):
+        """
+        Start watching the metadata file in a daemon thread.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        self._inotify_fd = _open_inotify(directory)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="mtr2mqtt-metadata-watcher",
+            daemon=True,
+        )
+        self._thread.start()
+        LOGGER.info(
+            "Watching metadata file for changes",
+            extra={
+                "event": "metadata_watch_started",
+                "metadata_file": self.path,
+                "metadata_watch_mode": "inotify" if self.uses_inotify else "polling",
+            },
+        )
+
+    def stop(self):
+        """
+        Stop the watcher thread and release the inotify descriptor.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def check(self):
+        """
+        Reload the metadata index if the file changed since the last check.
+        """
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+
+        self._signature = signature
+        try:
+            index = metadata.load_index(self.path)
+        except metadata.MetadataError as error:
+            logging.warning("Keeping previous metadata, reload failed: %s", error)
+            return False
+
+        self.on_reload(index)
+        return True
+
+    def _wait_for_change(self):
+        if self._inotify_fd is None:
+            self._stop.wait(self.poll_interval)
+            return
+
+        readable, _writable, _errors = select.select(
+            [self._inotify_fd],
+            [],
+            [],
+            self.poll_interval,
+        )
+        if readable:
+            try:
+                while os.read(self._inotify_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wait_for_change()
+            if self._stop.is_set():
+                break
+            self.check()
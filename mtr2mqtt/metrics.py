@@ -0,0 +1,385 @@
+"""
+In-process runtime metrics with a Prometheus text exposition endpoint.
+
+Metrics are plain counters, gauges and histograms registered in a module
+level registry. Updating one takes a lock and a few additions, so they are
+cheap enough for the serial and publish hot paths. The optional HTTP
+endpoint renders the registry in the Prometheus text format from a
+background thread.
+"""
+
+from __future__ import annotations
+
+import bisect
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import logging
+import math
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+ARRIVAL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PACKET_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """
+    Monotonically increasing counter.
+    """
+
+    metric_type = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """
+        Increase the counter.
+        """
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        """
+        Return the current counter value.
+        """
+        return self._value
+
+    def samples(self):
+        """
+        Return (name, labels, value) samples for the exposition format.
+        """
+        return [(self.name, "", self._value)]
+
+
+class Gauge:
+    """
+    Value that can go up and down, or is read from a callback at scrape time.
+    """
+
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._function = None
+
+    def set(self, value):
+        """
+        Set the gauge value.
+        """
+        self._value = value
+
+    def set_function(self, function):
+        """
+        Read the gauge from function whenever it is collected; None detaches it.
+        """
+        self._function = function
+
+    @property
+    def value(self):
+        """
+        Return the current gauge value.
+        """
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def samples(self):
+        """
+        Return (name, labels, value) samples for the exposition format.
+        """
+        return [(self.name, "", self.value)]
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, typically durations in seconds.
+    """
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Record one observation.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """
+        Observe the wall-clock duration of the with block.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+    @property
+    def count(self):
+        """
+        Return the number of observations.
+        """
+        with self._lock:
+            return sum(self._counts)
+
+    def samples(self):
+        """
+        Return (name, labels, value) samples for the exposition format.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for upper_bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            samples.append(
+                (
+                    f"{self.name}_bucket",
+                    f'{{le="{_format_value(upper_bound)}"}}',
+                    cumulative,
+                )
+            )
+        samples.append((f"{self.name}_sum", "", total))
+        samples.append((f"{self.name}_count", "", cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Ordered collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """
+        Register a metric and return it.
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation):
+        """
+        Create and register a counter.
+        """
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation):
+        """
+        Create and register a gauge.
+        """
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_LATENCY_BUCKETS):
+        """
+        Create and register a histogram.
+        """
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+PACKETS = REGISTRY.counter(
+    "mtr2mqtt_packets_total",
+    "Transmitter packets read from the receivers.",
+)
+CHECKSUM_ERRORS = REGISTRY.counter(
+    "mtr2mqtt_checksum_errors_total",
+    "SCL responses rejected because of a checksum mismatch.",
+)
+SERIAL_TIMEOUTS = REGISTRY.counter(
+    "mtr2mqtt_serial_timeouts_total",
+    "SCL polls that timed out without a response.",
+)
+SIZE_MISMATCHES = REGISTRY.counter(
+    "mtr2mqtt_size_mismatches_total",
+    "MTR payloads rejected because of a length field mismatch.",
+)
+PUBLISH_FAILURES = REGISTRY.counter(
+    "mtr2mqtt_publish_failures_total",
+    "Measurement publishes that failed.",
+)
+SERIAL_RECONNECTS = REGISTRY.counter(
+    "mtr2mqtt_serial_reconnects_total",
+    "Receiver serial connections recovered after a read failure.",
+)
+MQTT_RECONNECTS = REGISTRY.counter(
+    "mtr2mqtt_mqtt_reconnects_total",
+    "MQTT broker reconnects after a disconnect.",
+)
+SERIAL_RTT = REGISTRY.histogram(
+    "mtr2mqtt_serial_rtt_seconds",
+    "Serial round-trip time of one receiver poll.",
+)
+DECODE_TIME = REGISTRY.histogram(
+    "mtr2mqtt_decode_seconds",
+    "Time to decode one MTR payload into a measurement.",
+)
+PUBLISH_TIME = REGISTRY.histogram(
+    "mtr2mqtt_publish_seconds",
+    "Time to hand one measurement to the MQTT client.",
+)
+TRAFFIC_INTER_ARRIVAL = REGISTRY.histogram(
+    "mtr2mqtt_traffic_inter_arrival_seconds",
+    "Time between receiver polls that returned measurements.",
+    buckets=ARRIVAL_BUCKETS,
+)
+DRAIN_PACKETS = REGISTRY.histogram(
+    "mtr2mqtt_drain_packets",
+    "Packets read from a receiver ring buffer by one drain.",
+    buckets=PACKET_COUNT_BUCKETS,
+)
+TRACKED_SENSORS = REGISTRY.gauge(
+    "mtr2mqtt_tracked_sensors",
+    "Sensors with tracked availability status.",
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "mtr2mqtt_queue_depth",
+    "Measurements waiting in the pipeline queue.",
+)
+
+QUEUE_HIGH_WATER_MARK = REGISTRY.gauge(
+    "mtr2mqtt_queue_high_water_mark",
+    "Largest number of measurements waiting in the pipeline queue.",
+)
+QUEUE_DROPPED = REGISTRY.counter(
+    "mtr2mqtt_queue_dropped_total",
+    "Measurements dropped because the pipeline queue was full.",
+)
+QUEUE_COALESCED = REGISTRY.counter(
+    "mtr2mqtt_queue_coalesced_total",
+    "Queued measurements replaced by a newer one of the same sensor.",
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serve the metrics page.
+        """
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        LOGGER.debug("metrics request: " + format, *args)
+
+
+class MetricsServer:
+    """
+    Serve a metrics registry over HTTP from a daemon thread.
+    """
+
+    def __init__(self, port, host="", registry=REGISTRY):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        """
+        Return the bound port, useful when port 0 was requested.
+        """
+        return self._server.server_address[1]
+
+    def start(self):
+        """
+        Start serving in the background.
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="mtr2mqtt-metrics",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving and close the listening socket.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+
+def start_server(port, host=""):
+    """
+    Serve the default registry in the background and return the server.
+    """
+    server = MetricsServer(port, host=host)
+    server.start()
+    LOGGER.info(
+        "Metrics endpoint started",
+        extra={"event": "metrics_started", "metrics_port": server.port},
+    )
+    return server
@@ -3,8 +3,11 @@ MTR protocol parser module
 
 Classes
     TransmitterType
+    Measurement
 
 Functions
+    decode_payload(payload)
+    mtr_response_to_measurement(payload, transmitters_metadata)
     mtr_response_to_json(payload, transmitters_metadata)
 """
 
@@ -15,19 +18,12 @@ from datetime import datetime, timedelta, timezone
 from collections import namedtuple
 from collections import defaultdict
 from mtr2mqtt import metadata
+from mtr2mqtt import metrics
 
 
-RESERVED_METADATA_FIELDS = frozenset({
-    "battery",
-    "type",
-    "rsl",
-    "id",
-    "reading",
-    "timestamp",
-    "message",
-    "calibrated",
-    "utility",
-})
+RESERVED_METADATA_FIELDS = metadata.RESERVED_METADATA_FIELDS
+# Utility calibration dates count days from 1.1.2000
+CALIBRATION_EPOCH = datetime(2000, 1, 1)
 
 
 class TransmitterType(Enum):
@@ -45,74 +41,158 @@ class TransmitterType(Enum):
     UTILITY = 15
 
 
-def check_payload(payload):
+class Measurement:
     """
-    Verifies that payload length matches lenght field
-    and that the packet is long enough
+    One decoded transmitter packet with optional metadata merged in.
+
+    The measurement fields are kept in packet order so the JSON rendering
+    stays byte-for-byte compatible, and the rendering is cached so a
+    measurement is serialized at most once.
+    """
+
+    __slots__ = ("sensor_id", "data", "_json")
+
+    def __init__(self, data, measurement_json=None):
+        self.data = data
+        self.sensor_id = data["id"]
+        self._json = measurement_json
+
+    @classmethod
+    def from_json(cls, measurement_json):
+        """
+        Build a measurement from a JSON object string, keeping the original text.
+        """
+        data = json.loads(measurement_json)
+        if not isinstance(data, dict):
+            raise ValueError("Measurement JSON must be an object")
+        return cls(data, measurement_json)
+
+    def get(self, key, default=None):
+        """
+        Return one measurement field.
+        """
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def to_json(self):
+        """
+        Serialize the measurement as the MQTT JSON payload.
+        """
+        if self._json is None:
+            self._json = json.dumps(self.data)
+        return self._json
+
+    def __repr__(self):
+        return f"Measurement({self.data!r})"
+
+
+Headers = namedtuple('Headers', 'transmitter_type rsl transmitter_id battery_voltage')
+_TRANSMITTER_TYPE_NAMES = {
+    transmitter_type.value: transmitter_type.name
+    for transmitter_type in TransmitterType
+}
+
+
+def _split_payload(payload):
+    """
+    Split payload once and verify that its length matches the length field
     """
 
     if payload is None:
         logging.warning("No MTR respose to parse")
-        return False
+        return None
     payload_fields = str(payload).split()
     if len(payload_fields) <= 4:
         logging.warning("Too short payload to process: %s", payload)
-        return False
+        return None
     try:
         data_bytes = int(payload_fields[1]) >> 5
-    except (IndexError, ValueError):
+    except ValueError:
         logging.warning("Malformed payload length field in payload: %s", payload)
-        return False
+        return None
     # Actual payload bytes = received - type - length&voltage - rsl - id
     received_data_bytes = len(payload_fields) - 4
     if data_bytes == received_data_bytes:
-        return True
+        return payload_fields
+    metrics.SIZE_MISMATCHES.inc()
     logging.warning(
         "Payload size mismatch, expected %s got %s bytes",
         data_bytes,
         received_data_bytes,
     )
-    return False
+    return None
+
+
+def check_payload(payload):
+    """
+    Verifies that payload length matches lenght field
+    and that the packet is long enough
+    """
+    return _split_payload(payload) is not None
+
+
+def decode_payload(payload):
+    """
+    Tokenize and validate an MTR packet once, returning its fields as integers
+    """
+    payload_fields = _split_payload(payload)
+    if payload_fields is None:
+        return None
+    try:
+        return tuple(map(int, payload_fields))
+    except ValueError:
+        logging.warning("Malformed payload field, skipping payload: %s", payload)
+        return None
+
+
+def _decode_header_fields(fields):
+    """
+    Get transmitter type, rsl, id and voltage from decoded fields
+    """
+    transmitter_type = _TRANSMITTER_TYPE_NAMES.get(fields[0])
+    if transmitter_type is None:
+        logging.warning("Malformed payload header, skipping payload: %s", fields)
+        return None
+    battery_voltage = (
+        fields[1] & 31
+    ) / 10  # clear 3 highest bits used for data length (31 = 00011111)
+    transmitter_id = str(fields[3])
+    rsl = (fields[2] & 127) - 127
+    return Headers(transmitter_type, rsl, transmitter_id, battery_voltage)
+
+
+def _decode_ft10_reading(fields):
+    """
+    Get FT10/MTR260/CSR260 reading from decoded fields
+    """
+    try:
+        return round((fields[4] + fields[5] * 256) / 10.0 - 273.2, 1)
+    except IndexError:
+        logging.warning("Malformed FT10 payload, skipping payload: %s", fields)
+        return None
 
 
 def _get_header_fields(payload):
     """
     Get transmitter type, rsl, id and voltage fields
     """
-    if check_payload(payload):
-        payload_fields = str(payload).split()
-        try:
-            transmitter_type = TransmitterType(int(payload_fields[0])).name
-            battery_voltage = (
-                int(payload_fields[1]) & 31
-            ) / 10  # clear 3 highest bits used for data length (31 = 00011111)
-            transmitter_id = str(int(payload_fields[3]))
-            rsl = (int(payload_fields[2]) & 127) - 127
-        except (IndexError, ValueError):
-            logging.warning("Malformed payload header, skipping payload: %s", payload)
-            return None
-        Headers = namedtuple('Headers', 'transmitter_type rsl transmitter_id battery_voltage')
-        return Headers(transmitter_type, rsl, transmitter_id, battery_voltage)
-    return None
+    fields = decode_payload(payload)
+    if fields is None:
+        return None
+    return _decode_header_fields(fields)
 
 def _get_ft10_reading(payload):
     """
     Get FT10/MTR260/CSR260 reading from payload
     """
-    if check_payload(payload):
-        payload_fields = str(payload).split()
-        try:
-            reading = round(
-                (int(payload_fields[4]) + int(payload_fields[5]) * 256) / 10.0 - 273.2,
-                1,
-            )
-        except (IndexError, ValueError):
-            logging.warning("Malformed FT10 payload, skipping payload: %s", payload)
-            return None
-        return reading
-    return None
+    fields = decode_payload(payload)
+    if fields is None:
+        return None
+    return _decode_ft10_reading(fields)
 
-def _get_ft10_data(headers, payload):
+def _get_ft10_data(headers, fields):
     """
     Get FT10/MTR260/CSR260 reading as json
     """
@@ -121,32 +201,26 @@ def _get_ft10_data(headers, payload):
         "type": f"{headers.transmitter_type}",
         "rsl": headers.rsl,
         "id": headers.transmitter_id,
-        "reading": _get_ft10_reading(payload),
+        "reading": _decode_ft10_reading(fields),
         "timestamp": f"{datetime.now(timezone.utc)}",
     }
 
-def _get_utility_data(headers, payload):
+def _get_utility_data(headers, fields):
     """
     Get Utility packet as json
     """
-    payload_fields = str(payload).split()
     # Some transmitters may intermittently send some additional
     # information using transmitter type 15.
     # After that, comes a byte indicating the type of utility data,
     # and after that, some data.
     # Currently only 0 and 1 types seem to exist
-    logging.debug("Utility packet MTR payload: %s", payload)
+    logging.debug("Utility packet MTR payload: %s", fields)
     # Calibration date
-    if payload_fields[4] == "0" and len(payload_fields) == 7:
+    if fields[4] == 0 and len(fields) == 7:
         # Rest of the payload is a 16 bit word, least significant byte first.
         # Value 0 corresponds to 1.1.2000, and every day increments by one.
-        start_date = datetime.strptime("1.1.2000", "%d.%m.%Y")
-        logging.debug("Utility packet, payload length: %s", len(payload_fields))
-        try:
-            calibration_days = int(payload_fields[5]) + 256 * int(payload_fields[6])
-        except (IndexError, ValueError):
-            logging.warning("Malformed utility payload, skipping payload: %s", payload)
-            return None
+        logging.debug("Utility packet, payload length: %s", len(fields))
+        calibration_days = fields[5] + 256 * fields[6]
         if (
             calibration_days == 65535
         ):
@@ -163,7 +237,7 @@ def _get_utility_data(headers, payload):
                 "message": "Device not calibrated" ,
                 "timestamp": f"{datetime.now(timezone.utc)}"
                 }
-        calibration_date = start_date + timedelta(days=calibration_days)
+        calibration_date = CALIBRATION_EPOCH + timedelta(days=calibration_days)
         return {
             "battery": headers.battery_voltage,
             "type": f"{headers.transmitter_type}",
@@ -190,11 +264,11 @@ def _default_payload_handler():
     Wrapper function for _unsupported_data_type to be used while processing payloads
     """
 
-    def _unsupported_data_type(headers, payload):
+    def _unsupported_data_type(headers, fields):
         """
         Get unsupported package response as json
         """
-        logging.debug("Unsupported response, payload: %s", payload)
+        logging.debug("Unsupported response, payload: %s", fields)
         return {
             "battery": headers.battery_voltage,
             "type": f"{headers.transmitter_type}",
@@ -214,32 +288,43 @@ payload_type_function_mapping = {
 
 payload_proressor = defaultdict(_default_payload_handler, payload_type_function_mapping)
 
-def mtr_response_to_json(payload, transmitters_metadata):
+def mtr_response_to_measurement(payload, transmitters_metadata):
     """
-    Convert MTR response packet to JSON
+    Convert MTR response packet to a Measurement
 
-    Optionally adding metadata from a file
+    Optionally adding metadata from a TransmitterMetadataIndex. A metadata
+    JSON string from metadata.loadfile is still accepted but is indexed on
+    every call.
     """
 
-    headers = _get_header_fields(payload)
+    fields = decode_payload(payload)
+    if fields is None:
+        return None
+    headers = _decode_header_fields(fields)
     if headers:
-        data = payload_proressor[headers.transmitter_type](headers, payload)
+        data = payload_proressor[headers.transmitter_type](headers, fields)
         if data is None:
             return None
 
         if transmitters_metadata:
-            transmitter_information = metadata.get_data(
-                headers.transmitter_id, transmitters_metadata
+            transmitter_information = metadata.as_index(transmitters_metadata).get(
+                headers.transmitter_id
             )
             logging.debug("Transmitter info: %s", transmitter_information)
             if transmitter_information:
-                transmitter_information = {
-                    key: value
-                    for key, value in transmitter_information.items()
-                    if key not in RESERVED_METADATA_FIELDS
-                }
-                data_with_transmitter_info = {**data, **transmitter_information}
-                return json.dumps(data_with_transmitter_info)
-        return json.dumps(data)
+                return Measurement({**data, **transmitter_information})
+        return Measurement(data)
 
     return None
+
+
+def mtr_response_to_json(payload, transmitters_metadata):
+    """
+    Convert MTR response packet to JSON
+
+    Optionally adding metadata from a file
+    """
+    measurement = mtr_response_to_measurement(payload, transmitters_metadata)
+    if measurement is None:
+        return None
+    return measurement.to_json()
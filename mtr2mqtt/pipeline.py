@@ -0,0 +1,213 @@
+"""
+Bounded hand-off queue between the serial reader and the MQTT publisher.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import logging
+import threading
+import time
+
+from mtr2mqtt import metrics
+
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop-oldest"
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE)
+DEFAULT_QUEUE_SIZE = 1000
+LOGGER = logging.getLogger(__name__)
+
+
+class MeasurementQueue:
+    """
+    Thread-safe bounded FIFO of keyed items with a configurable overflow policy.
+
+    When the queue is full, the block policy makes the producer wait for
+    space, drop-oldest discards the oldest queued item, and coalesce replaces
+    the queued item with the same key in place (falling back to drop-oldest
+    when no item with that key is waiting).
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, overflow=OVERFLOW_BLOCK):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown queue overflow policy {overflow!r}")
+        self.maxsize = max(1, int(maxsize))
+        self.overflow = overflow
+        self._entries = deque()
+        self._pending = {}
+        self._condition = threading.Condition()
+        self.closed = False
+        self._counters = dict.fromkeys(
+            ("queue_high_water_mark", "queue_dropped", "queue_coalesced"),
+            0,
+        )
+
+    def __len__(self):
+        with self._condition:
+            return len(self._entries)
+
+    @property
+    def high_water_mark(self):
+        """
+        Return the deepest backlog seen so far.
+        """
+        return self._counters["queue_high_water_mark"]
+
+    @property
+    def dropped(self):
+        """
+        Return the number of items discarded to make room.
+        """
+        return self._counters["queue_dropped"]
+
+    @property
+    def coalesced(self):
+        """
+        Return the number of items replaced in place by a newer one.
+        """
+        return self._counters["queue_coalesced"]
+
+    @property
+    def depth(self):
+        """
+        Return the number of queued items.
+        """
+        return len(self)
+
+    def _pop_oldest(self):
+        entry = self._entries.popleft()
+        if self._pending.get(entry[0]) is entry:
+            del self._pending[entry[0]]
+        return entry[1]
+
+    def put(self, key, item, timeout=None):
+        """
+        Queue an item and return whether it was accepted.
+
+        Returns False when the queue was closed or a blocking put timed out.
+        """
+        with self._condition:
+            if len(self._entries) >= self.maxsize:
+                if self.overflow == OVERFLOW_BLOCK:
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while len(self._entries) >= self.maxsize and not self.closed:
+                        remaining = None
+                        if deadline is not None:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                return False
+                        self._condition.wait(remaining)
+                elif self.overflow == OVERFLOW_COALESCE and key in self._pending:
+                    self._pending[key][1] = item
+                    self._counters["queue_coalesced"] += 1
+                    metrics.QUEUE_COALESCED.inc()
+                    return True
+                else:
+                    self._pop_oldest()
+                    self._counters["queue_dropped"] += 1
+                    metrics.QUEUE_DROPPED.inc()
+            if self.closed:
+                return False
+
+            entry = [key, item]
+            self._entries.append(entry)
+            self._pending[key] = entry
+            if len(self._entries) > self.high_water_mark:
+                self._counters["queue_high_water_mark"] = len(self._entries)
+                metrics.QUEUE_HIGH_WATER_MARK.set(len(self._entries))
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Return the oldest item, or None if none arrived before the timeout.
+        """
+        with self._condition:
+            if not self._entries and not self.closed:
+                self._condition.wait(timeout)
+            if not self._entries:
+                return None
+            item = self._pop_oldest()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """
+        Wake up blocked producers and consumers and refuse further items.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Return queue depth and overflow counters.
+        """
+        with self._condition:
+            return {"queue_depth": len(self._entries), **self._counters}
+
+
+class QueueFeeder:
+    """
+    Reader stage that fills a measurement queue from a background thread.
+
+    read_batch returns or yields the (key, item) pairs of one read. When it
+    raises, the queue is closed and the error is raised again to the consumer
+    by get(), instead of leaving the consumer polling a queue nobody fills.
+    Errors other than the expected ones are logged where they happen.
+    """
+
+    def __init__(self, measurement_queue, read_batch, expected_errors=()):
+        self.measurement_queue = measurement_queue
+        self.read_batch = read_batch
+        self.expected_errors = expected_errors
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name="mtr2mqtt-serial-reader",
+            daemon=True,
+        )
+
+    def start(self):
+        """
+        Start reading in the background.
+        """
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Close the queue and wait for the reader to finish its current read.
+        """
+        self.measurement_queue.close()
+        self._thread.join(timeout=timeout)
+        LOGGER.info(
+            "Pipeline stopped",
+            extra={"event": "pipeline_stopped", **self.measurement_queue.stats()},
+        )
+
+    def get(self, timeout=None):
+        """
+        Return the oldest queued item, None on timeout, or raise the reader error.
+        """
+        item = self.measurement_queue.get(timeout=timeout)
+        if item is None and self.error is not None:
+            raise self.error
+        return item
+
+    def _run(self):
+        try:
+            while not self.measurement_queue.closed:
+                for key, item in self.read_batch():
+                    self.measurement_queue.put(key, item)
+        except self.expected_errors as error:
+            self.error = error
+            self.measurement_queue.close()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            LOGGER.exception(
+                "Serial reader stopped",
+                extra={"event": "serial_reader_failed"},
+            )
+            self.error = error
+            self.measurement_queue.close()
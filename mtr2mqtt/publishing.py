@@ -0,0 +1,517 @@
+"""
+MQTT connection handling and publish helpers for the bridge runtime.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+
+import paho.mqtt.client as mqtt
+
+from mtr2mqtt import homeassistant
+from mtr2mqtt import metrics
+from mtr2mqtt import mtr
+from mtr2mqtt import replay
+from mtr2mqtt import spool
+from mtr2mqtt import status
+from mtr2mqtt import summary
+from mtr2mqtt.errors import BridgeError
+from mtr2mqtt.errors import MqttConnectionError
+
+
+LOGGER = logging.getLogger(__name__)
+PUBLISH_SPOOLED = "spooled"
+
+
+def on_connect(client, userdata, flags, reason_code, properties):
+    """
+    Handle MQTT connection state changes.
+    """
+    logging.debug(
+        "userdata: %s, flags: %s, properties: %s",
+        userdata,
+        flags,
+        properties,
+    )
+    if reason_code == 0:
+        if getattr(client, "disconnect_flag", False):
+            metrics.MQTT_RECONNECTS.inc()
+            client.disconnect_flag = False
+        client.connected_flag = True
+        client.connect_error = None
+        LOGGER.info(
+            "MQTT broker connected",
+            extra={
+                "event": "mqtt_connected",
+                "mqtt_reason_code": str(reason_code),
+            },
+        )
+    else:
+        client.connected_flag = False
+        client.connect_error = reason_code
+        logging.warning("Bad connection Returned code=%s", str(reason_code))
+
+
+def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
+    """
+    Handle MQTT disconnect events.
+    """
+    logging.warning(
+        "MQTT server disconnected with reason: %s, userdata: %s, flags: %s, properties: %s",
+        str(reason_code),
+        userdata,
+        disconnect_flags,
+        properties,
+    )
+    client.connected_flag = False
+    client.disconnect_flag = True
+
+
+def on_publish(client, userdata, mid, reason_code, properties):
+    """
+    Count publishes the client finished sending or the broker acknowledged.
+    """
+    logging.debug(
+        "published mid: %s, reason: %s, userdata: %s, properties: %s",
+        mid,
+        reason_code,
+        userdata,
+        properties,
+    )
+    client.acknowledged_count += 1
+
+
+def _track_inflight(client):
+    """
+    Count accepted publishes so the inflight count is accepted - acknowledged.
+    """
+    publish = client.publish
+
+    def counting_publish(*args, **kwargs):
+        message_info = publish(*args, **kwargs)
+        if message_info.rc == mqtt.MQTT_ERR_SUCCESS:
+            client.published_count += 1
+        return message_info
+
+    client.published_count = 0
+    client.acknowledged_count = 0
+    client.publish = counting_publish
+    client.on_publish = on_publish
+
+
+def mqtt_inflight(client):
+    """
+    Return the number of publishes not yet completed, or None if not tracked.
+    """
+    if not hasattr(client, "published_count"):
+        return None
+    return max(0, client.published_count - client.acknowledged_count)
+
+
+def open_mqtt_connection(args):
+    """
+    Create and connect the MQTT client.
+    """
+    if getattr(args, "replay_stub_mqtt", False):
+        LOGGER.info(
+            "Publishing to the in-process stub MQTT client",
+            extra={"event": "mqtt_stub"},
+        )
+        return replay.StubMqttClient()
+    mqtt.Client.connected_flag = False
+    client = mqtt.Client(
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        client_id="mtr2mqtt",
+        userdata=None,
+        protocol=mqtt.MQTTv311,
+        transport="tcp",
+    )
+    client.enable_logger()
+    client.reconnect_delay_set(min_delay=1, max_delay=30)
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    _track_inflight(client)
+    client.connected_flag = False
+    client.connect_error = None
+
+    mqtt_host = args.mqtt_host or "localhost"
+    mqtt_port = int(args.mqtt_port or 1883)
+
+    client.loop_start()
+    LOGGER.info(
+        "Connecting to MQTT broker",
+        extra={
+            "event": "mqtt_connecting",
+            "mqtt_host": mqtt_host,
+            "mqtt_port": mqtt_port,
+        },
+    )
+    try:
+        client.connect(mqtt_host, mqtt_port)
+        deadline = time.monotonic() + 30
+        while not client.connected_flag and client.connect_error is None:
+            logging.debug("Waiting for MQTT connection")
+            if time.monotonic() >= deadline:
+                raise MqttConnectionError(
+                    f"Timed out waiting for MQTT host {mqtt_host}:{mqtt_port}"
+                )
+            time.sleep(1)
+        if client.connect_error is not None:
+            raise MqttConnectionError(
+                "MQTT broker rejected connection to "
+                f"{mqtt_host}:{mqtt_port} with reason code {client.connect_error}"
+            )
+    except (mqtt.socket.timeout, mqtt.socket.error, OSError) as error:
+        client.loop_stop()
+        logging.exception("Unable to connect to MQTT host: %s", error)
+        raise MqttConnectionError(
+            f"Unable to connect to MQTT host {mqtt_host}:{mqtt_port}"
+        ) from error
+    except MqttConnectionError:
+        client.loop_stop()
+        raise
+    return client
+
+
+def as_measurement(measurement):
+    """
+    Accept a Measurement or a legacy measurement JSON string.
+    """
+    if isinstance(measurement, mtr.Measurement):
+        return measurement
+    return mtr.Measurement.from_json(measurement)
+
+
+def publish_measurement(
+    mqtt_client,
+    receiver_serial_number,
+    measurement,
+    ha_discovery_publisher=None,
+):
+    """
+    Publish discovery first when enabled, then publish the measurement.
+
+    The measurement is serialized here, once, right before the publish.
+    """
+    try:
+        measurement = as_measurement(measurement)
+        sensor_id = measurement.sensor_id
+    except (TypeError, ValueError, KeyError):
+        logging.exception(
+            "Invalid measurement payload, skipping publish: %s",
+            measurement,
+        )
+        return mqtt.MQTT_ERR_INVAL, None
+
+    if not getattr(mqtt_client, "connected_flag", True):
+        metrics.PUBLISH_FAILURES.inc()
+        logging.warning(
+            "Skipping publish for receiver %s sensor %s because MQTT is disconnected",
+            receiver_serial_number,
+            sensor_id,
+        )
+        return mqtt.MQTT_ERR_NO_CONN, None
+
+    if ha_discovery_publisher:
+        ha_discovery_publisher.publish_if_needed(
+            mqtt_client,
+            receiver_serial_number,
+            measurement.data,
+        )
+
+    measurement_json = measurement.to_json()
+    try:
+        with metrics.PUBLISH_TIME.time():
+            result, mid = mqtt_client.publish(
+                homeassistant.state_topic(receiver_serial_number, sensor_id),
+                payload=measurement_json,
+                qos=1,
+                retain=False,
+            )
+    except (OSError, RuntimeError, TypeError, ValueError):
+        metrics.PUBLISH_FAILURES.inc()
+        logging.exception(
+            "Publishing measurement failed for receiver %s sensor %s",
+            receiver_serial_number,
+            sensor_id,
+        )
+        return mqtt.MQTT_ERR_NO_CONN, None
+    logging.debug("publish result: %s, mid: %s", result, mid)
+    if result != 0:
+        metrics.PUBLISH_FAILURES.inc()
+        logging.warning(
+            "Sending message: %s failed with result code: %s",
+            measurement_json,
+            result,
+        )
+    return result, mid
+
+
+def publish_status(mqtt_client, topic, payload):
+    """
+    Publish a retained status payload.
+    """
+    if not getattr(mqtt_client, "connected_flag", True):
+        logging.warning("Skipping status publish for %s because MQTT is disconnected", topic)
+        return mqtt.MQTT_ERR_NO_CONN, None
+
+    try:
+        result, mid = mqtt_client.publish(
+            topic,
+            payload=json.dumps(payload, sort_keys=True),
+            qos=1,
+            retain=True,
+        )
+    except (OSError, RuntimeError, TypeError, ValueError):
+        logging.exception("Publishing status failed for topic %s", topic)
+        return mqtt.MQTT_ERR_NO_CONN, None
+    logging.debug("status publish result: %s, mid: %s", result, mid)
+    return result, mid
+
+
+def publish_summary(mqtt_client, receiver, payload):
+    """
+    Publish a retained receiver summary payload, given as a dict or as
+    already serialized JSON.
+    """
+    return _publish_summary_document(
+        mqtt_client,
+        summary.summary_topic(receiver),
+        payload,
+        retain=True,
+    )
+
+
+def publish_summary_delta(mqtt_client, receiver, payload):
+    """
+    Publish a non-retained receiver summary delta payload.
+    """
+    return _publish_summary_document(
+        mqtt_client,
+        summary.summary_delta_topic(receiver),
+        payload,
+        retain=False,
+    )
+
+
+def _status_topic(payload):
+    if payload["entity_type"] == "receiver":
+        return status.receiver_status_topic(payload["receiver"])
+    return status.sensor_status_topic(payload["receiver"], payload["sensor"])
+
+
+def publish_status_changes(mqtt_client, status_tracker, summary_tracker, now=None):
+    """
+    Publish retained status payloads whose content changed.
+
+    Returns (payload, mid) for every published status.
+    """
+    published = []
+    for key, payload, rendered in status_tracker.changed_payloads(now):
+        summary_tracker.record_status(payload)
+        result, mid = publish_status(mqtt_client, _status_topic(payload), payload)
+        if result == mqtt.MQTT_ERR_SUCCESS:
+            status_tracker.mark_status_published(key, rendered)
+            published.append((payload, mid))
+    return published
+
+
+def publish_due_summaries(mqtt_client, summary_tracker, now=None, force=False):
+    """
+    Publish due receiver summary deltas and retained full summaries.
+
+    With force, pending summaries are published without waiting for the
+    debounce or full summary interval. Returns (document, mid) for every
+    published summary, where document is the serialized JSON that was sent.
+    """
+    due_now = math.inf if force else None
+    published = []
+    for receiver, sequence, sensors, rendered in summary_tracker.due_deltas(
+        now=due_now,
+        updated_at=now,
+    ):
+        result, mid = publish_summary_delta(mqtt_client, receiver, rendered)
+        if result == mqtt.MQTT_ERR_SUCCESS:
+            summary_tracker.mark_delta_published(receiver, sequence, sensors)
+            published.append((rendered, mid))
+    for receiver, rendered in summary_tracker.due_payloads(
+        now=due_now,
+        updated_at=now,
+    ):
+        result, mid = publish_summary(mqtt_client, receiver, rendered)
+        if result == mqtt.MQTT_ERR_SUCCESS:
+            summary_tracker.mark_published(receiver, rendered)
+            published.append((rendered, mid))
+    return published
+
+
+def _publish_summary_document(mqtt_client, topic, payload, retain):
+    if not getattr(mqtt_client, "connected_flag", True):
+        logging.warning(
+            "Skipping summary publish for %s because MQTT is disconnected",
+            topic,
+        )
+        return mqtt.MQTT_ERR_NO_CONN, None
+
+    try:
+        if not isinstance(payload, str):
+            payload = json.dumps(payload, sort_keys=True)
+        result, mid = mqtt_client.publish(
+            topic,
+            payload=payload,
+            qos=1,
+            retain=retain,
+        )
+    except (OSError, RuntimeError, TypeError, ValueError):
+        logging.exception("Publishing summary failed for topic %s", topic)
+        return mqtt.MQTT_ERR_NO_CONN, None
+    logging.debug("summary publish result: %s, mid: %s", result, mid)
+    return result, mid
+
+
+class SpoolingPublisher:
+    """
+    Queue measurements in a disk spool while MQTT is unavailable.
+
+    Measurements are spooled while the broker is disconnected, and also while
+    older measurements are still waiting, so they are published in order.
+    replay() publishes the backlog at most rate measurements per second from
+    a token bucket holding up to one second of tokens.
+    """
+
+    def __init__(self, measurement_spool, rate=spool.DEFAULT_REPLAY_RATE):
+        self.spool = measurement_spool
+        self.rate = rate
+        self._tokens = 0.0
+        self._refilled_at = None
+
+    def __len__(self):
+        return len(self.spool)
+
+    def should_spool(self, mqtt_client):
+        """
+        Return whether a new measurement has to wait in the spool.
+        """
+        return bool(len(self.spool)) or not getattr(mqtt_client, "connected_flag", True)
+
+    def append(self, receiver_serial_number, measurement):
+        """
+        Append a measurement to the spool, behind any measurements already waiting.
+        """
+        try:
+            measurement = as_measurement(measurement)
+        except (TypeError, ValueError, KeyError):
+            logging.exception(
+                "Invalid measurement payload, skipping spool: %s",
+                measurement,
+            )
+            return mqtt.MQTT_ERR_INVAL, None
+        self.spool.append(
+            receiver_serial_number,
+            measurement.sensor_id,
+            measurement.to_json(),
+        )
+        LOGGER.debug(
+            "Measurement spooled",
+            extra={
+                "event": "measurement_spooled",
+                "receiver_serial_number": receiver_serial_number,
+                "sensor": measurement.sensor_id,
+                "spool_size": len(self.spool),
+            },
+        )
+        return PUBLISH_SPOOLED, None
+
+    def replay(self, mqtt_client, discovery_publisher=None):
+        """
+        Publish spooled measurements in order and return the replayed
+        (receiver, sensor) pairs.
+        """
+        if mqtt_client is None or len(self.spool) == 0:
+            self._refilled_at = None
+            return []
+        if not getattr(mqtt_client, "connected_flag", True):
+            self._refilled_at = None
+            return []
+
+        monotonic_now = time.monotonic()
+        if self._refilled_at is None:
+            self._tokens = 1.0
+        else:
+            self._tokens = min(
+                max(self.rate, 1.0),
+                self._tokens + (monotonic_now - self._refilled_at) * self.rate,
+            )
+        self._refilled_at = monotonic_now
+
+        replayed = []
+        for seq, receiver_serial_number, sensor_id, payload in self.spool.peek(
+            int(self._tokens)
+        ):
+            result, _mid = publish_measurement(
+                mqtt_client,
+                receiver_serial_number,
+                payload,
+                ha_discovery_publisher=discovery_publisher,
+            )
+            if result == mqtt.MQTT_ERR_INVAL:
+                self.spool.remove(seq)
+                continue
+            if result != mqtt.MQTT_ERR_SUCCESS:
+                break
+            self.spool.remove(seq)
+            replayed.append((receiver_serial_number, sensor_id))
+        self._tokens -= len(replayed)
+
+        if replayed:
+            LOGGER.info(
+                "Replayed spooled measurements",
+                extra={
+                    "event": "spool_replayed",
+                    "spool_replayed": len(replayed),
+                    "spool_size": len(self.spool),
+                },
+            )
+        return replayed
+
+    def close(self):
+        """
+        Close the spool database.
+        """
+        self.spool.close()
+
+
+def open_spooling_publisher(args):
+    """
+    Open the measurement spool, or return None when no spool file is set.
+    """
+    spool_file = getattr(args, "spool_file", None)
+    if not spool_file:
+        return None
+    try:
+        measurement_spool = spool.MeasurementSpool(
+            spool_file,
+            max_bytes=getattr(args, "spool_max_bytes", spool.DEFAULT_MAX_BYTES),
+            max_age_seconds=getattr(
+                args,
+                "spool_max_age",
+                spool.DEFAULT_MAX_AGE_SECONDS,
+            ),
+        )
+    except spool.SpoolError as error:
+        raise BridgeError(str(error)) from error
+    LOGGER.info(
+        "Measurement spool opened",
+        extra={
+            "event": "spool_opened",
+            "spool_file": spool_file,
+            "spool_size": len(measurement_spool),
+        },
+    )
+    return SpoolingPublisher(
+        measurement_spool,
+        rate=getattr(args, "spool_replay_rate", spool.DEFAULT_REPLAY_RATE),
+    )
@@ -0,0 +1,285 @@
+"""
+Serial receiver discovery, validation and recovery for the bridge runtime.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+import time
+
+import serial
+from serial.tools import list_ports
+
+from mtr2mqtt import capture
+from mtr2mqtt import metrics
+from mtr2mqtt import replay
+from mtr2mqtt import scl
+from mtr2mqtt.errors import ReceiverConnectionError
+
+
+SERIAL_PORT_GREP = "RTR|FTR|DCS|DPR"
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ReceiverConnection:
+    """
+    Validated receiver connection state used by the runtime loop.
+    """
+
+    serial_handle: serial.Serial
+    device_type: str
+    receiver_serial_number: str
+    serial_config: dict
+
+    def poll(self, command, receiver_diagnostics):
+        """
+        Send one poll command and return the parsed SCL response, or None.
+
+        Serial errors propagate, so the caller can recover the receiver.
+        """
+        started_at = time.perf_counter()
+        self.serial_handle.write(command)
+        logging.debug("Wrote message: %s to: to %s", command, self.serial_handle.name)
+        response = self.serial_handle.read_until(scl.END_CHAR)
+        response_checksum = bytes(self.serial_handle.read(1))
+        round_trip = time.perf_counter() - started_at
+        metrics.SERIAL_RTT.observe(round_trip)
+        receiver_diagnostics.record_rtt(round_trip)
+        parsed_response = scl.parse_response(response, response_checksum)
+        if (
+            parsed_response is None
+            and response
+            and scl.calc_bcc(response) != response_checksum
+        ):
+            receiver_diagnostics.record_checksum_error()
+        logging.debug(
+            "response: %s, response checksum: %s",
+            response,
+            response_checksum,
+        )
+        logging.debug("parsed SCL response: %s", parsed_response)
+        return parsed_response
+
+
+def _create_serial_handle(args, port):
+    if getattr(args, "replay", None):
+        return capture.wrap(
+            replay.ReplaySerial.from_file(
+                port,
+                speed=getattr(args, "replay_speed", replay.DEFAULT_SPEED),
+            )
+        )
+    return capture.wrap(
+        serial.Serial(
+            port=port,
+            baudrate=args.baudrate,
+            bytesize=args.bytesize,
+            parity=args.parity,
+            stopbits=args.stopbits,
+            timeout=args.serial_timeout,
+        )
+    )
+
+
+def _read_receiver_serial_number(ser, scl_address):
+    """
+    Query the receiver serial number from an open and validated port.
+    """
+    try:
+        scl_sn_command = scl.create_command("SN ?", scl_address)
+        ser.write(scl_sn_command)
+        logging.debug("Wrote message: %s to: %s", scl_sn_command, ser.name)
+        response = ser.read_until(scl.END_CHAR)
+        response_checksum = bytes(ser.read(1))
+        receiver_serial_number = scl.parse_response(response, response_checksum)
+        if receiver_serial_number:
+            return receiver_serial_number
+
+        logging.warning("Unable to read receiver serial number from port %s", ser.name)
+        return None
+    except (OSError, serial.serialutil.SerialException):
+        logging.exception("Reading receiver serial number failed on port %s", ser.name)
+        return None
+
+
+def _build_receiver_connection(ser, args, device_type):
+    receiver_serial_number = _read_receiver_serial_number(ser, args.scl_address)
+    if not receiver_serial_number:
+        ser.close()
+        return None
+
+    LOGGER.info(
+        "Receiver connected",
+        extra={
+            "event": "receiver_connected",
+            "device_type": device_type,
+            "receiver_serial_number": receiver_serial_number,
+            "serial_port": ser.name,
+        },
+    )
+    return ReceiverConnection(
+        serial_handle=ser,
+        device_type=device_type,
+        receiver_serial_number=receiver_serial_number,
+        serial_config=ser.get_settings(),
+    )
+
+
+def _configured_ports(args):
+    """
+    Return the explicitly configured serial ports as a list.
+    """
+    if getattr(args, "replay", None):
+        return [args.replay]
+    serial_port = getattr(args, "serial_port", None)
+    if not serial_port:
+        return []
+    if isinstance(serial_port, str):
+        return [serial_port]
+    return list(serial_port)
+
+
+def _open_configured_port(args, port):
+    try:
+        ser = _create_serial_handle(args, port)
+        device_type = scl.get_receiver_type(ser, args.scl_address)
+        if not device_type:
+            logging.error(
+                "Configured serial port %s is not a compatible MTR receiver",
+                port,
+            )
+            ser.close()
+            return None
+        return _build_receiver_connection(ser, args, device_type)
+    except (OSError, serial.serialutil.SerialException, ValueError):
+        logging.exception("Unable to open serial port")
+        raise ReceiverConnectionError(
+            f"Unable to open serial port {port}"
+        ) from None
+
+
+def _discover_receivers(args, exclude_ports=(), limit=None):
+    receivers = []
+    for port in list(list_ports.grep(SERIAL_PORT_GREP)):
+        if port.device in exclude_ports:
+            continue
+        try:
+            ser = _create_serial_handle(args, port.device)
+            device_type = scl.get_receiver_type(ser, args.scl_address)
+            if not device_type:
+                ser.close()
+                continue
+            receiver = _build_receiver_connection(ser, args, device_type)
+        except (OSError, serial.serialutil.SerialException):
+            continue
+        if receiver is not None:
+            receivers.append(receiver)
+            if limit is not None and len(receivers) >= limit:
+                break
+    return receivers
+
+
+def open_receiver_connection(args, exclude_ports=()):
+    """
+    Open and validate a receiver connection.
+
+    Ports listed in exclude_ports, typically those already held by other
+    receivers of the same bridge, are skipped.
+    """
+    configured_ports = _configured_ports(args)
+    if configured_ports:
+        for port in configured_ports:
+            if port not in exclude_ports:
+                return _open_configured_port(args, port)
+        return None
+
+    receivers = _discover_receivers(args, exclude_ports, limit=1)
+    return receivers[0] if receivers else None
+
+
+def open_receiver_connections(args, exclude_ports=(), *, retry_later=False):
+    """
+    Open every configured serial port, or every discovered receiver.
+
+    A configured port that cannot be opened raises ReceiverConnectionError,
+    unless retry_later is set: then it is logged and left out, so the bridge
+    can keep serving its other receivers and try the port again later.
+    """
+    configured_ports = _configured_ports(args)
+    if configured_ports:
+        receivers = []
+        for port in configured_ports:
+            if port in exclude_ports:
+                continue
+            try:
+                receivers.append(_open_configured_port(args, port))
+            except ReceiverConnectionError:
+                if not retry_later:
+                    raise
+                LOGGER.warning(
+                    "Unable to reopen serial port %s, retrying later",
+                    port,
+                    extra={"event": "receiver_reopen_failed", "serial_port": port},
+                )
+        return [receiver for receiver in receivers if receiver is not None]
+
+    return _discover_receivers(args, exclude_ports)
+
+
+def recover_receiver_connection(receiver, args, exclude_ports=()):
+    """
+    Try to restore serial connectivity and refresh receiver identity.
+    """
+    current_port = receiver.serial_handle.port
+
+    try:
+        receiver.serial_handle.close()
+    except (OSError, serial.serialutil.SerialException):
+        logging.debug("Closing failed serial port %s raised an exception", current_port)
+
+    if current_port:
+        try:
+            logging.warning("Trying to reopen serial port: %s", current_port)
+            reopened_ser = serial.Serial()
+            reopened_ser.port = current_port
+            reopened_ser.apply_settings(receiver.serial_config)
+            reopened_ser.open()
+            reopened_ser = capture.wrap(reopened_ser)
+            device_type = scl.get_receiver_type(reopened_ser, args.scl_address)
+            if device_type:
+                recovered_receiver = _build_receiver_connection(
+                    reopened_ser,
+                    args,
+                    device_type,
+                )
+                if recovered_receiver:
+                    logging.info("Recovered serial connection on %s", current_port)
+                    return recovered_receiver
+            logging.warning(
+                "Reopened serial port %s but did not detect a compatible receiver",
+                current_port,
+            )
+            reopened_ser.close()
+        except serial.serialutil.SerialException:
+            logging.exception("Serial exception: opening serial port failed")
+        except FileNotFoundError:
+            logging.exception("File not found: opening serial port failed")
+        except OSError:
+            logging.exception("OS Error: opening serial port failed")
+
+    if not _configured_ports(args):
+        logging.warning("Trying to rediscover receiver port")
+        recovered_receiver = open_receiver_connection(
+            args,
+            exclude_ports=exclude_ports,
+        )
+        if recovered_receiver:
+            logging.info(
+                "Recovered serial connection on rediscovered port %s",
+                recovered_receiver.serial_handle.port,
+            )
+            return recovered_receiver
+
+    return None
@@ -0,0 +1,328 @@
+"""
+Replay recorded SCL traffic through the bridge without a physical receiver.
+
+A capture file lists raw SCL response frames as hex, one per line, optionally
+preceded by the second the frame was recorded at::
+
+    # comment
+    12.500 0630203930203538203135303036203134352031310313
+    13.020 06230326
+
+ReplaySerial stands in for the serial port. It answers the receiver type and
+serial number queries and returns the next frame of its FramePlayer to every
+poll once the frame is due, at the recorded pace divided by the replay speed.
+A speed of 0 replays every frame back-to-back. StubMqttClient accepts publishes in
+process, so a replay can measure bridge throughput without a broker.
+
+Binary captures written with --capture are read as well; the responses to
+the recorded polls are replayed with their recorded timings.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+import time
+
+import paho.mqtt.client as mqtt
+
+from mtr2mqtt import capture
+from mtr2mqtt import scl
+
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_SPEED = 1.0
+DEFAULT_DEVICE_TYPE = "RTR970"
+DEFAULT_SERIAL_NUMBER = "REPLAY"
+EMPTY_RING_BUFFER = "#"
+
+
+class ReplayError(ValueError):
+    """
+    Raised when a capture file cannot be parsed.
+    """
+
+
+class ReplayFinished(Exception):
+    """
+    Raised by FramePlayer when every recorded frame has been replayed.
+    """
+
+    def __init__(self, frames, seconds):
+        super().__init__(f"Replayed {frames} frames in {seconds:.3f} s")
+        self.frames = frames
+        self.seconds = seconds
+
+    @property
+    def frames_per_second(self):
+        """
+        Return the replay throughput.
+        """
+        if self.seconds <= 0:
+            return float(self.frames)
+        return self.frames / self.seconds
+
+
+@dataclass(frozen=True)
+class ReplayFrame:
+    """
+    One recorded SCL response frame and the second it was recorded at.
+    """
+
+    data: bytes
+    timestamp: float | None = None
+
+
+def parse_capture_line(line):
+    """
+    Parse one capture line into a ReplayFrame, or None for blank and comments.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    fields = line.split()
+    if len(fields) > 2:
+        raise ReplayError(f"Unexpected capture line: {line}")
+    timestamp = float(fields[0]) if len(fields) == 2 else None
+    return ReplayFrame(bytes.fromhex(fields[-1]), timestamp)
+
+
+def _load_binary_capture(path):
+    """
+    Rebuild poll response frames from a binary serial capture.
+
+    A response may span several reads, so the reads following a poll request
+    are joined into one frame. Responses to other commands are skipped.
+    """
+    frames = []
+    poll_timestamp = None
+    response = b""
+    for record in capture.read_records(path):
+        if record.direction == capture.DIRECTION_READ:
+            response += record.data
+            continue
+        if poll_timestamp is not None and response:
+            frames.append(ReplayFrame(response, poll_timestamp))
+        command = record.data[1:].split(scl.END_CHAR, 1)[0]
+        poll_timestamp = record.timestamp if command.startswith(b"DBG") else None
+        response = b""
+    if poll_timestamp is not None and response:
+        frames.append(ReplayFrame(response, poll_timestamp))
+    return frames
+
+
+def load_capture(path):
+    """
+    Read every frame of a text or binary capture file.
+    """
+    if capture.is_capture_file(path):
+        return _load_binary_capture(path)
+    frames = []
+    with open(path, encoding="ascii") as capture_file:
+        for line_number, line in enumerate(capture_file, start=1):
+            try:
+                frame = parse_capture_line(line)
+            except ValueError as error:
+                raise ReplayError(f"{path}:{line_number}: {error}") from error
+            if frame is not None:
+                frames.append(frame)
+    return frames
+
+
+class FramePlayer:
+    """
+    Hand out recorded frames at the recorded pace divided by the replay speed.
+    """
+
+    def __init__(self, frames, speed=DEFAULT_SPEED, monotonic=None):
+        self.speed = speed
+        self._frames = list(frames)
+        self._position = 0
+        self._monotonic = monotonic or time.monotonic
+        self._started_at = None
+        self._last_frame_at = None
+        self._drained = False
+
+    def remaining(self):
+        """
+        Return the number of frames not replayed yet.
+        """
+        return len(self._frames) - self._position
+
+    def next_frame(self):
+        """
+        Return the next due frame, or an empty ring buffer response.
+        """
+        now = self._monotonic()
+        if self._started_at is None:
+            self._started_at = self._last_frame_at = now
+        if self._position >= len(self._frames):
+            if self._drained:
+                raise ReplayFinished(
+                    len(self._frames),
+                    self._last_frame_at - self._started_at,
+                )
+            # Report an empty ring buffer once, so a drain batch in progress
+            # is handled before the replay ends.
+            self._drained = True
+            return scl.create_response(EMPTY_RING_BUFFER)
+        frame = self._frames[self._position]
+        if now < self._due_at(frame):
+            return scl.create_response(EMPTY_RING_BUFFER)
+        self._position += 1
+        self._last_frame_at = now
+        return frame.data
+
+    def _due_at(self, frame):
+        first_timestamp = self._frames[0].timestamp
+        if self.speed <= 0 or frame.timestamp is None or first_timestamp is None:
+            return self._started_at
+        return self._started_at + (frame.timestamp - first_timestamp) / self.speed
+
+
+class ReplaySerial:
+    """
+    Serial port stand-in that answers polls from a frame player.
+    """
+
+    def __init__(
+        self,
+        player,
+        *,
+        name="replay",
+        device_type=DEFAULT_DEVICE_TYPE,
+        serial_number=DEFAULT_SERIAL_NUMBER,
+    ):
+        self.port = name
+        self.name = name
+        self.device_type = device_type
+        self.serial_number = serial_number
+        self.is_open = True
+        self.player = player
+        self._pending = bytearray()
+
+    @classmethod
+    def from_file(cls, path, speed=DEFAULT_SPEED):
+        """
+        Create a replay port from a capture file.
+        """
+        return cls(FramePlayer(load_capture(path), speed=speed), name=path)
+
+    @property
+    def in_waiting(self):
+        """
+        Return the number of response bytes not read yet.
+        """
+        return len(self._pending)
+
+    def get_settings(self):
+        """
+        Return an empty settings dictionary, as there is no port to configure.
+        """
+        return {}
+
+    def apply_settings(self, _settings):
+        """
+        Ignore serial settings.
+        """
+
+    def reset_input_buffer(self):
+        """
+        Discard response bytes not read yet.
+        """
+        self._pending.clear()
+
+    def reset_output_buffer(self):
+        """
+        Nothing is buffered for output.
+        """
+
+    def close(self):
+        """
+        Mark the port closed.
+        """
+        self.is_open = False
+
+    def write(self, command):
+        """
+        Queue the response to one SCL command.
+        """
+        text = command[1:].split(scl.END_CHAR, 1)[0].decode("ascii")
+        if text == "TYPE ?":
+            self._pending += scl.create_response(self.device_type)
+        elif text == "SN ?":
+            self._pending += scl.create_response(self.serial_number)
+        else:
+            self._pending += self.player.next_frame()
+        return len(command)
+
+    def read_until(self, expected=scl.END_CHAR):
+        """
+        Return pending bytes up to and including the expected terminator.
+        """
+        end = self._pending.find(expected)
+        end = len(self._pending) if end < 0 else end + len(expected)
+        return self.read(end)
+
+    def read(self, size=1):
+        """
+        Return up to size pending bytes.
+        """
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+
+class StubMqttClient:
+    """
+    In-process MQTT client that accepts every publish without a broker.
+    """
+
+    def __init__(self):
+        self.connected_flag = True
+        self.messages = 0
+        self.payload_bytes = 0
+        self._mid = 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        """
+        Count the publish and report success.
+        """
+        del topic, qos, retain
+        self._mid += 1
+        self.messages += 1
+        if payload is not None:
+            self.payload_bytes += len(payload)
+        message_info = mqtt.MQTTMessageInfo(self._mid)
+        message_info.rc = mqtt.MQTT_ERR_SUCCESS
+        return message_info
+
+    def loop_stop(self):
+        """
+        Nothing runs in the background.
+        """
+
+    def disconnect(self):
+        """
+        Mark the client disconnected.
+        """
+        self.connected_flag = False
+
+
+def log_finished(finished, mqtt_client=None):
+    """
+    Log replay throughput once every recorded frame was replayed.
+    """
+    LOGGER.info(
+        "Replay finished: %s frames in %.3f s, %.1f frames/s",
+        finished.frames,
+        finished.seconds,
+        finished.frames_per_second,
+        extra={
+            "event": "replay_finished",
+            "frames": finished.frames,
+            "seconds": round(finished.seconds, 3),
+            "frames_per_second": round(finished.frames_per_second, 1),
+            "mqtt_messages": getattr(mqtt_client, "messages", None),
+        },
+    )
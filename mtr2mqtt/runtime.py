@@ -4,65 +4,54 @@ Runtime helpers for the long-lived MTR to MQTT bridge process.
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
-import json
 import logging
 import sys
+import threading
 import time
 
 import paho.mqtt.client as mqtt
 import serial
-from serial.tools import list_ports
 
+from mtr2mqtt import capture
+from mtr2mqtt import diagnostics
 from mtr2mqtt import homeassistant
 from mtr2mqtt import metadata
+from mtr2mqtt import metadata_watcher
+from mtr2mqtt import metrics
 from mtr2mqtt import mtr
+from mtr2mqtt import pipeline
+from mtr2mqtt import replay
+from mtr2mqtt import scheduler
 from mtr2mqtt import scl
+from mtr2mqtt import snapshot
 from mtr2mqtt import status
 from mtr2mqtt import summary
+from mtr2mqtt.errors import BridgeError
+from mtr2mqtt.errors import OutputModeError
+from mtr2mqtt.errors import ReceiverConnectionError
+from mtr2mqtt.publishing import PUBLISH_SPOOLED
+from mtr2mqtt.publishing import as_measurement
+from mtr2mqtt.publishing import open_mqtt_connection
+from mtr2mqtt.publishing import open_spooling_publisher
+from mtr2mqtt.publishing import publish_due_summaries
+from mtr2mqtt.publishing import publish_measurement
+from mtr2mqtt.publishing import publish_status_changes
+from mtr2mqtt.receivers import ReceiverConnection
+from mtr2mqtt.receivers import open_receiver_connections
+from mtr2mqtt.receivers import recover_receiver_connection
+from mtr2mqtt.table_view import DEFAULT_MAX_FPS
 from mtr2mqtt.table_view import MeasurementTableView
 
 
-SERIAL_PORT_GREP = "RTR|FTR|DCS|DPR"
 LOGGER = logging.getLogger(__name__)
-STATUS_SWEEP_INTERVAL = 60
-
-
-class BridgeError(Exception):
-    """
-    Base exception for runtime-level startup and transport failures.
-    """
-
-
-class ReceiverConnectionError(BridgeError):
-    """
-    Raised when the runtime cannot open or validate the receiver connection.
-    """
-
-
-class MqttConnectionError(BridgeError):
-    """
-    Raised when the runtime cannot connect to the MQTT broker.
-    """
-
-
-class OutputModeError(BridgeError):
-    """
-    Raised when the selected output mode cannot run in the current terminal.
-    """
-
-
-@dataclass
-class ReceiverConnection:
-    """
-    Validated receiver connection state used by the runtime loop.
-    """
-
-    serial_handle: serial.Serial
-    device_type: str
-    receiver_serial_number: str
-    serial_config: dict
+STATUS_DEADLINE_SLACK = 0.001
+DEFAULT_DRAIN_MAX_PACKETS = 100
+RECEIVER_RETRY_INTERVAL = 1
+RECEIVER_REDISCOVERY_INTERVAL = 30
+PIPELINE_GET_TIMEOUT = 1
 
 
 class BridgeState(Enum):
@@ -85,263 +74,35 @@ class PollResult:
     """
 
     state: BridgeState
-    measurement_json: str | None = None
-
-
-def on_connect(client, userdata, flags, reason_code, properties):
-    """
-    Handle MQTT connection state changes.
-    """
-    logging.debug(
-        "userdata: %s, flags: %s, properties: %s",
-        userdata,
-        flags,
-        properties,
-    )
-    if reason_code == 0:
-        client.connected_flag = True
-        client.connect_error = None
-        LOGGER.info(
-            "MQTT broker connected",
-            extra={
-                "event": "mqtt_connected",
-                "mqtt_reason_code": str(reason_code),
-            },
-        )
-    else:
-        client.connected_flag = False
-        client.connect_error = reason_code
-        logging.warning("Bad connection Returned code=%s", str(reason_code))
-
-
-def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
-    """
-    Handle MQTT disconnect events.
-    """
-    logging.warning(
-        "MQTT server disconnected with reason: %s, userdata: %s, flags: %s, properties: %s",
-        str(reason_code),
-        userdata,
-        disconnect_flags,
-        properties,
-    )
-    client.connected_flag = False
-    client.disconnect_flag = True
-
-
-def _create_serial_handle(args, port):
-    return serial.Serial(
-        port=port,
-        baudrate=args.baudrate,
-        bytesize=args.bytesize,
-        parity=args.parity,
-        stopbits=args.stopbits,
-        timeout=args.serial_timeout,
-    )
-
-
-def _read_receiver_serial_number(ser, scl_address):
-    """
-    Query the receiver serial number from an open and validated port.
-    """
-    try:
-        scl_sn_command = scl.create_command("SN ?", scl_address)
-        ser.write(scl_sn_command)
-        logging.debug("Wrote message: %s to: %s", scl_sn_command, ser.name)
-        response = ser.read_until(scl.END_CHAR)
-        response_checksum = bytes(ser.read(1))
-        receiver_serial_number = scl.parse_response(response, response_checksum)
-        if receiver_serial_number:
-            return receiver_serial_number
-
-        logging.warning("Unable to read receiver serial number from port %s", ser.name)
-        return None
-    except (OSError, serial.serialutil.SerialException):
-        logging.exception("Reading receiver serial number failed on port %s", ser.name)
-        return None
-
-
-def _build_receiver_connection(ser, args, device_type):
-    receiver_serial_number = _read_receiver_serial_number(ser, args.scl_address)
-    if not receiver_serial_number:
-        ser.close()
-        return None
+    measurement: mtr.Measurement | None = None
+    receiver: ReceiverConnection | None = None
 
-    LOGGER.info(
-        "Receiver connected",
-        extra={
-            "event": "receiver_connected",
-            "device_type": device_type,
-            "receiver_serial_number": receiver_serial_number,
-            "serial_port": ser.name,
-        },
-    )
-    return ReceiverConnection(
-        serial_handle=ser,
-        device_type=device_type,
-        receiver_serial_number=receiver_serial_number,
-        serial_config=ser.get_settings(),
-    )
 
-
-def open_receiver_connection(args):
-    """
-    Open and validate a receiver connection.
-    """
-    if args.serial_port:
-        try:
-            ser = _create_serial_handle(args, args.serial_port)
-            device_type = scl.get_receiver_type(ser, args.scl_address)
-            if not device_type:
-                logging.error(
-                    "Configured serial port %s is not a compatible MTR receiver",
-                    args.serial_port,
-                )
-                ser.close()
-                return None
-            return _build_receiver_connection(ser, args, device_type)
-        except (OSError, serial.serialutil.SerialException, ValueError):
-            logging.exception("Unable to open serial port")
-            raise ReceiverConnectionError(
-                f"Unable to open serial port {args.serial_port}"
-            ) from None
-
-    for port in list(list_ports.grep(SERIAL_PORT_GREP)):
-        try:
-            ser = _create_serial_handle(args, port.device)
-            device_type = scl.get_receiver_type(ser, args.scl_address)
-            if device_type:
-                return _build_receiver_connection(ser, args, device_type)
-            ser.close()
-        except (OSError, serial.serialutil.SerialException):
-            continue
-
-    return None
-
-
-def recover_receiver_connection(receiver, args):
+@dataclass
+class DrainResult:
     """
-    Try to restore serial connectivity and refresh receiver identity.
+    Result of reading the receiver ring buffer back-to-back.
     """
-    current_port = receiver.serial_handle.port
-
-    try:
-        receiver.serial_handle.close()
-    except (OSError, serial.serialutil.SerialException):
-        logging.debug("Closing failed serial port %s raised an exception", current_port)
 
-    if current_port:
-        try:
-            logging.warning("Trying to reopen serial port: %s", current_port)
-            reopened_ser = serial.Serial()
-            reopened_ser.port = current_port
-            reopened_ser.apply_settings(receiver.serial_config)
-            reopened_ser.open()
-            device_type = scl.get_receiver_type(reopened_ser, args.scl_address)
-            if device_type:
-                recovered_receiver = _build_receiver_connection(
-                    reopened_ser,
-                    args,
-                    device_type,
-                )
-                if recovered_receiver:
-                    logging.info("Recovered serial connection on %s", current_port)
-                    return recovered_receiver
-            logging.warning(
-                "Reopened serial port %s but did not detect a compatible receiver",
-                current_port,
-            )
-            reopened_ser.close()
-        except serial.serialutil.SerialException:
-            logging.exception("Serial exception: opening serial port failed")
-        except FileNotFoundError:
-            logging.exception("File not found: opening serial port failed")
-        except OSError:
-            logging.exception("OS Error: opening serial port failed")
-
-    if not args.serial_port:
-        logging.warning("Trying to rediscover receiver port")
-        recovered_receiver = open_receiver_connection(args)
-        if recovered_receiver:
-            logging.info(
-                "Recovered serial connection on rediscovered port %s",
-                recovered_receiver.serial_handle.port,
-            )
-            return recovered_receiver
-
-    return None
-
-
-def open_mqtt_connection(args):
-    """
-    Create and connect the MQTT client.
-    """
-    mqtt.Client.connected_flag = False
-    client = mqtt.Client(
-        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
-        client_id="mtr2mqtt",
-        userdata=None,
-        protocol=mqtt.MQTTv311,
-        transport="tcp",
-    )
-    client.enable_logger()
-    client.reconnect_delay_set(min_delay=1, max_delay=30)
-    client.on_connect = on_connect
-    client.on_disconnect = on_disconnect
-    client.connected_flag = False
-    client.connect_error = None
+    state: BridgeState
+    measurements: list
+    packets: int
+    drain_seconds: float
+    receiver: ReceiverConnection | None = None
 
-    mqtt_host = args.mqtt_host or "localhost"
-    mqtt_port = int(args.mqtt_port or 1883)
 
-    client.loop_start()
-    LOGGER.info(
-        "Connecting to MQTT broker",
-        extra={
-            "event": "mqtt_connecting",
-            "mqtt_host": mqtt_host,
-            "mqtt_port": mqtt_port,
-        },
-    )
-    try:
-        client.connect(mqtt_host, mqtt_port)
-        deadline = time.monotonic() + 30
-        while not client.connected_flag and client.connect_error is None:
-            logging.debug("Waiting for MQTT connection")
-            if time.monotonic() >= deadline:
-                raise MqttConnectionError(
-                    f"Timed out waiting for MQTT host {mqtt_host}:{mqtt_port}"
-                )
-            time.sleep(1)
-        if client.connect_error is not None:
-            raise MqttConnectionError(
-                "MQTT broker rejected connection to "
-                f"{mqtt_host}:{mqtt_port} with reason code {client.connect_error}"
-            )
-    except (mqtt.socket.timeout, mqtt.socket.error, OSError) as error:
-        client.loop_stop()
-        logging.exception("Unable to connect to MQTT host: %s", error)
-        raise MqttConnectionError(
-            f"Unable to connect to MQTT host {mqtt_host}:{mqtt_port}"
-        ) from error
-    except MqttConnectionError:
-        client.loop_stop()
-        raise
-    return client
-
-
-def log_measurement(measurement_json):
+def log_measurement(measurement):
     """
     Log a measurement payload as a structured JSON record.
     """
     try:
-        measurement = json.loads(measurement_json)
-    except (TypeError, json.JSONDecodeError):
+        measurement = as_measurement(measurement)
+    except (TypeError, ValueError, KeyError):
         LOGGER.info(
             "Measurement received",
             extra={
                 "event": "measurement_received",
-                "measurement_raw": measurement_json,
+                "measurement_raw": measurement,
             },
         )
         return
@@ -350,128 +111,40 @@ def log_measurement(measurement_json):
         "Measurement received",
         extra={
             "event": "measurement_received",
-            "measurement": measurement,
+            "measurement": measurement.data,
         },
     )
 
 
-def publish_measurement(
-    mqtt_client,
-    receiver_serial_number,
-    measurement_json,
-    ha_discovery_publisher=None,
-):
-    """
-    Publish discovery first when enabled, then publish the measurement.
-    """
-    try:
-        measurement = json.loads(measurement_json)
-        sensor_id = measurement["id"]
-    except (TypeError, json.JSONDecodeError, KeyError):
-        logging.exception(
-            "Invalid measurement payload, skipping publish: %s",
-            measurement_json,
-        )
-        return mqtt.MQTT_ERR_INVAL, None
-
-    if not getattr(mqtt_client, "connected_flag", True):
-        logging.warning(
-            "Skipping publish for receiver %s sensor %s because MQTT is disconnected",
-            receiver_serial_number,
-            sensor_id,
-        )
-        return mqtt.MQTT_ERR_NO_CONN, None
-
-    if ha_discovery_publisher:
-        ha_discovery_publisher.publish_if_needed(
-            mqtt_client,
-            receiver_serial_number,
-            measurement,
-        )
-
-    try:
-        result, mid = mqtt_client.publish(
-            homeassistant.state_topic(receiver_serial_number, sensor_id),
-            payload=measurement_json,
-            qos=1,
-            retain=False,
-        )
-    except (OSError, RuntimeError, TypeError, ValueError):
-        logging.exception(
-            "Publishing measurement failed for receiver %s sensor %s",
-            receiver_serial_number,
-            sensor_id,
-        )
-        return mqtt.MQTT_ERR_NO_CONN, None
-    logging.debug("publish result: %s, mid: %s", result, mid)
-    if result != 0:
-        logging.warning(
-            "Sending message: %s failed with result code: %s",
-            measurement_json,
-            result,
-        )
-    return result, mid
-
-
-def publish_status(mqtt_client, topic, payload):
-    """
-    Publish a retained status payload.
-    """
-    if not getattr(mqtt_client, "connected_flag", True):
-        logging.warning("Skipping status publish for %s because MQTT is disconnected", topic)
-        return mqtt.MQTT_ERR_NO_CONN, None
-
-    try:
-        result, mid = mqtt_client.publish(
-            topic,
-            payload=json.dumps(payload, sort_keys=True),
-            qos=1,
-            retain=True,
-        )
-    except (OSError, RuntimeError, TypeError, ValueError):
-        logging.exception("Publishing status failed for topic %s", topic)
-        return mqtt.MQTT_ERR_NO_CONN, None
-    logging.debug("status publish result: %s, mid: %s", result, mid)
-    return result, mid
-
-
-def publish_summary(mqtt_client, receiver, payload):
-    """
-    Publish a retained receiver summary payload.
-    """
-    topic = summary.summary_topic(receiver)
-    if not getattr(mqtt_client, "connected_flag", True):
-        logging.warning(
-            "Skipping summary publish for %s because MQTT is disconnected",
-            topic,
-        )
-        return mqtt.MQTT_ERR_NO_CONN, None
-
-    try:
-        result, mid = mqtt_client.publish(
-            topic,
-            payload=json.dumps(payload, sort_keys=True),
-            qos=1,
-            retain=True,
-        )
-    except (OSError, RuntimeError, TypeError, ValueError):
-        logging.exception("Publishing summary failed for topic %s", topic)
-        return mqtt.MQTT_ERR_NO_CONN, None
-    logging.debug("summary publish result: %s, mid: %s", result, mid)
-    return result, mid
-
-
 class MtrBridge:  # pylint: disable=too-many-instance-attributes
     """
-    Long-running runtime for polling an MTR receiver and publishing to MQTT.
+    Long-running runtime for polling MTR receivers and publishing to MQTT.
+
+    Every receiver shares the same MQTT client and the same status and
+    summary trackers, which are keyed by receiver serial number. Receivers
+    are polled concurrently, while measurements are tracked and published
+    from the calling thread only.
     """
 
     def __init__(self, args, transmitters_metadata=None, discovery_publisher=None):
         self.args = args
-        self.transmitters_metadata = transmitters_metadata
+        self.transmitters_metadata = metadata.as_index(transmitters_metadata)
         self.discovery_publisher = discovery_publisher
-        self.receiver = None
+        self.receivers = []
+        self._receivers_lock = threading.Lock()
+        self._receiver_capacity = 0
+        self._receiver_rediscovery_at = 0
+        self._poll_executor = None
         self.mqtt_client = None
+        self.bridge_status = diagnostics.BridgeStatusPublisher(
+            interval=getattr(
+                self.args,
+                "bridge_status_interval",
+                diagnostics.DEFAULT_INTERVAL_SECONDS,
+            ),
+            topic_template=getattr(self.args, "bridge_status_topic", None),
+        )
+        self._state_lock = threading.Lock()
         self.state = BridgeState.STARTING
         self.output_view = self._create_output_view()
         self.status_tracker = status.StatusTracker(
@@ -483,8 +156,85 @@ class MtrBridge:  # pylint: disable=too-many-instance-attributes
                 "summary_debounce_seconds",
                 summary.DEFAULT_DEBOUNCE_SECONDS,
             ),
+            delta=getattr(self.args, "summary_delta", False),
+            full_interval=getattr(
+                self.args,
+                "summary_full_interval",
+                summary.DEFAULT_FULL_INTERVAL_SECONDS,
+            ),
+        )
+        self.poll_scheduler = self._create_poll_scheduler()
+        self.last_drain = None
+        self.measurement_queue = None
+        self.spooler = None
+        self.metadata_watcher = None
+        self.metadata_changes = metadata_watcher.PendingChanges()
+        self.discovery_warm_up = None
+        self.state_saver = None
+        self._capture_flushed_at = time.monotonic()
+        self.metrics_server = None
+
+    @property
+    def receiver(self):
+        """
+        Return the first connected receiver, or None.
+        """
+        return self.receivers[0] if self.receivers else None
+
+    @receiver.setter
+    def receiver(self, receiver):
+        self.receivers = [] if receiver is None else [receiver]
+
+    def _create_poll_scheduler(self):
+        return scheduler.PollScheduler(
+            min_interval=getattr(
+                self.args,
+                "poll_interval_min",
+                scheduler.DEFAULT_MIN_INTERVAL,
+            ),
+            max_interval=getattr(
+                self.args,
+                "poll_interval_max",
+                scheduler.DEFAULT_MAX_INTERVAL,
+            ),
         )
-        self._last_status_sweep = 0
+
+    @property
+    def state(self):
+        """
+        Return the current bridge state.
+        """
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        with self._state_lock:
+            self._state = state
+
+    @staticmethod
+    def _aggregate_state(states):
+        """
+        Return the most active of the per-receiver poll states.
+        """
+        for state in (
+            BridgeState.READY,
+            BridgeState.IDLE,
+            BridgeState.RECOVERING,
+        ):
+            if state in states:
+                return state
+        return BridgeState.WAITING_FOR_RECEIVER
+
+    def _settle_state(self, state):
+        """
+        Set the bridge state once from the aggregate state of a poll cycle.
+
+        Receivers are polled from worker threads, which only report their
+        state, so the shared bridge state is written by one thread per cycle.
+        """
+        if state is BridgeState.RECOVERING and self.receivers:
+            state = BridgeState.READY
+        self.state = state
 
     def _create_output_view(self):
         if getattr(self.args, "output", "json") != "table":
@@ -493,7 +243,9 @@ class MtrBridge:  # pylint: disable=too-many-instance-attributes
             raise OutputModeError(
                 "Table output requires an interactive terminal"
             )
-        return MeasurementTableView()
+        return MeasurementTableView(
+            max_fps=getattr(self.args, "table_max_fps", DEFAULT_MAX_FPS),
+        )
 
     def _poll_command(self):
         return scl.create_command("DBG 1 ?", self.args.scl_address)
@@ -502,128 +254,363 @@ class MtrBridge:  # pylint: disable=too-many-instance-attributes
         """
         Initialize the receiver connection and MQTT client.
         """
-        self.receiver = open_receiver_connection(self.args)
-        if not self.receiver:
+        if getattr(self.args, "capture", None):
+            capture.start(
+                self.args.capture,
+                max_bytes=getattr(
+                    self.args,
+                    "capture_max_bytes",
+                    capture.DEFAULT_MAX_BYTES,
+                ),
+            )
+        self.receivers = open_receiver_connections(self.args)
+        if not self.receivers:
             raise ReceiverConnectionError("Unable to find MTR receivers")
+        self._receiver_capacity = len(self.receivers)
         self.mqtt_client = open_mqtt_connection(self.args)
         self.state = BridgeState.READY
+        self.spooler = open_spooling_publisher(self.args)
+        self._restore_state()
+        self._start_metrics_server()
+        self._start_metadata_watcher()
+        self._start_discovery_warm_up()
+
+    def _start_metrics_server(self):
+        """
+        Serve Prometheus metrics over HTTP when a metrics port is configured.
+        """
+        metrics.TRACKED_SENSORS.set_function(lambda: len(self.status_tracker.sensors))
+        metrics.QUEUE_DEPTH.set_function(
+            lambda: 0 if self.measurement_queue is None else self.measurement_queue.depth
+        )
+        metrics_port = getattr(self.args, "metrics_port", None)
+        if metrics_port is None:
+            return
+        try:
+            self.metrics_server = metrics.start_server(
+                metrics_port,
+                host=getattr(self.args, "metrics_host", ""),
+            )
+        except OSError as error:
+            raise BridgeError(
+                f"Unable to serve metrics on port {metrics_port}: {error}"
+            ) from error
+
+    def _restore_state(self):
+        """
+        Seed the discovery, status and summary caches from the state snapshot.
+        """
+        state_file = getattr(self.args, "state_file", None)
+        if not state_file:
+            return
+        caches = {"status": self.status_tracker, "summary": self.summary_tracker}
+        if self.discovery_publisher is not None:
+            caches["discovery"] = self.discovery_publisher
+        self.state_saver = snapshot.SnapshotSaver(
+            state_file,
+            caches,
+            interval=getattr(
+                self.args,
+                "state_save_interval",
+                snapshot.DEFAULT_SAVE_INTERVAL,
+            ),
+        )
+        self.state_saver.restore()
+
+    def _flush_capture(self):
+        """
+        Flush and, at the size limit, rotate the serial capture once per interval.
+        """
+        now = time.monotonic()
+        if now - self._capture_flushed_at < capture.FLUSH_INTERVAL_SECONDS:
+            return
+        self._capture_flushed_at = now
+        capture.flush()
+
+    def _save_state(self, force=False):
+        if self.state_saver is not None:
+            self.state_saver.save(force=force)
+
+    def _start_discovery_warm_up(self):
+        """
+        Pre-publish discovery for the metadata transmitters in the background.
+
+        Warm-up needs the receiver serial number for the state topics, so it
+        only runs when exactly one receiver is connected.
+        """
+        if not getattr(self.args, "ha_discovery_warm_up", False):
+            return
+        if self.discovery_publisher is None or not self.transmitters_metadata:
+            return
+        if len(self.receivers) != 1:
+            LOGGER.info(
+                "Skipping discovery warm-up with more than one receiver",
+                extra={
+                    "event": "discovery_warm_up_skipped",
+                    "receivers": len(self.receivers),
+                },
+            )
+            return
+        self.discovery_warm_up = homeassistant.DiscoveryWarmUp(self.discovery_publisher)
+        self.discovery_warm_up.start(
+            self.mqtt_client,
+            self.receiver.receiver_serial_number,
+            self.transmitters_metadata,
+        )
+
+    def _start_metadata_watcher(self):
+        metadata_file = getattr(self.args, "metadata_file", None)
+        if not metadata_file or not getattr(self.args, "metadata_watch", False):
+            return
+        self.metadata_watcher = metadata_watcher.MetadataWatcher(
+            metadata_file,
+            self.reload_metadata,
+            poll_interval=getattr(
+                self.args,
+                "metadata_watch_interval",
+                metadata_watcher.DEFAULT_POLL_INTERVAL,
+            ),
+        )
+        self.metadata_watcher.start()
+
+    def reload_metadata(self, transmitters_metadata):
+        """
+        Swap in a rebuilt metadata index and queue discovery refreshes.
+
+        Called from the watcher thread; discovery is re-published later from
+        the polling loop by apply_metadata_changes.
+        """
+        changed_ids = transmitters_metadata.changed_ids(self.transmitters_metadata)
+        self.transmitters_metadata = transmitters_metadata
+        self.metadata_changes.add(changed_ids)
+        LOGGER.info(
+            "Metadata reloaded",
+            extra={
+                "event": "metadata_reloaded",
+                "metadata_transmitters": len(transmitters_metadata),
+                "metadata_changed_transmitters": sorted(changed_ids),
+            },
+        )
+
+    def apply_metadata_changes(self):
+        """
+        Re-publish Home Assistant discovery for transmitters whose metadata changed.
+        """
+        if self.discovery_publisher is None or self.mqtt_client is None:
+            return []
+        if not getattr(self.mqtt_client, "connected_flag", True):
+            return []
+        changed_ids = self.metadata_changes.take()
+        if not changed_ids:
+            return []
+        return self.discovery_publisher.republish_changed(
+            self.mqtt_client,
+            changed_ids,
+            self.transmitters_metadata,
+        )
 
     def close(self):
         """
         Stop MQTT and close the current serial handle if present.
         """
+        self.flush_output(force=True)
+        if self.discovery_warm_up is not None:
+            self.discovery_warm_up.stop()
+        self._save_state(force=True)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.metadata_watcher is not None:
+            self.metadata_watcher.stop()
+            self.metadata_watcher = None
         if self.mqtt_client is not None:
             try:
                 self.mqtt_client.loop_stop()
                 self.mqtt_client.disconnect()
             except (OSError, RuntimeError, TypeError, ValueError):
                 logging.debug("MQTT client shutdown raised an exception")
-        if self.receiver is not None:
+        if self._poll_executor is not None:
+            self._poll_executor.shutdown(wait=True)
+            self._poll_executor = None
+        if self.spooler is not None:
+            self.spooler.close()
+            self.spooler = None
+        for receiver in self.receivers:
             try:
-                self.receiver.serial_handle.close()
+                receiver.serial_handle.close()
             except (OSError, serial.serialutil.SerialException):
                 logging.debug("Closing serial handle failed during shutdown")
+        capture.stop()
         self.state = BridgeState.STOPPED
 
-    def _ensure_receiver(self):
-        if self.receiver is None:
-            self.state = BridgeState.WAITING_FOR_RECEIVER
-            self.receiver = open_receiver_connection(self.args)
-            if self.receiver is not None:
-                self.state = BridgeState.READY
-        return self.receiver
+    def _ensure_receivers(self):
+        """
+        Reopen receivers, immediately when none is left and periodically
+        when only some of them were lost.
+        """
+        with self._receivers_lock:
+            if not self.receivers:
+                self.state = BridgeState.WAITING_FOR_RECEIVER
+                self.receivers = open_receiver_connections(self.args, retry_later=True)
+                if self.receivers:
+                    self.state = BridgeState.READY
+            elif (
+                len(self.receivers) < self._receiver_capacity
+                and time.monotonic() >= self._receiver_rediscovery_at
+            ):
+                self._receiver_rediscovery_at = (
+                    time.monotonic() + RECEIVER_REDISCOVERY_INTERVAL
+                )
+                self.receivers = self.receivers + open_receiver_connections(
+                    self.args,
+                    exclude_ports=self._receiver_ports(),
+                    retry_later=True,
+                )
+            self._receiver_capacity = max(
+                self._receiver_capacity,
+                len(self.receivers),
+            )
+            return self.receivers
+
+    def _receiver_ports(self, exclude=None):
+        return {
+            receiver.serial_handle.port
+            for receiver in self.receivers
+            if receiver is not exclude
+        }
 
-    def poll_once(self):
+    def _recover_receiver(self, receiver):
+        """
+        Recover one receiver in place, or drop it when recovery fails.
         """
-        Poll the receiver once and return an explicit result for the cycle.
+        with self._receivers_lock:
+            recovered = recover_receiver_connection(
+                receiver,
+                self.args,
+                exclude_ports=self._receiver_ports(exclude=receiver),
+            )
+            receivers = list(self.receivers)
+            if receiver in receivers:
+                position = receivers.index(receiver)
+                if recovered is None:
+                    del receivers[position]
+                else:
+                    receivers[position] = recovered
+            elif recovered is not None:
+                receivers.append(recovered)
+            self.receivers = receivers
+        if recovered is not None:
+            metrics.SERIAL_RECONNECTS.inc()
+        return recovered
+
+    def poll_once(self, receiver=None):
         """
-        receiver = self._ensure_receiver()
+        Poll a receiver once and return an explicit result for the cycle.
+
+        Without an explicit receiver the first connected receiver is polled
+        and the bridge state is updated from the result. Polls of an explicit
+        receiver leave the bridge state to the coordinating thread.
+        """
+        if receiver is not None:
+            return self._poll(receiver)
+        self._ensure_receivers()
+        receiver = self.receiver
         if receiver is None:
             logging.debug("No receiver connection available")
             return PollResult(BridgeState.WAITING_FOR_RECEIVER)
+        poll_result = self._poll(receiver)
+        self._settle_state(poll_result.state)
+        return poll_result
+
+    def _poll(self, receiver):
+        """
+        Poll one receiver without touching the shared bridge state.
+        """
+        receiver_diagnostics = self.bridge_status.diagnostics_for(
+            receiver.receiver_serial_number
+        )
+        poll_result = self._poll_response(receiver, receiver_diagnostics)
+        receiver_diagnostics.record_state(poll_result.state)
+        return poll_result
 
-        parsed_response = None
+    def _poll_response(self, receiver, receiver_diagnostics):
         try:
-            poll_command = self._poll_command()
-            receiver.serial_handle.write(poll_command)
-            logging.debug(
-                "Wrote message: %s to: to %s",
-                poll_command,
-                receiver.serial_handle.name,
-            )
-            response = receiver.serial_handle.read_until(scl.END_CHAR)
-            response_checksum = bytes(receiver.serial_handle.read(1))
-            parsed_response = scl.parse_response(response, response_checksum)
-            logging.debug(
-                "response: %s, response checksum: %s",
-                response,
-                response_checksum,
-            )
-            logging.debug("parsed SCL response: %s", parsed_response)
+            parsed_response = receiver.poll(self._poll_command(), receiver_diagnostics)
         except (OSError, serial.serialutil.SerialException):
             logging.exception("Reading from serial port failed")
-            self.state = BridgeState.RECOVERING
-            self.receiver = recover_receiver_connection(receiver, self.args)
-            if self.receiver is not None:
-                self.state = BridgeState.READY
-            return PollResult(BridgeState.RECOVERING)
+            self._recover_receiver(receiver)
+            return PollResult(BridgeState.RECOVERING, receiver=receiver)
 
         if parsed_response is None:
             logging.debug("No readable response from receiver")
-            self.state = BridgeState.IDLE
-            return PollResult(BridgeState.IDLE)
+            return PollResult(BridgeState.IDLE, receiver=receiver)
 
         if parsed_response == "#":
             logging.debug("Ring buffer empty")
-            self.state = BridgeState.IDLE
-            return PollResult(BridgeState.IDLE)
+            return PollResult(BridgeState.IDLE, receiver=receiver)
 
-        self.state = BridgeState.READY
-        measurement_json = mtr.mtr_response_to_json(
-            parsed_response,
-            self.transmitters_metadata,
-        )
+        metrics.PACKETS.inc()
+        receiver_diagnostics.record_packet()
+        with metrics.DECODE_TIME.time():
+            measurement = mtr.mtr_response_to_measurement(
+                parsed_response,
+                self.transmitters_metadata,
+            )
         if (
-            measurement_json
+            measurement is not None
             and getattr(self.args, "metadata_transmitters_only", False)
+            and (
+                self.transmitters_metadata is None
+                or measurement.sensor_id not in self.transmitters_metadata
+            )
         ):
-            measurement = json.loads(measurement_json)
-            if not metadata.has_transmitter_id(
-                measurement["id"],
-                self.transmitters_metadata,
-            ):
-                LOGGER.debug(
-                    "Skipping transmitter not configured in metadata",
-                    extra={
-                        "event": "measurement_skipped_unconfigured",
-                        "measurement": measurement,
-                    },
-                )
-                measurement_json = None
+            LOGGER.debug(
+                "Skipping transmitter not configured in metadata",
+                extra={
+                    "event": "measurement_skipped_unconfigured",
+                    "measurement": measurement.data,
+                },
+            )
+            measurement = None
 
         return PollResult(
             BridgeState.READY,
-            measurement_json=measurement_json,
+            measurement=measurement,
+            receiver=receiver,
         )
 
-    def publish_measurement(self, measurement_json):
+    def publish_measurement(self, measurement, receiver=None):
         """
-        Publish a parsed measurement using the current receiver identity.
+        Publish a parsed measurement using the receiver identity it came from.
         """
-        if not measurement_json or self.receiver is None:
+        receiver = receiver or self.receiver
+        if not measurement or receiver is None:
             return mqtt.MQTT_ERR_NO_CONN, None
 
+        if self.spooler is not None and self.spooler.should_spool(self.mqtt_client):
+            return self.spooler.append(receiver.receiver_serial_number, measurement)
+
         return publish_measurement(
             self.mqtt_client,
-            self.receiver.receiver_serial_number,
-            measurement_json,
+            receiver.receiver_serial_number,
+            measurement,
             ha_discovery_publisher=self.discovery_publisher,
         )
 
-    def _status_topic(self, payload):
-        if payload["entity_type"] == "receiver":
-            return status.receiver_status_topic(payload["receiver"])
-        return status.sensor_status_topic(payload["receiver"], payload["sensor"])
+    def replay_spool(self):
+        """
+        Publish spooled measurements in order, at most spool_replay_rate per second.
+        """
+        if self.spooler is None:
+            return 0
+        replayed = self.spooler.replay(self.mqtt_client, self.discovery_publisher)
+        for receiver_serial_number, sensor_id in replayed:
+            self.status_tracker.record_publish_success(
+                receiver_serial_number,
+                sensor_id,
+                published_at=status.utc_now(),
+            )
+        return len(replayed)
 
     def publish_status_changes(self, now=None):
         """
@@ -631,116 +618,381 @@ class MtrBridge:  # pylint: disable=too-many-instance-attributes
         """
         if self.mqtt_client is None:
             return []
+        return publish_status_changes(
+            self.mqtt_client,
+            self.status_tracker,
+            self.summary_tracker,
+            now,
+        )
 
-        published = []
-        for key, payload, rendered in self.status_tracker.changed_payloads(now):
-            self.summary_tracker.record_status(payload)
-            result, mid = publish_status(
-                self.mqtt_client,
-                self._status_topic(payload),
-                payload,
-            )
-            if result == mqtt.MQTT_ERR_SUCCESS:
-                self.status_tracker.mark_status_published(key, rendered)
-                published.append((payload, mid))
-        return published
-
-    def publish_due_summaries(self, now=None):
+    def publish_due_summaries(self, now=None, force=False):
         """
-        Publish retained receiver summaries whose debounce interval has elapsed.
+        Publish due receiver summary deltas and retained full summaries.
+
+        With force, pending summaries are published without waiting for the
+        debounce or full summary interval.
         """
         if self.mqtt_client is None:
             return []
+        return publish_due_summaries(
+            self.mqtt_client,
+            self.summary_tracker,
+            now=now,
+            force=force,
+        )
 
-        published = []
-        for receiver, payload, rendered in self.summary_tracker.due_payloads(
-            updated_at=now,
-        ):
-            result, mid = publish_summary(self.mqtt_client, receiver, payload)
-            if result == mqtt.MQTT_ERR_SUCCESS:
-                self.summary_tracker.mark_published(receiver, rendered)
-                published.append((payload, mid))
-        return published
+    def publish_bridge_status(self, now=None, force=False):
+        """
+        Publish retained bridge diagnostics for every receiver once per interval.
+        """
+        if not getattr(self.args, "bridge_status", False) or self.mqtt_client is None:
+            return []
+        if not self.bridge_status.due(force=force):
+            return []
+        return self.bridge_status.publish(
+            self.mqtt_client,
+            [receiver.receiver_serial_number for receiver in list(self.receivers)],
+            status.format_timestamp(now or status.utc_now()),
+            discovery_publisher=self.discovery_publisher,
+        )
+
+    def _status_delay(self, now=None):
+        """
+        Return seconds until the next sensor or receiver crosses offline_timeout.
+        """
+        deadline = self.status_tracker.next_deadline()
+        if deadline is None:
+            return None
+        now = now or status.utc_now()
+        return max(0.0, (deadline - now).total_seconds() + STATUS_DEADLINE_SLACK)
+
+    def _summary_delay(self):
+        """
+        Return seconds until the next debounced receiver summary is due.
+        """
+        due_at = self.summary_tracker.next_due_at()
+        if due_at is None:
+            return None
+        return max(0.0, due_at - time.monotonic())
+
+    def _seconds_until_next_timer(self, now=None):
+        """
+        Return seconds until the next status, summary or table frame timer
+        fires, or None.
+
+        Status and summary timers are left out while MQTT is disconnected, as
+        an overdue summary would otherwise turn every pause into a busy loop.
+        """
+        timer_delays = [self._output_frame_delay()]
+        if self._mqtt_connected():
+            timer_delays += [self._status_delay(now), self._summary_delay()]
+        delays = [delay for delay in timer_delays if delay is not None]
+        return min(delays) if delays else None
+
+    def _mqtt_connected(self):
+        return getattr(self.mqtt_client, "connected_flag", self.mqtt_client is not None)
+
+    def _output_frame_delay(self):
+        """
+        Return seconds until a coalesced table frame may be drawn, or None.
+        """
+        if self.output_view is None:
+            return None
+        return self.output_view.next_frame_delay()
+
+    def flush_output(self, force=False):
+        """
+        Draw a coalesced table frame once its frame interval has elapsed.
+        """
+        if self.output_view is not None:
+            self.output_view.flush(force=force)
 
     def sweep_status(self, force=False, now=None):
         """
-        Detect timeout-driven status changes and update MQTT/table output.
+        Publish offline transitions once a status deadline has passed.
         """
-        monotonic_now = time.monotonic()
-        if not force and monotonic_now - self._last_status_sweep < STATUS_SWEEP_INTERVAL:
+        now = now or status.utc_now()
+        deadline = self.status_tracker.next_deadline()
+        if not force and (deadline is None or now <= deadline):
             return []
 
-        self._last_status_sweep = monotonic_now
-        now = now or status.utc_now()
+        if self.measurement_queue is not None:
+            LOGGER.debug(
+                "Pipeline queue statistics",
+                extra={
+                    "event": "pipeline_queue_stats",
+                    **self.measurement_queue.stats(),
+                },
+            )
         published = self.publish_status_changes(now)
         if self.output_view is not None:
             self.output_view.update_statuses(self.status_tracker.sensor_payloads(now))
         self.publish_due_summaries(now)
         return published
 
-    def run_forever(self):
+    def housekeeping(self):
         """
-        Start the runtime and keep polling until interrupted.
+        Apply metadata changes, replay the spool, save the state snapshot,
+        flush the serial capture and publish bridge diagnostics.
         """
-        self.start()
+        self.apply_metadata_changes()
+        self.replay_spool()
+        self._save_state()
+        self._flush_capture()
+        self.publish_bridge_status()
+
+    def drain(self, max_packets=None, receiver=None):
+        """
+        Read packets back-to-back until the receiver ring buffer is empty.
+        """
+        max_packets = max_packets or getattr(
+            self.args,
+            "drain_max_packets",
+            DEFAULT_DRAIN_MAX_PACKETS,
+        )
+        started_at = time.monotonic()
+        measurements = []
+        packets = 0
+        state = BridgeState.READY
+        while packets < max_packets:
+            poll_result = self.poll_once(receiver)
+            state = poll_result.state
+            if state is not BridgeState.READY:
+                break
+            packets += 1
+            if poll_result.measurement is not None:
+                measurements.append(poll_result.measurement)
+
+        drain_result = DrainResult(
+            state=state,
+            measurements=measurements,
+            packets=packets,
+            drain_seconds=time.monotonic() - started_at,
+            receiver=receiver or self.receiver,
+        )
+        with self._state_lock:
+            self.last_drain = drain_result
+        metrics.DRAIN_PACKETS.observe(packets)
+        if packets:
+            LOGGER.debug(
+                "Ring buffer drained",
+                extra={
+                    "event": "ring_buffer_drained",
+                    "receiver_serial_number": getattr(
+                        drain_result.receiver,
+                        "receiver_serial_number",
+                        None,
+                    ),
+                    "batch_size": packets,
+                    "batch_measurements": len(measurements),
+                    "drain_seconds": round(drain_result.drain_seconds, 6),
+                    "buffer_empty": state is BridgeState.IDLE,
+                },
+            )
+        return drain_result
+
+    def handle_measurement(self, measurement, receiver=None):
+        """
+        Track, display and publish one measurement from a receiver.
+        """
+        receiver = receiver or self.receiver
+        receiver_serial_number = receiver.receiver_serial_number
+        sensor_id = measurement.sensor_id
+        now = status.utc_now()
+        self.status_tracker.record_observation(
+            receiver_serial_number,
+            sensor_id,
+            observed_at=now,
+        )
+        status_payload = self.status_tracker.sensor_payload(
+            receiver_serial_number,
+            sensor_id,
+            now,
+        )
+        if self.output_view is not None:
+            self.output_view.update(
+                receiver_serial_number,
+                measurement,
+                status_payload=status_payload,
+            )
+        else:
+            log_measurement(measurement)
+        self.summary_tracker.record_measurement(
+            receiver_serial_number,
+            measurement.data,
+            status_payload,
+        )
+        result, mid = self.publish_measurement(measurement, receiver)
+        if result == mqtt.MQTT_ERR_SUCCESS:
+            self.status_tracker.record_publish_success(
+                receiver_serial_number,
+                sensor_id,
+                published_at=status.utc_now(),
+            )
+        elif result != PUBLISH_SPOOLED:
+            self.status_tracker.record_error(
+                receiver_serial_number,
+                sensor_id,
+            )
+        return result, mid
+
+    def _poll_receiver(self, receiver):
+        """
+        Poll or drain one receiver and return its (state, receiver, measurements).
+        """
+        if getattr(self.args, "drain_mode", False):
+            drain_result = self.drain(receiver=receiver)
+            return drain_result.state, receiver, drain_result.measurements
+
+        poll_result = self.poll_once(receiver)
+        measurements = []
+        if poll_result.measurement is not None:
+            measurements.append(poll_result.measurement)
+        return poll_result.state, receiver, measurements
+
+    def _poll_receivers(self, receivers):
+        if len(receivers) == 1:
+            return [self._poll_receiver(receivers[0])]
+        if self._poll_executor is None:
+            self._poll_executor = ThreadPoolExecutor(
+                thread_name_prefix="mtr2mqtt-receiver",
+            )
+        return list(self._poll_executor.map(self._poll_receiver, receivers))
+
+    def _read_receivers(self):
+        """
+        Poll every receiver once, or drain their ring buffers in drain mode.
+
+        Returns the most active resulting state and the per-receiver results.
+        """
+        receivers = self._ensure_receivers()
+        if not receivers:
+            logging.debug("No receiver connection available")
+            return BridgeState.WAITING_FOR_RECEIVER, []
+
+        results = self._poll_receivers(list(receivers))
+        state = self._aggregate_state(
+            {state for state, _receiver, _measurements in results}
+        )
+        self._settle_state(state)
+        return state, results
+
+    def _poll_cycle(self):
+        """
+        Read every receiver once, handle the measurements and return the state.
+        """
+        polled_at = time.monotonic()
+        state, results = self._read_receivers()
+        handled = False
+        for _state, receiver, measurements in results:
+            for measurement in measurements:
+                self.handle_measurement(measurement, receiver)
+                handled = True
+        if handled:
+            self.poll_scheduler.record_traffic(polled_at)
+            self.publish_status_changes()
+            self.publish_due_summaries()
+        return state
+
+    def _pause_after(self, state, timers=True):
+        if state is BridgeState.IDLE:
+            self.poll_scheduler.record_idle()
+            delay = self.poll_scheduler.next_delay()
+            timer_delay = self._seconds_until_next_timer() if timers else None
+            if timer_delay is not None:
+                delay = min(delay, timer_delay)
+            time.sleep(delay)
+        elif state in {
+            BridgeState.RECOVERING,
+            BridgeState.WAITING_FOR_RECEIVER,
+        }:
+            time.sleep(RECEIVER_RETRY_INTERVAL)
+
+    def _read_batch(self):
+        """
+        Serial reader stage: poll the receivers once and yield what to queue.
+
+        The pause before the next poll runs after the batch was queued and
+        follows the poll scheduler only: the status and summary trackers are
+        left to the publisher thread, which wakes for their timers itself.
+        """
+        polled_at = time.monotonic()
+        state, results = self._read_receivers()
+        if any(measurements for _state, _receiver, measurements in results):
+            self.poll_scheduler.record_traffic(polled_at)
+        for _state, receiver, measurements in results:
+            for measurement in measurements:
+                yield (
+                    (receiver.receiver_serial_number, measurement.sensor_id),
+                    (receiver, measurement),
+                )
+        self._pause_after(state, timers=False)
+
+    def _run_pipeline(self):
+        """
+        Publisher stage: handle queued measurements while a reader thread polls.
+        """
+        self.measurement_queue = pipeline.MeasurementQueue(
+            maxsize=getattr(self.args, "pipeline_queue_size", pipeline.DEFAULT_QUEUE_SIZE),
+            overflow=getattr(self.args, "pipeline_overflow", pipeline.OVERFLOW_BLOCK),
+        )
+        feeder = pipeline.QueueFeeder(
+            self.measurement_queue,
+            self._read_batch,
+            expected_errors=(BridgeError, replay.ReplayFinished),
+        )
+        feeder.start()
         try:
             while True:
+                self.housekeeping()
                 self.sweep_status()
                 self.publish_due_summaries()
-                poll_result = self.poll_once()
-                if poll_result.measurement_json:
-                    measurement = json.loads(poll_result.measurement_json)
-                    receiver_serial_number = self.receiver.receiver_serial_number
-                    sensor_id = measurement["id"]
-                    now = status.utc_now()
-                    self.status_tracker.record_observation(
-                        receiver_serial_number,
-                        sensor_id,
-                        observed_at=now,
-                    )
-                    if self.output_view is not None:
-                        self.output_view.update(
-                            receiver_serial_number,
-                            poll_result.measurement_json,
-                            status_payload=self.status_tracker.sensor_payload(
-                                receiver_serial_number,
-                                sensor_id,
-                                now,
-                            ),
-                        )
-                    else:
-                        log_measurement(poll_result.measurement_json)
-                    self.summary_tracker.record_measurement(
-                        receiver_serial_number,
-                        measurement,
-                        self.status_tracker.sensor_payload(
-                            receiver_serial_number,
-                            sensor_id,
-                            now,
-                        ),
-                    )
-                    result, _mid = self.publish_measurement(poll_result.measurement_json)
-                    if result == mqtt.MQTT_ERR_SUCCESS:
-                        self.status_tracker.record_publish_success(
-                            receiver_serial_number,
-                            sensor_id,
-                            published_at=status.utc_now(),
-                        )
-                    else:
-                        self.status_tracker.record_error(
-                            receiver_serial_number,
-                            sensor_id,
-                        )
+                self.flush_output()
+                timeout = PIPELINE_GET_TIMEOUT
+                timer_delay = self._seconds_until_next_timer()
+                if timer_delay is not None:
+                    timeout = min(timeout, timer_delay)
+                item = feeder.get(timeout=timeout)
+                if item is None:
+                    continue
+                receiver, measurement = item
+                self.handle_measurement(measurement, receiver)
+                if not self.measurement_queue.depth:
                     self.publish_status_changes()
                     self.publish_due_summaries()
-                    continue
-                if poll_result.state in {
-                    BridgeState.IDLE,
-                    BridgeState.RECOVERING,
-                    BridgeState.WAITING_FOR_RECEIVER,
-                }:
-                    time.sleep(1)
+        finally:
+            feeder.stop(timeout=getattr(self.args, "serial_timeout", 1) + 1)
+
+    def run_forever(self):
+        """
+        Start the runtime and keep polling until interrupted.
+        """
+        try:
+            self._run()
         except KeyboardInterrupt:
             logging.info("Interrupted by user")
+        except replay.ReplayFinished as finished:
+            self._finish_replay(finished)
         finally:
             self.close()
+
+    def _run(self):
+        self.start()
+        if getattr(self.args, "pipeline", False):
+            self._run_pipeline()
+            return
+        while True:
+            self.housekeeping()
+            self.sweep_status()
+            self.publish_due_summaries()
+            self.flush_output()
+            self._pause_after(self._poll_cycle())
+
+    def _finish_replay(self, finished):
+        """
+        Publish everything the replayed traffic left pending and log throughput.
+        """
+        self.sweep_status(force=True)
+        self.publish_due_summaries(force=True)
+        self._save_state(force=True)
+        replay.log_finished(finished, self.mqtt_client)
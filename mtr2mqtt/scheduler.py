@@ -0,0 +1,94 @@
+"""
+Adaptive receiver poll scheduling.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import statistics
+import time
+
+from mtr2mqtt import metrics
+
+
+DEFAULT_MIN_INTERVAL = 0.1
+DEFAULT_MAX_INTERVAL = 1.0
+DEFAULT_BACKOFF_FACTOR = 2
+DEFAULT_HISTORY_SIZE = 256
+
+
+class PollScheduler:
+    """
+    Choose the delay before the next poll from recent receiver traffic.
+
+    The first empty poll after traffic waits only the floor interval, and
+    every further empty poll multiplies the delay by the backoff factor up to
+    the ceiling. The times between polls that returned measurements are
+    kept and exported as a histogram metric, so the floor and ceiling can be
+    tuned against real traffic.
+    """
+
+    def __init__(
+        self,
+        min_interval=DEFAULT_MIN_INTERVAL,
+        max_interval=DEFAULT_MAX_INTERVAL,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        history_size=DEFAULT_HISTORY_SIZE,
+        monotonic=None,
+    ):
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.backoff_factor = max(1.0, float(backoff_factor))
+        self._monotonic = monotonic or time.monotonic
+        self._idle_polls = 0
+        self._last_traffic_at = None
+        self.inter_arrival_times = deque(maxlen=history_size)
+
+    def record_traffic(self, now=None):
+        """
+        Record one poll batch that returned measurements and reset the backoff.
+
+        A drain returns several measurements from one poll batch; it counts
+        as one arrival at the time the batch was polled.
+        """
+        now = self._monotonic() if now is None else now
+        if self._last_traffic_at is not None:
+            inter_arrival = now - self._last_traffic_at
+            self.inter_arrival_times.append(inter_arrival)
+            metrics.TRAFFIC_INTER_ARRIVAL.observe(inter_arrival)
+        self._last_traffic_at = now
+        self._idle_polls = 0
+
+    def record_idle(self):
+        """
+        Record one poll that found the receiver buffer empty.
+
+        The count stops growing once the delay reaches the ceiling, so a long
+        silent period cannot overflow the backoff.
+        """
+        if self.min_interval > 0 and self.next_delay() < self.max_interval:
+            self._idle_polls += 1
+
+    def next_delay(self):
+        """
+        Return the number of seconds to wait before the next poll.
+        """
+        if self._idle_polls == 0:
+            return 0.0
+        delay = self.min_interval * self.backoff_factor ** (self._idle_polls - 1)
+        return min(delay, self.max_interval)
+
+    def inter_arrival_stats(self):
+        """
+        Summarize recent poll batch inter-arrival times in seconds.
+        """
+        samples = list(self.inter_arrival_times)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "min": min(samples),
+            "max": max(samples),
+            "mean": statistics.fmean(samples),
+            "median": statistics.median(samples),
+        }
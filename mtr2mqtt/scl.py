@@ -4,6 +4,7 @@ SCL protocol parser module
 Functions
     calc_bcc(message)
     create_command(scl_command, scl_address=126)
+    create_response(scl_response)
     parse_response(scl_response, scl_response_checksum)
     get_receiver_type(ser, scl_address)
 
@@ -12,9 +13,12 @@ Functions
 import logging
 import serial
 
+from mtr2mqtt import metrics
+
 
 # Constants
 END_CHAR = b"\x03"
+ACK_CHAR = b"\x06"
 
 
 def calc_bcc(message):
@@ -42,14 +46,32 @@ def create_command(scl_command, scl_address=126):
     return scl_id + str.encode(scl_command + ext) + bcc
 
 
+def create_response(scl_response):
+    """
+    SCL response packet format is:
+    <ACK><response><EXT><BCC>
+    ACK is byte having value 6
+    BCC is checksum byte that is calculated using XOR operation of all the other bytes
+    """
+    response = ACK_CHAR + str.encode(scl_response) + END_CHAR
+    return response + calc_bcc(response)
+
+
 def parse_response(scl_response, scl_response_checksum):
     """
     Checks SCL response checksum and returns payload as string
+
+    An empty response is a serial read timeout, not a checksum error.
     """
+    if not scl_response:
+        metrics.SERIAL_TIMEOUTS.inc()
+        logging.debug("SCL response timed out")
+        return None
     # Check that checksum matches
     scl_tmp_response_bytes = [scl_response[i : i + 1] for i in range(len(scl_response))]
     calulated_response_checksum = calc_bcc(scl_response)
     if calulated_response_checksum != scl_response_checksum:
+        metrics.CHECKSUM_ERRORS.inc()
         logging.warning('Checsum error, ignoring response')
         logging.debug(
             "SCL checksum error, response: %s, received checksum: %s expected checksum: %s",
@@ -88,7 +110,9 @@ def _parse_receiver(ser):
             logging.debug(
                 "Received incorrect device type response: %s", parsed_response
             )
-        logging.debug("Incorrect checksum received")
+        else:
+            metrics.CHECKSUM_ERRORS.inc()
+            logging.debug("Incorrect checksum received")
     return None
 
 
@@ -0,0 +1,374 @@
+"""
+Synthetic MTR receiver on a pseudo-terminal for load testing the bridge.
+
+The simulator emulates an RTR970 or FTR980 receiver: it answers the
+``TYPE ?``, ``SN ?`` and ``DBG 1 ?`` SCL commands on the slave side of a
+pty, and fills a bounded ring buffer with packets from simulated FT10,
+CSR260, utility and unsupported transmitters. Packets that arrive while the
+ring buffer is full overwrite the oldest one and are counted as overflows,
+so raising the transmitter count or lowering the interval shows how many
+packets per second one bridge keeps up with.
+
+Run it and point the bridge at the printed port::
+
+    python -m mtr2mqtt.simulator --ft10 200 --interval 1
+    mtr2mqtt --serial-port /dev/pts/5
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from collections import deque
+from dataclasses import dataclass
+import heapq
+import logging
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from mtr2mqtt import mtr
+from mtr2mqtt import scl
+
+
+LOGGER = logging.getLogger(__name__)
+DEVICE_TYPES = ("RTR970", "FTR980")
+DEFAULT_SERIAL_NUMBER = "SIM0001"
+DEFAULT_BUFFER_SIZE = 256
+DEFAULT_INTERVAL = 10.0
+DEFAULT_STATS_INTERVAL = 10.0
+FIRST_TRANSMITTER_ID = 10000
+BATTERY_DECIVOLTS = 26
+EMPTY_RING_BUFFER = "#"
+UNSUPPORTED_TYPE = mtr.TransmitterType.MTR262
+
+
+@dataclass
+class SimulatedTransmitter:
+    """
+    One simulated transmitter and its current reading.
+    """
+
+    transmitter_type: mtr.TransmitterType
+    transmitter_id: int
+    temperature: float = 20.0
+
+    def payload(self, rng):
+        """
+        Build the next MTR packet of this transmitter.
+        """
+        if self.transmitter_type is mtr.TransmitterType.UTILITY:
+            calibration_days = rng.randrange(0, 10000)
+            data = [0, calibration_days % 256, calibration_days // 256]
+        else:
+            self.temperature += rng.uniform(-0.2, 0.2)
+            raw = round((self.temperature + 273.2) * 10)
+            data = [raw % 256, raw // 256]
+        fields = [
+            self.transmitter_type.value,
+            (len(data) << 5) | BATTERY_DECIVOLTS,
+            rng.randrange(40, 100),
+            self.transmitter_id,
+            *data,
+        ]
+        return " ".join(str(field) for field in fields)
+
+
+def create_transmitters(ft10=0, csr260=0, utility=0, unsupported=0):
+    """
+    Create the simulated transmitters with consecutive ids.
+    """
+    counts = (
+        (mtr.TransmitterType.FT10, ft10),
+        (mtr.TransmitterType.CSR260, csr260),
+        (mtr.TransmitterType.UTILITY, utility),
+        (UNSUPPORTED_TYPE, unsupported),
+    )
+    transmitters = []
+    for transmitter_type, count in counts:
+        for _ in range(count):
+            transmitters.append(
+                SimulatedTransmitter(
+                    transmitter_type,
+                    FIRST_TRANSMITTER_ID + len(transmitters),
+                )
+            )
+    return transmitters
+
+
+@dataclass(frozen=True)
+class ReceiverIdentity:
+    """
+    Receiver type and serial number reported to TYPE ? and SN ?.
+    """
+
+    device_type: str = DEVICE_TYPES[0]
+    serial_number: str = DEFAULT_SERIAL_NUMBER
+
+
+class TransmitterSchedule:
+    """
+    Send times of simulated transmitters.
+
+    Every transmitter sends once per interval, starting at a random phase.
+    """
+
+    def __init__(
+        self,
+        transmitters,
+        interval=DEFAULT_INTERVAL,
+        seed=None,
+        monotonic=None,
+    ):
+        self.transmitters = list(transmitters)
+        self.interval = interval
+        self.rng = random.Random(seed)
+        self._monotonic = monotonic or time.monotonic
+        started_at = self._monotonic()
+        self._due = [
+            (started_at + self.rng.uniform(0, interval), index)
+            for index in range(len(self.transmitters))
+        ]
+        heapq.heapify(self._due)
+
+    def next_due_at(self):
+        """
+        Return when the next transmitter sends, or None without transmitters.
+        """
+        return self._due[0][0] if self._due else None
+
+    def due_payloads(self, now=None):
+        """
+        Yield the packet of every transmitter due by now.
+        """
+        now = self._monotonic() if now is None else now
+        while self._due and self._due[0][0] <= now:
+            due_at, index = self._due[0]
+            heapq.heapreplace(self._due, (due_at + self.interval, index))
+            yield self.transmitters[index].payload(self.rng)
+
+
+class SimulatedReceiver:
+    """
+    Receiver ring buffer fed by a transmitter schedule.
+
+    A corrupted response either carries a wrong checksum or a packet whose
+    length field does not match its data.
+    """
+
+    def __init__(
+        self,
+        schedule,
+        *,
+        identity=None,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        corruption_ratio=0.0,
+    ):
+        self.schedule = schedule
+        self.identity = identity or ReceiverIdentity()
+        self.corruption_ratio = corruption_ratio
+        self.ring_buffer = deque(maxlen=buffer_size)
+        self.counters = dict.fromkeys(
+            ("generated", "served", "corrupted", "overflows"),
+            0,
+        )
+
+    def next_due_at(self):
+        """
+        Return when the next transmitter sends, or None without transmitters.
+        """
+        return self.schedule.next_due_at()
+
+    def advance(self, now=None):
+        """
+        Queue the packets of every transmitter due by now.
+        """
+        for payload in self.schedule.due_payloads(now):
+            if len(self.ring_buffer) == self.ring_buffer.maxlen:
+                self.counters["overflows"] += 1
+            self.ring_buffer.append(payload)
+            self.counters["generated"] += 1
+
+    def respond(self, command):
+        """
+        Return the framed response to one SCL command, or None to stay silent.
+        """
+        text = command[1:].split(scl.END_CHAR, 1)[0].decode("ascii", "replace")
+        if text == "TYPE ?":
+            return scl.create_response(self.identity.device_type)
+        if text == "SN ?":
+            return scl.create_response(self.identity.serial_number)
+        if text == "DBG 1 ?":
+            self.advance()
+            if not self.ring_buffer:
+                return scl.create_response(EMPTY_RING_BUFFER)
+            self.counters["served"] += 1
+            return self._corrupt(self.ring_buffer.popleft())
+        return None
+
+    def _corrupt(self, payload):
+        rng = self.schedule.rng
+        if rng.random() >= self.corruption_ratio:
+            return scl.create_response(payload)
+        self.counters["corrupted"] += 1
+        if rng.random() < 0.5:
+            response = scl.create_response(payload)
+            return response[:-1] + bytes([response[-1] ^ 0xFF])
+        return scl.create_response(payload.rsplit(" ", 1)[0])
+
+    def stats(self):
+        """
+        Return packet counters and the ring buffer depth.
+        """
+        return {**self.counters, "buffer_depth": len(self.ring_buffer)}
+
+
+def _split_commands(buffer):
+    """
+    Split complete <ID><command><EXT><BCC> frames off the input buffer.
+    """
+    commands = []
+    while True:
+        end = buffer.find(scl.END_CHAR)
+        if end < 0 or end + 1 >= len(buffer):
+            return commands
+        frame = bytes(buffer[: end + 2])
+        del buffer[: end + 2]
+        if scl.calc_bcc(frame[1:-1]) == frame[-1:]:
+            commands.append(frame)
+        else:
+            LOGGER.debug("Ignoring command with a checksum error: %s", frame)
+
+
+def serve(receiver, master_fd, stop_event, stats_interval=DEFAULT_STATS_INTERVAL):
+    """
+    Answer commands on the pty master until stop_event is set.
+    """
+    buffer = bytearray()
+    stats_at = time.monotonic() + stats_interval
+    while not stop_event.is_set():
+        now = time.monotonic()
+        receiver.advance(now)
+        if stats_interval and now >= stats_at:
+            stats_at = now + stats_interval
+            LOGGER.info(
+                "Simulator stats: %s",
+                receiver.stats(),
+                extra={"event": "simulator_stats", **receiver.stats()},
+            )
+        timeout = min(0.1, max(0.0, (receiver.next_due_at() or now + 0.1) - now))
+        readable, _writable, _errors = select.select([master_fd], [], [], timeout)
+        if not readable:
+            continue
+        try:
+            data = os.read(master_fd, 4096)
+        except OSError:
+            # The slave side is closed between bridge connections.
+            time.sleep(0.1)
+            continue
+        buffer += data
+        for command in _split_commands(buffer):
+            response = receiver.respond(command)
+            if response is not None:
+                os.write(master_fd, response)
+
+
+def open_pty():
+    """
+    Open a raw pseudo-terminal and return (master_fd, slave_fd, slave_path).
+    """
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(slave_fd)
+    return master_fd, slave_fd, os.ttyname(slave_fd)
+
+
+def create_parser():
+    """
+    Build the simulator argument parser.
+    """
+    parser = ArgumentParser(description="Simulate an MTR receiver on a pty")
+    parser.add_argument("--ft10", help="FT10 transmitters", default=10, type=int)
+    parser.add_argument("--csr260", help="CSR260 transmitters", default=0, type=int)
+    parser.add_argument("--utility", help="Utility transmitters", default=0, type=int)
+    parser.add_argument(
+        "--unsupported",
+        help="Transmitters of a type the bridge does not decode",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "--interval",
+        help="Seconds between packets of one transmitter",
+        default=DEFAULT_INTERVAL,
+        type=float,
+    )
+    parser.add_argument(
+        "--corruption-ratio",
+        help="Fraction of responses with a checksum or length error",
+        default=0.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--buffer-size",
+        help="Receiver ring buffer capacity in packets",
+        default=DEFAULT_BUFFER_SIZE,
+        type=int,
+    )
+    parser.add_argument(
+        "--device-type",
+        help="Receiver type reported to TYPE ?",
+        default=DEVICE_TYPES[0],
+        choices=DEVICE_TYPES,
+    )
+    parser.add_argument(
+        "--serial-number",
+        help="Receiver serial number reported to SN ?",
+        default=DEFAULT_SERIAL_NUMBER,
+    )
+    parser.add_argument(
+        "--stats-interval",
+        help="Seconds between statistics log lines, 0 disables them",
+        default=DEFAULT_STATS_INTERVAL,
+        type=float,
+    )
+    parser.add_argument("--seed", help="Random seed", default=None, type=int)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the simulator until interrupted.
+    """
+    args = create_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    receiver = SimulatedReceiver(
+        TransmitterSchedule(
+            create_transmitters(args.ft10, args.csr260, args.utility, args.unsupported),
+            interval=args.interval,
+            seed=args.seed,
+        ),
+        identity=ReceiverIdentity(args.device_type, args.serial_number),
+        buffer_size=args.buffer_size,
+        corruption_ratio=args.corruption_ratio,
+    )
+    master_fd, slave_fd, slave_path = open_pty()
+    LOGGER.info(
+        "Simulating %s %s with %s transmitters on %s",
+        args.device_type,
+        args.serial_number,
+        len(receiver.schedule.transmitters),
+        slave_path,
+    )
+    try:
+        serve(receiver, master_fd, threading.Event(), args.stats_interval)
+    except KeyboardInterrupt:
+        LOGGER.info("Simulator stats: %s", receiver.stats())
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+if __name__ == "__main__":
+    main()
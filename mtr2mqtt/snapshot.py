@@ -0,0 +1,169 @@
+"""
+On-disk snapshot of the discovery, status and summary publish caches.
+
+Restoring the snapshot at startup keeps a restart from re-publishing
+retained discovery, status and summary payloads that the broker already
+holds. The file is replaced atomically and carries a digest of its content,
+so a torn or hand-edited snapshot is ignored instead of half restored.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+SNAPSHOT_VERSION = 1
+DEFAULT_SAVE_INTERVAL = 60
+
+
+def payload_digest(*parts):
+    """
+    Return a stable digest for a published topic and payload.
+    """
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _state_digest(state):
+    return payload_digest(json.dumps(state, sort_keys=True, separators=(",", ":")))
+
+
+class StateSnapshot:
+    """
+    Load and atomically save the bridge state snapshot file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """
+        Return the saved state, or None when it is missing or not usable.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as snapshot_file:
+                document = json.load(snapshot_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            self._ignore(f"unreadable: {error}")
+            return None
+
+        if not isinstance(document, dict) or document.get("version") != SNAPSHOT_VERSION:
+            self._ignore("unsupported snapshot version")
+            return None
+        state = document.get("state")
+        if not isinstance(state, dict) or document.get("digest") != _state_digest(state):
+            self._ignore("digest mismatch")
+            return None
+        return state
+
+    def save(self, state):
+        """
+        Write the state to a temporary file and move it over the snapshot.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        document = {
+            "version": SNAPSHOT_VERSION,
+            "digest": _state_digest(state),
+            "state": state,
+        }
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=directory,
+            prefix=".mtr2mqtt-state-",
+            delete=False,
+        ) as snapshot_file:
+            try:
+                json.dump(document, snapshot_file, sort_keys=True)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            except (OSError, TypeError, ValueError):
+                snapshot_file.close()
+                os.unlink(snapshot_file.name)
+                raise
+        os.replace(snapshot_file.name, self.path)
+
+    def _ignore(self, reason):
+        LOGGER.warning(
+            "Ignoring state snapshot %s: %s",
+            self.path,
+            reason,
+            extra={"event": "state_snapshot_ignored", "state_file": self.path},
+        )
+
+
+class SnapshotSaver:
+    """
+    Restore publish caches from a state snapshot and save them periodically.
+
+    caches maps a snapshot section name to an object with snapshot() and
+    restore() methods, such as the status tracker under "status".
+    """
+
+    def __init__(self, path, caches, interval=DEFAULT_SAVE_INTERVAL):
+        self.state_snapshot = StateSnapshot(path)
+        self.caches = caches
+        self.interval = interval
+        self._saved_at = time.monotonic()
+
+    def restore(self):
+        """
+        Seed the caches from the snapshot and return whether it was restored.
+        """
+        state = self.state_snapshot.load()
+        if state is None:
+            return False
+        try:
+            for name, cache in self.caches.items():
+                if name in state:
+                    cache.restore(state[name])
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            LOGGER.warning(
+                "Ignoring the rest of the state snapshot %s: %s",
+                self.state_snapshot.path,
+                error,
+                extra={
+                    "event": "state_snapshot_ignored",
+                    "state_file": self.state_snapshot.path,
+                },
+            )
+            return False
+        LOGGER.info(
+            "State snapshot restored",
+            extra={
+                "event": "state_restored",
+                "state_file": self.state_snapshot.path,
+                "state_discovery_entries": len(state.get("discovery", [])),
+                "state_status_entities": len(state.get("status", [])),
+            },
+        )
+        return True
+
+    def save(self, force=False):
+        """
+        Write the snapshot when the save interval elapsed, or now if forced.
+        """
+        now = time.monotonic()
+        if not force and now - self._saved_at < self.interval:
+            return False
+        self._saved_at = now
+        try:
+            self.state_snapshot.save(
+                {name: cache.snapshot() for name, cache in self.caches.items()}
+            )
+        except (OSError, TypeError, ValueError) as error:
+            LOGGER.warning(
+                "Saving the state snapshot %s failed: %s",
+                self.state_snapshot.path,
+                error,
+                extra={"event": "state_save_failed"},
+            )
+            return False
+        return True
@@ -0,0 +1,189 @@
+"""
+Disk-backed spool for measurements that could not be published to MQTT.
+
+Measurements are appended to a SQLite database in WAL mode, keeping the
+serialized payload exactly as it was first published so the original
+`timestamp` field survives the outage. Entries are replayed in append order.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+import sqlite3
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60
+DEFAULT_REPLAY_RATE = 20.0
+PRUNE_EVERY_APPENDS = 100
+PRUNE_INTERVAL_SECONDS = 60.0
+
+
+class SpoolError(Exception):
+    """
+    Raised when the spool database cannot be opened.
+    """
+
+
+@dataclass
+class _SpoolUsage:
+    """
+    In-memory totals of the spool table and the prune bookkeeping.
+    """
+
+    count: int = 0
+    size_bytes: int = 0
+    unpruned_appends: int = 0
+    pruned_at: float | None = None
+
+
+class MeasurementSpool:
+    """
+    Append-only measurement log with size and age caps.
+
+    The size cap is checked against in-memory counters on every append.
+    Expired entries are deleted every PRUNE_EVERY_APPENDS appends or
+    PRUNE_INTERVAL_SECONDS seconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes=DEFAULT_MAX_BYTES,
+        max_age_seconds=DEFAULT_MAX_AGE_SECONDS,
+        clock=None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        try:
+            self._connection = sqlite3.connect(
+                path,
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS measurements ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "receiver TEXT NOT NULL, "
+                "sensor TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "spooled_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS measurements_spooled_at "
+                "ON measurements (spooled_at)"
+            )
+            count, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM measurements"
+            ).fetchone()
+        except sqlite3.Error as error:
+            raise SpoolError(f"Unable to open measurement spool {path}: {error}") from error
+        self._usage = _SpoolUsage(count, size)
+
+    def __len__(self):
+        return self._usage.count
+
+    @property
+    def size_bytes(self):
+        """
+        Return the total payload size of spooled measurements.
+        """
+        return self._usage.size_bytes
+
+    def append(self, receiver, sensor_id, payload):
+        """
+        Spool one serialized measurement and enforce the size and age caps.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO measurements (receiver, sensor, payload, spooled_at) "
+                "VALUES (?, ?, ?, ?)",
+                (receiver, str(sensor_id), payload, self._clock()),
+            )
+            self._usage.count += 1
+            self._usage.size_bytes += len(payload)
+            self._usage.unpruned_appends += 1
+            self._prune_if_due()
+
+    def peek(self, limit):
+        """
+        Return up to limit of the oldest entries as (seq, receiver, sensor, payload).
+        """
+        with self._lock:
+            self._prune_if_due()
+            return self._connection.execute(
+                "SELECT seq, receiver, sensor, payload FROM measurements "
+                "ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def remove(self, seq):
+        """
+        Remove a replayed entry.
+        """
+        with self._lock:
+            self._delete("seq = ?", (seq,))
+
+    def _delete(self, where, parameters=()):
+        """
+        Delete matching entries, keep the counters in step and return the count.
+        """
+        count, size = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) "
+            f"FROM measurements WHERE {where}",
+            parameters,
+        ).fetchone()
+        if count:
+            self._connection.execute(f"DELETE FROM measurements WHERE {where}", parameters)
+            self._usage.count -= count
+            self._usage.size_bytes -= size
+        return count
+
+    def _prune_if_due(self):
+        now = self._clock()
+        usage = self._usage
+        if (
+            usage.size_bytes > self.max_bytes
+            or usage.unpruned_appends >= PRUNE_EVERY_APPENDS
+            or usage.pruned_at is None
+            or now - usage.pruned_at >= PRUNE_INTERVAL_SECONDS
+        ):
+            self._prune(now)
+
+    def _prune(self, now):
+        self._usage.unpruned_appends = 0
+        self._usage.pruned_at = now
+        expired = self._delete(
+            "spooled_at < ?",
+            (now - self.max_age_seconds,),
+        )
+        evicted = 0
+        while self._usage.size_bytes > self.max_bytes and self._usage.count:
+            evicted += self._delete("seq = (SELECT MIN(seq) FROM measurements)")
+
+        if expired or evicted:
+            LOGGER.warning(
+                "Discarded spooled measurements over the spool limits",
+                extra={
+                    "event": "spool_pruned",
+                    "spool_expired": expired,
+                    "spool_evicted": evicted,
+                    "spool_size": self._usage.count,
+                },
+            )
+
+    def close(self):
+        """
+        Close the spool database.
+        """
+        with self._lock:
+            self._connection.close()
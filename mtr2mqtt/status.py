@@ -6,9 +6,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
+import heapq
+import itertools
 import json
 
+from mtr2mqtt.topics import memoize
 from mtr2mqtt.topics import topic_fragment
 
 
@@ -40,6 +44,7 @@ def format_timestamp(value):
     )
 
 
+@memoize
 def receiver_status_topic(receiver, prefix=STATUS_TOPIC_PREFIX):
     """
     Build the retained receiver status topic.
@@ -47,6 +52,7 @@ def receiver_status_topic(receiver, prefix=STATUS_TOPIC_PREFIX):
     return f"{prefix}/{topic_fragment(receiver)}"
 
 
+@memoize
 def sensor_status_topic(receiver, sensor, prefix=STATUS_TOPIC_PREFIX):
     """
     Build the retained sensor status topic.
@@ -98,15 +104,39 @@ class EntityStatus:
         return payload
 
 
+def _isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+def _parse_isoformat(value):
+    return None if value is None else datetime.fromisoformat(value)
+
+
+def _status_key_order(key):
+    entity_type, receiver, sensor = key
+    return (entity_type != "receiver", receiver, sensor or "")
+
+
 class StatusTracker:
     """
     Track receiver and sensor availability independently.
+
+    Only entities touched by an observation, publish or error, plus those
+    whose offline deadline has passed, are re-rendered when looking for
+    changed payloads. Deadlines live in a min-heap ordered by
+    last_received_at + offline_timeout with one live entry per entity. A
+    newer observation does not push another entry: when the entry surfaces
+    and the entity was seen again since, it is moved to the new deadline.
     """
 
     def __init__(self, offline_timeout=30 * 60):
         self.offline_timeout = offline_timeout
         self.receivers = {}
         self.sensors = {}
+        self._dirty = set()
+        self._deadlines = []
+        self._scheduled = {}
+        self._deadline_sequence = itertools.count()
 
     def record_observation(self, receiver, sensor, observed_at=None):
         """
@@ -117,34 +147,48 @@ class StatusTracker:
         sensor_state = self._sensor(receiver, sensor)
         receiver_state.last_received_at = observed_at
         sensor_state.last_received_at = observed_at
+        self._touch(self._receiver_key(receiver_state), receiver_state)
+        self._touch(self._sensor_key(sensor_state), sensor_state)
 
     def record_publish_success(self, receiver, sensor, published_at=None):
         """
         Record a successful measurement publish for a receiver and sensor.
         """
         published_at = published_at or utc_now()
-        self._receiver(receiver).last_publish_at = published_at
-        self._sensor(receiver, sensor).last_publish_at = published_at
+        receiver_state = self._receiver(receiver)
+        sensor_state = self._sensor(receiver, sensor)
+        receiver_state.last_publish_at = published_at
+        sensor_state.last_publish_at = published_at
+        self._dirty.add(self._receiver_key(receiver_state))
+        self._dirty.add(self._sensor_key(sensor_state))
 
     def record_error(self, receiver, sensor=None):
         """
         Increment attributable receiver and optional sensor error counters.
         """
-        self._receiver(receiver).error_count += 1
+        receiver_state = self._receiver(receiver)
+        receiver_state.error_count += 1
+        self._dirty.add(self._receiver_key(receiver_state))
         if sensor is not None:
-            self._sensor(receiver, sensor).error_count += 1
+            sensor_state = self._sensor(receiver, sensor)
+            sensor_state.error_count += 1
+            self._dirty.add(self._sensor_key(sensor_state))
 
     def changed_payloads(self, now=None):
         """
         Return status payloads whose serialized content changed since publish.
         """
         now = now or utc_now()
+        self._expire_deadlines(now)
         changed = []
-        for key, state in self._states():
+        for key in sorted(self._dirty, key=_status_key_order):
+            state = self._state_by_key(key)
             payload = state.payload(now, self.offline_timeout)
             rendered = json.dumps(payload, sort_keys=True, separators=(",", ":"))
             if rendered != state.last_status_payload:
                 changed.append((key, payload, rendered))
+            else:
+                self._dirty.discard(key)
         return changed
 
     def mark_status_published(self, key, rendered_payload):
@@ -152,6 +196,116 @@ class StatusTracker:
         Mark a changed status payload as successfully published.
         """
         self._state_by_key(key).last_status_payload = rendered_payload
+        self._dirty.discard(key)
+
+    def next_deadline(self):
+        """
+        Return the earliest time an observed entity goes offline, or None.
+
+        The entity is still online at exactly this time and offline right after.
+        """
+        while self._deadlines:
+            deadline = self._settle_head()
+            if deadline is not None:
+                return deadline
+        return None
+
+    def _deadline(self, state):
+        return state.last_received_at + timedelta(seconds=self.offline_timeout)
+
+    def _schedule(self, key, deadline):
+        self._scheduled[key] = deadline
+        heapq.heappush(
+            self._deadlines,
+            (deadline, next(self._deadline_sequence), key),
+        )
+
+    def _touch(self, key, state):
+        self._dirty.add(key)
+        deadline = self._deadline(state)
+        scheduled = self._scheduled.get(key)
+        # A later deadline is picked up when the scheduled entry surfaces.
+        if scheduled is None or deadline < scheduled:
+            self._schedule(key, deadline)
+
+    def _settle_head(self):
+        """
+        Return the deadline of the heap head once it is current, else None.
+
+        A superseded head is dropped and a head whose entity was observed
+        again is moved to the entity's current deadline.
+        """
+        deadline, _sequence, key = self._deadlines[0]
+        if self._scheduled.get(key) != deadline:
+            heapq.heappop(self._deadlines)
+            return None
+        current = self._deadline(self._state_by_key(key))
+        if current != deadline:
+            self._scheduled[key] = current
+            heapq.heapreplace(
+                self._deadlines,
+                (current, next(self._deadline_sequence), key),
+            )
+            return None
+        return deadline
+
+    def _expire_deadlines(self, now):
+        """
+        Mark entities whose offline deadline passed before now as dirty.
+        """
+        while self._deadlines and self._deadlines[0][0] < now:
+            deadline, _sequence, key = heapq.heappop(self._deadlines)
+            if self._scheduled.get(key) != deadline:
+                continue
+            current = self._deadline(self._state_by_key(key))
+            if current == deadline:
+                del self._scheduled[key]
+                self._dirty.add(key)
+            else:
+                self._schedule(key, current)
+
+    def snapshot(self):
+        """
+        Return the tracked entities as JSON-serializable dictionaries.
+        """
+        return [
+            {
+                "entity_type": state.entity_type,
+                "receiver": state.receiver,
+                "sensor": state.sensor,
+                "last_received_at": _isoformat(state.last_received_at),
+                "last_publish_at": _isoformat(state.last_publish_at),
+                "error_count": state.error_count,
+                "last_status_payload": state.last_status_payload,
+            }
+            for state in [*self.receivers.values(), *self.sensors.values()]
+        ]
+
+    def restore(self, entities):
+        """
+        Restore entities from a snapshot without marking them as changed.
+
+        Restored entities whose offline deadline passed while the bridge was
+        down are picked up by the next sweep.
+        """
+        for entity in entities:
+            state = EntityStatus(
+                entity_type=entity["entity_type"],
+                receiver=str(entity["receiver"]),
+                sensor=None if entity.get("sensor") is None else str(entity["sensor"]),
+                last_received_at=_parse_isoformat(entity.get("last_received_at")),
+                last_publish_at=_parse_isoformat(entity.get("last_publish_at")),
+                error_count=int(entity.get("error_count", 0)),
+                last_status_payload=entity.get("last_status_payload"),
+            )
+            if state.entity_type == "receiver":
+                self.receivers[state.receiver] = state
+                key = self._receiver_key(state)
+            else:
+                self.sensors[(state.receiver, state.sensor)] = state
+                key = self._sensor_key(state)
+            if state.last_received_at is not None:
+                self._schedule(key, self._deadline(state))
 
     def sensor_payloads(self, now=None):
         """
@@ -170,6 +324,14 @@ class StatusTracker:
         now = now or utc_now()
         return self._sensor(receiver, sensor).payload(now, self.offline_timeout)
 
+    @staticmethod
+    def _receiver_key(state):
+        return ("receiver", state.receiver, None)
+
+    @staticmethod
+    def _sensor_key(state):
+        return ("sensor", state.receiver, state.sensor)
+
     def _receiver(self, receiver):
         receiver = str(receiver)
         if receiver not in self.receivers:
@@ -177,6 +339,7 @@ class StatusTracker:
                 entity_type="receiver",
                 receiver=receiver,
             )
+            self._dirty.add(("receiver", receiver, None))
         return self.receivers[receiver]
 
     def _sensor(self, receiver, sensor):
@@ -189,14 +352,9 @@ class StatusTracker:
                 receiver=receiver,
                 sensor=sensor,
             )
+            self._dirty.add(("sensor", receiver, sensor))
         return self.sensors[key]
 
-    def _states(self):
-        for receiver, state in sorted(self.receivers.items()):
-            yield ("receiver", receiver, None), state
-        for (receiver, sensor), state in sorted(self.sensors.items()):
-            yield ("sensor", receiver, sensor), state
-
     def _state_by_key(self, key):
         entity_type, receiver, sensor = key
         if entity_type == "receiver":
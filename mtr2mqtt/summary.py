@@ -4,20 +4,27 @@ Receiver-level latest-value summary tracking.
 
 from __future__ import annotations
 
+import bisect
 from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
 import json
 import time
 
 from mtr2mqtt import status as status_module
+from mtr2mqtt.snapshot import payload_digest
+from mtr2mqtt.topics import memoize
 from mtr2mqtt.topics import topic_fragment
 
 
 SUMMARY_TOPIC_PREFIX = "summary"
 DEFAULT_DEBOUNCE_SECONDS = 5
+DEFAULT_FULL_INTERVAL_SECONDS = 5 * 60
+SUMMARY_DELTA_SUFFIX = "delta"
 SUMMARY_METADATA_FIELDS = ("location", "description", "unit", "quantity", "zone")
 
 
+@memoize
 def summary_topic(receiver, prefix=SUMMARY_TOPIC_PREFIX):
     """
     Build the retained receiver summary topic.
@@ -25,6 +32,14 @@ def summary_topic(receiver, prefix=SUMMARY_TOPIC_PREFIX):
     return f"{prefix}/{topic_fragment(receiver)}"
 
 
+@memoize
+def summary_delta_topic(receiver, prefix=SUMMARY_TOPIC_PREFIX):
+    """
+    Build the non-retained receiver summary delta topic.
+    """
+    return f"{summary_topic(receiver, prefix)}/{SUMMARY_DELTA_SUFFIX}"
+
+
 def _measurement_timestamp(measurement):
     timestamp = measurement.get("timestamp")
     if timestamp is None:
@@ -50,6 +65,7 @@ class TransmitterSummary:
     status: str | None = None
     status_code: int | None = None
     metadata: dict | None = None
+    _fragment: str | None = field(default=None, compare=False, repr=False)
 
     def payload(self):
         """
@@ -67,18 +83,94 @@ class TransmitterSummary:
             data.update(self.metadata)
         return data
 
+    def fragment(self):
+        """
+        Return the serialized summary entry, rendered once per change.
+        """
+        if self._fragment is None:
+            self._fragment = json.dumps(self.payload(), sort_keys=True)
+        return self._fragment
+
+    def update_status(self, status, status_code):
+        """
+        Update availability and invalidate the cached fragment.
+        """
+        self.status = status
+        self.status_code = status_code
+        self._fragment = None
+
+
+@dataclass
+class _SummarySchedule:
+    """
+    Publish schedule of one receiver summary.
+
+    debounce_due_at paces the delta document with deltas enabled and the
+    full document otherwise; full_due_at is only used with deltas enabled.
+    """
+
+    debounce_due_at: float | None = None
+    full_due_at: float | None = None
+    full_published_at: float | None = None
+    delta_sensors: set = field(default_factory=set)
+    delta_sequence: int = 0
+
+
+@dataclass
+class _ReceiverSummaryState:
+    """
+    Sensor order, change counters and publish schedule of one receiver.
+    """
+
+    sensor_order: list = field(default_factory=list)
+    encoded_sensors: dict = field(default_factory=dict)
+    version: int = 0
+    published_version: int = 0
+    last_rendered: str | None = None
+    schedule: _SummarySchedule = field(default_factory=_SummarySchedule)
+
+    @property
+    def published(self):
+        """
+        Return whether the current summary version was published.
+        """
+        return self.version == self.published_version
+
 
 class SummaryTracker:
     """
     Track receiver summaries and coalesce retained MQTT publishes.
+
+    Transmitters are indexed by receiver and then by sensor. The published
+    document is assembled from per-transmitter JSON fragments, and only the
+    fragments of transmitters that changed are serialized again. Every
+    change bumps the receiver version, which is what decides whether a
+    summary still needs publishing.
+
+    With deltas enabled, the debounce interval paces delta documents that
+    carry only the transmitters changed since the previous delta, and the
+    full document is due at most once per full_interval.
     """
 
-    def __init__(self, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS, monotonic=None):
+    def __init__(
+        self,
+        debounce_seconds=DEFAULT_DEBOUNCE_SECONDS,
+        monotonic=None,
+        delta=False,
+        full_interval=DEFAULT_FULL_INTERVAL_SECONDS,
+    ):
         self.debounce_seconds = debounce_seconds
         self._monotonic = monotonic or time.monotonic
+        self.delta = delta
+        self.full_interval = full_interval
         self.transmitters = {}
-        self._publish_due_at = {}
-        self._last_rendered = {}
+        self._receivers = {}
+
+    def _receiver_state(self, receiver):
+        receiver_state = self._receivers.get(receiver)
+        if receiver_state is None:
+            receiver_state = self._receivers[receiver] = _ReceiverSummaryState()
+        return receiver_state
 
     def record_measurement(self, receiver, measurement, status_payload=None):
         """
@@ -86,13 +178,13 @@ class SummaryTracker:
         """
         receiver = str(receiver)
         sensor = str(measurement["id"])
-        key = (receiver, sensor)
         metadata = {
             field: measurement[field]
             for field in SUMMARY_METADATA_FIELDS
             if field in measurement
         }
-        current = self.transmitters.get(key)
+        receiver_transmitters = self.transmitters.setdefault(receiver, {})
+        current = receiver_transmitters.get(sensor)
         updated = TransmitterSummary(
             value=measurement.get("reading"),
             battery=measurement.get("battery"),
@@ -110,8 +202,12 @@ class SummaryTracker:
             metadata=metadata,
         )
         if current != updated:
-            self.transmitters[key] = updated
-            self._mark_dirty(receiver)
+            if current is None:
+                receiver_state = self._receiver_state(receiver)
+                bisect.insort(receiver_state.sensor_order, sensor)
+                receiver_state.encoded_sensors[sensor] = json.dumps(sensor)
+            receiver_transmitters[sensor] = updated
+            self._mark_entry_dirty(receiver, sensor)
 
     def record_status(self, status_payload):
         """
@@ -122,8 +218,7 @@ class SummaryTracker:
 
         receiver = str(status_payload["receiver"])
         sensor = str(status_payload["sensor"])
-        key = (receiver, sensor)
-        current = self.transmitters.get(key)
+        current = self.transmitters.get(receiver, {}).get(sensor)
         if current is None:
             return
 
@@ -133,52 +228,270 @@ class SummaryTracker:
         ):
             return
 
-        current.status = status_payload.get("status")
-        current.status_code = status_payload.get("status_code")
-        self._mark_dirty(receiver)
+        current.update_status(
+            status_payload.get("status"),
+            status_payload.get("status_code"),
+        )
+        self._mark_entry_dirty(receiver, sensor)
+
+    def snapshot(self):
+        """
+        Return the tracked transmitters and, for receivers whose current
+        summary is the published one, a digest of its transmitter entries.
+        """
+        return {
+            "transmitters": {
+                receiver: {
+                    sensor: {
+                        "value": summary.value,
+                        "battery": summary.battery,
+                        "measured_at": summary.measured_at,
+                        "status": summary.status,
+                        "status_code": summary.status_code,
+                        "metadata": summary.metadata,
+                    }
+                    for sensor, summary in transmitters.items()
+                }
+                for receiver, transmitters in self.transmitters.items()
+            },
+            "published": {
+                receiver: payload_digest(self._render_current_entries(receiver))
+                for receiver in self.transmitters
+                if self._receiver_state(receiver).published
+            },
+        }
+
+    def restore(self, state):
+        """
+        Restore transmitters from a snapshot.
+
+        A receiver counts as published when the entries rebuilt from the
+        snapshot match the published digest, so a restart does not re-send
+        its summary before something changes.
+        """
+        for receiver, transmitters in state.get("transmitters", {}).items():
+            receiver = str(receiver)
+            receiver_state = self._receiver_state(receiver)
+            for sensor, fields in transmitters.items():
+                sensor = str(sensor)
+                self.transmitters.setdefault(receiver, {})[sensor] = TransmitterSummary(
+                    **fields
+                )
+                if sensor not in receiver_state.encoded_sensors:
+                    bisect.insort(receiver_state.sensor_order, sensor)
+                    receiver_state.encoded_sensors[sensor] = json.dumps(sensor)
+            receiver_state.version += 1
+
+        for receiver, digest in state.get("published", {}).items():
+            receiver = str(receiver)
+            if payload_digest(self._render_current_entries(receiver)) == digest:
+                receiver_state = self._receiver_state(receiver)
+                receiver_state.published_version = receiver_state.version
+
+        due_at = self._monotonic() + self.debounce_seconds
+        for receiver in state.get("transmitters", {}):
+            receiver_state = self._receiver_state(str(receiver))
+            if receiver_state.published:
+                continue
+            schedule = receiver_state.schedule
+            if self.delta and schedule.full_due_at is None:
+                schedule.full_due_at = due_at
+            elif not self.delta and schedule.debounce_due_at is None:
+                schedule.debounce_due_at = due_at
 
     def due_payloads(self, now=None, updated_at=None):
         """
-        Return receiver summary payloads whose debounce interval has elapsed.
+        Return (receiver, rendered) for full summaries due for publishing.
+        """
+        now = self._monotonic() if now is None else now
+        updated_at = updated_at or status_module.utc_now()
+        due = []
+        for receiver, receiver_state in sorted(self._receivers.items()):
+            schedule = receiver_state.schedule
+            due_at = schedule.full_due_at if self.delta else schedule.debounce_due_at
+            if due_at is None or now < due_at:
+                continue
+            if receiver_state.published:
+                if self.delta:
+                    schedule.full_due_at = None
+                else:
+                    schedule.debounce_due_at = None
+                continue
+            due.append((receiver, self.render(receiver, updated_at)))
+        return due
+
+    def due_deltas(self, now=None, updated_at=None):
+        """
+        Return delta payloads for receivers whose debounce interval has elapsed.
+
+        Each item is (receiver, sequence, sensors, rendered) and is only
+        returned while deltas are enabled.
         """
+        if not self.delta:
+            return []
         now = self._monotonic() if now is None else now
         updated_at = updated_at or status_module.utc_now()
         due = []
-        for receiver, due_at in sorted(self._publish_due_at.items()):
-            if now < due_at:
+        for receiver, receiver_state in sorted(self._receivers.items()):
+            schedule = receiver_state.schedule
+            if schedule.debounce_due_at is None or now < schedule.debounce_due_at:
+                continue
+            if not schedule.delta_sensors:
+                schedule.debounce_due_at = None
                 continue
-            payload = self.payload(receiver, updated_at)
-            rendered = json.dumps(payload, sort_keys=True, separators=(",", ":"))
-            if rendered != self._last_rendered.get(receiver):
-                due.append((receiver, payload, rendered))
+            sequence = schedule.delta_sequence + 1
+            sensors = tuple(sorted(schedule.delta_sensors))
+            due.append(
+                (
+                    receiver,
+                    sequence,
+                    sensors,
+                    self.render_delta(receiver, sequence, sensors, updated_at),
+                )
+            )
         return due
 
+    def next_due_at(self):
+        """
+        Return the monotonic time the next receiver summary is due, or None.
+        """
+        due_times = [
+            due_at
+            for receiver_state in self._receivers.values()
+            for due_at in (
+                receiver_state.schedule.debounce_due_at,
+                receiver_state.schedule.full_due_at,
+            )
+            if due_at is not None
+        ]
+        if not due_times:
+            return None
+        return min(due_times)
+
     def mark_published(self, receiver, rendered_payload):
         """
-        Mark a summary payload as successfully published.
+        Mark a full summary payload as successfully published.
+        """
+        receiver_state = self._receiver_state(str(receiver))
+        receiver_state.last_rendered = rendered_payload
+        receiver_state.published_version = receiver_state.version
+        schedule = receiver_state.schedule
+        if self.delta:
+            schedule.full_due_at = None
+            schedule.full_published_at = self._monotonic()
+        else:
+            schedule.debounce_due_at = None
+
+    def mark_delta_published(self, receiver, sequence, sensors):
+        """
+        Mark a delta payload as successfully published.
+        """
+        schedule = self._receiver_state(str(receiver)).schedule
+        schedule.delta_sequence = sequence
+        schedule.delta_sensors.difference_update(sensors)
+        schedule.debounce_due_at = None
+        if schedule.delta_sensors:
+            schedule.debounce_due_at = self._monotonic() + self.debounce_seconds
+
+    def delta_sequence(self, receiver):
+        """
+        Return the sequence number of the last published delta of a receiver.
+        """
+        receiver_state = self._receivers.get(str(receiver))
+        return 0 if receiver_state is None else receiver_state.schedule.delta_sequence
+
+    def version(self, receiver):
+        """
+        Return the change counter of one receiver summary.
+        """
+        receiver_state = self._receivers.get(str(receiver))
+        return 0 if receiver_state is None else receiver_state.version
+
+    def render(self, receiver, updated_at=None):
+        """
+        Serialize the receiver summary by joining cached transmitter fragments.
+
+        The result is identical to json.dumps(payload, sort_keys=True).
         """
         receiver = str(receiver)
-        self._last_rendered[receiver] = rendered_payload
-        self._publish_due_at.pop(receiver, None)
+        updated_at = updated_at or status_module.utc_now()
+        entries = self._render_current_entries(receiver)
+        return (
+            f'{{"receiver": {json.dumps(receiver)}, '
+            f'"transmitters": {{{entries}}}, '
+            f'"updated_at": {json.dumps(status_module.format_timestamp(updated_at))}}}'
+        )
+
+    def render_delta(self, receiver, sequence, sensors, updated_at=None):
+        """
+        Serialize a delta document carrying only the given transmitters.
+
+        The result is identical to json.dumps(delta_payload(...), sort_keys=True).
+        """
+        receiver = str(receiver)
+        updated_at = updated_at or status_module.utc_now()
+        entries = self._render_entries(receiver, sensors)
+        return (
+            f'{{"receiver": {json.dumps(receiver)}, '
+            f'"seq": {int(sequence)}, '
+            f'"transmitters": {{{entries}}}, '
+            f'"updated_at": {json.dumps(status_module.format_timestamp(updated_at))}}}'
+        )
+
+    def delta_payload(self, receiver, sequence, sensors, updated_at=None):
+        """
+        Build a delta payload carrying only the given transmitters.
+        """
+        receiver = str(receiver)
+        updated_at = updated_at or status_module.utc_now()
+        transmitters = self.transmitters.get(receiver, {})
+        return {
+            "receiver": receiver,
+            "seq": int(sequence),
+            "updated_at": status_module.format_timestamp(updated_at),
+            "transmitters": {sensor: transmitters[sensor].payload() for sensor in sensors},
+        }
+
+    def _render_current_entries(self, receiver):
+        return self._render_entries(receiver, self._receiver_state(receiver).sensor_order)
+
+    def _render_entries(self, receiver, sensors):
+        transmitters = self.transmitters.get(receiver, {})
+        encoded_sensors = self._receiver_state(receiver).encoded_sensors
+        return ", ".join(
+            f"{encoded_sensors[sensor]}: {transmitters[sensor].fragment()}"
+            for sensor in sensors
+        )
 
     def payload(self, receiver, updated_at=None):
         """
         Build the current compact summary payload for one receiver.
+
+        Publishing uses render(); this builds the same document as a dict.
         """
         receiver = str(receiver)
         updated_at = updated_at or status_module.utc_now()
-        transmitters = {
-            sensor: summary.payload()
-            for (entry_receiver, sensor), summary in sorted(self.transmitters.items())
-            if entry_receiver == receiver
-        }
         return {
             "receiver": receiver,
             "updated_at": status_module.format_timestamp(updated_at),
-            "transmitters": transmitters,
+            "transmitters": {
+                sensor: transmitter.payload()
+                for sensor, transmitter in self.transmitters.get(receiver, {}).items()
+            },
         }
 
-    def _mark_dirty(self, receiver):
-        receiver = str(receiver)
-        if receiver not in self._publish_due_at:
-            self._publish_due_at[receiver] = self._monotonic() + self.debounce_seconds
+    def _mark_entry_dirty(self, receiver, sensor):
+        receiver_state = self._receiver_state(receiver)
+        receiver_state.version += 1
+        schedule = receiver_state.schedule
+        now = self._monotonic()
+        if schedule.debounce_due_at is None:
+            schedule.debounce_due_at = now + self.debounce_seconds
+        if not self.delta:
+            return
+        schedule.delta_sensors.add(sensor)
+        if schedule.full_due_at is None:
+            due_at = now + self.debounce_seconds
+            if schedule.full_published_at is not None:
+                due_at = max(due_at, schedule.full_published_at + self.full_interval)
+            schedule.full_due_at = due_at
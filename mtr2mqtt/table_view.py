@@ -4,10 +4,14 @@ Live table rendering for human-facing terminal output.
 
 from __future__ import annotations
 
+import bisect
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
 import json
 import shutil
 import sys
+import time
 
 
 CORE_COLUMNS = [
@@ -40,6 +44,10 @@ READING_COLOR = "\033[38;5;121m"
 STATUS_COLOR = "\033[38;5;222m"
 TIMESTAMP_COLOR = "\033[38;5;250m"
 RESET = "\033[0m"
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_LINE = "\x1b[K"
+HEADER_LINES = 5
+DEFAULT_MAX_FPS = 10
 PREFERRED_WIDTHS = {
     "id": 8,
     "status": 7,
@@ -86,12 +94,50 @@ def _format_timestamp(value):
     return timestamp.isoformat(sep=" ", timespec="seconds")
 
 
+@dataclass
+class _TableLayout:
+    """
+    Row order and column widths kept between frames.
+    """
+
+    row_keys: list = field(default_factory=list)
+    row_sort_keys: list = field(default_factory=list)
+    desired_widths: dict = field(default_factory=dict)
+    columns: list = field(default_factory=list)
+    widths: dict = field(default_factory=dict)
+    terminal_size: object = None
+    dirty: bool = True
+
+
+@dataclass
+class _FrameState:
+    """
+    Rows changed since the last frame and when that frame was drawn.
+    """
+
+    interval: float
+    dirty_rows: set = field(default_factory=set)
+    pending: bool = False
+    drawn_at: float | None = None
+
+
 class MeasurementTableView:
     """
     Maintain the latest measurement per sensor and redraw a terminal table.
+
+    Column widths are cached and only grow when a value no longer fits.
+    Updates are coalesced into at most max_fps frames per second; a frame
+    rewrites just the changed rows in place unless the layout changed, in
+    which case the whole table is redrawn.
     """
 
-    def __init__(self, stream=None, use_color=None):
+    def __init__(
+        self,
+        stream=None,
+        use_color=None,
+        max_fps=DEFAULT_MAX_FPS,
+        monotonic=None,
+    ):
         self.stream = stream or sys.stdout
         self.rows = {}
         self.dynamic_columns = []
@@ -100,12 +146,27 @@ class MeasurementTableView:
             if use_color is None
             else use_color
         )
+        self._monotonic = monotonic or time.monotonic
+        self._layout = _TableLayout()
+        self._frame = _FrameState(interval=1 / max_fps if max_fps else 0)
+
+    @property
+    def frame_interval(self):
+        """
+        Return the minimum seconds between two frames.
+        """
+        return self._frame.interval
 
-    def update(self, receiver_serial_number, measurement_json, status_payload=None):
+    def update(self, receiver_serial_number, measurement, status_payload=None):
         """
         Merge a measurement into the latest-state table and redraw it.
+
+        The measurement may be a decoded Measurement or a measurement JSON string.
         """
-        measurement = json.loads(measurement_json)
+        if isinstance(measurement, str):
+            measurement = json.loads(measurement)
+        else:
+            measurement = measurement.data
         row = {
             key: value
             for key, value in measurement.items()
@@ -117,6 +178,12 @@ class MeasurementTableView:
         row_key = (receiver_serial_number, sensor_id)
         if status_payload:
             row["status"] = status_payload.get("status")
+        if row_key not in self.rows:
+            sort_key = self._row_sort_key(row_key)
+            index = bisect.bisect_left(self._layout.row_sort_keys, sort_key)
+            self._layout.row_sort_keys.insert(index, sort_key)
+            self._layout.row_keys.insert(index, row_key)
+            self._layout.dirty = True
         self.rows[row_key] = row
 
         known_columns = set(CORE_COLUMNS + OPTIONAL_COLUMNS + self.dynamic_columns)
@@ -125,7 +192,9 @@ class MeasurementTableView:
                 self.dynamic_columns.append(key)
                 known_columns.add(key)
 
-        self.render()
+        self._track_widths(row)
+        self._frame.dirty_rows.add(row_key)
+        self._request_frame()
 
     def update_statuses(self, status_payloads):
         """
@@ -144,83 +213,142 @@ class MeasurementTableView:
             row = self.rows[row_key]
             if row.get("status") != status_payload.get("status"):
                 row["status"] = status_payload.get("status")
+                self._track_widths(row)
+                self._frame.dirty_rows.add(row_key)
                 changed = True
         if changed:
+            self._request_frame()
+
+    def next_frame_delay(self, now=None):
+        """
+        Return seconds until a coalesced frame may be drawn, or None.
+        """
+        if not self._frame.pending:
+            return None
+        if self._frame.drawn_at is None:
+            return 0.0
+        now = self._monotonic() if now is None else now
+        return max(0.0, self._frame.drawn_at + self._frame.interval - now)
+
+    def flush(self, force=False):
+        """
+        Draw the coalesced frame once the frame interval has elapsed.
+        """
+        if self._frame.pending and (force or self.next_frame_delay() == 0):
             self.render()
 
     def render(self):
         """
-        Draw the full table for the current latest sensor state.
+        Draw the changed rows, or the full table when the layout changed.
         """
-        columns = self._columns()
-        rows = self._sorted_rows()
-        terminal_width = shutil.get_terminal_size((120, 24)).columns
+        terminal_size = shutil.get_terminal_size((120, 24))
+        if terminal_size != self._layout.terminal_size:
+            self._layout.terminal_size = terminal_size
+            self._layout.dirty = True
+        if self._layout.dirty:
+            self._layout.columns = self._columns()
+            self._layout.widths = self._column_widths(
+                self._layout.columns,
+                terminal_size.columns,
+            )
+        if self._layout.dirty or len(self.rows) + HEADER_LINES > terminal_size.lines:
+            self._render_full()
+        else:
+            self._render_changed_rows()
+        self._layout.dirty = False
+        self._frame.dirty_rows.clear()
+        self._frame.pending = False
+        self._frame.drawn_at = self._monotonic()
+        self.stream.flush()
 
+    def _render_full(self):
+        columns = self._layout.columns
         lines = [
             self._colorize("mtr2mqtt live table", TITLE_COLOR),
-            self._colorize(f"Sensors: {len(rows)}", COUNT_COLOR),
+            self._colorize(f"Sensors: {len(self.rows)}", COUNT_COLOR),
             "",
-            self._render_header(columns, terminal_width),
-            self._render_separator(columns, terminal_width),
+            self._render_header(columns),
+            self._render_separator(columns),
         ]
-        for row in rows:
-            lines.append(self._render_row(columns, row, terminal_width))
+        for row in self._sorted_rows():
+            lines.append(self._render_row(columns, row))
 
-        self.stream.write("\x1b[H\x1b[2J")
+        self.stream.write(CLEAR_SCREEN)
         self.stream.write("\n".join(lines))
         self.stream.write("\n")
-        self.stream.flush()
+
+    def _render_changed_rows(self):
+        columns = self._layout.columns
+        parts = []
+        for row_key in sorted(self._frame.dirty_rows, key=self._row_sort_key):
+            index = bisect.bisect_left(self._layout.row_sort_keys, self._row_sort_key(row_key))
+            line = HEADER_LINES + index + 1
+            parts.append(
+                f"\x1b[{line};1H{self._render_row(columns, self.rows[row_key])}{CLEAR_LINE}"
+            )
+        parts.append(f"\x1b[{HEADER_LINES + len(self.rows) + 1};1H")
+        self.stream.write("".join(parts))
+
+    def _request_frame(self):
+        self._frame.pending = True
+        self.flush()
+
+    def _track_widths(self, row):
+        """
+        Grow cached column widths when a value of the row no longer fits.
+        """
+        for column, value in row.items():
+            if column == "timestamp":
+                width = len(_format_timestamp(value))
+            else:
+                width = len(_display_value(value))
+            current = self._layout.desired_widths.get(column)
+            if current is None:
+                self._layout.desired_widths[column] = self._desired_width(column, width)
+                self._layout.dirty = True
+            elif width > current and current < MAX_WIDTHS.get(column, 24):
+                self._layout.desired_widths[column] = self._desired_width(column, width)
+                self._layout.dirty = True
 
     def _columns(self):
         columns = []
         for name in CORE_COLUMNS + OPTIONAL_COLUMNS + self.dynamic_columns:
-            if any(name in row for row in self.rows.values()) and name not in columns:
+            if name in self._layout.desired_widths and name not in columns:
                 columns.append(name)
         return columns
 
     def _sorted_rows(self):
-        return [
-            self.rows[key]
-            for key in sorted(
-                self.rows,
-                key=lambda item: (
-                    self._sort_id(item[1]),
-                    str(item[1]),
-                    str(item[0]),
-                ),
-            )
-        ]
+        return [self.rows[key] for key in self._layout.row_keys]
+
+    def _row_sort_key(self, row_key):
+        return (self._sort_id(row_key[1]), str(row_key[1]), str(row_key[0]))
 
     def _sort_id(self, sensor_id):
         return int(sensor_id) if str(sensor_id).isdigit() else float("inf")
 
-    def _render_separator(self, columns, terminal_width):
-        widths = self._column_widths(columns, terminal_width)
-        separator = "-+-".join("-" * widths[column] for column in columns)
+    def _render_separator(self, columns):
+        separator = "-+-".join("-" * self._layout.widths[column] for column in columns)
         return self._colorize(separator, SEPARATOR_COLOR)
 
-    def _render_header(self, columns, terminal_width):
-        widths = self._column_widths(columns, terminal_width)
+    def _render_header(self, columns):
         cells = [
-            self._colorize(column.ljust(widths[column]), HEADER_COLOR)
+            self._colorize(column.ljust(self._layout.widths[column]), HEADER_COLOR)
             for column in columns
         ]
         return " | ".join(cells)
 
-    def _render_row(self, columns, values, terminal_width):
-        widths = self._column_widths(columns, terminal_width)
+    def _render_row(self, columns, values):
         rendered_cells = []
         for column in columns:
             value = self._cell_value(column, values).replace("\n", " ")
-            fitted = self._fit(value, widths[column])
+            fitted = self._fit(value, self._layout.widths[column])
             rendered_cells.append(self._colorize_cell(column, fitted))
         return " | ".join(rendered_cells)
 
     def _column_widths(self, columns, terminal_width):
         min_widths = {column: self._min_width(column) for column in columns}
-        rows = self._sorted_rows()
         widths = {
-            column: self._desired_width(column, rows, min_widths[column])
+            column: max(self._layout.desired_widths[column], min_widths[column])
             for column in columns
         }
 
@@ -243,13 +371,11 @@ class MeasurementTableView:
     def _min_width(self, column):
         return max(len(column), min(6, PREFERRED_WIDTHS.get(column, 6)))
 
-    def _desired_width(self, column, rows, min_width):
-        sample_values = [_display_value(row.get(column, "")) for row in rows]
-        value_lengths = [len(value) for value in sample_values]
-        widest = max([len(column), *value_lengths], default=len(column))
+    def _desired_width(self, column, value_width):
+        widest = max(len(column), value_width)
         preferred = PREFERRED_WIDTHS.get(column, widest)
         max_width = MAX_WIDTHS.get(column, 24)
-        return min(max(min_width, widest, preferred), max_width)
+        return min(max(self._min_width(column), widest, preferred), max_width)
 
     def _widest_shrinkable_column(self, columns, widths, min_widths):
         shrinkable_columns = [
@@ -1,13 +1,31 @@
 """
 MQTT topic helpers.
+
+Topic and identifier helpers are memoized with a bounded LRU cache, so the
+publish path only sanitizes a receiver or sensor id the first time it is seen.
+The bound is sized for tens of thousands of transmitters, so live topics are
+not evicted while transmitters that went away age out on their own.
 """
 
+from functools import lru_cache
 import re
 
 
+TOPIC_CACHE_SIZE = 65536
+_UNSAFE_TOPIC_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def memoize(function):
+    """
+    Memoize a topic or identifier helper in a TOPIC_CACHE_SIZE LRU cache.
+    """
+    return lru_cache(maxsize=TOPIC_CACHE_SIZE)(function)
+
+
+@memoize
 def topic_fragment(value):
     """
     Return one MQTT-safe topic path fragment for an arbitrary identifier.
     """
-    sanitized = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value).strip())
+    sanitized = _UNSAFE_TOPIC_CHARACTERS.sub("_", str(value).strip())
     return sanitized.strip("_") or "unknown"
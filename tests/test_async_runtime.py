@@ -0,0 +1,199 @@
+"""
+Tests for the asyncio runtime core.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from context import mtr2mqtt
+from mtr2mqtt import async_runtime
+from mtr2mqtt import replay
+from mtr2mqtt import runtime
+
+
+class _QueuedSerial:
+    """
+    Fake receiver serial port that answers polls from a list of SCL payloads.
+    """
+
+    def __init__(self, port, payloads):
+        self.name = self.port = port
+        self.payloads = list(payloads)
+        self.frame = b""
+
+    def write(self, _command):
+        payload = self.payloads.pop(0) if self.payloads else "#"
+        self.frame = b"\x80" + payload.encode("ascii") + b"\x03"
+
+    def read_until(self, _end):
+        return self.frame
+
+    def read(self, _size):
+        return runtime.scl.calc_bcc(self.frame)
+
+
+class _FakeClient:
+    connected_flag = True
+
+    def __init__(self):
+        self.calls = []
+
+    def publish(self, topic, **kwargs):
+        self.calls.append((topic, kwargs["payload"]))
+        return (0, len(self.calls))
+
+
+def _receiver(port, serial_number, payloads):
+    return runtime.ReceiverConnection(
+        serial_handle=_QueuedSerial(port, payloads),
+        device_type="RTR970",
+        receiver_serial_number=serial_number,
+        serial_config={},
+    )
+
+
+async def _run_briefly(bridge, seconds=0.3):
+    try:
+        await asyncio.wait_for(bridge.run(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _measurement_calls(client):
+    """
+    Return measurement publishes without their receive timestamps.
+    """
+    calls = []
+    for topic, payload in client.calls:
+        if topic.startswith("measurements/"):
+            measurement = json.loads(payload)
+            measurement.pop("timestamp")
+            calls.append((topic, measurement))
+    return calls
+
+
+def _start_with(bridge, receivers, client):
+    def start():
+        bridge.receivers = receivers
+        bridge.mqtt_client = client
+        bridge.state = runtime.BridgeState.READY
+
+    return start
+
+
+def test_async_bridge_publishes_like_threaded_bridge(monkeypatch):
+    """
+    The asyncio runtime publishes the same topics and payloads as MtrBridge.
+    """
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
+    payloads = ["0 90 58 15006 145 11", "0 90 58 15007 145 11"]
+
+    threaded = runtime.MtrBridge(SimpleNamespace(scl_address=126))
+    threaded.receiver = _receiver("/dev/ttyUSB0", "RTR970123", payloads)
+    threaded.mqtt_client = _FakeClient()
+    while threaded._poll_cycle() is runtime.BridgeState.READY:
+        pass
+
+    bridge = async_runtime.AsyncMtrBridge(SimpleNamespace(scl_address=126))
+    client = _FakeClient()
+    monkeypatch.setattr(
+        bridge,
+        "start",
+        _start_with(
+            bridge,
+            [_receiver("/dev/ttyUSB0", "RTR970123", payloads)],
+            client,
+        ),
+    )
+
+    asyncio.run(_run_briefly(bridge))
+
+    assert _measurement_calls(client) == _measurement_calls(threaded.mqtt_client)
+    assert len(_measurement_calls(client)) == 2
+    assert {topic for topic, _payload in client.calls} >= {
+        "status/RTR970123/15006",
+        "status/RTR970123/15007",
+    }
+
+
+def test_async_bridge_runs_one_reader_task_per_receiver(monkeypatch):
+    """
+    Every receiver is polled by its own reader task.
+    """
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
+    bridge = async_runtime.AsyncMtrBridge(SimpleNamespace(scl_address=126))
+    client = _FakeClient()
+    receivers = [
+        _receiver("/dev/ttyUSB0", "RTR970123", ["0 90 58 15006 145 11"]),
+        _receiver("/dev/ttyUSB1", "RTR970456", ["0 90 58 16001 145 11"]),
+    ]
+    monkeypatch.setattr(bridge, "start", _start_with(bridge, receivers, client))
+    reader_counts = []
+    original = bridge._read_receiver
+
+    async def read_receiver(receiver):
+        reader_counts.append(receiver.receiver_serial_number)
+        await original(receiver)
+
+    monkeypatch.setattr(bridge, "_read_receiver", read_receiver)
+
+    asyncio.run(_run_briefly(bridge))
+
+    topics = [topic for topic, _payload in client.calls]
+    assert sorted(reader_counts) == ["RTR970123", "RTR970456"]
+    assert "measurements/RTR970123/15006" in topics
+    assert "measurements/RTR970456/16001" in topics
+
+
+def test_async_bridge_surfaces_receiver_errors(monkeypatch):
+    """
+    Receiver errors raised by a task stop the runtime like in MtrBridge.
+    """
+    bridge = async_runtime.AsyncMtrBridge(SimpleNamespace(scl_address=126))
+    monkeypatch.setattr(bridge, "start", lambda: None)
+
+    def fail(_args, **_kwargs):
+        raise runtime.ReceiverConnectionError("Unable to open serial port /dev/x")
+
+    monkeypatch.setattr(runtime, "open_receiver_connections", fail)
+
+    with pytest.raises(runtime.ReceiverConnectionError):
+        asyncio.run(_run_briefly(bridge, seconds=1))
+
+
+def test_async_bridge_flushes_pending_summaries_when_replay_finishes(monkeypatch):
+    """
+    The end of a replay publishes debounced summaries and saves the state.
+    """
+    bridge = async_runtime.AsyncMtrBridge(
+        SimpleNamespace(scl_address=126, summary_debounce_seconds=60)
+    )
+    class StoppableClient(_FakeClient):
+        def loop_stop(self):
+            pass
+
+        def disconnect(self):
+            pass
+
+    bridge.mqtt_client = StoppableClient()
+    saves = []
+    bridge.state_saver = SimpleNamespace(save=lambda force=False: saves.append(force))
+
+    async def replay_one_measurement():
+        bridge.summary_tracker.record_measurement(
+            "RTR970123",
+            {"id": "15006", "reading": 22.9},
+        )
+        raise replay.ReplayFinished(1, 0.5)
+
+    monkeypatch.setattr(bridge, "run", replay_one_measurement)
+
+    bridge.run_forever()
+
+    assert [topic for topic, _payload in bridge.mqtt_client.calls] == [
+        "summary/RTR970123"
+    ]
+    assert True in saves
+    assert bridge.state is runtime.BridgeState.STOPPED
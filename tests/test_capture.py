@@ -0,0 +1,144 @@
+"""
+Tests for the binary serial traffic capture.
+"""
+
+import os
+
+from context import mtr2mqtt
+from mtr2mqtt import capture
+from mtr2mqtt import replay
+from mtr2mqtt import scl
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSerial:
+    name = port = "/dev/ttyUSB0"
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.frame = b""
+
+    def write(self, command):
+        self.frame = self.responses.pop(0)
+        return len(command)
+
+    def read_until(self, _end):
+        return self.frame[:-1]
+
+    def read(self, _size):
+        return self.frame[-1:]
+
+
+def test_capturing_serial_records_requests_and_responses(tmp_path):
+    """
+    Every write and read is stored with its direction and offset.
+    """
+    path = tmp_path / "serial.cap"
+    clock = FakeClock()
+    capture_log = capture.CaptureLog(str(path), monotonic=clock)
+    response = scl.create_response("0 90 58 15006 145 11")
+    serial_handle = capture.CapturingSerial(FakeSerial([response]), capture_log)
+    poll_command = scl.create_command("DBG 1 ?")
+
+    clock.now += 0.5
+    serial_handle.write(poll_command)
+    clock.now += 0.25
+    serial_handle.read_until(scl.END_CHAR)
+    serial_handle.read(1)
+    capture_log.close()
+
+    assert serial_handle.port == "/dev/ttyUSB0"
+    assert list(capture.read_records(path)) == [
+        capture.CaptureRecord(0.5, capture.DIRECTION_WRITE, poll_command),
+        capture.CaptureRecord(0.75, capture.DIRECTION_READ, response[:-1]),
+        capture.CaptureRecord(0.75, capture.DIRECTION_READ, response[-1:]),
+    ]
+
+
+def test_capture_log_rotates_at_size_limit(tmp_path):
+    """
+    A flush of a full capture file moves it to <path>.1 and starts a new file.
+    """
+    path = tmp_path / "serial.cap"
+    record_size = capture.RECORD.size + 10
+    capture_log = capture.CaptureLog(
+        str(path),
+        max_bytes=capture.HEADER.size + 2 * record_size,
+    )
+
+    for index in range(2):
+        capture_log.record(capture.DIRECTION_READ, bytes([index]) * 10)
+    assert not (tmp_path / "serial.cap.1").exists()
+    capture_log.flush()
+    capture_log.record(capture.DIRECTION_READ, b"\x02" * 10)
+    capture_log.close()
+
+    assert [record.data for record in capture.read_records(f"{path}.1")] == [
+        b"\x00" * 10,
+        b"\x01" * 10,
+    ]
+    assert [record.data for record in capture.read_records(path)] == [b"\x02" * 10]
+
+
+def test_read_records_stops_at_truncated_record(tmp_path, caplog):
+    """
+    A record cut short by an unclean shutdown is ignored.
+    """
+    path = tmp_path / "serial.cap"
+    capture_log = capture.CaptureLog(str(path))
+    capture_log.record(capture.DIRECTION_WRITE, b"request")
+    capture_log.record(capture.DIRECTION_READ, b"response")
+    capture_log.close()
+    os.truncate(path, os.path.getsize(path) - 3)
+
+    assert [record.data for record in capture.read_records(path)] == [b"request"]
+    assert "truncated" in caplog.text
+
+
+def test_replay_loads_poll_responses_from_binary_capture(tmp_path):
+    """
+    Reads after a poll are joined into one frame; other responses are skipped.
+    """
+    path = tmp_path / "serial.cap"
+    clock = FakeClock()
+    capture_log = capture.CaptureLog(str(path), monotonic=clock)
+    responses = [
+        scl.create_response("RTR970"),
+        scl.create_response("0 90 58 15006 145 11"),
+        scl.create_response("#"),
+    ]
+    serial_handle = capture.CapturingSerial(FakeSerial(responses), capture_log)
+    for command in ("TYPE ?", "DBG 1 ?", "DBG 1 ?"):
+        clock.now += 1
+        serial_handle.write(scl.create_command(command))
+        serial_handle.read_until(scl.END_CHAR)
+        serial_handle.read(1)
+    capture_log.close()
+
+    assert replay.load_capture(path) == [
+        replay.ReplayFrame(responses[1], 2.0),
+        replay.ReplayFrame(responses[2], 3.0),
+    ]
+
+
+def test_wrap_only_proxies_while_capture_is_active(tmp_path):
+    """
+    Serial handles are wrapped only between start and stop.
+    """
+    serial_handle = FakeSerial([])
+    assert capture.wrap(serial_handle) is serial_handle
+
+    capture.start(str(tmp_path / "serial.cap"))
+    try:
+        assert isinstance(capture.wrap(serial_handle), capture.CapturingSerial)
+    finally:
+        capture.stop()
+
+    assert capture.wrap(serial_handle) is serial_handle
@@ -37,16 +37,39 @@ def test_parser_defaults_without_arguments(monkeypatch):
     monkeypatch.delenv("MTR2MQTT_SERIAL_TIMEOUT", raising=False)
     monkeypatch.delenv("MTR2MQTT_OFFLINE_TIMEOUT", raising=False)
     monkeypatch.delenv("MTR2MQTT_SUMMARY_DEBOUNCE_SECONDS", raising=False)
+    monkeypatch.delenv("MTR2MQTT_SUMMARY_DELTA", raising=False)
+    monkeypatch.delenv("MTR2MQTT_SUMMARY_FULL_INTERVAL", raising=False)
+    monkeypatch.delenv("MTR2MQTT_DRAIN_MODE", raising=False)
+    monkeypatch.delenv("MTR2MQTT_DRAIN_MAX_PACKETS", raising=False)
+    monkeypatch.delenv("MTR2MQTT_POLL_INTERVAL_MIN", raising=False)
+    monkeypatch.delenv("MTR2MQTT_POLL_INTERVAL_MAX", raising=False)
+    monkeypatch.delenv("MTR2MQTT_RUNTIME", raising=False)
+    monkeypatch.delenv("MTR2MQTT_PIPELINE", raising=False)
+    monkeypatch.delenv("MTR2MQTT_PIPELINE_QUEUE_SIZE", raising=False)
+    monkeypatch.delenv("MTR2MQTT_PIPELINE_OVERFLOW", raising=False)
+    monkeypatch.delenv("MTR2MQTT_SPOOL_FILE", raising=False)
+    monkeypatch.delenv("MTR2MQTT_STATE_FILE", raising=False)
+    monkeypatch.delenv("MTR2MQTT_METRICS_PORT", raising=False)
+    monkeypatch.delenv("MTR2MQTT_METRICS_HOST", raising=False)
+    monkeypatch.delenv("MTR2MQTT_STATE_SAVE_INTERVAL", raising=False)
+    monkeypatch.delenv("MTR2MQTT_SPOOL_MAX_BYTES", raising=False)
+    monkeypatch.delenv("MTR2MQTT_SPOOL_MAX_AGE", raising=False)
+    monkeypatch.delenv("MTR2MQTT_SPOOL_REPLAY_RATE", raising=False)
     monkeypatch.delenv("MTR2MQTT_SCL_ADDRESS", raising=False)
     monkeypatch.delenv("MTR2MQTT_MQTT_HOST", raising=False)
     monkeypatch.delenv("MTR2MQTT_MQTT_PORT", raising=False)
     monkeypatch.delenv("MTR2MQTT_METADATA_FILE", raising=False)
     monkeypatch.delenv("MTR2MQTT_METADATA_TRANSMITTERS_ONLY", raising=False)
+    monkeypatch.delenv("MTR2MQTT_METADATA_WATCH", raising=False)
+    monkeypatch.delenv("MTR2MQTT_METADATA_WATCH_INTERVAL", raising=False)
     monkeypatch.delenv("MTR2MQTT_OUTPUT", raising=False)
+    monkeypatch.delenv("MTR2MQTT_TABLE_MAX_FPS", raising=False)
     monkeypatch.delenv("MTR2MQTT_HA_DISCOVERY", raising=False)
     monkeypatch.delenv("MTR2MQTT_HA_DISCOVERY_PREFIX", raising=False)
     monkeypatch.delenv("MTR2MQTT_HA_DISCOVERY_RETAIN", raising=False)
     monkeypatch.delenv("MTR2MQTT_HA_DISCOVERY_NODE_ID", raising=False)
+    monkeypatch.delenv("MTR2MQTT_HA_DISCOVERY_WARM_UP", raising=False)
+    monkeypatch.delenv("MTR2MQTT_HA_DISCOVERY_WARM_UP_RATE", raising=False)
     monkeypatch.delenv("MTR2MQTT_DEBUG", raising=False)
     monkeypatch.delenv("MTR2MQTT_QUIET", raising=False)
 
@@ -58,16 +81,39 @@ def test_parser_defaults_without_arguments(monkeypatch):
     assert args.serial_timeout == 1
     assert args.offline_timeout == 1800
     assert args.summary_debounce_seconds == 5
+    assert args.summary_delta is False
+    assert args.summary_full_interval == 300
+    assert args.drain_mode is False
+    assert args.drain_max_packets == 100
+    assert args.poll_interval_min == 0.1
+    assert args.poll_interval_max == 1.0
+    assert args.runtime == "threaded"
+    assert args.pipeline is False
+    assert args.pipeline_queue_size == 1000
+    assert args.pipeline_overflow == "block"
+    assert args.spool_file is None
+    assert args.state_file is None
+    assert args.metrics_port is None
+    assert args.metrics_host == ""
+    assert args.state_save_interval == 60
+    assert args.spool_max_bytes == 16 * 1024 * 1024
+    assert args.spool_max_age == 24 * 60 * 60
+    assert args.spool_replay_rate == 20.0
     assert args.scl_address == 126
     assert args.mqtt_host is None
     assert args.mqtt_port == 1883
     assert args.metadata_file is None
     assert args.metadata_transmitters_only is False
+    assert args.metadata_watch is False
+    assert args.metadata_watch_interval == 5
     assert args.output == "json"
+    assert args.table_max_fps == 10
     assert args.ha_discovery is False
     assert args.ha_discovery_prefix == "homeassistant"
     assert args.ha_discovery_retain is True
     assert args.ha_discovery_node_id is None
+    assert args.ha_discovery_warm_up is False
+    assert args.ha_discovery_warm_up_rate == 10.0
     assert args.debug is False
     assert args.quiet is False
     assert args.version is False
@@ -77,42 +123,88 @@ def test_parser_reads_environment_defaults(monkeypatch):
     """
     Parser uses supported environment variables as defaults.
     """
-    monkeypatch.setenv("MTR2MQTT_SERIAL_PORT", "/dev/ttyUSB0")
+    monkeypatch.setenv("MTR2MQTT_SERIAL_PORT", "/dev/ttyUSB0, /dev/ttyUSB1")
     monkeypatch.setenv("MTR2MQTT_BAUDRATE", "115200")
     monkeypatch.setenv("MTR2MQTT_SERIAL_TIMEOUT", "5")
     monkeypatch.setenv("MTR2MQTT_OFFLINE_TIMEOUT", "120")
     monkeypatch.setenv("MTR2MQTT_SUMMARY_DEBOUNCE_SECONDS", "7")
+    monkeypatch.setenv("MTR2MQTT_SUMMARY_DELTA", "true")
+    monkeypatch.setenv("MTR2MQTT_SUMMARY_FULL_INTERVAL", "600")
+    monkeypatch.setenv("MTR2MQTT_DRAIN_MODE", "true")
+    monkeypatch.setenv("MTR2MQTT_DRAIN_MAX_PACKETS", "25")
+    monkeypatch.setenv("MTR2MQTT_POLL_INTERVAL_MIN", "0.25")
+    monkeypatch.setenv("MTR2MQTT_POLL_INTERVAL_MAX", "10")
+    monkeypatch.setenv("MTR2MQTT_RUNTIME", "asyncio")
+    monkeypatch.setenv("MTR2MQTT_PIPELINE", "true")
+    monkeypatch.setenv("MTR2MQTT_PIPELINE_QUEUE_SIZE", "50")
+    monkeypatch.setenv("MTR2MQTT_PIPELINE_OVERFLOW", "coalesce")
+    monkeypatch.setenv("MTR2MQTT_SPOOL_FILE", "/data/spool.db")
+    monkeypatch.setenv("MTR2MQTT_STATE_FILE", "/data/state.json")
+    monkeypatch.setenv("MTR2MQTT_METRICS_PORT", "9108")
+    monkeypatch.setenv("MTR2MQTT_METRICS_HOST", "127.0.0.1")
+    monkeypatch.setenv("MTR2MQTT_STATE_SAVE_INTERVAL", "15")
+    monkeypatch.setenv("MTR2MQTT_SPOOL_MAX_BYTES", "1024")
+    monkeypatch.setenv("MTR2MQTT_SPOOL_MAX_AGE", "600")
+    monkeypatch.setenv("MTR2MQTT_SPOOL_REPLAY_RATE", "5")
     monkeypatch.setenv("MTR2MQTT_SCL_ADDRESS", "1")
     monkeypatch.setenv("MTR2MQTT_MQTT_HOST", "mqtt.example")
     monkeypatch.setenv("MTR2MQTT_MQTT_PORT", "1884")
     monkeypatch.setenv("MTR2MQTT_METADATA_FILE", "tests/metadata.yml")
     monkeypatch.setenv("MTR2MQTT_METADATA_TRANSMITTERS_ONLY", "true")
+    monkeypatch.setenv("MTR2MQTT_METADATA_WATCH", "true")
+    monkeypatch.setenv("MTR2MQTT_METADATA_WATCH_INTERVAL", "2")
     monkeypatch.setenv("MTR2MQTT_OUTPUT", "table")
+    monkeypatch.setenv("MTR2MQTT_TABLE_MAX_FPS", "4")
     monkeypatch.setenv("MTR2MQTT_HA_DISCOVERY", "true")
     monkeypatch.setenv("MTR2MQTT_HA_DISCOVERY_PREFIX", "ha")
     monkeypatch.setenv("MTR2MQTT_HA_DISCOVERY_RETAIN", "false")
     monkeypatch.setenv("MTR2MQTT_HA_DISCOVERY_NODE_ID", "bridge-1")
+    monkeypatch.setenv("MTR2MQTT_HA_DISCOVERY_WARM_UP", "true")
+    monkeypatch.setenv("MTR2MQTT_HA_DISCOVERY_WARM_UP_RATE", "2.5")
     monkeypatch.setenv("MTR2MQTT_DEBUG", "true")
     monkeypatch.delenv("MTR2MQTT_QUIET", raising=False)
 
     parser = cli.create_parser()
     args = parser.parse_args([])
 
-    assert args.serial_port == "/dev/ttyUSB0"
+    assert args.serial_port == ["/dev/ttyUSB0", "/dev/ttyUSB1"]
     assert args.baudrate == 115200
     assert args.serial_timeout == 5
     assert args.offline_timeout == 120
     assert args.summary_debounce_seconds == 7
+    assert args.summary_delta is True
+    assert args.summary_full_interval == 600
+    assert args.drain_mode is True
+    assert args.drain_max_packets == 25
+    assert args.poll_interval_min == 0.25
+    assert args.poll_interval_max == 10.0
+    assert args.runtime == "asyncio"
+    assert args.pipeline is True
+    assert args.pipeline_queue_size == 50
+    assert args.pipeline_overflow == "coalesce"
+    assert args.spool_file == "/data/spool.db"
+    assert args.state_file == "/data/state.json"
+    assert args.metrics_port == 9108
+    assert args.metrics_host == "127.0.0.1"
+    assert args.state_save_interval == 15
+    assert args.spool_max_bytes == 1024
+    assert args.spool_max_age == 600
+    assert args.spool_replay_rate == 5.0
     assert args.scl_address == 1
     assert args.mqtt_host == "mqtt.example"
     assert args.mqtt_port == 1884
     assert args.metadata_file == "tests/metadata.yml"
     assert args.metadata_transmitters_only is True
+    assert args.metadata_watch is True
+    assert args.metadata_watch_interval == 2
     assert args.output == "table"
+    assert args.table_max_fps == 4
     assert args.ha_discovery is True
     assert args.ha_discovery_prefix == "ha"
     assert args.ha_discovery_retain is False
     assert args.ha_discovery_node_id == "bridge-1"
+    assert args.ha_discovery_warm_up is True
+    assert args.ha_discovery_warm_up_rate == 2.5
     assert args.debug is True
     assert args.quiet is False
 
@@ -127,6 +219,47 @@ def test_parser_rejects_invalid_integer_environment_default(monkeypatch):
         cli.create_parser()
 
 
+def test_parser_rejects_invalid_float_environment_default(monkeypatch):
+    """
+    Invalid numeric environment defaults raise a clear configuration error.
+    """
+    monkeypatch.setenv("MTR2MQTT_POLL_INTERVAL_MAX", "slow")
+
+    with pytest.raises(cli.CliConfigurationError):
+        cli.create_parser()
+
+
+def test_parser_rejects_non_positive_spool_replay_rate(monkeypatch):
+    """
+    A spool replay rate of 0 or less would never drain the spool.
+    """
+    parser = cli.create_parser()
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--spool-replay-rate", "0"])
+
+    monkeypatch.setenv("MTR2MQTT_SPOOL_REPLAY_RATE", "-1")
+    with pytest.raises(cli.CliConfigurationError):
+        cli.create_parser()
+
+
+def test_parser_rejects_bridge_status_topic_with_unknown_placeholder(monkeypatch):
+    """
+    A bridge status topic template may only reference {receiver}.
+    """
+    parser = cli.create_parser()
+
+    args = parser.parse_args(["--bridge-status-topic", "mtr/{receiver}/bridge"])
+    assert args.bridge_status_topic == "mtr/{receiver}/bridge"
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--bridge-status-topic", "mtr/{serial}/bridge"])
+
+    monkeypatch.setenv("MTR2MQTT_BRIDGE_STATUS_TOPIC", "mtr/{0}/bridge")
+    with pytest.raises(cli.CliConfigurationError):
+        cli.create_parser()
+
+
 def test_parser_debug_flag_enables_debug():
     """
     The debug flag is parsed as a boolean store_true option.
@@ -218,6 +351,19 @@ def test_parser_parses_common_options():
     assert args.output == "table"
 
 
+def test_parser_repeated_serial_port_replaces_environment_default(monkeypatch):
+    """
+    Repeated --serial-port options build a list that overrides the environment.
+    """
+    monkeypatch.setenv("MTR2MQTT_SERIAL_PORT", "/dev/ttyUSB9")
+    parser = cli.create_parser()
+
+    args = parser.parse_args(["-s", "/dev/ttyUSB0", "--serial-port", "/dev/ttyUSB1"])
+
+    assert args.serial_port == ["/dev/ttyUSB0", "/dev/ttyUSB1"]
+    assert parser.parse_args([]).serial_port == ["/dev/ttyUSB9"]
+
+
 def test_parser_rejects_invalid_scl_address():
     """
     The parser rejects unsupported SCL addresses.
@@ -244,13 +390,15 @@ def test_create_discovery_publisher_returns_none_when_disabled():
 
 def test_create_discovery_publisher_uses_cli_configuration():
     """
-    Discovery publisher creation preserves the configured prefix, retain, and node id.
+    Discovery publisher creation preserves the configured prefix, retain, node id
+    and warm-up rate.
     """
     args = SimpleNamespace(
         ha_discovery=True,
         ha_discovery_prefix="ha",
         ha_discovery_retain=False,
         ha_discovery_node_id="bridge-1",
+        ha_discovery_warm_up_rate=2.5,
     )
 
     publisher = cli.create_discovery_publisher(args)
@@ -258,6 +406,7 @@ def test_create_discovery_publisher_uses_cli_configuration():
     assert publisher.discovery_prefix == "ha"
     assert publisher.retain is False
     assert publisher.node_id == "bridge-1"
+    assert publisher.warm_up_rate == 2.5
 
 
 def test_main_exits_cleanly_when_runtime_startup_fails(monkeypatch):
@@ -307,3 +456,32 @@ def test_main_exits_cleanly_when_environment_defaults_are_invalid(monkeypatch, c
 
     assert error.value.code == -1
     assert "MTR2MQTT_MQTT_PORT must be an integer" in capsys.readouterr().err
+
+
+def test_main_uses_asyncio_runtime_when_selected(monkeypatch):
+    """
+    The asyncio runtime is selected with --runtime asyncio.
+    """
+    args = SimpleNamespace(version=False, runtime="asyncio")
+    captured = {}
+
+    class FakeAsyncBridge:
+        def __init__(self, *_args, **_kwargs):
+            captured["bridge"] = "asyncio"
+
+        def run_forever(self):
+            captured["ran"] = True
+
+    monkeypatch.setattr(
+        cli,
+        "create_parser",
+        lambda: SimpleNamespace(parse_args=lambda: args),
+    )
+    monkeypatch.setattr(cli, "configure_logging", lambda _args: None)
+    monkeypatch.setattr(cli, "load_metadata", lambda _args: None)
+    monkeypatch.setattr(cli, "create_discovery_publisher", lambda _args: None)
+    monkeypatch.setattr(cli, "AsyncMtrBridge", FakeAsyncBridge)
+
+    cli.main()
+
+    assert captured == {"bridge": "asyncio", "ran": True}
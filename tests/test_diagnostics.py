@@ -0,0 +1,97 @@
+"""
+Tests for the retained bridge diagnostics.
+"""
+
+from context import mtr2mqtt
+from mtr2mqtt import diagnostics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bridge_status_topic_supports_default_and_template():
+    """
+    The default topic sits next to the receiver status topics.
+    """
+    assert diagnostics.bridge_status_topic("RTR970123") == "status/RTR970123/bridge"
+    assert (
+        diagnostics.bridge_status_topic("RTR 970/1", "bridges/{receiver}/stats")
+        == "bridges/RTR_970_1/stats"
+    )
+
+
+def test_percentile_uses_nearest_rank():
+    """
+    Percentiles pick an observed sample instead of interpolating.
+    """
+    values = list(range(1, 101))
+
+    assert diagnostics.percentile([], 50) is None
+    assert diagnostics.percentile(values, 50) == 50
+    assert diagnostics.percentile(values, 95) == 95
+    assert diagnostics.percentile(values, 99) == 99
+    assert diagnostics.percentile([7], 99) == 7
+
+
+def test_payload_reports_rates_rtt_and_state_time():
+    """
+    Rates cover the interval since the previous payload.
+    """
+    clock = FakeClock()
+    bridge_diagnostics = diagnostics.BridgeDiagnostics(rtt_samples=3, monotonic=clock)
+    bridge_diagnostics.record_state("starting")
+    clock.now += 2
+    bridge_diagnostics.record_state("receiving")
+    for seconds in (0.5, 0.01, 0.02, 0.03):
+        bridge_diagnostics.record_rtt(seconds)
+    for _ in range(20):
+        bridge_diagnostics.record_packet()
+    bridge_diagnostics.record_checksum_error()
+    clock.now += 8
+
+    payload = bridge_diagnostics.payload(mqtt_inflight=4)
+
+    assert payload["state"] == "receiving"
+    assert payload["packets_total"] == 20
+    assert payload["checksum_errors_total"] == 1
+    assert payload["packets_per_second"] == 2.0
+    assert payload["checksum_errors_per_second"] == 0.1
+    assert payload["mqtt_inflight"] == 4
+    assert payload["state_seconds"] == {"starting": 2.0, "receiving": 8.0}
+    assert payload["poll_rtt_p50_ms"] == 20.0
+    assert payload["poll_rtt_p99_ms"] == 30.0
+    assert payload["cpu_seconds"] >= 0
+
+    clock.now += 10
+    assert bridge_diagnostics.payload()["packets_per_second"] == 0.0
+
+
+def test_status_publisher_publishes_each_receiver_to_its_template_topic():
+    """
+    Every receiver gets its own diagnostics and its own retained topic.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs["retain"]))
+            return (0, len(self.calls))
+
+    publisher = diagnostics.BridgeStatusPublisher(topic_template="bridges/{receiver}")
+    publisher.diagnostics_for("RTR970123").record_packet()
+    client = FakeClient()
+
+    assert publisher.due() is True
+    assert publisher.due() is False
+    published = publisher.publish(client, ["RTR970123", "FTR980456"], "now")
+
+    assert client.calls == [("bridges/RTR970123", True), ("bridges/FTR980456", True)]
+    assert [payload["packets_total"] for payload, _mid in published] == [1, 0]
+    assert publisher.diagnostics_for("RTR970123") is publisher.diagnostics_for("RTR970123")
@@ -6,6 +6,9 @@ import json
 
 from context import mtr2mqtt
 from mtr2mqtt import homeassistant
+from mtr2mqtt import metadata
+from mtr2mqtt import mtr
+from mtr2mqtt import topics
 
 
 def test_discovery_topic_without_node_id():
@@ -33,6 +36,29 @@ def test_discovery_topic_with_node_id():
     )
 
 
+def test_state_topic_is_built_once_per_receiver_and_sensor(monkeypatch):
+    """
+    Repeated publishes for the same sensor reuse the cached topic string.
+    """
+    homeassistant.state_topic.cache_clear()
+    calls = []
+    original = homeassistant.topic_fragment
+    monkeypatch.setattr(
+        homeassistant,
+        "topic_fragment",
+        lambda value: calls.append(value) or original(value),
+    )
+
+    first = homeassistant.state_topic("RTR970123", "15006")
+    second = homeassistant.state_topic("RTR970123", "15006")
+
+    assert first == second == "measurements/RTR970123/15006"
+    assert calls == ["RTR970123", "15006"]
+    assert homeassistant.state_topic.cache_info().hits == 1
+    assert homeassistant.state_topic.cache_info().maxsize == topics.TOPIC_CACHE_SIZE
+    homeassistant.state_topic.cache_clear()
+
+
 def test_state_topic_sanitizes_receiver_and_sensor_fragments():
     """
     Measurement topics keep receiver and sensor ids within one topic level each.
@@ -290,6 +316,36 @@ def test_discovery_publisher_only_marks_successful_publishes():
     assert len(client.calls) == 2
 
 
+def test_bridge_discovery_publish_errors_are_logged_not_raised(caplog):
+    """
+    A failing bridge discovery publish does not stop the bridge status
+    publish, and is retried on the next one.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = 0
+
+        def publish(self, *_args, **_kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("client is shutting down")
+            return (0, 1)
+
+    publisher = homeassistant.DiscoveryPublisher("homeassistant")
+    client = FakeClient()
+
+    with caplog.at_level("ERROR"):
+        assert (
+            publisher.publish_bridge_if_needed(client, "RTR970123", "status/bridge")
+            is False
+        )
+
+    assert "RTR970123" in caplog.records[-1].getMessage()
+    assert publisher.publish_bridge_if_needed(client, "RTR970123", "status/bridge")
+    assert client.calls == 2
+
+
 def test_discovery_publisher_skips_repeated_publish_after_success():
     """
     Discovery is published only once per receiver and sensor during the process lifetime.
@@ -317,3 +373,194 @@ def test_discovery_publisher_skips_repeated_publish_after_success():
     assert publisher.publish_if_needed(client, "RTR970123", measurement) is True
     assert len(client.calls) == 1
     assert client.calls[0][1]["retain"] is False
+
+
+def test_discovery_publisher_republishes_only_changed_sensors():
+    """
+    Metadata reloads re-publish discovery for announced sensors that changed.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
+
+    publisher = homeassistant.DiscoveryPublisher("homeassistant")
+    client = FakeClient()
+    for sensor_id in ("15006", "15007"):
+        publisher.publish_if_needed(
+            client,
+            "RTR970123",
+            {
+                "id": sensor_id,
+                "type": "FT10",
+                "reading": 22.9,
+                "location": "Old room",
+            },
+        )
+
+    republished = publisher.republish_changed(
+        client,
+        {15006, 99999},
+        metadata.TransmitterMetadataIndex([{"id": 15006, "location": "New room"}]),
+    )
+
+    assert republished == [("RTR970123", "15006")]
+    assert len(client.calls) == 3
+    assert client.calls[-1][0] == "homeassistant/device/15006/config"
+    payload = json.loads(client.calls[-1][1]["payload"])
+    assert payload["dev"]["suggested_area"] == "New room"
+    assert payload["dev"]["mdl"] == "FT10"
+
+
+def test_discovery_warm_up_publishes_metadata_transmitters_provisionally():
+    """
+    Warm-up announces metadata transmitters that were not announced yet, and
+    the first real measurement re-publishes only when its metadata differs.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
+
+    publisher = homeassistant.DiscoveryPublisher("homeassistant", warm_up_rate=0)
+    client = FakeClient()
+    publisher.publish_if_needed(
+        client,
+        "RTR970123",
+        {"id": "15008", "type": "FT10", "reading": 1.0},
+    )
+    metadata_index = metadata.TransmitterMetadataIndex(
+        [
+            {"id": 15006, "location": "Kitchen"},
+            {"id": 15007, "location": "Sauna"},
+            {"id": 15008, "location": "Garage"},
+        ]
+    )
+
+    assert publisher.warm_up(client, "RTR970123", metadata_index) == 2
+    assert [topic for topic, _kwargs in client.calls[1:]] == [
+        "homeassistant/device/15006/config",
+        "homeassistant/device/15007/config",
+    ]
+    assert publisher.has_published("RTR970123", "15006")
+
+    publisher.publish_if_needed(
+        client,
+        "RTR970123",
+        {"id": 15006, "location": "Kitchen", "type": "FT10", "reading": 22.9},
+    )
+    assert len(client.calls) == 3
+
+    publisher.publish_if_needed(
+        client,
+        "RTR970123",
+        {"id": 15007, "location": "Steam room", "type": "FT10", "reading": 80.0},
+    )
+    assert len(client.calls) == 4
+    assert json.loads(client.calls[-1][1]["payload"])["dev"]["mdl"] == "FT10"
+
+    publisher.publish_if_needed(
+        client,
+        "RTR970123",
+        {"id": 15007, "location": "Steam room", "type": "FT10", "reading": 81.0},
+    )
+    assert len(client.calls) == 4
+
+
+def test_warmed_up_discovery_is_not_republished_for_decoded_measurement():
+    """
+    A decoded FT10 packet adds model, reading and diagnostics fields, which
+    must not re-publish discovery that was warmed up from the same metadata.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
+
+    metadata_index = metadata.TransmitterMetadataIndex(
+        [{"id": 15006, "location": "Kitchen", "unit": "°C", "quantity": "Temperature"}]
+    )
+    publisher = homeassistant.DiscoveryPublisher("homeassistant", warm_up_rate=0)
+    client = FakeClient()
+    publisher.warm_up(client, "RTR970123", metadata_index)
+    measurement = mtr.mtr_response_to_measurement(
+        "0 90 58 15006 145 11",
+        metadata_index,
+    )
+
+    assert publisher.publish_if_needed(client, "RTR970123", measurement.data) is True
+    assert len(client.calls) == 1
+    payload = json.loads(client.calls[0][1]["payload"])
+    assert payload["cmps"]["reading"]["state_class"] == "measurement"
+    assert payload["cmps"]["reading"]["device_class"] == "temperature"
+
+
+def test_discovery_payloads_resolve_origin_version_once(monkeypatch):
+    """
+    The installed package version is looked up once per process.
+    """
+    homeassistant._origin.cache_clear()
+    lookups = []
+    monkeypatch.setattr(
+        homeassistant,
+        "version",
+        lambda name: lookups.append(name) or "1.2.3",
+    )
+
+    for sensor_id in ("15006", "15007"):
+        payload = json.loads(
+            homeassistant.build_discovery_payload(
+                "RTR970123",
+                {"id": sensor_id, "reading": 22.7},
+            )
+        )
+        assert payload["o"]["sw"] == "1.2.3"
+        assert payload["cmps"]["battery"]["unique_id"] == f"{sensor_id}_battery"
+        assert payload["cmps"]["rsl"]["object_id"] == f"{sensor_id}_rsl"
+
+    assert lookups == ["mtr2mqtt"]
+    homeassistant._origin.cache_clear()
+
+
+def test_restored_discovery_is_only_republished_when_the_payload_changed():
+    """
+    Snapshot entries suppress discovery publishes whose digest is unchanged.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
+
+    measurement = {"id": "15006", "type": "FT10", "reading": 22.9}
+    publisher = homeassistant.DiscoveryPublisher("homeassistant")
+    publisher.publish_if_needed(FakeClient(), "RTR970123", measurement)
+
+    restored = homeassistant.DiscoveryPublisher("homeassistant")
+    restored.restore(publisher.snapshot())
+    client = FakeClient()
+
+    assert restored.publish_if_needed(client, "RTR970123", measurement) is True
+    assert client.calls == []
+
+    renamed = homeassistant.DiscoveryPublisher("homeassistant", node_id="bridge-2")
+    renamed.restore(publisher.snapshot())
+    renamed.publish_if_needed(client, "RTR970123", measurement)
+    assert [topic for topic, _kwargs in client.calls] == [
+        "homeassistant/device/bridge_2/15006/config",
+    ]
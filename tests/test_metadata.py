@@ -168,3 +168,86 @@ def test_metadata_get_data_returns_none_for_invalid_transmitter_id():
     Invalid transmitter ids do not raise during lookup.
     """
     assert metadata.get_data("not-a-number", METADATA_TEST_FILE_OUTPUT) is None
+
+
+def test_metadata_load_index_looks_up_transmitters_by_id():
+    """
+    metadata.load_index returns an index keyed by integer transmitter id.
+    """
+    index = metadata.load_index(METADATA_TEST_FILE)
+
+    assert len(index) == 2
+    assert index.ids() == [1234, 2345]
+    assert index.get(METADATA_TRANSMITTER_ID) == METADATA_TEST_TRANSMITTER_OUTPUT
+    assert index.get("2345") == METADATA_TEST_TRANSMITTER_OUTPUT
+    assert index.get(9999) is None
+    assert 1234 in index
+    assert "9999" not in index
+
+
+def test_metadata_index_drops_reserved_fields():
+    """
+    Reserved measurement fields are filtered once when the index is built.
+    """
+    index = metadata.TransmitterMetadataIndex([
+        {"id": 15006, "reading": 999, "battery": 9.9, "location": "Living room"},
+    ])
+
+    assert index.get(15006) == {"location": "Living room"}
+
+
+def test_metadata_index_keeps_first_entry_and_skips_malformed_entries():
+    """
+    Duplicate ids keep the first entry and malformed entries are ignored.
+    """
+    index = metadata.TransmitterMetadataIndex([
+        "invalid",
+        {"location": "No id"},
+        {"id": "2345", "location": "String id"},
+        {"id": 2345, "location": "Room 2"},
+        {"id": 2345, "location": "Duplicate"},
+    ])
+
+    assert index.ids() == [2345]
+    assert index.get(2345) == {"location": "Room 2"}
+
+
+def test_metadata_index_with_unexpected_content_is_empty():
+    """
+    Non-list metadata and invalid JSON produce an empty index.
+    """
+    assert len(metadata.TransmitterMetadataIndex({"id": 2345})) == 0
+    assert len(metadata.TransmitterMetadataIndex.from_json("{")) == 0
+    assert metadata.TransmitterMetadataIndex.from_json("null").get(2345) is None
+
+
+def test_metadata_as_index_accepts_index_json_and_none():
+    """
+    metadata.as_index passes indexes through and builds one from JSON text.
+    """
+    index = metadata.TransmitterMetadataIndex([{"id": 2345}])
+
+    assert metadata.as_index(index) is index
+    assert metadata.as_index(None) is None
+    assert metadata.as_index(METADATA_TEST_FILE_OUTPUT).get(2345) == (
+        METADATA_TEST_TRANSMITTER_OUTPUT
+    )
+
+
+def test_metadata_index_changed_ids_reports_added_removed_and_updated():
+    """
+    Index comparison only reports transmitters whose metadata differs.
+    """
+    previous = metadata.TransmitterMetadataIndex([
+        {"id": 1, "location": "Room"},
+        {"id": 2, "location": "Hall"},
+        {"id": 3, "location": "Attic"},
+    ])
+    current = metadata.TransmitterMetadataIndex([
+        {"id": 1, "location": "Room"},
+        {"id": 2, "location": "Kitchen"},
+        {"id": 4, "location": "Cellar"},
+    ])
+
+    assert current.changed_ids(previous) == {2, 3, 4}
+    assert current.changed_ids(None) == {1, 2, 4}
@@ -0,0 +1,94 @@
+"""
+Tests for metadata file hot reloading.
+"""
+
+import os
+import threading
+
+from context import mtr2mqtt
+from mtr2mqtt import metadata_watcher
+
+
+def _write_metadata(path, content, mtime_ns):
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_check_reloads_index_only_when_file_changes(tmp_path):
+    """
+    The watcher rebuilds the index once per file change.
+    """
+    metadata_file = tmp_path / "metadata.yml"
+    _write_metadata(metadata_file, "- id: 1234\n  location: Room\n", 1_000_000_000)
+    reloaded = []
+    watcher = metadata_watcher.MetadataWatcher(str(metadata_file), reloaded.append)
+
+    assert watcher.check() is False
+
+    _write_metadata(metadata_file, "- id: 1234\n  location: Hall\n", 2_000_000_000)
+
+    assert watcher.check() is True
+    assert watcher.check() is False
+    assert len(reloaded) == 1
+    assert reloaded[0].get(1234) == {"location": "Hall"}
+
+
+def test_check_keeps_previous_metadata_when_reload_fails(tmp_path):
+    """
+    Invalid YAML does not replace the running metadata index.
+    """
+    metadata_file = tmp_path / "metadata.yml"
+    _write_metadata(metadata_file, "- id: 1234\n", 1_000_000_000)
+    reloaded = []
+    watcher = metadata_watcher.MetadataWatcher(str(metadata_file), reloaded.append)
+
+    _write_metadata(metadata_file, ":\n  bad\n", 2_000_000_000)
+
+    assert watcher.check() is False
+    assert reloaded == []
+
+
+def test_check_ignores_missing_file(tmp_path):
+    """
+    A temporarily missing file is not treated as empty metadata.
+    """
+    metadata_file = tmp_path / "metadata.yml"
+    _write_metadata(metadata_file, "- id: 1234\n", 1_000_000_000)
+    reloaded = []
+    watcher = metadata_watcher.MetadataWatcher(str(metadata_file), reloaded.append)
+
+    metadata_file.unlink()
+
+    assert watcher.check() is False
+    assert reloaded == []
+
+
+def test_watcher_thread_reloads_replaced_file(tmp_path):
+    """
+    The background thread picks up an atomically replaced metadata file.
+    """
+    metadata_file = tmp_path / "metadata.yml"
+    _write_metadata(metadata_file, "- id: 1234\n", 1_000_000_000)
+    reloaded = threading.Event()
+    indexes = []
+
+    def on_reload(index):
+        indexes.append(index)
+        reloaded.set()
+
+    watcher = metadata_watcher.MetadataWatcher(
+        str(metadata_file),
+        on_reload,
+        poll_interval=0.05,
+    )
+    watcher.start()
+    try:
+        replacement = tmp_path / "metadata.yml.tmp"
+        _write_metadata(replacement, "- id: 2345\n", 2_000_000_000)
+        os.replace(replacement, metadata_file)
+
+        assert reloaded.wait(5)
+    finally:
+        watcher.stop()
+
+    assert indexes[-1].ids() == [2345]
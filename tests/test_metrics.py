@@ -0,0 +1,89 @@
+"""
+Tests for runtime metrics and the metrics HTTP endpoint.
+"""
+
+from urllib.request import urlopen
+
+from context import mtr2mqtt
+from mtr2mqtt import metrics
+from mtr2mqtt import mtr
+from mtr2mqtt import scl
+
+
+def test_registry_renders_prometheus_text_format():
+    """
+    Counters, gauges and cumulative histogram buckets use the text format.
+    """
+    registry = metrics.MetricsRegistry()
+    packets = registry.counter("test_packets_total", "Packets.")
+    depth = registry.gauge("test_queue_depth", "Depth.")
+    latency = registry.histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1))
+
+    packets.inc()
+    packets.inc(2)
+    depth.set_function(lambda: 7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_packets_total Packets.",
+        "# TYPE test_packets_total counter",
+        "test_packets_total 3",
+        "# HELP test_queue_depth Depth.",
+        "# TYPE test_queue_depth gauge",
+        "test_queue_depth 7",
+        "# HELP test_latency_seconds Latency.",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1"} 2',
+        'test_latency_seconds_bucket{le="+Inf"} 3',
+        "test_latency_seconds_sum 5.55",
+        "test_latency_seconds_count 3",
+    ]
+
+
+def test_protocol_errors_are_counted():
+    """
+    Checksum errors and payload size mismatches increment their counters.
+    """
+    checksum_errors = metrics.CHECKSUM_ERRORS.value
+    size_mismatches = metrics.SIZE_MISMATCHES.value
+
+    assert scl.parse_response(b"\x800 90 58 15006 145 11\x03", b"\x00") is None
+    assert mtr.mtr_response_to_measurement("0 122 58 15006 145", None) is None
+
+    assert metrics.CHECKSUM_ERRORS.value == checksum_errors + 1
+    assert metrics.SIZE_MISMATCHES.value == size_mismatches + 1
+
+
+def test_serial_timeouts_are_not_counted_as_checksum_errors():
+    """
+    An empty SCL response counts as a serial timeout only.
+    """
+    checksum_errors = metrics.CHECKSUM_ERRORS.value
+    serial_timeouts = metrics.SERIAL_TIMEOUTS.value
+
+    assert scl.parse_response(b"", b"") is None
+
+    assert metrics.CHECKSUM_ERRORS.value == checksum_errors
+    assert metrics.SERIAL_TIMEOUTS.value == serial_timeouts + 1
+
+
+def test_metrics_server_serves_registry_over_http():
+    """
+    The endpoint serves the registry on /metrics and 404 elsewhere.
+    """
+    registry = metrics.MetricsRegistry()
+    registry.counter("test_requests_total", "Requests.").inc()
+    server = metrics.MetricsServer(0, host="127.0.0.1", registry=registry)
+    server.start()
+    try:
+        with urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.stop()
+
+    assert "test_requests_total 1" in body
+    assert content_type.startswith("text/plain; version=0.0.4")
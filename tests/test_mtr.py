@@ -5,6 +5,7 @@ Tests for MTR module
 import json
 
 from freezegun import freeze_time
+from mtr2mqtt import metadata
 from mtr2mqtt import mtr
 
 
@@ -267,3 +268,81 @@ def test_mtr_response_to_json_returns_none_for_unknown_transmitter_type():
     Unknown transmitter types are ignored instead of crashing parsing.
     """
     assert mtr.mtr_response_to_json(MTR_UNKNOWN_TYPE_INPUT, None) is None
+
+
+@freeze_time("2020-09-23 19:34:13.497019+00:00")
+def test_mtr_response_to_json_with_metadata_index():
+    """
+    Prebuilt metadata indexes are merged the same way as metadata JSON.
+    """
+    transmitters_metadata = metadata.TransmitterMetadataIndex([
+        {"id": 15006, "location": "Living room", "reading": 999}
+    ])
+
+    assert json.loads(mtr.mtr_response_to_json(MTR_READING_INPUT, transmitters_metadata)) == {
+        **json.loads(MTR_READING_OUTPUT),
+        "location": "Living room",
+    }
+
+
+@freeze_time("2020-09-23 19:34:13.497019+00:00")
+def test_mtr_response_to_measurement_returns_typed_measurement():
+    """
+    Packets decode into a Measurement that renders the same JSON payload.
+    """
+    measurement = mtr.mtr_response_to_measurement(MTR_READING_INPUT, None)
+
+    assert isinstance(measurement, mtr.Measurement)
+    assert measurement.sensor_id == "15006"
+    assert measurement["reading"] == 22.9
+    assert measurement.get("location") is None
+    assert measurement.to_json() == MTR_READING_OUTPUT
+    assert measurement.to_json() is measurement.to_json()
+
+
+def test_measurement_from_json_keeps_original_text():
+    """
+    Measurements built from JSON are not re-serialized.
+    """
+    measurement_json = '{"id":"15006","reading":22.9}'
+
+    measurement = mtr.Measurement.from_json(measurement_json)
+
+    assert measurement.sensor_id == "15006"
+    assert measurement.to_json() is measurement_json
+
+
+def test_decode_payload_returns_integer_fields():
+    """
+    mtr.decode_payload tokenizes and validates a packet once.
+    """
+    assert mtr.decode_payload(MTR_READING_INPUT) == (0, 90, 58, 15006, 145, 11)
+
+
+def test_decode_payload_rejects_invalid_packets():
+    """
+    mtr.decode_payload returns None for missing, short, mismatched or malformed packets.
+    """
+    assert mtr.decode_payload(MTR_NONE_MESSAGE) is None
+    assert mtr.decode_payload(MTR_TOO_SHORT_INPUT) is None
+    assert mtr.decode_payload(MTR_SIZE_MISMATCH_INPUT) is None
+    assert mtr.decode_payload(MTR_MALFORMED_LENGTH_INPUT) is None
+    assert mtr.decode_payload(MTR_MALFORMED_TRANSMITTER_ID_INPUT) is None
+
+
+def test_payload_handlers_receive_decoded_fields(monkeypatch):
+    """
+    Handlers dispatched through payload_proressor get the decoded integer fields.
+    """
+    captured = {}
+
+    def handler(headers, fields):
+        captured["headers"] = headers
+        captured["fields"] = fields
+        return {"id": headers.transmitter_id}
+
+    monkeypatch.setitem(mtr.payload_proressor, "FT10", handler)
+
+    assert mtr.mtr_response_to_json(MTR_READING_INPUT, None) == '{"id": "15006"}'
+    assert captured["headers"] == ("FT10", -69, "15006", 2.6)
+    assert captured["fields"] == (0, 90, 58, 15006, 145, 11)
@@ -0,0 +1,100 @@
+"""
+Tests for the bounded measurement pipeline queue.
+"""
+
+import threading
+
+import pytest
+from context import mtr2mqtt
+from mtr2mqtt import metrics
+from mtr2mqtt import pipeline
+
+
+def test_queue_is_fifo_and_tracks_high_water_mark():
+    """
+    Items come out in arrival order and the deepest backlog is remembered.
+    """
+    queue = pipeline.MeasurementQueue(maxsize=5)
+    for value in range(3):
+        assert queue.put(("RTR970123", str(value)), value) is True
+
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == [0, 1]
+    assert queue.stats() == {
+        "queue_depth": 1,
+        "queue_high_water_mark": 3,
+        "queue_dropped": 0,
+        "queue_coalesced": 0,
+    }
+    assert queue.get(timeout=0) == 2
+    assert queue.get(timeout=0) is None
+
+
+def test_drop_oldest_policy_discards_oldest_item():
+    """
+    A full drop-oldest queue makes room by discarding the oldest measurement.
+    """
+    queue = pipeline.MeasurementQueue(maxsize=2, overflow=pipeline.OVERFLOW_DROP_OLDEST)
+    dropped = metrics.QUEUE_DROPPED.value
+    for value in range(4):
+        queue.put(("RTR970123", str(value)), value)
+
+    assert queue.dropped == 2
+    assert metrics.QUEUE_DROPPED.value == dropped + 2
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == [2, 3]
+
+
+def test_coalesce_policy_replaces_pending_item_for_same_sensor():
+    """
+    A full coalescing queue replaces a waiting reading of the same sensor in place.
+    """
+    queue = pipeline.MeasurementQueue(maxsize=2, overflow=pipeline.OVERFLOW_COALESCE)
+    queue.put(("RTR970123", "15006"), "15006-old")
+    queue.put(("RTR970123", "15007"), "15007")
+    queue.put(("RTR970123", "15006"), "15006-new")
+    queue.put(("RTR970123", "15008"), "15008")
+
+    assert queue.coalesced == 1
+    assert queue.dropped == 1
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == ["15007", "15008"]
+
+
+def test_block_policy_waits_for_consumer():
+    """
+    A full blocking queue holds the producer until the consumer makes room.
+    """
+    queue = pipeline.MeasurementQueue(maxsize=1)
+    queue.put("a", 1)
+
+    assert queue.put("b", 2, timeout=0.01) is False
+
+    producer = threading.Thread(target=queue.put, args=("b", 2))
+    producer.start()
+    assert queue.get(timeout=1) == 1
+    producer.join(timeout=1)
+
+    assert queue.get(timeout=1) == 2
+    assert queue.dropped == 0
+
+
+def test_close_releases_blocked_producer():
+    """
+    Closing the queue wakes a producer blocked on a full queue.
+    """
+    queue = pipeline.MeasurementQueue(maxsize=1)
+    queue.put("a", 1)
+    results = []
+    producer = threading.Thread(target=lambda: results.append(queue.put("b", 2)))
+    producer.start()
+
+    queue.close()
+    producer.join(timeout=1)
+
+    assert results == [False]
+
+
+def test_unknown_overflow_policy_is_rejected():
+    """
+    Unsupported overflow policies are rejected early.
+    """
+    with pytest.raises(ValueError):
+        pipeline.MeasurementQueue(overflow="spill")
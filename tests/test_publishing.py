@@ -0,0 +1,519 @@
+"""
+Tests for MQTT connection handling and publish helpers.
+"""
+
+from types import SimpleNamespace
+import json
+
+import pytest
+from context import mtr2mqtt
+from mtr2mqtt import homeassistant
+from mtr2mqtt import mtr
+from mtr2mqtt import publishing
+from mtr2mqtt import spool
+
+
+def test_open_mqtt_connection_uses_callback_api_v2(monkeypatch):
+    """
+    MQTT client initialization opts in to the non-deprecated callback API.
+    """
+    captured = {}
+
+    class FakeClient:
+        publish = None
+
+        def __init__(self, **kwargs):
+            captured["kwargs"] = kwargs
+            self.connected_flag = False
+
+        def enable_logger(self):
+            captured["enable_logger"] = True
+
+        def reconnect_delay_set(self, min_delay, max_delay):
+            captured["reconnect_delay_set"] = (min_delay, max_delay)
+
+        def loop_start(self):
+            captured["loop_start"] = True
+
+        def connect(self, host, port):
+            captured["connect"] = (host, port)
+            self.connected_flag = True
+
+    monkeypatch.setattr(publishing.mqtt, "Client", FakeClient)
+    monkeypatch.setattr(
+        publishing.mqtt,
+        "CallbackAPIVersion",
+        SimpleNamespace(VERSION2="version2"),
+    )
+    monkeypatch.setattr(publishing.time, "sleep", lambda _: None)
+
+    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+
+    client = publishing.open_mqtt_connection(args)
+
+    assert captured["kwargs"]["callback_api_version"] == "version2"
+    assert captured["kwargs"]["client_id"] == "mtr2mqtt"
+    assert captured["kwargs"]["protocol"] == publishing.mqtt.MQTTv311
+    assert captured["kwargs"]["transport"] == "tcp"
+    assert captured["connect"] == ("mqtt.example", 1884)
+    assert captured["reconnect_delay_set"] == (1, 30)
+    assert captured["enable_logger"] is True
+    assert captured["loop_start"] is True
+    assert client.on_connect is publishing.on_connect
+    assert client.on_disconnect is publishing.on_disconnect
+    assert client.on_publish is publishing.on_publish
+
+
+def test_open_mqtt_connection_raises_mqtt_error_on_connect_failure(monkeypatch):
+    """
+    MQTT startup failures are surfaced as runtime exceptions instead of exits.
+    """
+
+    class FakeClient:
+        publish = None
+
+        def __init__(self, **kwargs):
+            self.connected_flag = False
+
+        def enable_logger(self):
+            return None
+
+        def reconnect_delay_set(self, min_delay, max_delay):
+            return None
+
+        def loop_start(self):
+            return None
+
+        def loop_stop(self):
+            return None
+
+        def connect(self, host, port):
+            raise publishing.mqtt.socket.error("boom")
+
+    monkeypatch.setattr(publishing.mqtt, "Client", FakeClient)
+    monkeypatch.setattr(publishing.time, "sleep", lambda _: None)
+
+    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+
+    try:
+        publishing.open_mqtt_connection(args)
+    except publishing.MqttConnectionError as error:
+        assert "Unable to connect to MQTT host mqtt.example:1884" == str(error)
+    else:
+        raise AssertionError("MqttConnectionError was not raised")
+
+
+def test_open_mqtt_connection_raises_on_broker_rejection(monkeypatch):
+    """
+    MQTT broker rejections fail startup instead of hanging indefinitely.
+    """
+
+    class FakeClient:
+        publish = None
+
+        def __init__(self, **kwargs):
+            self.connected_flag = False
+            self.connect_error = None
+
+        def enable_logger(self):
+            return None
+
+        def reconnect_delay_set(self, min_delay, max_delay):
+            return None
+
+        def loop_start(self):
+            return None
+
+        def loop_stop(self):
+            return None
+
+        def connect(self, host, port):
+            publishing.on_connect(self, None, None, 5, None)
+
+    monkeypatch.setattr(publishing.mqtt, "Client", FakeClient)
+    monkeypatch.setattr(publishing.time, "sleep", lambda _: None)
+
+    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+
+    with pytest.raises(publishing.MqttConnectionError) as error:
+        publishing.open_mqtt_connection(args)
+
+    assert "reason code 5" in str(error.value)
+
+
+def test_open_mqtt_connection_raises_on_timeout(monkeypatch):
+    """
+    MQTT startup times out when the callback never reports success or failure.
+    """
+    monotonic_values = iter([0, 10, 20, 31])
+
+    class FakeClient:
+        publish = None
+
+        def __init__(self, **kwargs):
+            self.connected_flag = False
+            self.connect_error = None
+
+        def enable_logger(self):
+            return None
+
+        def reconnect_delay_set(self, min_delay, max_delay):
+            return None
+
+        def loop_start(self):
+            return None
+
+        def loop_stop(self):
+            return None
+
+        def connect(self, host, port):
+            return None
+
+    monkeypatch.setattr(publishing.mqtt, "Client", FakeClient)
+    monkeypatch.setattr(publishing.time, "sleep", lambda _: None)
+    monkeypatch.setattr(publishing.time, "monotonic", lambda: next(monotonic_values))
+
+    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+
+    with pytest.raises(publishing.MqttConnectionError) as error:
+        publishing.open_mqtt_connection(args)
+
+    assert "Timed out waiting" in str(error.value)
+
+
+def test_on_connect_logs_reason_code_objects_without_crashing(caplog):
+    """
+    Successful MQTT connects must tolerate ReasonCode-like callback objects.
+    """
+
+    class FakeReasonCode:
+        def __eq__(self, other):
+            return other == 0
+
+        def __str__(self):
+            return "Success"
+
+    client = SimpleNamespace(connected_flag=False, connect_error="previous")
+
+    with caplog.at_level("INFO"):
+        publishing.on_connect(client, None, None, FakeReasonCode(), None)
+
+    assert client.connected_flag is True
+    assert client.connect_error is None
+    assert caplog.records[0].event == "mqtt_connected"
+    assert caplog.records[0].mqtt_reason_code == "Success"
+
+
+def test_publish_measurement_skips_while_mqtt_is_disconnected():
+    """
+    Measurements are skipped cleanly when MQTT is temporarily disconnected.
+    """
+    client = SimpleNamespace(connected_flag=False)
+
+    result, mid = publishing.publish_measurement(
+        client,
+        "RTR970123",
+        '{"id": "15006", "reading": 22.9}',
+    )
+
+    assert result == publishing.mqtt.MQTT_ERR_NO_CONN
+    assert mid is None
+
+
+def test_publish_measurement_publishes_discovery_first():
+    """
+    Measurement publishing keeps the normal state topic and publishes discovery first.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
+
+    client = FakeClient()
+    publisher = homeassistant.DiscoveryPublisher("homeassistant", retain=True)
+    measurement_json = (
+        '{"id":"15006","type":"FT10","reading":22.9,"battery":2.6,"rsl":-69}'
+    )
+
+    result, mid = publishing.publish_measurement(
+        client,
+        "RTR970123",
+        measurement_json,
+        ha_discovery_publisher=publisher,
+    )
+
+    assert result == 0
+    assert mid == 2
+    assert client.calls[0][0] == "homeassistant/device/15006/config"
+    assert client.calls[0][1]["qos"] == 1
+    assert client.calls[0][1]["retain"] is True
+    assert client.calls[1][0] == "measurements/RTR970123/15006"
+    assert client.calls[1][1]["payload"] == measurement_json
+    assert client.calls[1][1]["retain"] is False
+
+
+def test_publish_measurement_rejects_invalid_json_payload():
+    """
+    Invalid measurement payloads are skipped instead of raising.
+    """
+    client = SimpleNamespace(connected_flag=True)
+
+    result, mid = publishing.publish_measurement(client, "RTR970123", "{")
+
+    assert result == publishing.mqtt.MQTT_ERR_INVAL
+    assert mid is None
+
+
+def test_publish_measurement_handles_publish_exceptions():
+    """
+    MQTT publish exceptions are converted to a failed publish result.
+    """
+
+    class FakeClient:
+        connected_flag = True
+
+        def publish(self, *args, **kwargs):
+            raise RuntimeError("boom")
+
+    result, mid = publishing.publish_measurement(
+        FakeClient(),
+        "RTR970123",
+        '{"id": "15006", "reading": 22.9}',
+    )
+
+    assert result == publishing.mqtt.MQTT_ERR_NO_CONN
+    assert mid is None
+
+
+def test_publish_measurement_without_discovery_keeps_normal_publish_behavior():
+    """
+    Measurement publishing still works unchanged when discovery is disabled.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, 1)
+
+    client = FakeClient()
+    measurement_json = (
+        '{"id":"15006","type":"FT10","reading":22.9,"battery":2.6,"rsl":-69}'
+    )
+
+    result, mid = publishing.publish_measurement(
+        client,
+        "RTR970123",
+        measurement_json,
+        ha_discovery_publisher=None,
+    )
+
+    assert result == 0
+    assert mid == 1
+    assert client.calls == [
+        (
+            "measurements/RTR970123/15006",
+            {"payload": measurement_json, "qos": 1, "retain": False},
+        )
+    ]
+
+
+def test_publish_measurement_sanitizes_topic_fragments():
+    """
+    Crafted receiver or sensor ids cannot publish outside the measurement namespace.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, 1)
+
+    client = FakeClient()
+
+    result, mid = publishing.publish_measurement(
+        client,
+        "RTR/970+#",
+        '{"id":"15/006+#","type":"FT10","reading":22.9,"battery":2.6,"rsl":-69}',
+        ha_discovery_publisher=None,
+    )
+
+    assert result == 0
+    assert mid == 1
+    assert client.calls[0][0] == "measurements/RTR_970/15_006"
+
+
+def test_publish_status_uses_retained_status_topic_payload():
+    """
+    Status publishing is retained and separate from measurement publishing.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, 1)
+
+    client = FakeClient()
+    payload = {
+        "entity_type": "sensor",
+        "receiver": "RTR970123",
+        "sensor": "15006",
+        "status": "online",
+        "status_code": 1,
+        "last_received_at": "2026-04-26T10:15:32Z",
+        "last_publish_at": "2026-04-26T10:15:33Z",
+        "error_count": 0,
+    }
+
+    result, mid = publishing.publish_status(
+        client,
+        "status/RTR970123/15006",
+        payload,
+    )
+
+    assert result == 0
+    assert mid == 1
+    assert client.calls[0][0] == "status/RTR970123/15006"
+    assert client.calls[0][1]["qos"] == 1
+    assert client.calls[0][1]["retain"] is True
+    assert json.loads(client.calls[0][1]["payload"]) == payload
+
+
+def test_publish_summary_uses_retained_receiver_summary_topic():
+    """
+    Summary publishing is retained and separate from measurements and status.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, 1)
+
+    client = FakeClient()
+    payload = {
+        "receiver": "RTR970123",
+        "updated_at": "2026-04-26T12:00:00Z",
+        "transmitters": {
+            "15006": {
+                "value": 22.9,
+                "battery": 2.6,
+                "measured_at": "2026-04-26T10:15:32Z",
+                "status": "online",
+                "status_code": 1,
+            },
+        },
+    }
+
+    result, mid = publishing.publish_summary(client, "RTR970123", payload)
+
+    assert result == 0
+    assert mid == 1
+    assert client.calls[0][0] == "summary/RTR970123"
+    assert client.calls[0][1]["qos"] == 1
+    assert client.calls[0][1]["retain"] is True
+    assert json.loads(client.calls[0][1]["payload"]) == payload
+
+
+def test_publish_measurement_serializes_measurement_object_once():
+    """
+    Measurement objects are rendered right before publishing and handed to discovery as data.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, 1)
+
+    class FakePublisher:
+        def __init__(self):
+            self.measurements = []
+
+        def publish_if_needed(self, _client, _receiver, measurement):
+            self.measurements.append(measurement)
+
+    client = FakeClient()
+    publisher = FakePublisher()
+    measurement = mtr.Measurement({"id": "15006", "reading": 22.9})
+
+    result, _mid = publishing.publish_measurement(
+        client,
+        "RTR970123",
+        measurement,
+        ha_discovery_publisher=publisher,
+    )
+
+    assert result == 0
+    assert publisher.measurements == [{"id": "15006", "reading": 22.9}]
+    assert client.calls[0][1]["payload"] == '{"id": "15006", "reading": 22.9}'
+    assert client.calls[0][1]["payload"] is measurement.to_json()
+
+
+def test_on_publish_completes_tracked_inflight_publishes():
+    """
+    Inflight publishes are the accepted ones the client has not completed.
+    """
+
+    class FakeClient:
+        def publish(self, topic, **kwargs):
+            return SimpleNamespace(rc=publishing.mqtt.MQTT_ERR_SUCCESS, mid=1)
+
+    client = FakeClient()
+    assert publishing.mqtt_inflight(client) is None
+    publishing._track_inflight(client)
+
+    client.publish("a", payload="1")
+    client.publish("b", payload="2")
+    publishing.on_publish(client, None, 1, 0, None)
+
+    assert publishing.mqtt_inflight(client) == 1
+
+
+def test_spooling_publisher_queues_behind_waiting_measurements(tmp_path):
+    """
+    New measurements wait behind spooled ones, and replay is rate limited.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.connected_flag = False
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append(topic)
+            return (0, len(self.calls))
+
+    client = FakeClient()
+    spooler = publishing.SpoolingPublisher(
+        spool.MeasurementSpool(str(tmp_path / "spool.db")),
+        rate=1,
+    )
+    assert spooler.should_spool(client) is True
+    for sensor_id in ("15006", "15007"):
+        assert spooler.append("RTR970123", f'{{"id": "{sensor_id}"}}') == (
+            publishing.PUBLISH_SPOOLED,
+            None,
+        )
+    client.connected_flag = True
+
+    assert spooler.should_spool(client) is True
+    assert spooler.replay(client) == [("RTR970123", "15006")]
+    assert client.calls == ["measurements/RTR970123/15006"]
+    assert len(spooler) == 1
+    spooler.close()
@@ -0,0 +1,275 @@
+"""
+Tests for receiver discovery and recovery.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from context import mtr2mqtt
+from mtr2mqtt import diagnostics
+from mtr2mqtt import receivers
+
+
+def test_open_receiver_connection_rejects_incompatible_explicit_port(monkeypatch):
+    """
+    Explicit ports must still validate as compatible receivers.
+    """
+
+    class FakeSerial:
+        def __init__(self):
+            self.closed = False
+            self.name = "/dev/cu.usbserial-test"
+
+        def close(self):
+            self.closed = True
+
+    fake_serial = FakeSerial()
+    args = SimpleNamespace(
+        serial_port="/dev/cu.usbserial-test",
+        baudrate=9600,
+        bytesize=8,
+        parity="N",
+        stopbits=1,
+        serial_timeout=1,
+        scl_address=126,
+    )
+
+    monkeypatch.setattr(receivers, "_create_serial_handle", lambda *_args: fake_serial)
+    monkeypatch.setattr(receivers.scl, "get_receiver_type", lambda *_args: None)
+
+    receiver = receivers.open_receiver_connection(args)
+
+    assert receiver is None
+    assert fake_serial.closed is True
+
+
+def test_open_receiver_connection_raises_receiver_error_for_open_failure(monkeypatch):
+    """
+    Explicit-port failures are surfaced as runtime exceptions instead of exits.
+    """
+    args = SimpleNamespace(
+        serial_port="/dev/cu.usbserial-test",
+        baudrate=9600,
+        bytesize=8,
+        parity="N",
+        stopbits=1,
+        serial_timeout=1,
+        scl_address=126,
+    )
+
+    def raise_serial_error(*_args):
+        raise receivers.serial.serialutil.SerialException("boom")
+
+    monkeypatch.setattr(receivers, "_create_serial_handle", raise_serial_error)
+
+    try:
+        receivers.open_receiver_connection(args)
+    except receivers.ReceiverConnectionError as error:
+        assert "Unable to open serial port /dev/cu.usbserial-test" == str(error)
+    else:
+        raise AssertionError("ReceiverConnectionError was not raised")
+
+
+def test_recover_receiver_connection_rediscovery_finds_replugged_receiver(monkeypatch):
+    """
+    Autodetect mode rescans for a receiver when reopening the old port fails.
+    """
+
+    class ExistingSerial:
+        def __init__(self):
+            self.port = "/dev/cu.usbserial-old"
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    class ReopenAttempt:
+        def __init__(self):
+            self.port = None
+
+        def apply_settings(self, _settings):
+            pass
+
+        def open(self):
+            raise FileNotFoundError("device disappeared")
+
+    rediscovered_receiver = receivers.ReceiverConnection(
+        serial_handle=SimpleNamespace(port="/dev/cu.usbserial-new"),
+        device_type="RTR970",
+        receiver_serial_number="RTR970456",
+        serial_config={"baudrate": 9600},
+    )
+    current_receiver = receivers.ReceiverConnection(
+        serial_handle=ExistingSerial(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={"baudrate": 9600},
+    )
+
+    monkeypatch.setattr(receivers.serial, "Serial", ReopenAttempt)
+    monkeypatch.setattr(
+        receivers,
+        "open_receiver_connection",
+        lambda _args, exclude_ports=(): rediscovered_receiver,
+    )
+
+    recovered = receivers.recover_receiver_connection(
+        current_receiver,
+        SimpleNamespace(serial_port=None, scl_address=126),
+    )
+
+    assert current_receiver.serial_handle.closed is True
+    assert recovered is rediscovered_receiver
+
+
+def test_build_receiver_connection_logs_structured_receiver_details(monkeypatch, caplog):
+    """
+    Receiver connection logs expose the device and serial identity as fields.
+    """
+
+    class FakeSerial:
+        name = "/dev/cu.usbserial-test"
+
+        def get_settings(self):
+            return {"baudrate": 9600}
+
+    monkeypatch.setattr(receivers, "_read_receiver_serial_number", lambda *_args: "A118636")
+
+    with caplog.at_level("INFO"):
+        receiver = receivers._build_receiver_connection(
+            FakeSerial(),
+            SimpleNamespace(scl_address=126),
+            "RTR970 V3.0",
+        )
+
+    assert receiver.receiver_serial_number == "A118636"
+    assert caplog.records[0].event == "receiver_connected"
+    assert caplog.records[0].device_type == "RTR970 V3.0"
+    assert caplog.records[0].serial_port == "/dev/cu.usbserial-test"
+
+
+def test_receiver_poll_records_checksum_errors_for_corrupt_frames_only():
+    """
+    A poll timeout is not a checksum error; a corrupt frame is.
+    """
+
+    class FakeSerial:
+        name = "/dev/ttyUSB0"
+
+        def __init__(self, frames):
+            self.frames = list(frames)
+
+        def write(self, _command):
+            pass
+
+        def read_until(self, _end_char):
+            return self.frames.pop(0)
+
+        def read(self, _size):
+            return self.frames.pop(0)
+
+    serial_handle = FakeSerial([b"", b"", b"\x060 90 58 15006 145 11\x03", b"\x00"])
+    receiver = receivers.ReceiverConnection(
+        serial_handle=serial_handle,
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
+    )
+    receiver_diagnostics = diagnostics.BridgeDiagnostics()
+
+    assert receiver.poll(b"MEA CH 1 ?", receiver_diagnostics) is None
+    assert receiver_diagnostics.payload()["checksum_errors_total"] == 0
+    assert receiver.poll(b"MEA CH 1 ?", receiver_diagnostics) is None
+    assert receiver_diagnostics.payload()["checksum_errors_total"] == 1
+
+
+def test_open_receiver_connections_opens_every_configured_port(monkeypatch):
+    """
+    Each explicitly configured port is opened and validated on its own.
+    """
+    args = SimpleNamespace(
+        serial_port=["/dev/ttyUSB0", "/dev/ttyUSB1", "/dev/ttyUSB2"],
+        scl_address=126,
+    )
+    opened = []
+
+    def open_configured_port(_args, port):
+        opened.append(port)
+        if port == "/dev/ttyUSB1":
+            return None
+        return SimpleNamespace(serial_handle=SimpleNamespace(port=port))
+
+    monkeypatch.setattr(receivers, "_open_configured_port", open_configured_port)
+
+    opened_receivers = receivers.open_receiver_connections(
+        args,
+        exclude_ports={"/dev/ttyUSB2"},
+    )
+
+    assert opened == ["/dev/ttyUSB0", "/dev/ttyUSB1"]
+    assert [receiver.serial_handle.port for receiver in opened_receivers] == [
+        "/dev/ttyUSB0"
+    ]
+
+
+def test_open_receiver_connections_retries_unavailable_port_later(monkeypatch, caplog):
+    """
+    Rediscovery skips a configured port that cannot be opened instead of
+    failing the whole bridge, while startup still reports it.
+    """
+    args = SimpleNamespace(
+        serial_port=["/dev/ttyUSB0", "/dev/ttyUSB1"],
+        scl_address=126,
+    )
+
+    def open_configured_port(_args, port):
+        if port == "/dev/ttyUSB0":
+            raise receivers.ReceiverConnectionError(f"Unable to open serial port {port}")
+        return SimpleNamespace(serial_handle=SimpleNamespace(port=port))
+
+    monkeypatch.setattr(receivers, "_open_configured_port", open_configured_port)
+
+    with pytest.raises(receivers.ReceiverConnectionError):
+        receivers.open_receiver_connections(args)
+
+    with caplog.at_level("WARNING"):
+        reopened = receivers.open_receiver_connections(args, retry_later=True)
+
+    assert [receiver.serial_handle.port for receiver in reopened] == ["/dev/ttyUSB1"]
+    assert caplog.records[-1].event == "receiver_reopen_failed"
+    assert caplog.records[-1].serial_port == "/dev/ttyUSB0"
+
+
+def test_open_receiver_connections_discovers_every_receiver(monkeypatch):
+    """
+    Autodetect mode opens every matching receiver except excluded ports.
+    """
+    ports = ["/dev/ttyUSB0", "/dev/ttyUSB1", "/dev/ttyUSB2"]
+    args = SimpleNamespace(serial_port=None, scl_address=126)
+
+    monkeypatch.setattr(
+        receivers.list_ports,
+        "grep",
+        lambda _pattern: [SimpleNamespace(device=port) for port in ports],
+    )
+    monkeypatch.setattr(
+        receivers,
+        "_create_serial_handle",
+        lambda _args, port: SimpleNamespace(port=port),
+    )
+    monkeypatch.setattr(receivers.scl, "get_receiver_type", lambda *_args: "RTR970")
+    monkeypatch.setattr(
+        receivers,
+        "_build_receiver_connection",
+        lambda ser, _args, device_type: SimpleNamespace(serial_handle=ser),
+    )
+
+    discovered = receivers.open_receiver_connections(args, exclude_ports={"/dev/ttyUSB1"})
+    first = receivers.open_receiver_connection(args, exclude_ports={"/dev/ttyUSB0"})
+
+    assert [receiver.serial_handle.port for receiver in discovered] == [
+        "/dev/ttyUSB0",
+        "/dev/ttyUSB2",
+    ]
+    assert first.serial_handle.port == "/dev/ttyUSB1"
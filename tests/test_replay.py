@@ -0,0 +1,108 @@
+"""
+Tests for replaying recorded SCL traffic.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from context import mtr2mqtt
+from mtr2mqtt import replay
+from mtr2mqtt import receivers
+from mtr2mqtt import runtime
+from mtr2mqtt import scl
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 50.0
+
+    def __call__(self):
+        return self.now
+
+
+def _poll(serial_handle):
+    serial_handle.write(scl.create_command("DBG 1 ?"))
+    response = serial_handle.read_until(scl.END_CHAR)
+    return scl.parse_response(response, serial_handle.read(1))
+
+
+def test_load_capture_reads_timestamped_and_plain_frames(tmp_path):
+    """
+    Capture lines hold a hex frame with an optional timestamp.
+    """
+    frame = scl.create_response("0 90 58 15006 145 11")
+    capture = tmp_path / "capture.txt"
+    capture.write_text(f"# recorded\n\n1.5 {frame.hex()}\n{frame.hex()}\n")
+
+    assert replay.load_capture(capture) == [
+        replay.ReplayFrame(frame, 1.5),
+        replay.ReplayFrame(frame, None),
+    ]
+
+    capture.write_text("1 2 3\n")
+    with pytest.raises(replay.ReplayError, match="capture.txt:1"):
+        replay.load_capture(capture)
+
+
+def test_replay_serial_answers_identity_queries():
+    """
+    The replay port identifies itself like a receiver.
+    """
+    serial_handle = replay.ReplaySerial(replay.FramePlayer([]))
+
+    assert scl.get_receiver_type(serial_handle, 126) == "RTR970"
+    assert receivers._read_receiver_serial_number(serial_handle, 126) == "REPLAY"
+
+
+def test_replay_serial_paces_frames_by_recorded_timestamps():
+    """
+    Frames not yet due are answered with an empty ring buffer.
+    """
+    clock = FakeClock()
+    frames = [
+        replay.ReplayFrame(scl.create_response("0 90 58 15006 145 11"), 10.0),
+        replay.ReplayFrame(scl.create_response("0 90 58 15007 145 11"), 12.0),
+    ]
+    player = replay.FramePlayer(frames, speed=2, monotonic=clock)
+    serial_handle = replay.ReplaySerial(player)
+
+    assert _poll(serial_handle) == "0 90 58 15006 145 11"
+    clock.now += 0.5
+    assert _poll(serial_handle) == "#"
+    assert player.remaining() == 1
+    clock.now += 0.5
+    assert _poll(serial_handle) == "0 90 58 15007 145 11"
+    assert _poll(serial_handle) == "#"
+    with pytest.raises(replay.ReplayFinished) as finished:
+        _poll(serial_handle)
+
+    assert finished.value.frames == 2
+    assert finished.value.seconds == 1.0
+    assert finished.value.frames_per_second == 2.0
+
+
+def test_bridge_replays_capture_to_stub_mqtt_client(tmp_path):
+    """
+    A replay drives the whole bridge and stops once the capture is exhausted.
+    """
+    capture = tmp_path / "capture.txt"
+    capture.write_text(
+        "\n".join(
+            scl.create_response(payload).hex()
+            for payload in ("0 90 58 15006 145 11", "0 90 58 15007 145 11")
+        )
+    )
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            replay=str(capture),
+            replay_speed=0,
+            replay_stub_mqtt=True,
+        )
+    )
+
+    bridge.run_forever()
+
+    assert isinstance(bridge.mqtt_client, replay.StubMqttClient)
+    assert bridge.mqtt_client.messages >= 2
+    assert bridge.state is runtime.BridgeState.STOPPED
@@ -4,408 +4,515 @@ Tests for runtime module.
 
 from types import SimpleNamespace
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
 import json
+import threading
+import time
 
 import pytest
 from context import mtr2mqtt
+from mtr2mqtt import homeassistant
 from mtr2mqtt import runtime
 
 
-def test_open_mqtt_connection_uses_callback_api_v2(monkeypatch):
+def test_bridge_table_output_requires_tty(monkeypatch):
     """
-    MQTT client initialization opts in to the non-deprecated callback API.
+    Table mode is rejected when stdout is not an interactive terminal.
     """
-    captured = {}
+    monkeypatch.setattr(runtime.sys.stdout, "isatty", lambda: False)
 
-    class FakeClient:
-        def __init__(self, **kwargs):
-            captured["kwargs"] = kwargs
-            self.connected_flag = False
+    with pytest.raises(runtime.OutputModeError) as error:
+        runtime.MtrBridge(SimpleNamespace(scl_address=126, output="table"))
+
+    assert "interactive terminal" in str(error.value)
 
-        def enable_logger(self):
-            captured["enable_logger"] = True
 
-        def reconnect_delay_set(self, min_delay, max_delay):
-            captured["reconnect_delay_set"] = (min_delay, max_delay)
+def test_bridge_publishes_measurement_unchanged_and_retained_status(monkeypatch):
+    """
+    Bridge status publishing is additive and does not alter measurement payloads.
+    """
 
-        def loop_start(self):
-            captured["loop_start"] = True
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
 
-        def connect(self, host, port):
-            captured["connect"] = (host, port)
-            self.connected_flag = True
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
 
-    monkeypatch.setattr(runtime.mqtt, "Client", FakeClient)
-    monkeypatch.setattr(
-        runtime.mqtt,
-        "CallbackAPIVersion",
-        SimpleNamespace(VERSION2="version2"),
+    observed_at = datetime(2026, 4, 26, 10, 15, 32, tzinfo=timezone.utc)
+    published_at = datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc)
+    times = iter([observed_at, published_at, published_at])
+    measurement_json = '{"id":"15006","reading":22.9}'
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, offline_timeout=1800))
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=SimpleNamespace(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
     )
-    monkeypatch.setattr(runtime.time, "sleep", lambda _: None)
+    bridge.mqtt_client = FakeClient()
 
-    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+    monkeypatch.setattr(runtime.status, "utc_now", lambda: next(times))
 
-    client = runtime.open_mqtt_connection(args)
+    measurement = json.loads(measurement_json)
+    receiver = bridge.receiver.receiver_serial_number
+    bridge.status_tracker.record_observation(receiver, measurement["id"], observed_at)
+    result, _mid = bridge.publish_measurement(measurement_json)
+    if result == runtime.mqtt.MQTT_ERR_SUCCESS:
+        bridge.status_tracker.record_publish_success(
+            receiver,
+            measurement["id"],
+            published_at,
+        )
+    bridge.publish_status_changes()
 
-    assert captured["kwargs"]["callback_api_version"] == "version2"
-    assert captured["kwargs"]["client_id"] == "mtr2mqtt"
-    assert captured["kwargs"]["protocol"] == runtime.mqtt.MQTTv311
-    assert captured["kwargs"]["transport"] == "tcp"
-    assert captured["connect"] == ("mqtt.example", 1884)
-    assert captured["reconnect_delay_set"] == (1, 30)
-    assert captured["enable_logger"] is True
-    assert captured["loop_start"] is True
-    assert client.on_connect is runtime.on_connect
-    assert client.on_disconnect is runtime.on_disconnect
+    assert bridge.mqtt_client.calls[0] == (
+        "measurements/RTR970123/15006",
+        {"payload": measurement_json, "qos": 1, "retain": False},
+    )
+    status_topics = [topic for topic, _kwargs in bridge.mqtt_client.calls[1:]]
+    assert status_topics == ["status/RTR970123", "status/RTR970123/15006"]
+    for _topic, kwargs in bridge.mqtt_client.calls[1:]:
+        assert kwargs["retain"] is True
+        payload = json.loads(kwargs["payload"])
+        assert payload["status"] == "online"
+        assert payload["status_code"] == 1
 
 
-def test_open_mqtt_connection_raises_mqtt_error_on_connect_failure(monkeypatch):
+def test_bridge_coalesces_summary_publish_without_changing_existing_topics():
     """
-    MQTT startup failures are surfaced as runtime exceptions instead of exits.
+    Rapid measurement updates become one retained summary after debounce.
     """
 
     class FakeClient:
-        def __init__(self, **kwargs):
-            self.connected_flag = False
-
-        def enable_logger(self):
-            return None
-
-        def reconnect_delay_set(self, min_delay, max_delay):
-            return None
+        def __init__(self):
+            self.calls = []
 
-        def loop_start(self):
-            return None
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
 
-        def loop_stop(self):
-            return None
+    measurement_one = {
+        "id": "15006",
+        "reading": 22.9,
+        "battery": 2.6,
+        "timestamp": "2026-04-26T10:15:32Z",
+        "location": "Technical room",
+        "description": "Floor heating input",
+        "unit": "°C",
+        "quantity": "Temperature",
+        "zone": "Heating",
+    }
+    measurement_two = {
+        "id": "15007",
+        "reading": 48.1,
+        "timestamp": "2026-04-26T10:15:33Z",
+    }
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            offline_timeout=1800,
+            summary_debounce_seconds=5,
+        )
+    )
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=SimpleNamespace(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
+    )
+    bridge.mqtt_client = FakeClient()
+    receiver = bridge.receiver.receiver_serial_number
 
-        def connect(self, host, port):
-            raise runtime.mqtt.socket.error("boom")
+    bridge.summary_tracker._monotonic = lambda: 0
+    for measurement in [measurement_one, measurement_two]:
+        bridge.status_tracker.record_observation(
+            receiver,
+            measurement["id"],
+            datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc),
+        )
+        bridge.summary_tracker.record_measurement(
+            receiver,
+            measurement,
+            bridge.status_tracker.sensor_payload(
+                receiver,
+                measurement["id"],
+                datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc),
+            ),
+        )
+        bridge.publish_measurement(json.dumps(measurement))
+        bridge.publish_due_summaries(
+            datetime(2026, 4, 26, 10, 15, 34, tzinfo=timezone.utc),
+        )
 
-    monkeypatch.setattr(runtime.mqtt, "Client", FakeClient)
-    monkeypatch.setattr(runtime.time, "sleep", lambda _: None)
+    assert [topic for topic, _kwargs in bridge.mqtt_client.calls] == [
+        "measurements/RTR970123/15006",
+        "measurements/RTR970123/15007",
+    ]
 
-    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+    bridge.summary_tracker._monotonic = lambda: 5
+    bridge.publish_due_summaries(
+        datetime(2026, 4, 26, 10, 15, 38, tzinfo=timezone.utc),
+    )
 
-    try:
-        runtime.open_mqtt_connection(args)
-    except runtime.MqttConnectionError as error:
-        assert "Unable to connect to MQTT host mqtt.example:1884" == str(error)
-    else:
-        raise AssertionError("MqttConnectionError was not raised")
+    assert [topic for topic, _kwargs in bridge.mqtt_client.calls] == [
+        "measurements/RTR970123/15006",
+        "measurements/RTR970123/15007",
+        "summary/RTR970123",
+    ]
+    summary_payload = json.loads(bridge.mqtt_client.calls[-1][1]["payload"])
+    assert bridge.mqtt_client.calls[-1][1]["retain"] is True
+    assert set(summary_payload["transmitters"]) == {"15006", "15007"}
+    assert summary_payload["transmitters"]["15006"]["value"] == 22.9
+    assert summary_payload["transmitters"]["15006"]["battery"] == 2.6
+    assert summary_payload["transmitters"]["15006"]["status"] == "online"
+    assert summary_payload["transmitters"]["15006"]["status_code"] == 1
+    assert summary_payload["transmitters"]["15006"]["location"] == "Technical room"
 
 
-def test_open_mqtt_connection_raises_on_broker_rejection(monkeypatch):
+def test_bridge_publishes_non_retained_summary_deltas():
     """
-    MQTT broker rejections fail startup instead of hanging indefinitely.
+    Summary deltas are not retained while the full summary stays retained.
     """
 
     class FakeClient:
-        def __init__(self, **kwargs):
-            self.connected_flag = False
-            self.connect_error = None
-
-        def enable_logger(self):
-            return None
-
-        def reconnect_delay_set(self, min_delay, max_delay):
-            return None
-
-        def loop_start(self):
-            return None
+        def __init__(self):
+            self.calls = []
 
-        def loop_stop(self):
-            return None
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
 
-        def connect(self, host, port):
-            runtime.on_connect(self, None, None, 5, None)
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            offline_timeout=1800,
+            summary_debounce_seconds=0,
+            summary_delta=True,
+            summary_full_interval=60,
+        )
+    )
+    bridge.mqtt_client = FakeClient()
+    bridge.summary_tracker._monotonic = lambda: 0
+    bridge.summary_tracker.record_measurement(
+        "RTR970123",
+        {"id": "15006", "reading": 22.9},
+    )
 
-    monkeypatch.setattr(runtime.mqtt, "Client", FakeClient)
-    monkeypatch.setattr(runtime.time, "sleep", lambda _: None)
+    published = bridge.publish_due_summaries(
+        datetime(2026, 4, 26, 10, 15, 38, tzinfo=timezone.utc),
+    )
 
-    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+    assert [
+        (topic, kwargs["retain"]) for topic, kwargs in bridge.mqtt_client.calls
+    ] == [
+        ("summary/RTR970123/delta", False),
+        ("summary/RTR970123", True),
+    ]
+    delta = json.loads(published[0][0])
+    assert delta["seq"] == 1
+    assert delta["transmitters"]["15006"]["value"] == 22.9
 
-    with pytest.raises(runtime.MqttConnectionError) as error:
-        runtime.open_mqtt_connection(args)
+    bridge.summary_tracker.record_measurement(
+        "RTR970123",
+        {"id": "15006", "reading": 23.1},
+    )
+    bridge.publish_due_summaries()
 
-    assert "reason code 5" in str(error.value)
+    assert bridge.mqtt_client.calls[-1][0] == "summary/RTR970123/delta"
+    assert json.loads(bridge.mqtt_client.calls[-1][1]["payload"])["seq"] == 2
 
 
-def test_open_mqtt_connection_raises_on_timeout(monkeypatch):
+def test_bridge_summary_updates_status_to_offline_without_clearing_value():
     """
-    MQTT startup times out when the callback never reports success or failure.
+    Offline status transitions update summary availability only.
     """
-    monotonic_values = iter([0, 10, 20, 31])
 
     class FakeClient:
-        def __init__(self, **kwargs):
-            self.connected_flag = False
-            self.connect_error = None
-
-        def enable_logger(self):
-            return None
-
-        def reconnect_delay_set(self, min_delay, max_delay):
-            return None
-
-        def loop_start(self):
-            return None
-
-        def loop_stop(self):
-            return None
+        def __init__(self):
+            self.calls = []
 
-        def connect(self, host, port):
-            return None
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
 
-    monkeypatch.setattr(runtime.mqtt, "Client", FakeClient)
-    monkeypatch.setattr(runtime.time, "sleep", lambda _: None)
-    monkeypatch.setattr(runtime.time, "monotonic", lambda: next(monotonic_values))
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            offline_timeout=60,
+            summary_debounce_seconds=5,
+        )
+    )
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=SimpleNamespace(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
+    )
+    bridge.mqtt_client = FakeClient()
+    receiver = bridge.receiver.receiver_serial_number
+    observed_at = datetime(2026, 4, 26, 10, 15, 32, tzinfo=timezone.utc)
+    offline_at = datetime(2026, 4, 26, 10, 16, 33, tzinfo=timezone.utc)
 
-    args = SimpleNamespace(mqtt_host="mqtt.example", mqtt_port=1884)
+    bridge.summary_tracker._monotonic = lambda: 0
+    bridge.status_tracker.record_observation(receiver, "15006", observed_at)
+    bridge.summary_tracker.record_measurement(
+        receiver,
+        {
+            "id": "15006",
+            "reading": 22.9,
+            "battery": 2.6,
+            "timestamp": "2026-04-26T10:15:32Z",
+        },
+        bridge.status_tracker.sensor_payload(receiver, "15006", observed_at),
+    )
+    bridge.publish_status_changes(observed_at)
+    bridge.summary_tracker._monotonic = lambda: 5
+    bridge.publish_due_summaries(observed_at)
 
-    with pytest.raises(runtime.MqttConnectionError) as error:
-        runtime.open_mqtt_connection(args)
+    bridge.summary_tracker._monotonic = lambda: 10
+    bridge.publish_status_changes(offline_at)
+    bridge.summary_tracker._monotonic = lambda: 15
+    bridge.publish_due_summaries(offline_at)
 
-    assert "Timed out waiting" in str(error.value)
+    summary_payloads = [
+        json.loads(kwargs["payload"])
+        for topic, kwargs in bridge.mqtt_client.calls
+        if topic == "summary/RTR970123"
+    ]
+    assert len(summary_payloads) == 2
+    entry = summary_payloads[-1]["transmitters"]["15006"]
+    assert entry["value"] == 22.9
+    assert entry["battery"] == 2.6
+    assert entry["measured_at"] == "2026-04-26T10:15:32Z"
+    assert entry["status"] == "offline"
+    assert entry["status_code"] == 0
 
 
-def test_on_connect_logs_reason_code_objects_without_crashing(caplog):
+def test_log_measurement_adds_structured_measurement_payload(caplog):
     """
-    Successful MQTT connects must tolerate ReasonCode-like callback objects.
+    Measurement logs carry the parsed payload as structured data.
     """
-
-    class FakeReasonCode:
-        def __eq__(self, other):
-            return other == 0
-
-        def __str__(self):
-            return "Success"
-
-    client = SimpleNamespace(connected_flag=False, connect_error="previous")
-
     with caplog.at_level("INFO"):
-        runtime.on_connect(client, None, None, FakeReasonCode(), None)
+        runtime.log_measurement('{"id":"15006","reading":22.9,"location":"Kids room"}')
 
-    assert client.connected_flag is True
-    assert client.connect_error is None
-    assert caplog.records[0].event == "mqtt_connected"
-    assert caplog.records[0].mqtt_reason_code == "Success"
+    assert caplog.records[0].event == "measurement_received"
+    assert caplog.records[0].measurement["id"] == "15006"
+    assert caplog.records[0].measurement["location"] == "Kids room"
 
 
-def test_open_receiver_connection_rejects_incompatible_explicit_port(monkeypatch):
+def test_bridge_recovers_and_uses_refreshed_receiver_serial_number(monkeypatch):
     """
-    Explicit ports must still validate as compatible receivers.
+    After serial recovery, publishes use the refreshed receiver serial number.
     """
 
-    class FakeSerial:
-        def __init__(self):
-            self.closed = False
-            self.name = "/dev/cu.usbserial-test"
+    class BrokenSerial:
+        port = "/dev/cu.usbserial-old"
+        name = port
+
+        def write(self, _command):
+            raise OSError("Device not configured")
 
         def close(self):
-            self.closed = True
+            pass
 
-    fake_serial = FakeSerial()
-    args = SimpleNamespace(
-        serial_port="/dev/cu.usbserial-test",
-        baudrate=9600,
-        bytesize=8,
-        parity="N",
-        stopbits=1,
-        serial_timeout=1,
-        scl_address=126,
+    old_receiver = runtime.ReceiverConnection(
+        serial_handle=BrokenSerial(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={"baudrate": 9600},
     )
+    new_receiver = runtime.ReceiverConnection(
+        serial_handle=SimpleNamespace(name="/dev/cu.usbserial-new"),
+        device_type="RTR970",
+        receiver_serial_number="RTR970456",
+        serial_config={"baudrate": 9600},
+    )
+    args = SimpleNamespace(scl_address=126, serial_port="/dev/cu.usbserial-old")
+    bridge = runtime.MtrBridge(args)
+    bridge.receiver = old_receiver
+    bridge.mqtt_client = object()
 
-    monkeypatch.setattr(runtime, "_create_serial_handle", lambda *_args: fake_serial)
-    monkeypatch.setattr(runtime.scl, "get_receiver_type", lambda *_args: None)
-
-    receiver = runtime.open_receiver_connection(args)
-
-    assert receiver is None
-    assert fake_serial.closed is True
-
+    captured = {}
 
-def test_open_receiver_connection_raises_receiver_error_for_open_failure(monkeypatch):
-    """
-    Explicit-port failures are surfaced as runtime exceptions instead of exits.
-    """
-    args = SimpleNamespace(
-        serial_port="/dev/cu.usbserial-test",
-        baudrate=9600,
-        bytesize=8,
-        parity="N",
-        stopbits=1,
-        serial_timeout=1,
-        scl_address=126,
+    monkeypatch.setattr(runtime.time, "sleep", lambda _: None)
+    monkeypatch.setattr(
+        runtime,
+        "recover_receiver_connection",
+        lambda receiver, _args, exclude_ports=(): new_receiver,
+    )
+    monkeypatch.setattr(
+        runtime,
+        "publish_measurement",
+        lambda _client, receiver_serial_number, _json, ha_discovery_publisher=None: (
+            captured.setdefault("receiver_serial_number", receiver_serial_number),
+            None,
+        ),
     )
 
-    def raise_serial_error(*_args):
-        raise runtime.serial.serialutil.SerialException("boom")
+    result = bridge.poll_once()
 
-    monkeypatch.setattr(runtime, "_create_serial_handle", raise_serial_error)
+    assert result.state is runtime.BridgeState.RECOVERING
+    assert result.measurement is None
+    assert bridge.receiver is new_receiver
+    assert bridge.state is runtime.BridgeState.READY
 
-    try:
-        runtime.open_receiver_connection(args)
-    except runtime.ReceiverConnectionError as error:
-        assert "Unable to open serial port /dev/cu.usbserial-test" == str(error)
-    else:
-        raise AssertionError("ReceiverConnectionError was not raised")
+    bridge.publish_measurement('{"id":"15006","reading":22.9}')
 
+    assert captured["receiver_serial_number"] == "RTR970456"
 
-def test_bridge_table_output_requires_tty(monkeypatch):
+
+def test_poll_once_returns_waiting_state_when_no_receiver_is_available(monkeypatch):
     """
-    Table mode is rejected when stdout is not an interactive terminal.
+    Polling exposes the no-receiver case explicitly.
     """
-    monkeypatch.setattr(runtime.sys.stdout, "isatty", lambda: False)
+    args = SimpleNamespace(scl_address=126, serial_port=None)
+    bridge = runtime.MtrBridge(args)
 
-    with pytest.raises(runtime.OutputModeError) as error:
-        runtime.MtrBridge(SimpleNamespace(scl_address=126, output="table"))
+    monkeypatch.setattr(
+        runtime, "open_receiver_connections", lambda _args, **_kwargs: []
+    )
 
-    assert "interactive terminal" in str(error.value)
+    result = bridge.poll_once()
+
+    assert result.state is runtime.BridgeState.WAITING_FOR_RECEIVER
+    assert result.measurement is None
+    assert bridge.state is runtime.BridgeState.WAITING_FOR_RECEIVER
 
 
-def test_recover_receiver_connection_rediscovery_finds_replugged_receiver(monkeypatch):
+def test_poll_once_returns_idle_for_empty_ring_buffer(monkeypatch):
     """
-    Autodetect mode rescans for a receiver when reopening the old port fails.
+    Polling exposes an empty receiver buffer as an idle cycle.
     """
 
-    class ExistingSerial:
-        def __init__(self):
-            self.port = "/dev/cu.usbserial-old"
-            self.closed = False
-
-        def close(self):
-            self.closed = True
+    class FakeSerial:
+        name = "/dev/cu.usbserial-test"
 
-    class ReopenAttempt:
-        def __init__(self):
-            self.port = None
+        def write(self, _command):
+            return None
 
-        def apply_settings(self, _settings):
-            pass
+        def read_until(self, _end):
+            return b"\x80#\x03"
 
-        def open(self):
-            raise FileNotFoundError("device disappeared")
+        def read(self, _size):
+            return runtime.scl.calc_bcc(b"\x80#\x03")
 
-    rediscovered_receiver = runtime.ReceiverConnection(
-        serial_handle=SimpleNamespace(port="/dev/cu.usbserial-new"),
-        device_type="RTR970",
-        receiver_serial_number="RTR970456",
-        serial_config={"baudrate": 9600},
-    )
-    current_receiver = runtime.ReceiverConnection(
-        serial_handle=ExistingSerial(),
+    args = SimpleNamespace(scl_address=126)
+    bridge = runtime.MtrBridge(args)
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=FakeSerial(),
         device_type="RTR970",
         receiver_serial_number="RTR970123",
         serial_config={"baudrate": 9600},
     )
 
-    monkeypatch.setattr(runtime.serial, "Serial", ReopenAttempt)
-    monkeypatch.setattr(
-        runtime,
-        "open_receiver_connection",
-        lambda _args: rediscovered_receiver,
-    )
-
-    recovered = runtime.recover_receiver_connection(
-        current_receiver,
-        SimpleNamespace(serial_port=None, scl_address=126),
-    )
+    result = bridge.poll_once()
 
-    assert current_receiver.serial_handle.closed is True
-    assert recovered is rediscovered_receiver
+    assert result.state is runtime.BridgeState.IDLE
+    assert result.measurement is None
+    assert bridge.state is runtime.BridgeState.IDLE
 
 
-def test_publish_measurement_skips_while_mqtt_is_disconnected():
+def test_poll_once_returns_measurement_payload_when_data_is_available(monkeypatch):
     """
-    Measurements are skipped cleanly when MQTT is temporarily disconnected.
+    Polling exposes parsed measurements explicitly instead of overloading None.
     """
-    client = SimpleNamespace(connected_flag=False)
-
-    result, mid = runtime.publish_measurement(
-        client,
-        "RTR970123",
-        '{"id": "15006", "reading": 22.9}',
-    )
-
-    assert result == runtime.mqtt.MQTT_ERR_NO_CONN
-    assert mid is None
 
+    class FakeSerial:
+        name = "/dev/cu.usbserial-test"
 
-def test_publish_measurement_publishes_discovery_first():
-    """
-    Measurement publishing keeps the normal state topic and publishes discovery first.
-    """
+        def write(self, _command):
+            return None
 
-    class FakeClient:
-        def __init__(self):
-            self.calls = []
+        def read_until(self, _end):
+            return b"\x800 90 58 15006 145 11\x03"
 
-        def publish(self, topic, **kwargs):
-            self.calls.append((topic, kwargs))
-            return (0, len(self.calls))
+        def read(self, _size):
+            return runtime.scl.calc_bcc(b"\x800 90 58 15006 145 11\x03")
 
-    client = FakeClient()
-    publisher = runtime.homeassistant.DiscoveryPublisher("homeassistant", retain=True)
-    measurement_json = (
-        '{"id":"15006","type":"FT10","reading":22.9,"battery":2.6,"rsl":-69}'
+    args = SimpleNamespace(scl_address=126)
+    bridge = runtime.MtrBridge(args)
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=FakeSerial(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={"baudrate": 9600},
     )
 
-    result, mid = runtime.publish_measurement(
-        client,
-        "RTR970123",
-        measurement_json,
-        ha_discovery_publisher=publisher,
-    )
+    result = bridge.poll_once()
 
-    assert result == 0
-    assert mid == 2
-    assert client.calls[0][0] == "homeassistant/device/15006/config"
-    assert client.calls[0][1]["qos"] == 1
-    assert client.calls[0][1]["retain"] is True
-    assert client.calls[1][0] == "measurements/RTR970123/15006"
-    assert client.calls[1][1]["payload"] == measurement_json
-    assert client.calls[1][1]["retain"] is False
+    assert result.state is runtime.BridgeState.READY
+    assert result.measurement is not None
+    assert result.measurement.sensor_id == "15006"
+    assert result.measurement["reading"] == 22.9
+    assert '"id": "15006"' in result.measurement.to_json()
+    assert bridge.state is runtime.BridgeState.READY
 
 
-def test_publish_measurement_rejects_invalid_json_payload():
+def test_poll_once_skips_measurements_missing_from_metadata_when_enabled(caplog):
     """
-    Invalid measurement payloads are skipped instead of raising.
+    Metadata-only mode drops unmatched transmitters before any view or publish path.
     """
-    client = SimpleNamespace(connected_flag=True)
 
-    result, mid = runtime.publish_measurement(client, "RTR970123", "{")
+    class FakeSerial:
+        name = "/dev/cu.usbserial-test"
 
-    assert result == runtime.mqtt.MQTT_ERR_INVAL
-    assert mid is None
+        def write(self, _command):
+            return None
 
+        def read_until(self, _end):
+            return b"\x800 90 58 15006 145 11\x03"
 
-def test_publish_measurement_handles_publish_exceptions():
-    """
-    MQTT publish exceptions are converted to a failed publish result.
-    """
+        def read(self, _size):
+            return runtime.scl.calc_bcc(b"\x800 90 58 15006 145 11\x03")
 
-    class FakeClient:
-        connected_flag = True
+    args = SimpleNamespace(
+        scl_address=126,
+        metadata_transmitters_only=True,
+    )
+    bridge = runtime.MtrBridge(
+        args,
+        transmitters_metadata=json.dumps([{"id": 99999, "location": "Elsewhere"}]),
+    )
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=FakeSerial(),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={"baudrate": 9600},
+    )
 
-        def publish(self, *args, **kwargs):
-            raise RuntimeError("boom")
+    with caplog.at_level("DEBUG"):
+        result = bridge.poll_once()
+
+    assert result.state is runtime.BridgeState.READY
+    assert result.measurement is None
+    assert bridge.state is runtime.BridgeState.READY
+    assert caplog.records[-1].event == "measurement_skipped_unconfigured"
+    assert caplog.records[-1].measurement["id"] == "15006"
+
+
+def test_bridge_start_raises_receiver_error_when_no_receiver_is_found(monkeypatch):
+    """
+    Bridge startup reports missing receivers as a runtime exception.
+    """
+    args = SimpleNamespace(scl_address=126)
+    bridge = runtime.MtrBridge(args)
 
-    result, mid = runtime.publish_measurement(
-        FakeClient(),
-        "RTR970123",
-        '{"id": "15006", "reading": 22.9}',
-    )
+    monkeypatch.setattr(runtime, "open_receiver_connections", lambda _args: [])
 
-    assert result == runtime.mqtt.MQTT_ERR_NO_CONN
-    assert mid is None
+    try:
+        bridge.start()
+    except runtime.ReceiverConnectionError as error:
+        assert "Unable to find MTR receivers" == str(error)
+    else:
+        raise AssertionError("ReceiverConnectionError was not raised")
 
 
-def test_publish_measurement_without_discovery_keeps_normal_publish_behavior():
+def test_bridge_start_warms_up_discovery_for_a_single_receiver(monkeypatch):
     """
-    Measurement publishing still works unchanged when discovery is disabled.
+    Discovery warm-up runs in the background once MQTT is connected.
     """
 
     class FakeClient:
@@ -414,33 +521,48 @@ def test_publish_measurement_without_discovery_keeps_normal_publish_behavior():
 
         def publish(self, topic, **kwargs):
             self.calls.append((topic, kwargs))
-            return (0, 1)
+            return (0, len(self.calls))
+
+        def loop_stop(self):
+            pass
+
+        def disconnect(self):
+            pass
 
     client = FakeClient()
-    measurement_json = (
-        '{"id":"15006","type":"FT10","reading":22.9,"battery":2.6,"rsl":-69}'
+    receiver = runtime.ReceiverConnection(
+        serial_handle=SimpleNamespace(close=lambda: None),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
     )
-
-    result, mid = runtime.publish_measurement(
-        client,
-        "RTR970123",
-        measurement_json,
-        ha_discovery_publisher=None,
+    monkeypatch.setattr(runtime, "open_receiver_connections", lambda _args: [receiver])
+    monkeypatch.setattr(runtime, "open_mqtt_connection", lambda _args: client)
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            ha_discovery_warm_up=True,
+        ),
+        transmitters_metadata=json.dumps([{"id": 15006, "location": "Kitchen"}]),
+        discovery_publisher=homeassistant.DiscoveryPublisher(
+            "homeassistant",
+            warm_up_rate=0,
+        ),
     )
 
-    assert result == 0
-    assert mid == 1
-    assert client.calls == [
-        (
-            "measurements/RTR970123/15006",
-            {"payload": measurement_json, "qos": 1, "retain": False},
-        )
+    bridge.start()
+    bridge.discovery_warm_up.thread.join(timeout=5)
+    bridge.close()
+
+    assert [topic for topic, _kwargs in client.calls] == [
+        "homeassistant/device/15006/config",
     ]
+    assert bridge.discovery_publisher.has_published("RTR970123", "15006")
 
 
-def test_publish_measurement_sanitizes_topic_fragments():
+def test_bridge_restart_restores_state_snapshot(monkeypatch, tmp_path):
     """
-    Crafted receiver or sensor ids cannot publish outside the measurement namespace.
+    A restarted bridge does not re-send unchanged discovery and status payloads.
     """
 
     class FakeClient:
@@ -449,155 +571,193 @@ def test_publish_measurement_sanitizes_topic_fragments():
 
         def publish(self, topic, **kwargs):
             self.calls.append((topic, kwargs))
-            return (0, 1)
+            return (0, len(self.calls))
 
-    client = FakeClient()
+        def loop_stop(self):
+            pass
 
-    result, mid = runtime.publish_measurement(
-        client,
-        "RTR/970+#",
-        '{"id":"15/006+#","type":"FT10","reading":22.9,"battery":2.6,"rsl":-69}',
-        ha_discovery_publisher=None,
-    )
+        def disconnect(self):
+            pass
 
-    assert result == 0
-    assert mid == 1
-    assert client.calls[0][0] == "measurements/RTR_970/15_006"
+    receiver = runtime.ReceiverConnection(
+        serial_handle=SimpleNamespace(close=lambda: None),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
+    )
+    monkeypatch.setattr(runtime, "open_receiver_connections", lambda _args: [receiver])
+    args = SimpleNamespace(
+        scl_address=126,
+        state_file=str(tmp_path / "state.json"),
+        offline_timeout=1800,
+    )
+    clients = []
+
+    def run_once():
+        client = FakeClient()
+        clients.append(client)
+        monkeypatch.setattr(runtime, "open_mqtt_connection", lambda _args: client)
+        bridge = runtime.MtrBridge(
+            args,
+            discovery_publisher=homeassistant.DiscoveryPublisher("homeassistant"),
+        )
+        bridge.start()
+        observed_at = datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc)
+        bridge.status_tracker.record_observation("RTR970123", "15006", observed_at)
+        bridge.publish_measurement('{"id":"15006","type":"FT10","reading":22.9}')
+        bridge.publish_status_changes(observed_at)
+        bridge.close()
+        return [topic for topic, _kwargs in client.calls]
+
+    assert run_once() == [
+        "homeassistant/device/15006/config",
+        "measurements/RTR970123/15006",
+        "status/RTR970123",
+        "status/RTR970123/15006",
+    ]
+    assert run_once() == ["measurements/RTR970123/15006"]
 
 
-def test_publish_status_uses_retained_status_topic_payload():
+def test_bridge_reload_metadata_swaps_index_and_refreshes_discovery():
     """
-    Status publishing is retained and separate from measurement publishing.
+    Metadata reloads take effect immediately and refresh only changed discovery.
     """
 
-    class FakeClient:
+    class FakePublisher:
         def __init__(self):
             self.calls = []
 
-        def publish(self, topic, **kwargs):
-            self.calls.append((topic, kwargs))
-            return (0, 1)
-
-    client = FakeClient()
-    payload = {
-        "entity_type": "sensor",
-        "receiver": "RTR970123",
-        "sensor": "15006",
-        "status": "online",
-        "status_code": 1,
-        "last_received_at": "2026-04-26T10:15:32Z",
-        "last_publish_at": "2026-04-26T10:15:33Z",
-        "error_count": 0,
-    }
+        def republish_changed(self, client, sensor_ids, metadata_index):
+            self.calls.append((client, sensor_ids, metadata_index))
+            return []
 
-    result, mid = runtime.publish_status(
-        client,
-        "status/RTR970123/15006",
-        payload,
+    publisher = FakePublisher()
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(scl_address=126),
+        transmitters_metadata=json.dumps([
+            {"id": 15006, "location": "Room"},
+            {"id": 15007, "location": "Hall"},
+        ]),
+        discovery_publisher=publisher,
     )
+    bridge.mqtt_client = SimpleNamespace(connected_flag=True)
+    reloaded = runtime.metadata.TransmitterMetadataIndex([
+        {"id": 15006, "location": "Room"},
+        {"id": 15007, "location": "Kitchen"},
+    ])
 
-    assert result == 0
-    assert mid == 1
-    assert client.calls[0][0] == "status/RTR970123/15006"
-    assert client.calls[0][1]["qos"] == 1
-    assert client.calls[0][1]["retain"] is True
-    assert json.loads(client.calls[0][1]["payload"]) == payload
+    bridge.reload_metadata(reloaded)
+    bridge.apply_metadata_changes()
+    bridge.apply_metadata_changes()
 
+    assert bridge.transmitters_metadata is reloaded
+    assert publisher.calls == [(bridge.mqtt_client, {15007}, reloaded)]
 
-def test_publish_summary_uses_retained_receiver_summary_topic():
+
+class _QueuedSerial:
     """
-    Summary publishing is retained and separate from measurements and status.
+    Fake receiver serial port that answers polls from a list of SCL payloads.
     """
 
-    class FakeClient:
-        def __init__(self):
-            self.calls = []
+    name = port = "/dev/cu.usbserial-test"
 
-        def publish(self, topic, **kwargs):
-            self.calls.append((topic, kwargs))
-            return (0, 1)
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.writes = 0
+        self.frame = b""
 
-    client = FakeClient()
-    payload = {
-        "receiver": "RTR970123",
-        "updated_at": "2026-04-26T12:00:00Z",
-        "transmitters": {
-            "15006": {
-                "value": 22.9,
-                "battery": 2.6,
-                "measured_at": "2026-04-26T10:15:32Z",
-                "status": "online",
-                "status_code": 1,
-            },
-        },
-    }
+    def write(self, _command):
+        self.writes += 1
+        payload = self.payloads.pop(0) if self.payloads else "#"
+        self.frame = b"\x80" + payload.encode("ascii") + b"\x03"
 
-    result, mid = runtime.publish_summary(client, "RTR970123", payload)
+    def read_until(self, _end):
+        return self.frame
 
-    assert result == 0
-    assert mid == 1
-    assert client.calls[0][0] == "summary/RTR970123"
-    assert client.calls[0][1]["qos"] == 1
-    assert client.calls[0][1]["retain"] is True
-    assert json.loads(client.calls[0][1]["payload"]) == payload
+    def read(self, _size):
+        return runtime.scl.calc_bcc(self.frame)
 
 
-def test_bridge_publishes_measurement_unchanged_and_retained_status(monkeypatch):
+def test_drain_reads_ring_buffer_until_empty():
     """
-    Bridge status publishing is additive and does not alter measurement payloads.
+    Drain mode polls back-to-back and reports batch size and duration.
     """
+    serial_handle = _QueuedSerial(
+        ["0 90 58 15006 145 11", "0 122 58 15006 145 11", "0 90 58 15007 145 11"]
+    )
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126))
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=serial_handle,
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
+    )
 
-    class FakeClient:
-        def __init__(self):
-            self.calls = []
+    result = bridge.drain(max_packets=10)
 
-        def publish(self, topic, **kwargs):
-            self.calls.append((topic, kwargs))
-            return (0, len(self.calls))
+    assert result.state is runtime.BridgeState.IDLE
+    assert result.packets == 3
+    assert [measurement.sensor_id for measurement in result.measurements] == [
+        "15006",
+        "15007",
+    ]
+    assert result.drain_seconds >= 0
+    assert bridge.last_drain is result
+    assert serial_handle.writes == 4
 
-    observed_at = datetime(2026, 4, 26, 10, 15, 32, tzinfo=timezone.utc)
-    published_at = datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc)
-    times = iter([observed_at, published_at, published_at])
-    measurement_json = '{"id":"15006","reading":22.9}'
-    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, offline_timeout=1800))
+
+def test_poll_once_records_packet_and_latency_metrics():
+    """
+    Every poll observes the serial RTT and every packet is counted and timed.
+    """
+    serial_handle = _QueuedSerial(["0 90 58 15006 145 11", "0 122 58 15006 145 11"])
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126))
     bridge.receiver = runtime.ReceiverConnection(
-        serial_handle=SimpleNamespace(),
+        serial_handle=serial_handle,
         device_type="RTR970",
         receiver_serial_number="RTR970123",
         serial_config={},
     )
-    bridge.mqtt_client = FakeClient()
+    packets = runtime.metrics.PACKETS.value
+    size_mismatches = runtime.metrics.SIZE_MISMATCHES.value
+    polls = runtime.metrics.SERIAL_RTT.count
+    decodes = runtime.metrics.DECODE_TIME.count
+    drains = runtime.metrics.DRAIN_PACKETS.count
+    drained_packets = runtime.metrics.DRAIN_PACKETS.samples()[-2][2]
 
-    monkeypatch.setattr(runtime.status, "utc_now", lambda: next(times))
+    bridge.drain(max_packets=10)
 
-    measurement = json.loads(measurement_json)
-    receiver = bridge.receiver.receiver_serial_number
-    bridge.status_tracker.record_observation(receiver, measurement["id"], observed_at)
-    result, _mid = bridge.publish_measurement(measurement_json)
-    if result == runtime.mqtt.MQTT_ERR_SUCCESS:
-        bridge.status_tracker.record_publish_success(
-            receiver,
-            measurement["id"],
-            published_at,
-        )
-    bridge.publish_status_changes()
+    assert runtime.metrics.PACKETS.value == packets + 2
+    assert runtime.metrics.SIZE_MISMATCHES.value == size_mismatches + 1
+    assert runtime.metrics.SERIAL_RTT.count == polls + 3
+    assert runtime.metrics.DECODE_TIME.count == decodes + 2
+    assert runtime.metrics.DRAIN_PACKETS.count == drains + 1
+    assert runtime.metrics.DRAIN_PACKETS.samples()[-2][2] == drained_packets + 2
 
-    assert bridge.mqtt_client.calls[0] == (
-        "measurements/RTR970123/15006",
-        {"payload": measurement_json, "qos": 1, "retain": False},
+
+def test_drain_stops_at_batch_limit():
+    """
+    Drain batches are bounded so bookkeeping still runs during long bursts.
+    """
+    serial_handle = _QueuedSerial(["0 90 58 15006 145 11"] * 5)
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126))
+    bridge.receiver = runtime.ReceiverConnection(
+        serial_handle=serial_handle,
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
     )
-    status_topics = [topic for topic, _kwargs in bridge.mqtt_client.calls[1:]]
-    assert status_topics == ["status/RTR970123", "status/RTR970123/15006"]
-    for _topic, kwargs in bridge.mqtt_client.calls[1:]:
-        assert kwargs["retain"] is True
-        payload = json.loads(kwargs["payload"])
-        assert payload["status"] == "online"
-        assert payload["status_code"] == 1
 
+    result = bridge.drain(max_packets=2)
 
-def test_bridge_coalesces_summary_publish_without_changing_existing_topics():
+    assert result.state is runtime.BridgeState.READY
+    assert result.packets == 2
+    assert len(serial_handle.payloads) == 3
+
+
+def test_drain_mode_cycle_publishes_status_once_per_batch(monkeypatch):
     """
-    Rapid measurement updates become one retained summary after debounce.
+    Drain mode publishes every measurement but runs status bookkeeping once.
     """
 
     class FakeClient:
@@ -608,386 +768,533 @@ def test_bridge_coalesces_summary_publish_without_changing_existing_topics():
             self.calls.append((topic, kwargs))
             return (0, len(self.calls))
 
-    measurement_one = {
-        "id": "15006",
-        "reading": 22.9,
-        "battery": 2.6,
-        "timestamp": "2026-04-26T10:15:32Z",
-        "location": "Technical room",
-        "description": "Floor heating input",
-        "unit": "°C",
-        "quantity": "Temperature",
-        "zone": "Heating",
-    }
-    measurement_two = {
-        "id": "15007",
-        "reading": 48.1,
-        "timestamp": "2026-04-26T10:15:33Z",
-    }
-    bridge = runtime.MtrBridge(
-        SimpleNamespace(
-            scl_address=126,
-            offline_timeout=1800,
-            summary_debounce_seconds=5,
-        )
-    )
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, drain_mode=True))
     bridge.receiver = runtime.ReceiverConnection(
-        serial_handle=SimpleNamespace(),
+        serial_handle=_QueuedSerial(["0 90 58 15006 145 11", "0 90 58 15007 145 11"]),
         device_type="RTR970",
         receiver_serial_number="RTR970123",
         serial_config={},
     )
     bridge.mqtt_client = FakeClient()
-    receiver = bridge.receiver.receiver_serial_number
-
-    bridge.summary_tracker._monotonic = lambda: 0
-    for measurement in [measurement_one, measurement_two]:
-        bridge.status_tracker.record_observation(
-            receiver,
-            measurement["id"],
-            datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc),
-        )
-        bridge.summary_tracker.record_measurement(
-            receiver,
-            measurement,
-            bridge.status_tracker.sensor_payload(
-                receiver,
-                measurement["id"],
-                datetime(2026, 4, 26, 10, 15, 33, tzinfo=timezone.utc),
-            ),
-        )
-        bridge.publish_measurement(json.dumps(measurement))
-        bridge.publish_due_summaries(
-            datetime(2026, 4, 26, 10, 15, 34, tzinfo=timezone.utc),
-        )
-
-    assert [topic for topic, _kwargs in bridge.mqtt_client.calls] == [
-        "measurements/RTR970123/15006",
-        "measurements/RTR970123/15007",
-    ]
-
-    bridge.summary_tracker._monotonic = lambda: 5
-    bridge.publish_due_summaries(
-        datetime(2026, 4, 26, 10, 15, 38, tzinfo=timezone.utc),
+    status_publishes = []
+    original = bridge.publish_status_changes
+    monkeypatch.setattr(
+        bridge,
+        "publish_status_changes",
+        lambda now=None: status_publishes.append(original(now)),
     )
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
 
-    assert [topic for topic, _kwargs in bridge.mqtt_client.calls] == [
-        "measurements/RTR970123/15006",
-        "measurements/RTR970123/15007",
-        "summary/RTR970123",
-    ]
-    summary_payload = json.loads(bridge.mqtt_client.calls[-1][1]["payload"])
-    assert bridge.mqtt_client.calls[-1][1]["retain"] is True
-    assert set(summary_payload["transmitters"]) == {"15006", "15007"}
-    assert summary_payload["transmitters"]["15006"]["value"] == 22.9
-    assert summary_payload["transmitters"]["15006"]["battery"] == 2.6
-    assert summary_payload["transmitters"]["15006"]["status"] == "online"
-    assert summary_payload["transmitters"]["15006"]["status_code"] == 1
-    assert summary_payload["transmitters"]["15006"]["location"] == "Technical room"
+    state = bridge._poll_cycle()
 
+    assert state is runtime.BridgeState.IDLE
+    assert len(status_publishes) == 1
+    topics = [topic for topic, _kwargs in bridge.mqtt_client.calls]
+    assert topics[:2] == ["measurements/RTR970123/15006", "measurements/RTR970123/15007"]
+    assert "status/RTR970123/15007" in topics
 
-def test_bridge_summary_updates_status_to_offline_without_clearing_value():
+
+def test_drain_batch_counts_as_one_traffic_arrival(monkeypatch):
     """
-    Offline status transitions update summary availability only.
+    Inter-arrival times are measured between poll batches, not measurements.
     """
 
     class FakeClient:
-        def __init__(self):
-            self.calls = []
-
         def publish(self, topic, **kwargs):
-            self.calls.append((topic, kwargs))
-            return (0, len(self.calls))
+            return (0, 1)
 
-    bridge = runtime.MtrBridge(
-        SimpleNamespace(
-            scl_address=126,
-            offline_timeout=60,
-            summary_debounce_seconds=5,
-        )
-    )
+    monotonic_now = [50.0]
+    monkeypatch.setattr(runtime.time, "monotonic", lambda: monotonic_now[0])
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, drain_mode=True))
+    serial_handle = _QueuedSerial(["0 90 58 15006 145 11", "0 90 58 15007 145 11"])
     bridge.receiver = runtime.ReceiverConnection(
-        serial_handle=SimpleNamespace(),
+        serial_handle=serial_handle,
         device_type="RTR970",
         receiver_serial_number="RTR970123",
         serial_config={},
     )
     bridge.mqtt_client = FakeClient()
-    receiver = bridge.receiver.receiver_serial_number
-    observed_at = datetime(2026, 4, 26, 10, 15, 32, tzinfo=timezone.utc)
-    offline_at = datetime(2026, 4, 26, 10, 16, 33, tzinfo=timezone.utc)
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
 
-    bridge.summary_tracker._monotonic = lambda: 0
-    bridge.status_tracker.record_observation(receiver, "15006", observed_at)
-    bridge.summary_tracker.record_measurement(
-        receiver,
-        {
-            "id": "15006",
-            "reading": 22.9,
-            "battery": 2.6,
-            "timestamp": "2026-04-26T10:15:32Z",
-        },
-        bridge.status_tracker.sensor_payload(receiver, "15006", observed_at),
-    )
-    bridge.publish_status_changes(observed_at)
-    bridge.summary_tracker._monotonic = lambda: 5
-    bridge.publish_due_summaries(observed_at)
+    bridge._poll_cycle()
+    monotonic_now[0] += 4
+    serial_handle.payloads = ["0 90 58 15008 145 11", "0 90 58 15009 145 11"]
+    bridge._poll_cycle()
 
-    bridge.summary_tracker._monotonic = lambda: 10
-    bridge.publish_status_changes(offline_at)
-    bridge.summary_tracker._monotonic = lambda: 15
-    bridge.publish_due_summaries(offline_at)
+    assert list(bridge.poll_scheduler.inter_arrival_times) == [4.0]
 
-    summary_payloads = [
-        json.loads(kwargs["payload"])
-        for topic, kwargs in bridge.mqtt_client.calls
-        if topic == "summary/RTR970123"
-    ]
-    assert len(summary_payloads) == 2
-    entry = summary_payloads[-1]["transmitters"]["15006"]
-    assert entry["value"] == 22.9
-    assert entry["battery"] == 2.6
-    assert entry["measured_at"] == "2026-04-26T10:15:32Z"
-    assert entry["status"] == "offline"
-    assert entry["status_code"] == 0
 
+def test_run_forever_backs_off_while_receiver_is_idle(monkeypatch):
+    """
+    Idle polls back off exponentially and traffic resets the poll interval.
+    """
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(scl_address=126, poll_interval_min=0.1, poll_interval_max=0.3)
+    )
+    states = iter(
+        [
+            runtime.BridgeState.IDLE,
+            runtime.BridgeState.IDLE,
+            runtime.BridgeState.IDLE,
+            runtime.BridgeState.READY,
+            runtime.BridgeState.IDLE,
+            runtime.BridgeState.WAITING_FOR_RECEIVER,
+        ]
+    )
+    sleeps = []
+
+    def poll_cycle():
+        try:
+            state = next(states)
+        except StopIteration as error:
+            raise KeyboardInterrupt from error
+        if state is runtime.BridgeState.READY:
+            bridge.poll_scheduler.record_traffic()
+        return state
 
-def test_log_measurement_adds_structured_measurement_payload(caplog):
-    """
-    Measurement logs carry the parsed payload as structured data.
-    """
-    with caplog.at_level("INFO"):
-        runtime.log_measurement('{"id":"15006","reading":22.9,"location":"Kids room"}')
+    monkeypatch.setattr(bridge, "start", lambda: None)
+    monkeypatch.setattr(bridge, "_poll_cycle", poll_cycle)
+    monkeypatch.setattr(runtime.time, "sleep", sleeps.append)
 
-    assert caplog.records[0].event == "measurement_received"
-    assert caplog.records[0].measurement["id"] == "15006"
-    assert caplog.records[0].measurement["location"] == "Kids room"
+    bridge.run_forever()
+
+    assert sleeps == pytest.approx([0.1, 0.2, 0.3, 0.1, 1])
 
 
-def test_build_receiver_connection_logs_structured_receiver_details(monkeypatch, caplog):
+def test_poll_cycle_polls_every_receiver_and_shares_trackers(monkeypatch):
     """
-    Receiver connection logs expose the device and serial identity as fields.
+    Measurements from several receivers are published under their own serials.
     """
 
-    class FakeSerial:
-        name = "/dev/cu.usbserial-test"
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
 
-        def get_settings(self):
-            return {"baudrate": 9600}
+        def publish(self, topic, **kwargs):
+            self.calls.append(topic)
+            return (0, len(self.calls))
 
-    monkeypatch.setattr(runtime, "_read_receiver_serial_number", lambda *_args: "A118636")
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126))
+    bridge.receivers = [
+        runtime.ReceiverConnection(
+            serial_handle=_QueuedSerial(["0 90 58 15006 145 11"]),
+            device_type="RTR970",
+            receiver_serial_number="RTR970123",
+            serial_config={},
+        ),
+        runtime.ReceiverConnection(
+            serial_handle=_QueuedSerial([]),
+            device_type="FTR980",
+            receiver_serial_number="FTR980456",
+            serial_config={},
+        ),
+        runtime.ReceiverConnection(
+            serial_handle=_QueuedSerial(["0 90 58 16001 145 11"]),
+            device_type="RTR970",
+            receiver_serial_number="RTR970789",
+            serial_config={},
+        ),
+    ]
+    bridge.mqtt_client = FakeClient()
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
 
-    with caplog.at_level("INFO"):
-        receiver = runtime._build_receiver_connection(
-            FakeSerial(),
-            SimpleNamespace(scl_address=126),
-            "RTR970 V3.0",
-        )
+    state = bridge._poll_cycle()
+    bridge._poll_executor.shutdown()
 
-    assert receiver.receiver_serial_number == "A118636"
-    assert caplog.records[0].event == "receiver_connected"
-    assert caplog.records[0].device_type == "RTR970 V3.0"
-    assert caplog.records[0].serial_port == "/dev/cu.usbserial-test"
+    assert state is runtime.BridgeState.READY
+    assert bridge.state is runtime.BridgeState.READY
+    assert bridge.bridge_status.diagnostics_for("RTR970123").state is runtime.BridgeState.READY
+    assert bridge.bridge_status.diagnostics_for("FTR980456").state is runtime.BridgeState.IDLE
+    assert "measurements/RTR970123/15006" in bridge.mqtt_client.calls
+    assert "measurements/RTR970789/16001" in bridge.mqtt_client.calls
+    assert "status/RTR970123/15006" in bridge.mqtt_client.calls
+    assert "status/RTR970789/16001" in bridge.mqtt_client.calls
+    assert bridge.status_tracker.sensor_payload("RTR970789", "16001") is not None
 
 
-def test_bridge_recovers_and_uses_refreshed_receiver_serial_number(monkeypatch):
+def test_failed_recovery_drops_only_the_lost_receiver(monkeypatch):
     """
-    After serial recovery, publishes use the refreshed receiver serial number.
+    A receiver that cannot be recovered is dropped while the others keep polling.
     """
 
     class BrokenSerial:
-        port = "/dev/cu.usbserial-old"
-        name = port
-
-        def write(self, _command):
-            raise OSError("Device not configured")
+        name = port = "/dev/ttyUSB0"
 
-        def close(self):
-            pass
+        def write(self, _data):
+            raise runtime.serial.serialutil.SerialException("unplugged")
 
-    old_receiver = runtime.ReceiverConnection(
+    lost = runtime.ReceiverConnection(
         serial_handle=BrokenSerial(),
         device_type="RTR970",
         receiver_serial_number="RTR970123",
-        serial_config={"baudrate": 9600},
+        serial_config={},
     )
-    new_receiver = runtime.ReceiverConnection(
-        serial_handle=SimpleNamespace(name="/dev/cu.usbserial-new"),
+    healthy = runtime.ReceiverConnection(
+        serial_handle=_QueuedSerial([]),
         device_type="RTR970",
         receiver_serial_number="RTR970456",
-        serial_config={"baudrate": 9600},
+        serial_config={},
     )
-    args = SimpleNamespace(scl_address=126, serial_port="/dev/cu.usbserial-old")
-    bridge = runtime.MtrBridge(args)
-    bridge.receiver = old_receiver
-    bridge.mqtt_client = object()
-
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126))
+    bridge.receivers = [lost, healthy]
     captured = {}
 
-    monkeypatch.setattr(runtime.time, "sleep", lambda _: None)
-    monkeypatch.setattr(
-        runtime,
-        "recover_receiver_connection",
-        lambda receiver, _args: new_receiver,
+    def recover(receiver, _args, exclude_ports=()):
+        captured["exclude_ports"] = exclude_ports
+        return None
+
+    monkeypatch.setattr(runtime, "recover_receiver_connection", recover)
+
+    result = bridge.poll_once(lost)
+
+    assert result.state is runtime.BridgeState.RECOVERING
+    assert bridge.receivers == [healthy]
+    assert captured["exclude_ports"] == {healthy.serial_handle.port}
+
+
+def test_pipeline_mode_publishes_measurements_read_by_reader_thread(monkeypatch):
+    """
+    In pipeline mode a reader thread queues measurements for the publisher stage.
+    """
+
+    class FakeClient:
+        connected_flag = True
+
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append(topic)
+            return (0, len(self.calls))
+
+        def loop_stop(self):
+            return None
+
+        def disconnect(self):
+            return None
+
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(scl_address=126, pipeline=True, pipeline_queue_size=10)
     )
-    monkeypatch.setattr(
-        runtime,
-        "publish_measurement",
-        lambda _client, receiver_serial_number, _json, ha_discovery_publisher=None: (
-            captured.setdefault("receiver_serial_number", receiver_serial_number),
-            None,
-        ),
+    receiver = runtime.ReceiverConnection(
+        serial_handle=_QueuedSerial(["0 90 58 15006 145 11", "0 90 58 15007 145 11"]),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
     )
+    receiver.serial_handle.close = lambda: None
+    client = FakeClient()
 
-    result = bridge.poll_once()
+    def start():
+        bridge.receiver = receiver
+        bridge.mqtt_client = client
 
-    assert result.state is runtime.BridgeState.RECOVERING
-    assert result.measurement_json is None
-    assert bridge.receiver is new_receiver
-    assert bridge.state is runtime.BridgeState.READY
+    handled = []
+    original = bridge.handle_measurement
 
-    bridge.publish_measurement('{"id":"15006","reading":22.9}')
+    def handle_measurement(measurement, receiver=None):
+        handled.append(threading.current_thread().name)
+        result = original(measurement, receiver)
+        if len(handled) == 2:
+            raise KeyboardInterrupt
+        return result
 
-    assert captured["receiver_serial_number"] == "RTR970456"
+    monkeypatch.setattr(bridge, "start", start)
+    monkeypatch.setattr(bridge, "handle_measurement", handle_measurement)
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
 
+    bridge.run_forever()
 
-def test_poll_once_returns_waiting_state_when_no_receiver_is_available(monkeypatch):
+    assert handled == [threading.current_thread().name] * 2
+    assert "measurements/RTR970123/15006" in client.calls
+    assert "measurements/RTR970123/15007" in client.calls
+    assert bridge.measurement_queue.closed is True
+    assert bridge.measurement_queue.high_water_mark >= 1
+
+
+def test_pipeline_mode_reraises_unexpected_reader_errors(monkeypatch, caplog):
     """
-    Polling exposes the no-receiver case explicitly.
+    An unexpected serial reader failure is logged and stops the publisher.
     """
-    args = SimpleNamespace(scl_address=126, serial_port=None)
-    bridge = runtime.MtrBridge(args)
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, pipeline=True))
 
-    monkeypatch.setattr(runtime, "open_receiver_connection", lambda _args: None)
+    def read_receivers():
+        raise UnicodeDecodeError("ascii", b"\xff", 0, 1, "bad frame")
 
-    result = bridge.poll_once()
+    monkeypatch.setattr(bridge, "start", lambda: None)
+    monkeypatch.setattr(bridge, "_read_receivers", read_receivers)
 
-    assert result.state is runtime.BridgeState.WAITING_FOR_RECEIVER
-    assert result.measurement_json is None
-    assert bridge.state is runtime.BridgeState.WAITING_FOR_RECEIVER
+    with pytest.raises(UnicodeDecodeError):
+        bridge.run_forever()
 
+    assert "Serial reader stopped" in caplog.text
+    assert bridge.measurement_queue.closed is True
 
-def test_poll_once_returns_idle_for_empty_ring_buffer(monkeypatch):
+
+def test_bridge_spools_while_disconnected_and_replays_in_order(tmp_path, monkeypatch):
     """
-    Polling exposes an empty receiver buffer as an idle cycle.
+    Measurements are spooled during an outage and replayed with their timestamps.
     """
 
-    class FakeSerial:
-        name = "/dev/cu.usbserial-test"
-
-        def write(self, _command):
-            return None
-
-        def read_until(self, _end):
-            return b"\x80#\x03"
+    class FakeClient:
+        def __init__(self):
+            self.connected_flag = False
+            self.calls = []
 
-        def read(self, _size):
-            return runtime.scl.calc_bcc(b"\x80#\x03")
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs["payload"]))
+            return (0, len(self.calls))
 
-    args = SimpleNamespace(scl_address=126)
-    bridge = runtime.MtrBridge(args)
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            spool_file=str(tmp_path / "spool.db"),
+            spool_replay_rate=1000,
+        )
+    )
+    bridge.spooler = runtime.open_spooling_publisher(bridge.args)
     bridge.receiver = runtime.ReceiverConnection(
-        serial_handle=FakeSerial(),
+        serial_handle=SimpleNamespace(name="/dev/ttyUSB0", port="/dev/ttyUSB0"),
         device_type="RTR970",
         receiver_serial_number="RTR970123",
-        serial_config={"baudrate": 9600},
+        serial_config={},
+    )
+    bridge.mqtt_client = FakeClient()
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
+    first = runtime.mtr.Measurement.from_json(
+        '{"id": "15006", "reading": 22.9, "timestamp": "2026-01-01 00:00:00+00:00"}'
+    )
+    second = runtime.mtr.Measurement.from_json(
+        '{"id": "15007", "reading": 21.0, "timestamp": "2026-01-01 00:00:05+00:00"}'
     )
 
-    result = bridge.poll_once()
+    assert bridge.handle_measurement(first) == (runtime.PUBLISH_SPOOLED, None)
+    assert bridge.replay_spool() == 0
+    bridge.mqtt_client.connected_flag = True
+    assert bridge.handle_measurement(second) == (runtime.PUBLISH_SPOOLED, None)
+    assert bridge.mqtt_client.calls == []
 
-    assert result.state is runtime.BridgeState.IDLE
-    assert result.measurement_json is None
-    assert bridge.state is runtime.BridgeState.IDLE
+    assert bridge.replay_spool() == 1
+    time.sleep(0.01)
+    assert bridge.replay_spool() == 1
+
+    assert bridge.mqtt_client.calls == [
+        ("measurements/RTR970123/15006", first.to_json()),
+        ("measurements/RTR970123/15007", second.to_json()),
+    ]
+    assert len(bridge.spooler) == 0
+    assert bridge.status_tracker.sensor_payload("RTR970123", "15006")["error_count"] == 0
+    bridge.spooler.close()
 
 
-def test_poll_once_returns_measurement_payload_when_data_is_available(monkeypatch):
+def test_sweep_status_publishes_offline_exactly_after_deadline():
     """
-    Polling exposes parsed measurements explicitly instead of overloading None.
+    Offline transitions are published as soon as the deadline passes.
     """
 
-    class FakeSerial:
-        name = "/dev/cu.usbserial-test"
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
 
-        def write(self, _command):
-            return None
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, json.loads(kwargs["payload"])))
+            return (0, len(self.calls))
 
-        def read_until(self, _end):
-            return b"\x800 90 58 15006 145 11\x03"
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, offline_timeout=60))
+    bridge.mqtt_client = FakeClient()
+    observed_at = datetime(2026, 4, 26, 10, 15, 32, tzinfo=timezone.utc)
+    bridge.status_tracker.record_observation("RTR970123", "15006", observed_at)
+    bridge.publish_status_changes(observed_at)
+    bridge.mqtt_client.calls.clear()
 
-        def read(self, _size):
-            return runtime.scl.calc_bcc(b"\x800 90 58 15006 145 11\x03")
+    deadline = observed_at + timedelta(seconds=60)
+    assert bridge._status_delay(observed_at + timedelta(seconds=59.5)) == pytest.approx(
+        0.5 + runtime.STATUS_DEADLINE_SLACK
+    )
+    assert bridge.sweep_status(now=deadline) == []
+    published = bridge.sweep_status(now=deadline + timedelta(milliseconds=1))
 
-    args = SimpleNamespace(scl_address=126)
-    bridge = runtime.MtrBridge(args)
-    bridge.receiver = runtime.ReceiverConnection(
-        serial_handle=FakeSerial(),
-        device_type="RTR970",
-        receiver_serial_number="RTR970123",
-        serial_config={"baudrate": 9600},
+    assert [payload["status"] for payload, _mid in published] == ["offline", "offline"]
+    assert bridge._status_delay() is None
+
+
+def test_idle_pause_wakes_for_next_timer(monkeypatch):
+    """
+    Idle backoff never sleeps past the next status or summary timer.
+    """
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(scl_address=126, poll_interval_min=5, poll_interval_max=5)
     )
+    sleeps = []
+    monkeypatch.setattr(runtime.time, "sleep", sleeps.append)
+    monkeypatch.setattr(bridge, "_seconds_until_next_timer", lambda: 0.25)
 
-    result = bridge.poll_once()
+    bridge._pause_after(runtime.BridgeState.IDLE)
 
-    assert result.state is runtime.BridgeState.READY
-    assert result.measurement_json is not None
-    assert '"id": "15006"' in result.measurement_json
-    assert bridge.state is runtime.BridgeState.READY
+    assert sleeps == [0.25]
 
 
-def test_poll_once_skips_measurements_missing_from_metadata_when_enabled(caplog):
+def test_idle_pause_ignores_overdue_summary_while_mqtt_is_disconnected(monkeypatch):
     """
-    Metadata-only mode drops unmatched transmitters before any view or publish path.
+    A summary that cannot be published does not turn the idle pause into a
+    busy loop.
     """
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(
+            scl_address=126,
+            poll_interval_min=1,
+            poll_interval_max=1,
+            summary_debounce_seconds=0,
+        )
+    )
+    bridge.summary_tracker.record_measurement("RTR970123", {"id": "15006", "reading": 1})
+    bridge.mqtt_client = SimpleNamespace(connected_flag=False)
+    sleeps = []
+    monkeypatch.setattr(runtime.time, "sleep", sleeps.append)
 
-    class FakeSerial:
-        name = "/dev/cu.usbserial-test"
-
-        def write(self, _command):
-            return None
+    assert bridge.publish_due_summaries() == []
+    bridge._pause_after(runtime.BridgeState.IDLE)
 
-        def read_until(self, _end):
-            return b"\x800 90 58 15006 145 11\x03"
+    assert sleeps == [1]
 
-        def read(self, _size):
-            return runtime.scl.calc_bcc(b"\x800 90 58 15006 145 11\x03")
 
-    args = SimpleNamespace(
-        scl_address=126,
-        metadata_transmitters_only=True,
+def test_pipeline_reader_pause_leaves_timers_to_the_publisher(monkeypatch):
+    """
+    The reader thread pauses on the poll scheduler alone and never reads the
+    status or summary trackers owned by the publisher thread.
+    """
+    bridge = runtime.MtrBridge(
+        SimpleNamespace(scl_address=126, poll_interval_min=5, poll_interval_max=5)
+    )
+    sleeps = []
+    monkeypatch.setattr(runtime.time, "sleep", sleeps.append)
+    monkeypatch.setattr(
+        bridge, "_read_receivers", lambda: (runtime.BridgeState.IDLE, [])
     )
+
+    def fail():
+        raise AssertionError("reader thread read the timers")
+
+    monkeypatch.setattr(bridge, "_seconds_until_next_timer", fail)
+
+    assert list(bridge._read_batch()) == []
+    assert sleeps == [5]
+
+
+def test_bridge_publishes_retained_bridge_status_once_per_interval(monkeypatch):
+    """
+    Bridge diagnostics go to a retained topic per receiver with HA discovery.
+    """
+
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def publish(self, topic, **kwargs):
+            self.calls.append((topic, kwargs))
+            return (0, len(self.calls))
+
+    monotonic_now = [1000.0]
+    monkeypatch.setattr(runtime.time, "monotonic", lambda: monotonic_now[0])
     bridge = runtime.MtrBridge(
-        args,
-        transmitters_metadata=json.dumps([{"id": 99999, "location": "Elsewhere"}]),
+        SimpleNamespace(
+            scl_address=126,
+            bridge_status=True,
+            bridge_status_interval=60,
+        ),
+        discovery_publisher=homeassistant.DiscoveryPublisher("homeassistant"),
     )
+    bridge.mqtt_client = FakeClient()
+    bridge.mqtt_client.published_count = 5
+    bridge.mqtt_client.acknowledged_count = 3
     bridge.receiver = runtime.ReceiverConnection(
-        serial_handle=FakeSerial(),
+        serial_handle=None,
         device_type="RTR970",
         receiver_serial_number="RTR970123",
-        serial_config={"baudrate": 9600},
+        serial_config={},
     )
+    bridge.bridge_status.diagnostics_for("RTR970123").record_state(runtime.BridgeState.READY)
+    now = datetime(2026, 4, 26, 10, 15, 32, tzinfo=timezone.utc)
 
-    with caplog.at_level("DEBUG"):
-        result = bridge.poll_once()
-
-    assert result.state is runtime.BridgeState.READY
-    assert result.measurement_json is None
-    assert bridge.state is runtime.BridgeState.READY
-    assert caplog.records[-1].event == "measurement_skipped_unconfigured"
-    assert caplog.records[-1].measurement["id"] == "15006"
-
+    published = bridge.publish_bridge_status(now)
 
-def test_bridge_start_raises_receiver_error_when_no_receiver_is_found(monkeypatch):
+    topics = [topic for topic, _kwargs in bridge.mqtt_client.calls]
+    assert topics == [
+        "homeassistant/device/mtr2mqtt_bridge_rtr970123/config",
+        "status/RTR970123/bridge",
+    ]
+    status_kwargs = bridge.mqtt_client.calls[1][1]
+    assert status_kwargs["retain"] is True
+    assert status_kwargs["qos"] == 1
+    payload, _mid = published[0]
+    assert payload["receiver"] == "RTR970123"
+    assert payload["state"] == "ready"
+    assert payload["mqtt_inflight"] == 2
+    assert payload["updated_at"] == "2026-04-26T10:15:32Z"
+    discovery = json.loads(bridge.mqtt_client.calls[0][1]["payload"])
+    assert discovery["state_topic"] == "status/RTR970123/bridge"
+    assert discovery["cmps"]["poll_rtt_p95_ms"]["entity_category"] == "diagnostic"
+
+    monotonic_now[0] += 30
+    assert bridge.publish_bridge_status(now) == []
+    monotonic_now[0] += 30
+    assert len(bridge.publish_bridge_status(now)) == 1
+    assert len(bridge.mqtt_client.calls) == 3
+
+
+def test_bridge_status_reports_the_statistics_of_each_receiver(monkeypatch):
     """
-    Bridge startup reports missing receivers as a runtime exception.
+    Packet counts and poll round-trip times are kept per receiver.
     """
-    args = SimpleNamespace(scl_address=126)
-    bridge = runtime.MtrBridge(args)
 
-    monkeypatch.setattr(runtime, "open_receiver_connection", lambda _args: None)
+    class FakeClient:
+        def publish(self, topic, **kwargs):
+            return (0, 1)
 
-    try:
-        bridge.start()
-    except runtime.ReceiverConnectionError as error:
-        assert "Unable to find MTR receivers" == str(error)
-    else:
-        raise AssertionError("ReceiverConnectionError was not raised")
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126, bridge_status=True))
+    busy = runtime.ReceiverConnection(
+        serial_handle=_QueuedSerial(["0 90 58 15006 145 11", "0 90 58 15007 145 11"]),
+        device_type="RTR970",
+        receiver_serial_number="RTR970123",
+        serial_config={},
+    )
+    quiet = runtime.ReceiverConnection(
+        serial_handle=_QueuedSerial([]),
+        device_type="FTR980",
+        receiver_serial_number="FTR980456",
+        serial_config={},
+    )
+    bridge.receivers = [busy, quiet]
+    bridge.mqtt_client = FakeClient()
+    monkeypatch.setattr(runtime, "log_measurement", lambda _measurement: None)
+    for _ in range(2):
+        bridge.poll_once(busy)
+        bridge.poll_once(quiet)
+
+    payloads = {
+        payload["receiver"]: payload for payload, _mid in bridge.publish_bridge_status()
+    }
+
+    assert payloads["RTR970123"]["packets_total"] == 2
+    assert payloads["RTR970123"]["state"] == "ready"
+    assert payloads["FTR980456"]["packets_total"] == 0
+    assert payloads["FTR980456"]["state"] == "idle"
+    assert payloads["FTR980456"]["poll_rtt_p50_ms"] is not None
+
+
+def test_capture_is_flushed_once_per_interval(monkeypatch):
+    """
+    The capture log is flushed, and rotated if full, from the bridge loop.
+    """
+    monotonic_now = [100.0]
+    monkeypatch.setattr(runtime.time, "monotonic", lambda: monotonic_now[0])
+    flushes = []
+    monkeypatch.setattr(runtime.capture, "flush", lambda: flushes.append(monotonic_now[0]))
+    bridge = runtime.MtrBridge(SimpleNamespace(scl_address=126))
+
+    bridge.housekeeping()
+    monotonic_now[0] += runtime.capture.FLUSH_INTERVAL_SECONDS
+    bridge.housekeeping()
+    bridge.housekeeping()
+
+    assert flushes == [100.0 + runtime.capture.FLUSH_INTERVAL_SECONDS]
@@ -0,0 +1,88 @@
+"""
+Tests for adaptive poll scheduling.
+"""
+
+import pytest
+from context import mtr2mqtt
+from mtr2mqtt import metrics
+from mtr2mqtt import scheduler
+
+
+def test_first_idle_poll_after_traffic_uses_floor_interval():
+    """
+    Polling continues immediately after traffic and then waits the floor interval.
+    """
+    poll_scheduler = scheduler.PollScheduler(min_interval=0.1, max_interval=5)
+
+    poll_scheduler.record_traffic()
+    assert poll_scheduler.next_delay() == 0
+
+    poll_scheduler.record_idle()
+    assert poll_scheduler.next_delay() == pytest.approx(0.1)
+
+
+def test_idle_polls_back_off_exponentially_up_to_ceiling():
+    """
+    Consecutive empty polls double the delay until the configured ceiling.
+    """
+    poll_scheduler = scheduler.PollScheduler(min_interval=0.1, max_interval=0.5)
+    delays = []
+    for _ in range(5):
+        poll_scheduler.record_idle()
+        delays.append(poll_scheduler.next_delay())
+
+    assert delays == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+
+    poll_scheduler.record_traffic()
+    poll_scheduler.record_idle()
+    assert poll_scheduler.next_delay() == pytest.approx(0.1)
+
+
+def test_long_idle_period_stays_at_ceiling():
+    """
+    Thousands of empty polls keep the ceiling delay instead of overflowing.
+    """
+    poll_scheduler = scheduler.PollScheduler(min_interval=0.1, max_interval=1)
+    for _ in range(5000):
+        poll_scheduler.record_idle()
+
+    assert poll_scheduler.next_delay() == 1
+
+    poll_scheduler.record_traffic()
+    poll_scheduler.record_idle()
+    assert poll_scheduler.next_delay() == pytest.approx(0.1)
+
+
+def test_ceiling_is_never_below_floor():
+    """
+    A ceiling lower than the floor is raised to the floor.
+    """
+    poll_scheduler = scheduler.PollScheduler(min_interval=2, max_interval=1)
+
+    poll_scheduler.record_idle()
+    poll_scheduler.record_idle()
+
+    assert poll_scheduler.next_delay() == 2
+
+
+def test_inter_arrival_times_are_recorded():
+    """
+    Measurement inter-arrival times are exposed for tuning.
+    """
+    clock = iter([10.0, 12.0, 13.0, 17.0])
+    poll_scheduler = scheduler.PollScheduler(monotonic=lambda: next(clock))
+    observed = metrics.TRAFFIC_INTER_ARRIVAL.count
+
+    assert poll_scheduler.inter_arrival_stats() == {"count": 0}
+    for _ in range(4):
+        poll_scheduler.record_traffic()
+
+    assert list(poll_scheduler.inter_arrival_times) == [2.0, 1.0, 4.0]
+    assert metrics.TRAFFIC_INTER_ARRIVAL.count == observed + 3
+    assert poll_scheduler.inter_arrival_stats() == {
+        "count": 3,
+        "min": 1.0,
+        "max": 4.0,
+        "mean": pytest.approx(7 / 3),
+        "median": 2.0,
+    }
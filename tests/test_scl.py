@@ -32,6 +32,15 @@ def test_scl_command_creation_with_address():
     assert scl.create_command("TYPE ?", 0) == SCL_COMMAND_TYPE_OUTPUT
 
 
+def test_scl_response_creation():
+    """
+    scl.create_response frames a response with ACK, EXT and checksum bytes
+    """
+    response = scl.create_response("0 91 56 24859 169 11")
+    assert response == b"\x060 91 56 24859 169 11\x03\x12"
+    assert scl.parse_response(response[:-1], response[-1:]) == "0 91 56 24859 169 11"
+
+
 def test_scl_mea_ch_command_creation_with_address():
     """
     scl.create_command returns the SCL command in bytes using defined address
@@ -0,0 +1,153 @@
+"""
+Tests for the synthetic MTR receiver simulator.
+"""
+
+import os
+import threading
+
+import pytest
+import serial
+from context import mtr2mqtt
+from mtr2mqtt import mtr
+from mtr2mqtt import receivers
+from mtr2mqtt import scl
+from mtr2mqtt import simulator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _parse(response):
+    return scl.parse_response(response[:-1], response[-1:])
+
+
+def test_receiver_answers_identity_queries():
+    """
+    TYPE ? and SN ? are answered with checksummed SCL responses.
+    """
+    receiver = simulator.SimulatedReceiver(
+        simulator.TransmitterSchedule([]),
+        identity=simulator.ReceiverIdentity(device_type="FTR980"),
+    )
+
+    assert _parse(receiver.respond(scl.create_command("TYPE ?"))) == "FTR980"
+    assert _parse(receiver.respond(scl.create_command("SN ?"))) == "SIM0001"
+    assert receiver.respond(scl.create_command("MEA CH 1 ?")) is None
+
+
+def test_receiver_serves_decodable_packets_of_every_type():
+    """
+    Every simulated transmitter type decodes to the expected measurement type.
+    """
+    clock = FakeClock()
+    receiver = simulator.SimulatedReceiver(
+        simulator.TransmitterSchedule(
+            simulator.create_transmitters(ft10=1, csr260=1, utility=1, unsupported=1),
+            interval=1,
+            seed=1,
+            monotonic=clock,
+        )
+    )
+    poll_command = scl.create_command("DBG 1 ?")
+
+    clock.now = 1
+    types = set()
+    for _ in range(4):
+        measurement = mtr.mtr_response_to_measurement(
+            _parse(receiver.respond(poll_command)),
+            None,
+        )
+        types.add(measurement["type"])
+
+    assert types == {"FT10", "CSR260", "UTILITY", "MTR262"}
+    assert _parse(receiver.respond(poll_command)) == "#"
+    assert receiver.stats()["served"] == 4
+
+
+def test_ring_buffer_overflow_is_counted():
+    """
+    Packets beyond the ring buffer capacity replace the oldest ones.
+    """
+    clock = FakeClock()
+    receiver = simulator.SimulatedReceiver(
+        simulator.TransmitterSchedule(
+            simulator.create_transmitters(ft10=5),
+            interval=1,
+            seed=1,
+            monotonic=clock,
+        ),
+        buffer_size=3,
+    )
+
+    receiver.advance(now=1)
+
+    assert receiver.stats() == {
+        "generated": 5,
+        "served": 0,
+        "corrupted": 0,
+        "overflows": 2,
+        "buffer_depth": 3,
+    }
+
+
+def test_corrupted_responses_are_rejected_by_the_bridge_parsers():
+    """
+    Corrupted responses fail either the checksum or the length check.
+    """
+    clock = FakeClock()
+    receiver = simulator.SimulatedReceiver(
+        simulator.TransmitterSchedule(
+            simulator.create_transmitters(ft10=20),
+            interval=1,
+            seed=3,
+            monotonic=clock,
+        ),
+        corruption_ratio=1.0,
+    )
+    clock.now = 1
+
+    for _ in range(20):
+        response = receiver.respond(scl.create_command("DBG 1 ?"))
+        payload = _parse(response)
+        assert payload is None or mtr.decode_payload(payload) is None
+    assert receiver.stats()["corrupted"] == 20
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="requires a pty")
+def test_bridge_reads_simulated_receiver_over_pty():
+    """
+    The bridge identifies and polls the simulated receiver through the pty.
+    """
+    receiver = simulator.SimulatedReceiver(
+        simulator.TransmitterSchedule(
+            simulator.create_transmitters(ft10=1),
+            interval=0.01,
+            seed=1,
+        )
+    )
+    master_fd, slave_fd, slave_path = simulator.open_pty()
+    stop_event = threading.Event()
+    server = threading.Thread(
+        target=simulator.serve,
+        args=(receiver, master_fd, stop_event, 0),
+        daemon=True,
+    )
+    server.start()
+    serial_handle = serial.Serial(slave_path, timeout=1)
+    try:
+        assert scl.get_receiver_type(serial_handle, 126) == "RTR970"
+        assert receivers._read_receiver_serial_number(serial_handle, 126) == "SIM0001"
+        serial_handle.write(scl.create_command("DBG 1 ?"))
+        response = serial_handle.read_until(scl.END_CHAR)
+        assert scl.parse_response(response, serial_handle.read(1)) is not None
+    finally:
+        serial_handle.close()
+        stop_event.set()
+        server.join()
+        os.close(master_fd)
+        os.close(slave_fd)
@@ -0,0 +1,75 @@
+"""
+Tests for the on-disk state snapshot.
+"""
+
+import json
+
+from context import mtr2mqtt
+from mtr2mqtt import snapshot
+
+
+def test_snapshot_round_trips_state_atomically(tmp_path):
+    """
+    Saved state is loaded back unchanged and no temporary file is left over.
+    """
+    path = tmp_path / "state.json"
+    state_snapshot = snapshot.StateSnapshot(str(path))
+    state = {"discovery": [["RTR970123", "15006", "abc"]], "status": []}
+
+    state_snapshot.save(state)
+    state_snapshot.save(state)
+
+    assert state_snapshot.load() == state
+    assert [entry.name for entry in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_snapshot_missing_file_loads_as_none(tmp_path):
+    """
+    A first start without a snapshot is not an error.
+    """
+    assert snapshot.StateSnapshot(str(tmp_path / "state.json")).load() is None
+
+
+def test_snapshot_with_mismatching_digest_is_ignored(tmp_path, caplog):
+    """
+    Edited or torn snapshots are ignored instead of partially restored.
+    """
+    path = tmp_path / "state.json"
+    state_snapshot = snapshot.StateSnapshot(str(path))
+    state_snapshot.save({"status": []})
+    document = json.loads(path.read_text(encoding="utf-8"))
+    document["state"]["status"] = [{"entity_type": "receiver"}]
+    path.write_text(json.dumps(document), encoding="utf-8")
+
+    assert state_snapshot.load() is None
+    assert caplog.records[-1].event == "state_snapshot_ignored"
+
+    path.write_text("{not json", encoding="utf-8")
+    assert state_snapshot.load() is None
+
+
+def test_snapshot_saver_saves_once_per_interval_and_restores_caches(tmp_path):
+    """
+    Caches are saved at most once per interval unless forced, and restored
+    section by section.
+    """
+
+    class FakeCache:
+        def __init__(self, entries):
+            self.entries = entries
+
+        def snapshot(self):
+            return list(self.entries)
+
+        def restore(self, entries):
+            self.entries = list(entries)
+
+    path = str(tmp_path / "state.json")
+    saver = snapshot.SnapshotSaver(path, {"status": FakeCache([1, 2])}, interval=60)
+
+    assert saver.save() is False
+    assert saver.save(force=True) is True
+
+    restored = FakeCache([])
+    assert snapshot.SnapshotSaver(path, {"status": restored}).restore() is True
+    assert restored.entries == [1, 2]
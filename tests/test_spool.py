@@ -0,0 +1,108 @@
+"""
+Tests for the disk-backed measurement spool.
+"""
+
+import pytest
+from context import mtr2mqtt
+from mtr2mqtt import spool
+
+
+def test_spool_returns_entries_in_append_order(tmp_path):
+    """
+    Spooled payloads are returned oldest first and removed once replayed.
+    """
+    measurement_spool = spool.MeasurementSpool(str(tmp_path / "spool.db"))
+    measurement_spool.append("RTR970123", "15006", '{"id":"15006","reading":1}')
+    measurement_spool.append("RTR970123", "15007", '{"id":"15007","reading":2}')
+
+    entries = measurement_spool.peek(10)
+
+    assert [entry[1:] for entry in entries] == [
+        ("RTR970123", "15006", '{"id":"15006","reading":1}'),
+        ("RTR970123", "15007", '{"id":"15007","reading":2}'),
+    ]
+    measurement_spool.remove(entries[0][0])
+    assert len(measurement_spool) == 1
+    assert measurement_spool.peek(10)[0][2] == "15007"
+
+
+def test_spool_survives_restart(tmp_path):
+    """
+    Spooled measurements are kept on disk across bridge restarts.
+    """
+    path = str(tmp_path / "spool.db")
+    measurement_spool = spool.MeasurementSpool(path)
+    measurement_spool.append("RTR970123", "15006", '{"id":"15006"}')
+    measurement_spool.close()
+
+    reopened = spool.MeasurementSpool(path)
+
+    assert len(reopened) == 1
+    assert reopened.size_bytes == len('{"id":"15006"}')
+    assert reopened.peek(1)[0][3] == '{"id":"15006"}'
+
+
+def test_spool_evicts_oldest_entries_over_size_cap(tmp_path):
+    """
+    The oldest measurements are discarded when the size cap is exceeded.
+    """
+    measurement_spool = spool.MeasurementSpool(str(tmp_path / "spool.db"), max_bytes=25)
+    for sensor in ["15006", "15007", "15008"]:
+        measurement_spool.append("RTR970123", sensor, f'{{"id":"{sensor}"}}')
+
+    assert [entry[2] for entry in measurement_spool.peek(10)] == ["15008"]
+    assert measurement_spool.size_bytes == 14
+
+
+def test_spool_discards_entries_over_age_cap(tmp_path):
+    """
+    Measurements older than the age cap are discarded.
+    """
+    now = [1000.0]
+    measurement_spool = spool.MeasurementSpool(
+        str(tmp_path / "spool.db"),
+        max_age_seconds=60,
+        clock=lambda: now[0],
+    )
+    measurement_spool.append("RTR970123", "15006", '{"id":"15006"}')
+    now[0] += 30
+    measurement_spool.append("RTR970123", "15007", '{"id":"15007"}')
+    now[0] += 40
+
+    assert [entry[2] for entry in measurement_spool.peek(10)] == ["15007"]
+    assert len(measurement_spool) == 1
+
+
+def test_spool_prunes_expired_entries_periodically(tmp_path, monkeypatch):
+    """
+    Expired entries are deleted every few appends instead of on every one.
+    """
+    now = [1000.0]
+    measurement_spool = spool.MeasurementSpool(
+        str(tmp_path / "spool.db"),
+        clock=lambda: now[0],
+    )
+    deletes = []
+    original = measurement_spool._delete
+
+    def counting_delete(where, parameters=()):
+        deletes.append(where)
+        return original(where, parameters)
+
+    monkeypatch.setattr(measurement_spool, "_delete", counting_delete)
+    for sensor in range(spool.PRUNE_EVERY_APPENDS * 2):
+        measurement_spool.append("RTR970123", str(sensor), "{}")
+        measurement_spool.peek(1)
+
+    assert len(deletes) == 2
+    now[0] += spool.PRUNE_INTERVAL_SECONDS
+    measurement_spool.peek(1)
+    assert len(deletes) == 3
+
+
+def test_spool_reports_unusable_database(tmp_path):
+    """
+    A spool path that cannot be opened raises SpoolError.
+    """
+    with pytest.raises(spool.SpoolError):
+        spool.MeasurementSpool(str(tmp_path / "missing" / "spool.db"))
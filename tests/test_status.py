@@ -175,3 +175,162 @@ def test_textual_and_numeric_status_are_consistent():
     for checked_at in (observed_at, observed_at + timedelta(seconds=61)):
         for _key, payload, _rendered in tracker.changed_payloads(checked_at):
             assert payload["status_code"] == status.STATUS_CODES[payload["status"]]
+
+
+def _render_counter(monkeypatch):
+    calls = []
+    dumps = status.json.dumps
+
+    def counting_dumps(*args, **kwargs):
+        calls.append(args[0])
+        return dumps(*args, **kwargs)
+
+    monkeypatch.setattr(status.json, "dumps", counting_dumps)
+    return calls
+
+
+def test_changed_payloads_renders_only_touched_entities(monkeypatch):
+    """
+    A new observation re-renders only its receiver and sensor.
+    """
+    tracker = status.StatusTracker(offline_timeout=60)
+    observed_at = datetime(2026, 3, 26, 12, 0, tzinfo=timezone.utc)
+    for sensor in range(100):
+        tracker.record_observation("receiver-a", str(sensor), observed_at=observed_at)
+    for key, _payload, rendered in tracker.changed_payloads(observed_at):
+        tracker.mark_status_published(key, rendered)
+    renders = _render_counter(monkeypatch)
+
+    tracker.record_observation(
+        "receiver-a",
+        "7",
+        observed_at=observed_at + timedelta(seconds=5),
+    )
+    changed = tracker.changed_payloads(observed_at + timedelta(seconds=5))
+
+    assert [key for key, _payload, _rendered in changed] == [
+        ("receiver", "receiver-a", None),
+        ("sensor", "receiver-a", "7"),
+    ]
+    assert len(renders) == 2
+
+
+def test_offline_deadline_heap_marks_only_expired_entities(monkeypatch):
+    """
+    Timeouts are found from the deadline heap and superseded deadlines are skipped.
+    """
+    tracker = status.StatusTracker(offline_timeout=60)
+    observed_at = datetime(2026, 3, 26, 12, 0, tzinfo=timezone.utc)
+    tracker.record_observation("receiver-a", "old", observed_at=observed_at)
+    tracker.record_observation(
+        "receiver-a",
+        "fresh",
+        observed_at=observed_at + timedelta(seconds=30),
+    )
+    tracker.record_observation(
+        "receiver-a",
+        "old-refreshed",
+        observed_at=observed_at,
+    )
+    tracker.record_observation(
+        "receiver-a",
+        "old-refreshed",
+        observed_at=observed_at + timedelta(seconds=40),
+    )
+    for key, _payload, rendered in tracker.changed_payloads(observed_at):
+        tracker.mark_status_published(key, rendered)
+    renders = _render_counter(monkeypatch)
+
+    offline = tracker.changed_payloads(observed_at + timedelta(seconds=61))
+
+    assert [key for key, _payload, _rendered in offline] == [
+        ("sensor", "receiver-a", "old"),
+    ]
+    assert offline[0][1]["status"] == status.STATUS_OFFLINE
+    assert len(renders) == 1
+
+
+def test_unpublished_changes_stay_pending_until_marked_published():
+    """
+    A changed payload is reported again until its publish is confirmed.
+    """
+    tracker = status.StatusTracker(offline_timeout=60)
+    observed_at = datetime(2026, 3, 26, 12, 0, tzinfo=timezone.utc)
+    tracker.record_observation("receiver-a", "sensor-123", observed_at=observed_at)
+
+    first = tracker.changed_payloads(observed_at)
+    second = tracker.changed_payloads(observed_at)
+    for key, _payload, rendered in second:
+        tracker.mark_status_published(key, rendered)
+
+    assert first == second
+    assert tracker.changed_payloads(observed_at) == []
+
+
+def test_next_deadline_skips_superseded_heap_entries():
+    """
+    The next deadline comes from the latest observation of each entity.
+    """
+    tracker = status.StatusTracker(offline_timeout=60)
+    observed_at = datetime(2026, 3, 26, 12, 0, tzinfo=timezone.utc)
+
+    assert tracker.next_deadline() is None
+
+    tracker.record_observation("receiver-a", "sensor-1", observed_at=observed_at)
+    tracker.record_observation(
+        "receiver-a",
+        "sensor-1",
+        observed_at=observed_at + timedelta(seconds=10),
+    )
+
+    assert tracker.next_deadline() == observed_at + timedelta(seconds=70)
+
+
+def test_deadline_heap_keeps_one_entry_per_entity():
+    """
+    Repeated observations move the deadline without growing the heap.
+    """
+    tracker = status.StatusTracker(offline_timeout=60)
+    observed_at = datetime(2026, 3, 26, 12, 0, tzinfo=timezone.utc)
+    for second in range(1000):
+        tracker.record_observation(
+            "receiver-a",
+            "sensor-1",
+            observed_at=observed_at + timedelta(seconds=second),
+        )
+
+    assert len(tracker._deadlines) == 2
+    assert tracker.next_deadline() == observed_at + timedelta(seconds=1059)
+    for key, _payload, rendered in tracker.changed_payloads(
+        observed_at + timedelta(seconds=1059)
+    ):
+        tracker.mark_status_published(key, rendered)
+
+    offline = tracker.changed_payloads(observed_at + timedelta(seconds=1060))
+
+    assert {payload["status"] for _key, payload, _rendered in offline} == {
+        status.STATUS_OFFLINE
+    }
+    assert tracker.next_deadline() is None
+
+
+def test_restored_status_is_not_republished_until_it_changes():
+    """
+    Restored entities keep their published payload and offline deadline.
+    """
+    observed_at = datetime(2026, 4, 26, 10, 0, 0, tzinfo=timezone.utc)
+    tracker = status.StatusTracker(offline_timeout=60)
+    tracker.record_observation("receiver-a", "sensor-123", observed_at=observed_at)
+    for key, _payload, rendered in tracker.changed_payloads(observed_at):
+        tracker.mark_status_published(key, rendered)
+
+    restored = status.StatusTracker(offline_timeout=60)
+    restored.restore(tracker.snapshot())
+
+    assert restored.changed_payloads(observed_at + timedelta(seconds=30)) == []
+    assert restored.next_deadline() == observed_at + timedelta(seconds=60)
+    changed = restored.changed_payloads(observed_at + timedelta(seconds=61))
+    assert [payload["status"] for _key, payload, _rendered in changed] == [
+        "offline",
+        "offline",
+    ]
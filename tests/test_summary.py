@@ -24,6 +24,13 @@ def test_summary_topic_sanitizes_receiver_fragment():
     assert summary.summary_topic("receiver/a+#") == "summary/receiver_a"
 
 
+def test_summary_delta_topic_nests_under_summary_topic():
+    """
+    Delta documents are published below the retained summary topic.
+    """
+    assert summary.summary_delta_topic("receiver/a") == "summary/receiver_a/delta"
+
+
 def test_summary_payload_contains_known_transmitters_and_selected_metadata():
     """
     Summary payloads include compact latest transmitter state.
@@ -192,10 +199,193 @@ def test_summary_publishes_are_coalesced_until_debounce_expires():
     )
 
     assert len(due) == 1
-    receiver, payload, rendered = due[0]
+    receiver, rendered = due[0]
     assert receiver == "receiver-a"
-    assert set(payload["transmitters"]) == {"sensor-101", "sensor-102"}
-    assert json.loads(rendered) == payload
+    assert set(json.loads(rendered)["transmitters"]) == {"sensor-101", "sensor-102"}
 
     tracker.mark_published(receiver, rendered)
     assert tracker.due_payloads(now=6) == []
+
+
+def test_next_due_at_reports_earliest_pending_summary():
+    """
+    The earliest debounce deadline across receivers is exposed for timers.
+    """
+    monotonic_value = 10
+    tracker = summary.SummaryTracker(
+        debounce_seconds=5,
+        monotonic=lambda: monotonic_value,
+    )
+
+    assert tracker.next_due_at() is None
+
+    tracker.record_measurement("receiver-a", {"id": "1", "reading": 1})
+    monotonic_value = 12
+    tracker.record_measurement("receiver-b", {"id": "2", "reading": 2})
+
+    assert tracker.next_due_at() == 15
+    tracker.mark_published("receiver-a", "{}")
+    assert tracker.next_due_at() == 17
+
+
+def test_render_serializes_only_changed_transmitter_entries(monkeypatch):
+    """
+    Rendering a receiver summary re-serializes only transmitters that changed.
+    """
+    tracker = summary.SummaryTracker(debounce_seconds=5, monotonic=lambda: 0)
+    for sensor in range(50):
+        tracker.record_measurement("receiver-a", {"id": str(sensor), "reading": sensor})
+    tracker.record_measurement("receiver-b", {"id": "900", "reading": 9})
+    tracker.render("receiver-a")
+
+    rendered = []
+    original = summary.TransmitterSummary.payload
+
+    def counting_payload(self):
+        rendered.append(self.value)
+        return original(self)
+
+    monkeypatch.setattr(summary.TransmitterSummary, "payload", counting_payload)
+    tracker.record_measurement("receiver-a", {"id": "7", "reading": 70})
+    tracker.record_status(
+        {
+            "entity_type": "sensor",
+            "receiver": "receiver-a",
+            "sensor": "8",
+            "status": "offline",
+            "status_code": 0,
+        }
+    )
+    payload = json.loads(tracker.render("receiver-a"))
+
+    assert sorted(rendered) == [8, 70]
+    assert len(payload["transmitters"]) == 50
+    assert payload["transmitters"]["7"]["value"] == 70
+    assert payload["transmitters"]["8"]["status"] == "offline"
+    assert "900" not in payload["transmitters"]
+
+
+def test_render_matches_full_serialization_and_reuses_fragments(monkeypatch):
+    """
+    The joined document equals a full json.dumps and re-renders only changes.
+    """
+    tracker = summary.SummaryTracker(debounce_seconds=5, monotonic=lambda: 0)
+    updated_at = datetime(2026, 4, 26, 12, 0, 0, tzinfo=timezone.utc)
+    tracker.record_measurement(
+        "receiver-a",
+        {"id": "sensor-b", "reading": 21.4, "battery": 2.6, "unit": "°C"},
+    )
+    tracker.record_measurement("receiver-a", {"id": "sensor-a", "reading": None})
+
+    assert tracker.render("receiver-a", updated_at) == json.dumps(
+        tracker.payload("receiver-a", updated_at),
+        sort_keys=True,
+    )
+    assert tracker.render("receiver-empty", updated_at) == json.dumps(
+        tracker.payload("receiver-empty", updated_at),
+        sort_keys=True,
+    )
+
+    entries = []
+    original = summary.TransmitterSummary.payload
+
+    def counting_payload(self):
+        entries.append(self.value)
+        return original(self)
+
+    monkeypatch.setattr(summary.TransmitterSummary, "payload", counting_payload)
+    tracker.record_status(
+        {
+            "entity_type": "sensor",
+            "receiver": "receiver-a",
+            "sensor": "sensor-b",
+            "status": "offline",
+            "status_code": 0,
+        }
+    )
+    rendered = tracker.render("receiver-a", updated_at)
+
+    assert entries == [21.4]
+    assert json.loads(rendered)["transmitters"]["sensor-b"]["status"] == "offline"
+
+
+def test_due_payloads_use_version_counter_to_skip_unchanged_receivers():
+    """
+    A receiver whose summary did not change since its last publish is not due.
+    """
+    tracker = summary.SummaryTracker(debounce_seconds=0, monotonic=lambda: 0)
+    tracker.record_measurement("receiver-a", {"id": "sensor-a", "reading": 1})
+    version = tracker.version("receiver-a")
+    receiver, rendered = tracker.due_payloads(now=0)[0]
+    tracker.mark_published(receiver, rendered)
+
+    tracker.record_measurement("receiver-a", {"id": "sensor-a", "reading": 1})
+
+    assert tracker.version("receiver-a") == version
+    assert tracker.due_payloads(now=0) == []
+    tracker.record_measurement("receiver-a", {"id": "sensor-a", "reading": 2})
+    assert tracker.version("receiver-a") == version + 1
+    assert len(tracker.due_payloads(now=0)) == 1
+
+
+def test_delta_summaries_carry_changed_transmitters_and_sequence():
+    """
+    Deltas follow the debounce and full documents follow full_interval.
+    """
+    monotonic_value = 0
+    tracker = summary.SummaryTracker(
+        debounce_seconds=5,
+        monotonic=lambda: monotonic_value,
+        delta=True,
+        full_interval=60,
+    )
+    updated_at = datetime(2026, 4, 26, 12, 0, 0, tzinfo=timezone.utc)
+    tracker.record_measurement("receiver-a", {"id": "sensor-a", "reading": 1})
+    tracker.record_measurement("receiver-a", {"id": "sensor-b", "reading": 2})
+
+    monotonic_value = 5
+    (receiver, sequence, sensors, rendered), = tracker.due_deltas(updated_at=updated_at)
+    assert (receiver, sequence, sensors) == ("receiver-a", 1, ("sensor-a", "sensor-b"))
+    assert rendered == json.dumps(
+        tracker.delta_payload(receiver, sequence, sensors, updated_at),
+        sort_keys=True,
+    )
+    tracker.mark_delta_published(receiver, sequence, sensors)
+    receiver, full = tracker.due_payloads(updated_at=updated_at)[0]
+    tracker.mark_published(receiver, full)
+
+    monotonic_value = 10
+    tracker.record_measurement("receiver-a", {"id": "sensor-b", "reading": 3})
+    monotonic_value = 15
+    (receiver, sequence, sensors, rendered), = tracker.due_deltas(updated_at=updated_at)
+    assert (sequence, sensors) == (2, ("sensor-b",))
+    assert json.loads(rendered)["transmitters"]["sensor-b"]["value"] == 3
+    tracker.mark_delta_published(receiver, sequence, sensors)
+
+    assert tracker.due_deltas() == []
+    assert tracker.due_payloads() == []
+    assert tracker.next_due_at() == 65
+    monotonic_value = 65
+    assert len(tracker.due_payloads(updated_at=updated_at)) == 1
+
+
+def test_restored_summary_is_not_due_until_it_changes():
+    """
+    A restored receiver whose entries match the published digest is not due.
+    """
+    tracker = summary.SummaryTracker(debounce_seconds=0, monotonic=lambda: 0)
+    tracker.record_measurement("receiver-a", {"id": "sensor-a", "reading": 1})
+    tracker.record_measurement("receiver-b", {"id": "sensor-b", "reading": 2})
+    receiver, rendered = tracker.due_payloads()[0]
+    tracker.mark_published(receiver, rendered)
+
+    restored = summary.SummaryTracker(debounce_seconds=0, monotonic=lambda: 0)
+    restored.restore(json.loads(json.dumps(tracker.snapshot())))
+
+    assert [due[0] for due in restored.due_payloads()] == ["receiver-b"]
+    assert restored.render("receiver-a", datetime(2026, 4, 26, tzinfo=timezone.utc)) == (
+        tracker.render("receiver-a", datetime(2026, 4, 26, tzinfo=timezone.utc))
+    )
+    restored.record_measurement("receiver-a", {"id": "sensor-c", "reading": 3})
+    due = dict(restored.due_payloads())
+    assert set(json.loads(due["receiver-a"])["transmitters"]) == {"sensor-a", "sensor-c"}
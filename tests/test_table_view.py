@@ -6,6 +6,8 @@ import io
 import os
 
 from context import mtr2mqtt
+from mtr2mqtt.mtr import Measurement
+from mtr2mqtt.table_view import CLEAR_SCREEN
 from mtr2mqtt.table_view import MeasurementTableView
 
 
@@ -51,8 +53,9 @@ def test_table_view_keeps_latest_reading_for_sensor(monkeypatch):
 
     view.update("RTR970123", '{"id":"15006","reading":22.7}')
     view.update("RTR970123", '{"id":"15006","reading":23.1}')
+    view.flush(force=True)
 
-    rendered = stream.getvalue().split("\x1b[H\x1b[2J")[-1]
+    rendered = stream.getvalue().split("\x1b[6;1H")[-1]
 
     assert "23.1" in rendered
     assert "22.7" not in rendered
@@ -71,8 +74,9 @@ def test_table_view_sorts_rows_by_numeric_sensor_id(monkeypatch):
 
     view.update("RTR970123", '{"id":"15010","location":"B room","reading":20.0}')
     view.update("RTR970123", '{"id":"15002","location":"A room","reading":21.0}')
+    view.flush(force=True)
 
-    rendered = stream.getvalue().split("\x1b[H\x1b[2J")[-1]
+    rendered = stream.getvalue().split(CLEAR_SCREEN)[-1]
     assert rendered.index("15002") < rendered.index("15010")
 
 
@@ -98,7 +102,7 @@ def test_table_view_formats_timestamp_to_second_precision(monkeypatch):
         ),
     )
 
-    rendered = stream.getvalue().split("\x1b[H\x1b[2J")[-1]
+    rendered = stream.getvalue().split(CLEAR_SCREEN)[-1]
     assert displayed_timestamp in rendered
     assert full_timestamp not in rendered
 
@@ -142,7 +146,7 @@ def test_table_view_includes_status_information(monkeypatch):
         status_payload={"status": "online", "status_code": 1},
     )
 
-    rendered = stream.getvalue().split("\x1b[H\x1b[2J")[-1]
+    rendered = stream.getvalue().split(CLEAR_SCREEN)[-1]
     assert "status" in rendered
     assert "online" in rendered
     assert "status_code" not in rendered
@@ -175,7 +179,88 @@ def test_table_view_reflects_offline_status_transition(monkeypatch):
             }
         ]
     )
+    view.flush(force=True)
 
-    rendered = stream.getvalue().split("\x1b[H\x1b[2J")[-1]
+    rendered = stream.getvalue().split("\x1b[6;1H")[-1]
     assert "offline" in rendered
     assert "online" not in rendered
+
+
+def test_table_view_accepts_measurement_objects(monkeypatch):
+    """
+    Decoded measurements are rendered without a JSON round trip.
+    """
+    stream = io.StringIO()
+    view = MeasurementTableView(stream=stream)
+    monkeypatch.setattr(
+        "mtr2mqtt.table_view.shutil.get_terminal_size",
+        lambda *args, **kwargs: os.terminal_size((160, 24)),
+    )
+
+    view.update("RTR970123", Measurement({"id": "15006", "reading": 22.7}))
+
+    rendered = stream.getvalue()
+    assert "15006" in rendered
+    assert "22.7" in rendered
+
+
+def test_table_view_redraws_only_changed_rows_in_place(monkeypatch):
+    """
+    Value changes that fit the cached widths rewrite just their own row.
+    """
+    stream = io.StringIO()
+    view = MeasurementTableView(stream=stream, max_fps=0)
+    monkeypatch.setattr(
+        "mtr2mqtt.table_view.shutil.get_terminal_size",
+        lambda *args, **kwargs: os.terminal_size((160, 24)),
+    )
+    view.update("RTR970123", '{"id":"15002","reading":21.0}')
+    view.update("RTR970123", '{"id":"15010","reading":20.0,"location":"Attic"}')
+    stream.truncate(0)
+    stream.seek(0)
+
+    view.update("RTR970123", '{"id":"15010","reading":20.5,"location":"Attic"}')
+
+    rendered = stream.getvalue()
+    assert CLEAR_SCREEN not in rendered
+    assert rendered.startswith("\x1b[7;1H")
+    assert "20.5" in rendered
+    assert "15002" not in rendered
+
+    view.update("RTR970123", '{"id":"15010","reading":20.5,"location":"Boiler room next to the garage"}')
+
+    assert CLEAR_SCREEN in stream.getvalue()
+
+
+def test_table_view_coalesces_updates_into_limited_frame_rate(monkeypatch):
+    """
+    Updates inside one frame interval are drawn together on the next frame.
+    """
+    monotonic_value = 0
+    stream = io.StringIO()
+    view = MeasurementTableView(
+        stream=stream,
+        max_fps=10,
+        monotonic=lambda: monotonic_value,
+    )
+    monkeypatch.setattr(
+        "mtr2mqtt.table_view.shutil.get_terminal_size",
+        lambda *args, **kwargs: os.terminal_size((160, 24)),
+    )
+    view.update("RTR970123", '{"id":"15006","reading":22.7}')
+    drawn = stream.getvalue()
+
+    view.update("RTR970123", '{"id":"15006","reading":22.8}')
+    view.update("RTR970123", '{"id":"15006","reading":22.9}')
+
+    assert stream.getvalue() == drawn
+    assert view.next_frame_delay() == 0.1
+    view.flush()
+    assert stream.getvalue() == drawn
+
+    monotonic_value = 0.1
+    view.flush()
+
+    assert "22.9" in stream.getvalue()
+    assert "22.8" not in stream.getvalue()
+    assert view.next_frame_delay() is None